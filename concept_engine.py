@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Compiled concept extraction for the synthesis generators.
+
+All concept terms are compiled into a single alternation regex, so each
+response is scanned exactly once no matter how many concepts there are.
+Scans produce a sparse concept x (question, tradition) count matrix backed
+by NumPy arrays; theme analysis then works on columns of that matrix.
+
+The concept dictionary lives in synthesis_concepts.json:
+    {"concept": ["term", "term", ...], ...}
+"""
+
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+CONCEPTS_FILE = Path(__file__).with_name("synthesis_concepts.json")
+
+
+def load_concepts(path=CONCEPTS_FILE):
+    """Load an ordered {concept: [terms]} dictionary from a JSON file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+class ConceptEngine:
+    """Single-pass matcher for a dictionary of concepts."""
+
+    def __init__(self, concepts):
+        self.concepts = list(concepts.keys())
+        self.index = {name: i for i, name in enumerate(self.concepts)}
+
+        # One capture group per concept; m.lastindex tells which one matched.
+        # Longer terms first so "causation" is tried before "cause".
+        groups = []
+        for terms in concepts.values():
+            ordered = sorted(set(terms), key=len, reverse=True)
+            groups.append('(' + '|'.join(re.escape(t) for t in ordered) + ')')
+        self.pattern = re.compile(r'\b(?:' + '|'.join(groups) + r')\b', re.IGNORECASE)
+
+    @classmethod
+    def from_file(cls, path=CONCEPTS_FILE):
+        return cls(load_concepts(path))
+
+    def scan(self, text):
+        """Count concept hits in a text with one regex sweep."""
+        counts = np.zeros(len(self.concepts), dtype=np.int32)
+        for match in self.pattern.finditer(text):
+            counts[match.lastindex - 1] += 1
+        return counts
+
+    def extract(self, text):
+        """Names of the concepts present in a text, in dictionary order."""
+        return [self.concepts[i] for i in np.flatnonzero(self.scan(text))]
+
+    def matrix(self, keyed_texts):
+        """Scan (key, text) pairs into a sparse ConceptMatrix."""
+        columns = []
+        rows, cols, counts = [], [], []
+        for key, text in keyed_texts:
+            j = len(columns)
+            columns.append(key)
+            hits = self.scan(text)
+            nonzero = np.flatnonzero(hits)
+            rows.append(nonzero)
+            cols.append(np.full(len(nonzero), j, dtype=np.int32))
+            counts.append(hits[nonzero])
+
+        def concat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+        return ConceptMatrix(
+            self.concepts,
+            columns,
+            concat(rows, np.int32),
+            concat(cols, np.int32),
+            concat(counts, np.int32),
+        )
+
+
+class ConceptMatrix:
+    """Sparse concept x column count matrix in coordinate (COO) form."""
+
+    def __init__(self, concepts, columns, rows, cols, counts):
+        self.concepts = concepts
+        self.columns = columns
+        self.column_index = {key: j for j, key in enumerate(columns)}
+        self.rows = rows
+        self.cols = cols
+        self.counts = counts
+
+    @property
+    def shape(self):
+        return len(self.concepts), len(self.columns)
+
+    def dense(self, keys=None):
+        """Dense counts for the given columns (all columns if keys is None)."""
+        if keys is None:
+            out = np.zeros(self.shape, dtype=np.int32)
+            out[self.rows, self.cols] = self.counts
+            return out
+
+        positions = np.full(len(self.columns), -1, dtype=np.int64)
+        for k, key in enumerate(keys):
+            positions[self.column_index[key]] = k
+        selected = positions[self.cols] >= 0
+        out = np.zeros((len(self.concepts), len(keys)), dtype=np.int32)
+        out[self.rows[selected], positions[self.cols[selected]]] = self.counts[selected]
+        return out
+
+    def presence(self, keys=None):
+        """Boolean concept-present matrix for the given columns."""
+        return self.dense(keys) > 0
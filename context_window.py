@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Small-to-big context expansion for retrieved chunks.
+
+Retrieval returns single chunks (one purport paragraph, one response
+section), and the synthesis prompt loses what surrounds them. expand()
+takes the top-k hits, computes each hit's window (chunk_index +/- window
+within the same verse or response), merges overlapping windows, and
+fetches every neighbour with ONE range query joined against a VALUES
+list of windows, instead of one query per hit. Hits that fall inside the
+same merged window become one passage, so no text is sent twice.
+
+The token budget is spent in rank order: first every hit's own chunk,
+then neighbours ring by ring (distance 1, 2, ...) while they fit, so a
+tight budget trims context rather than dropping hits.
+
+    passages = context_window.expand(conn, chunks, 'responses', window=1, token_budget=6000)
+"""
+
+from collections import defaultdict
+
+import rate_limit
+
+WINDOW = 1
+TOKEN_BUDGET = 6000
+
+# corpus -> (table, group column, text column, text key in hit dicts)
+CORPORA = {
+    'vedabase_chunks': ('vedabase_chunks', 'verse_id', 'content', 'content'),
+    'responses': ('embeddings', 'response_id', 'chunk_text', 'chunk_text'),
+}
+
+
+def merge_windows(hits, group_key, window):
+    """[(group, lo, hi, [hit ranks])] with overlapping or touching windows merged."""
+    by_group = defaultdict(list)
+    for rank, hit in enumerate(hits):
+        if hit.get('chunk_index') is None:
+            continue
+        index = hit['chunk_index']
+        by_group[hit[group_key]].append((index - window, index + window, rank))
+
+    merged = []
+    for group, spans in by_group.items():
+        spans.sort()
+        lo, hi, ranks = spans[0][0], spans[0][1], [spans[0][2]]
+        for span_lo, span_hi, rank in spans[1:]:
+            if span_lo <= hi + 1:
+                hi = max(hi, span_hi)
+                ranks.append(rank)
+            else:
+                merged.append((group, lo, hi, ranks))
+                lo, hi, ranks = span_lo, span_hi, [rank]
+        merged.append((group, lo, hi, ranks))
+    return merged
+
+
+def fetch_windows(conn, corpus, windows):
+    """{(group, chunk_index): text} for every chunk inside windows, in one query."""
+    table, group_column, text_column, _ = CORPORA[corpus]
+    if not windows:
+        return {}
+    values = ', '.join('(?, ?, ?)' for _ in windows)
+    params = [value for group, lo, hi, _ in windows for value in (group, lo, hi)]
+    rows = conn.execute(f"""
+        WITH w(grp, lo, hi) AS (VALUES {values})
+        SELECT t.{group_column}, t.chunk_index, t.{text_column}
+        FROM w JOIN {table} t ON t.{group_column} = w.grp AND t.chunk_index BETWEEN w.lo AND w.hi
+    """, params)
+    chunks = {}
+    for group, index, text in rows:
+        # Several sections may share an index position; keep the first
+        chunks.setdefault((group, index), text)
+    return chunks
+
+
+def expand(conn, hits, corpus, window=WINDOW, token_budget=TOKEN_BUDGET):
+    """Passages built from hits plus neighbours, best-ranked first.
+
+    Each passage is a copy of its best hit with the text replaced by the
+    window's chunks in order, plus 'context_indexes' (chunk indexes it
+    covers) and 'merged_hits' (how many hits it absorbed).
+    """
+    if not hits:
+        return []
+    _, group_key, _, text_key = CORPORA[corpus]
+    windows = merge_windows(hits, group_key, window) if window > 0 else []
+    chunks = fetch_windows(conn, corpus, windows)
+
+    passages = []
+    for group, lo, hi, ranks in windows:
+        own = {hits[rank]['chunk_index']: hits[rank][text_key] for rank in ranks}
+        texts = {index: chunks.get((group, index)) for index in range(lo, hi + 1)}
+        texts.update(own)
+        passages.append({'rank': min(ranks), 'ranks': ranks, 'own': sorted(own),
+                         'texts': {index: text for index, text in texts.items() if text}})
+    windowed = {rank for passage in passages for rank in passage['ranks']}
+    for rank, hit in enumerate(hits):
+        if rank not in windowed:
+            passages.append({'rank': rank, 'ranks': [rank], 'own': [None], 'texts': {None: hit[text_key]}})
+    passages.sort(key=lambda passage: passage['rank'])
+
+    # Budget: every hit's own chunk first, then neighbours ring by ring
+    used = 0
+    for passage in passages:
+        passage['chosen'] = set()
+        for index in passage['own']:
+            cost = rate_limit.estimate_tokens(passage['texts'][index])
+            if used + cost <= token_budget or not used:
+                passage['chosen'].add(index)
+                used += cost
+    for distance in range(1, window + 1):
+        for passage in passages:
+            if not passage['chosen'] or None in passage['chosen']:
+                continue
+            for index in sorted(passage['texts']):
+                if index in passage['chosen'] or min(abs(index - own) for own in passage['own']) != distance:
+                    continue
+                # Only grow next to text already chosen, so passages stay contiguous
+                if index - 1 not in passage['chosen'] and index + 1 not in passage['chosen']:
+                    continue
+                cost = rate_limit.estimate_tokens(passage['texts'][index])
+                if used + cost <= token_budget:
+                    passage['chosen'].add(index)
+                    used += cost
+
+    result = []
+    for passage in passages:
+        if not passage['chosen']:
+            continue
+        indexes = sorted(passage['chosen'], key=lambda index: -1 if index is None else index)
+        best = dict(hits[passage['rank']])
+        best[text_key] = '\n\n'.join(passage['texts'][index] for index in indexes)
+        best['context_indexes'] = [index for index in indexes if index is not None]
+        best['merged_hits'] = len(passage['ranks'])
+        result.append(best)
+    return result
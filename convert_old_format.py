@@ -8,12 +8,14 @@ New format: ~400 words, 8 sections with headers
 """
 
 import os
-import re
 import time
 from pathlib import Path
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
+import tradition_catalog
+from org_index import load_index
+
 load_dotenv()
 
 client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
@@ -28,21 +30,20 @@ conversion_stats = {
 
 def extract_old_format_responses(file_path):
     """Extract responses from old format .org files"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Pattern for old format: *** 1.1.1 Catholic Response
-    pattern = r'\*\*\* (\d+\.\d+)\.(\d+) (.+?) Response\n\n(.+?)(?=\n\*\*\* \d+\.\d+\.\d+|\Z)'
-    matches = re.findall(pattern, content, re.DOTALL)
-
     responses = []
-    for question_num, tradition_num, tradition_name, full_text in matches:
-        responses.append({
-            'question_number': question_num,
-            'tradition_number': int(tradition_num),
-            'tradition_name': tradition_name.strip(),
-            'old_text': full_text.strip()
-        })
+
+    # Old format headers: *** 1.1.1 Catholic Response
+    with load_index(file_path) as index:
+        for entry in index.responses:
+            if not entry.explicit or entry.number.count('.') != 2:
+                continue
+            question_num, tradition_num = entry.number.rsplit('.', 1)
+            responses.append({
+                'question_number': question_num,
+                'tradition_number': int(tradition_num),
+                'tradition_name': entry.tradition,
+                'old_text': index.raw(entry).strip()
+            })
 
     return responses
 
@@ -222,6 +223,14 @@ def main():
 
     files_to_convert = sorted(set(files_to_convert))
 
+    # Skip files that are already NEW format or were converted unchanged
+    catalog = tradition_catalog.connect()
+    tradition_catalog.refresh_paths(catalog, files_to_convert)
+    files_to_convert = [
+        f for f in tradition_catalog.pending(catalog, 'convert_old_format', files_to_convert)
+        if tradition_catalog.file_format(catalog, f) == 'OLD'
+    ]
+
     print(f"Found {len(files_to_convert)} files to convert:")
     for f in files_to_convert:
         print(f"  - {f.name}")
@@ -229,8 +238,7 @@ def main():
     # Estimate cost
     total_responses = 0
     for file_path in files_to_convert:
-        responses = extract_old_format_responses(file_path)
-        total_responses += len(responses)
+        total_responses += tradition_catalog.response_count(catalog, file_path)
 
     estimated_cost = total_responses * 0.02  # ~$0.02 per response
     print(f"\n📊 Total responses: {total_responses}")
@@ -242,6 +250,7 @@ def main():
 
     if response != 'yes':
         print("❌ Cancelled")
+        catalog.close()
         return
 
     # Convert files
@@ -255,7 +264,15 @@ def main():
         output_path = file_path.parent / f"{file_path.stem}_CONVERTED.txt"
 
         # Convert
+        failed_before = conversion_stats['failed']
         convert_file(file_path, output_path, dry_run=False)
+        if conversion_stats['failed'] == failed_before:
+            tradition_catalog.mark_processed(catalog, 'convert_old_format', file_path)
+        else:
+            tradition_catalog.mark_processed(catalog, 'convert_old_format', file_path,
+                                             status='failed', error='some responses failed')
+
+    catalog.close()
 
     # Print summary
     print("\n" + "="*80)
@@ -6,6 +6,13 @@ Delete lecture vectors from Vectorize and re-upload with correct metadata
 import json
 import subprocess
 from pathlib import Path
+import delete_vectors
+import embedding_store
+import rate_limit
+import vectorize_api
+
+EMBEDDINGS_NAME = "lecture_embeddings"
+INDEX = vectorize_api.index_name()  # live generation of the philosophy-vectors alias
 
 # Step 1: Delete lecture vectors (IDs 19824-26863)
 print("="*80)
@@ -13,38 +20,14 @@ print("DELETING OLD LECTURE VECTORS")
 print("="*80)
 print("Deleting vector IDs 19824-26863 from Vectorize...\n")
 
-# Create list of IDs to delete
-lecture_ids = [str(i) for i in range(19824, 26864)]  # 19824 to 26863 inclusive
-
-# Split into batches of 1000 (Vectorize limit)
-batch_size = 1000
-total_deleted = 0
-
-for i in range(0, len(lecture_ids), batch_size):
-    batch = lecture_ids[i:i+batch_size]
-    batch_num = (i // batch_size) + 1
-    total_batches = (len(lecture_ids) + batch_size - 1) // batch_size
-
-    print(f"Deleting batch {batch_num}/{total_batches} ({len(batch)} vectors)...")
-
-    # Create JSON array for the IDs
-    ids_json = json.dumps(batch)
-
-    result = subprocess.run(
-        ['npx', 'wrangler', 'vectorize', 'delete-vectors', 'philosophy-vectors', '--ids', ids_json],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode == 0:
-        total_deleted += len(batch)
-        print(f"  ✓ Deleted {len(batch)} vectors")
-        print(f"  Progress: {total_deleted}/{len(lecture_ids)}\n")
-    else:
-        print(f"  ✗ Failed to delete batch {batch_num}")
-        print(f"  Error: {result.stderr}")
-        print(f"  Note: This may be OK if vectors don't exist")
-        print()
+# Lecture vectors use the bare chunk id; concurrent batches through delete_vectors
+lecture_ids = {str(i): i for i in range(19824, 26864)}  # 19824 to 26863 inclusive
+state = delete_vectors.delete(INDEX, lecture_ids, 'ids=19824-26863')
+total_deleted = state['done']
+if state['failed']:
+    print(f"  ✗ {state['failed']} vector IDs failed to delete")
+    print(f"  Retry with: python3 job_ledger.py retry delete:{INDEX}:ids=19824-26863")
+    exit(1)
 
 print(f"\n✓ Deletion complete: {total_deleted} vector IDs processed\n")
 
@@ -82,8 +65,7 @@ for i in range(0, len(lecture_chunks), batch_size):
     texts = [chunk['content'] for chunk in batch]
 
     # Call OpenAI API
-    import requests
-    response = requests.post(
+    response = rate_limit.post(
         'https://api.openai.com/v1/embeddings',
         headers={
             'Content-Type': 'application/json',
@@ -103,40 +85,32 @@ for i in range(0, len(lecture_chunks), batch_size):
     embeddings_data = response.json()
     embeddings = [item['embedding'] for item in embeddings_data['data']]
 
-    # Prepare vectors with correct metadata
-    vectors_data = []
-    for chunk, embedding in zip(batch, embeddings):
-        # Get book code from chunk
-        book_id = chunk['book_id']
-        book_codes = {
-            9: 'LEC1A', 10: 'LEC1B', 11: 'LEC1C',
-            12: 'LEC2A', 13: 'LEC2B', 14: 'LEC2C', 15: 'OTHER'
+    # Save to the lecture_embeddings artifact with correct metadata
+    book_codes = {
+        9: 'LEC1A', 10: 'LEC1B', 11: 'LEC1C',
+        12: 'LEC2A', 13: 'LEC2B', 14: 'LEC2C', 15: 'OTHER'
+    }
+    rows = embedding_store.upsert(EMBEDDINGS_NAME, [str(chunk['id']) for chunk in batch], embeddings, [
+        {
+            'chunk_id': chunk['id'],
+            'verse_id': chunk['verse_id'],
+            'chunk_type': 'lecture_content',
+            'source': 'vedabase',  # Correct source
+            'book_code': book_codes.get(chunk['book_id'], 'OTHER')  # Added for filtering
         }
-        book_code = book_codes.get(book_id, 'OTHER')
-
-        vectors_data.append({
-            'id': str(chunk['id']),
-            'values': embedding,
-            'metadata': {
-                'chunk_id': chunk['id'],
-                'verse_id': chunk['verse_id'],
-                'chunk_type': 'lecture_content',
-                'source': 'vedabase',  # Correct source
-                'book_code': book_code  # Added for filtering
-            }
-        })
-
-    # Save to temp NDJSON
+        for chunk in batch
+    ])
+
+    # Write the batch from the artifact as NDJSON for wrangler
     temp_file = Path('temp_vectors.ndjson')
-    with open(temp_file, 'w') as f:
-        for vector in vectors_data:
-            f.write(json.dumps(vector) + '\n')
+    with embedding_store.EmbeddingStore(EMBEDDINGS_NAME) as store:
+        store.write_ndjson(temp_file, ids=list(rows), rows=rows)
 
     # Upload using wrangler with UPSERT (not insert)
     print("  Uploading to Vectorize with UPSERT...")
 
     result = subprocess.run(
-        ['npx', 'wrangler', 'vectorize', 'upsert', 'philosophy-vectors', '--file=temp_vectors.ndjson'],
+        ['npx', 'wrangler', 'vectorize', 'upsert', INDEX, '--file=temp_vectors.ndjson'],
         capture_output=True,
         text=True
     )
@@ -157,6 +131,9 @@ for i in range(0, len(lecture_chunks), batch_size):
         print(f"  Stopping. Fix the issue and run again to resume.")
         exit(1)
 
+# The lecture vectors are back: drop their tombstones
+delete_vectors.clear_tombstones(INDEX, lecture_ids)
+
 print("\n" + "="*80)
 print("COMPLETE!")
 print("="*80)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Bulk-delete Vectorize vectors selected by D1 predicates.
+
+Targets are resolved from the local D1 mirror (book code, chunk type,
+chunk id range) and mapped to vector ids with --id-format, since the
+uploads used different schemes over time:
+
+    vedabase_chunk_{id}   generate_vedabase_embeddings.py (default)
+    {id}                  the lecture uploads
+    letters_{id}          the first letters upload
+
+Tombstones are written before anything is sent, so local consumers stop
+using those vectors at once: index_alias.py neither re-uploads them into
+a new generation nor expects them when verifying against D1. Deletes go
+out in DELETE_BATCH-sized requests from --workers threads through the
+job ledger (failed batches are retried, an interrupted run resumes), and
+a sampled get_by_ids pass confirms the vectors are gone.
+
+Usage:
+    python3 delete_vectors.py delete --book LETTERS --id-format 'letters_{id}' --dry-run
+    python3 delete_vectors.py delete --ids 19824-26863 --id-format '{id}' --workers 8
+    python3 delete_vectors.py delete --book SB --chunk-type purport_paragraph --yes
+    python3 delete_vectors.py restore --book LETTERS --id-format 'letters_{id}'   # re-uploaded
+    python3 delete_vectors.py verify [--index NAME] [--sample 200]
+    python3 delete_vectors.py status
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+import job_ledger
+import storage
+import vectorize_api
+
+load_dotenv()
+
+TOMBSTONE_DB = "vector_tombstones.db"
+ID_FORMAT = "vedabase_chunk_{id}"
+WORKERS = 4
+VERIFY_SAMPLE = 200
+PREVIEW = 5
+
+
+def connect(db_path=TOMBSTONE_DB):
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS tombstones (
+        index_name TEXT NOT NULL,
+        vector_id TEXT NOT NULL,
+        chunk_id INTEGER,
+        reason TEXT,
+        deleted_at REAL NOT NULL,
+        verified_at REAL,
+        PRIMARY KEY (index_name, vector_id)
+    )
+    """)
+    return conn
+
+
+def _rows(sql, params=(), db_path=TOMBSTONE_DB):
+    """Read-only query that never creates the tombstone DB."""
+    if not Path(db_path).exists():
+        return []
+    conn = sqlite3.connect(f"file:{Path(db_path).resolve()}?mode=ro", uri=True)
+    try:
+        return conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+
+def tombstoned_ids(index=None):
+    """Deleted vector ids (of one index, or of any)."""
+    if index:
+        return {row[0] for row in _rows("SELECT vector_id FROM tombstones WHERE index_name = ?", (index,))}
+    return {row[0] for row in _rows("SELECT vector_id FROM tombstones")}
+
+
+def tombstoned_chunks(index=None):
+    """D1 chunk ids whose vectors were deleted (of one index, or of any)."""
+    if index:
+        rows = _rows("SELECT chunk_id FROM tombstones WHERE index_name = ? AND chunk_id IS NOT NULL", (index,))
+    else:
+        rows = _rows("SELECT chunk_id FROM tombstones WHERE chunk_id IS NOT NULL")
+    return {row[0] for row in rows}
+
+
+def parse_range(spec):
+    """'19824-26863' -> (19824, 26863); '19824' -> (19824, 19824)."""
+    first, _, last = spec.partition('-')
+    return int(first), int(last or first)
+
+
+def resolve_chunks(books=(), chunk_types=(), ranges=()):
+    """Chunk ids in the D1 mirror matching every given predicate."""
+    where, params = [], []
+    if books:
+        where.append(f"b.code IN ({', '.join('?' * len(books))})")
+        params.extend(books)
+    if chunk_types:
+        where.append(f"c.chunk_type IN ({', '.join('?' * len(chunk_types))})")
+        params.extend(chunk_types)
+    if ranges:
+        where.append('(' + ' OR '.join('c.id BETWEEN ? AND ?' for _ in ranges) + ')')
+        for first, last in ranges:
+            params.extend((first, last))
+    return [row[0] for row in storage.read_connection().execute(f"""
+        SELECT c.id
+        FROM vedabase_chunks c
+        JOIN vedabase_verses v ON c.verse_id = v.id
+        JOIN vedabase_books b ON v.book_id = b.id
+        WHERE {' AND '.join(where)}
+        ORDER BY c.id
+    """, params)]
+
+
+def record_tombstones(index, targets, reason):
+    """targets: {vector_id: chunk_id}."""
+    conn = connect()
+    with conn:
+        storage.executemany_chunked(conn, """
+            INSERT OR IGNORE INTO tombstones (index_name, vector_id, chunk_id, reason, deleted_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, ((index, vector_id, chunk_id, reason, time.time()) for vector_id, chunk_id in targets.items()))
+    conn.close()
+
+
+def clear_tombstones(index, vector_ids):
+    """Forget deletions of vector_ids (they were uploaded again); returns the count."""
+    conn = connect()
+    with conn:
+        cleared = storage.executemany_chunked(conn, """
+            DELETE FROM tombstones WHERE index_name = ? AND vector_id = ?
+        """, ((index, vector_id) for vector_id in vector_ids))
+    conn.close()
+    return cleared
+
+
+def worker(job, index, number, totals, lock):
+    """Claim DELETE_BATCH ids at a time until the job is drained."""
+    ledger = job_ledger.connect()
+    owner = f"{job_ledger.worker_id()}:{number}"
+    try:
+        while True:
+            ids = job_ledger.claim(ledger, job, owner, vectorize_api.DELETE_BATCH)
+            if not ids:
+                break
+            try:
+                vectorize_api.delete_by_ids(ids, index)
+            except Exception as e:
+                job_ledger.fail(ledger, job, owner, ids, e)
+                print(f"  ❌ [{owner}] {ids[0]}..{ids[-1]}: {e}")
+                continue
+            job_ledger.complete(ledger, job, owner, ids)
+            with lock:
+                totals['deleted'] += len(ids)
+                print(f"  🗑️  {totals['deleted']:,}/{totals['total']:,} delete requests sent")
+    finally:
+        ledger.close()
+
+
+def delete(index, targets, reason, workers=WORKERS, job=None):
+    """Tombstone and delete {vector_id: chunk_id}; returns the ledger counts."""
+    record_tombstones(index, targets, reason)
+
+    job = job or f"delete:{index}:{reason}"
+    ledger = job_ledger.connect()
+    # A finished job of the same name is an earlier run: delete again rather than resume
+    if job_ledger.drop_if_done(ledger, job):
+        print(f"🔁 Ledger job {job} finished earlier; sending the deletes again")
+    if not job_ledger.create_job(ledger, job, sorted(targets)):
+        print(f"↩️  Resuming ledger job {job}")
+    ledger.close()
+
+    totals = {'deleted': 0, 'total': len(targets)}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=worker, args=(job, index, number, totals, lock))
+               for number in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ledger = job_ledger.connect()
+    state = job_ledger.counts(ledger, job)
+    ledger.close()
+    return state
+
+
+def verify(index, sample_size=VERIFY_SAMPLE):
+    """Sample unverified tombstones and check the index no longer has them.
+
+    Returns (checked, still_present). Absent ids are marked verified.
+    """
+    pending = [row[0] for row in _rows(
+        "SELECT vector_id FROM tombstones WHERE index_name = ? AND verified_at IS NULL", (index,))]
+    sample = random.sample(pending, min(sample_size, len(pending)))
+    present = {record['id'] for record in vectorize_api.get_by_ids(sample, index)}
+    gone = [vector_id for vector_id in sample if vector_id not in present]
+    # Every sampled id gone: the whole deletion has landed
+    confirmed = pending if sample and not present else gone
+
+    conn = connect()
+    with conn:
+        storage.executemany_chunked(conn, """
+            UPDATE tombstones SET verified_at = ? WHERE index_name = ? AND vector_id = ?
+        """, ((time.time(), index, vector_id) for vector_id in confirmed))
+    conn.close()
+    return len(sample), sorted(present)
+
+
+def print_verify(index, sample_size):
+    checked, present = verify(index, sample_size)
+    if not checked:
+        print(f"✅ No unverified tombstones for {index}")
+    elif present:
+        print(f"⚠️  {len(present)}/{checked} sampled vectors are still in {index} (e.g. {present[:PREVIEW]})")
+        print(f"   Deletes are applied asynchronously; rerun: python3 delete_vectors.py verify --index {index}")
+    else:
+        print(f"✅ {checked} sampled vectors are gone from {index}")
+
+
+def print_status():
+    rows = _rows("""
+        SELECT index_name, reason, COUNT(*), COUNT(verified_at), MAX(deleted_at)
+        FROM tombstones GROUP BY index_name, reason ORDER BY MAX(deleted_at)
+    """)
+    for index, reason, count, verified, deleted_at in rows:
+        print(f"🪦 {index}  {reason}: {count:,} vectors ({verified:,} verified) "
+              f"[{time.strftime('%Y-%m-%d %H:%M', time.localtime(deleted_at))}]")
+    if not rows:
+        print("(no tombstones)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-delete Vectorize vectors selected from D1')
+    sub = parser.add_subparsers(dest='command', required=True)
+    targets_parser = argparse.ArgumentParser(add_help=False)
+    targets_parser.add_argument('--book', action='append', default=[], help='book code (repeatable)')
+    targets_parser.add_argument('--chunk-type', action='append', default=[], help='chunk type (repeatable)')
+    targets_parser.add_argument('--ids', action='append', default=[], help="chunk id range '19824-26863' (repeatable)")
+    targets_parser.add_argument('--id-format', default=ID_FORMAT, help=f'vector id template (default: {ID_FORMAT})')
+    targets_parser.add_argument('--index', help=f'Vectorize index (default: {vectorize_api.index_name()})')
+    p = sub.add_parser('delete', parents=[targets_parser], help='tombstone and delete matching vectors')
+    p.add_argument('--workers', type=int, default=WORKERS)
+    p.add_argument('--dry-run', action='store_true', help='list the targets, change nothing')
+    p.add_argument('--yes', action='store_true', help='do not ask for confirmation')
+    p = sub.add_parser('verify', help='check a sample of tombstoned ids is gone')
+    p.add_argument('--index')
+    p.add_argument('--sample', type=int, default=VERIFY_SAMPLE)
+    sub.add_parser('restore', parents=[targets_parser],
+                   help='clear tombstones of matching vectors after uploading them again')
+    sub.add_parser('status', help='tombstones per index and deletion')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print_status()
+        return
+    index = vectorize_api.index_name(args.index)
+    if args.command == 'verify':
+        print_verify(index, args.sample)
+        return
+
+    if not (args.book or args.chunk_type or args.ids):
+        parser.error('no targets: give --book, --chunk-type and/or --ids')
+    chunk_ids = resolve_chunks(args.book, args.chunk_type, [parse_range(spec) for spec in args.ids])
+    targets = {args.id_format.format(id=chunk_id): chunk_id for chunk_id in chunk_ids}
+    reason = ','.join([f"book={b}" for b in args.book] + [f"type={t}" for t in args.chunk_type] +
+                      [f"ids={spec}" for spec in args.ids])
+
+    if args.command == 'restore':
+        print(f"♻️  Cleared {clear_tombstones(index, targets):,} tombstones in {index} ({reason})")
+        return
+
+    print(f"🎯 {len(targets):,} vectors in {index} match {reason}")
+    if not targets:
+        return
+    preview = list(targets)
+    print(f"   {', '.join(preview[:PREVIEW])}{' ... ' + preview[-1] if len(preview) > PREVIEW else ''}")
+    if args.dry_run:
+        return
+    if not args.yes:
+        response = input(f"Delete {len(targets):,} vectors from {index}? (yes/no): ").strip().lower()
+        if response != 'yes':
+            print("Cancelled")
+            return
+
+    started = time.time()
+    state = delete(index, targets, reason, args.workers)
+    print(f"\n{'✅' if not state['failed'] else '⚠️ '} {state['done']:,} deleted, {state['failed']:,} failed "
+          f"in {time.time() - started:.1f}s")
+    if state['failed']:
+        print(f"   Retry with: python3 job_ledger.py retry delete:{index}:{reason} && rerun this command")
+        sys.exit(1)
+    print_verify(index, VERIFY_SAMPLE)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,33 +7,17 @@ by checking for section headers.
 import re
 from pathlib import Path
 
+import tradition_catalog
+from tradition_catalog import FORMAT_SAMPLE_CHARS, classify_format
+
 def detect_format(file_path):
     """Detect if file is old format (4 paragraphs) or new format (8 sections)"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read(5000)  # Read first 5000 chars
-
-        # Check for new format section headers
-        section_headers = [
-            r'\*\*Historical Development\*\*',
-            r'\*\*Key Concepts\*\*',
-            r'\*\*Core Arguments\*\*',
-            r'\*\*Counter-Arguments\*\*',
-            r'\*\*Textual Foundation\*\*',
-            r'\*\*Internal Variations\*\*',
-            r'\*\*Contemporary Applications\*\*'
-        ]
-
-        header_count = 0
-        for pattern in section_headers:
-            if re.search(pattern, content):
-                header_count += 1
+            content = f.read(FORMAT_SAMPLE_CHARS)  # Read first 5000 chars
 
         # If we find 3+ section headers, it's new format
-        if header_count >= 3:
-            return 'NEW'
-        else:
-            return 'OLD'
+        return classify_format(content)
 
     except Exception as e:
         return f'ERROR: {e}'
@@ -60,8 +44,12 @@ def main():
     new_format_files = []
     error_files = []
 
+    # Only new or changed files are re-read; the rest come from the catalog
+    conn = tradition_catalog.connect()
+    tradition_catalog.refresh_paths(conn, sorted(response_files))
+
     for file_path in sorted(response_files):
-        format_type = detect_format(file_path)
+        format_type = tradition_catalog.file_format(conn, file_path) or detect_format(file_path)
 
         if format_type == 'OLD':
             old_format_files.append(file_path)
@@ -94,14 +82,8 @@ def main():
     # Estimate responses and cost
     total_responses = 0
     for f in old_format_files:
-        try:
-            with open(f, 'r', encoding='utf-8') as file:
-                content = file.read()
-                # Count response markers
-                count = len(re.findall(r'\*\*\* \d+\.\d+\.\d+ .+ Response', content))
-                total_responses += count
-        except:
-            pass
+        total_responses += tradition_catalog.response_count(conn, f)
+    conn.close()
 
     estimated_cost = total_responses * 0.02  # ~$0.02 per response
 
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+On-disk embedding artifacts shared by the generators and uploaders.
+
+An artifact called NAME is two files:
+    NAME.npy          float32 matrix, one row per vector (read via mmap)
+    NAME.meta.sqlite  one row per vector: Vectorize id + JSON metadata
+
+Generators append vectors as they arrive from the API, so nothing is held
+in memory; uploaders read fixed-size slices and stream them out as the
+NDJSON that `wrangler vectorize insert/upsert --file` expects.
+
+Resumable generators (ledger jobs, several workers) upsert() each batch
+into the artifact instead: rows are written in place under a file lock
+and the .npy row count is only advanced once the batch is complete, then
+the batch is uploaded from the artifact.
+
+Usage:
+    python3 embedding_store.py info kb_embeddings
+    python3 embedding_store.py ndjson kb_embeddings kb_embeddings.ndjson
+    python3 embedding_store.py import-json kb_embeddings_for_upload.json kb_embeddings
+"""
+
+import fcntl
+import json
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+DTYPE = np.dtype('<f4')
+NPY_HEADER_BYTES = 128       # fixed so the row count can be patched in on close
+NDJSON_DECIMALS = 8          # float32 keeps ~7 significant digits
+
+
+def npy_path(name):
+    return Path(f"{name}.npy")
+
+
+def meta_path(name):
+    return Path(f"{name}.meta.sqlite")
+
+
+def lock_path(name):
+    return Path(f"{name}.lock")
+
+
+def exists(name):
+    """True if both files of an artifact are present."""
+    return npy_path(name).exists() and meta_path(name).exists()
+
+
+def size_mb(name):
+    """Combined size of an artifact's files in MB."""
+    return (npy_path(name).stat().st_size + meta_path(name).stat().st_size) / (1024 * 1024)
+
+
+def _npy_header(rows, dim):
+    """Version 1.0 .npy header padded to NPY_HEADER_BYTES."""
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d, %d), }" % (DTYPE.str, rows, dim)
+    header = header.ljust(NPY_HEADER_BYTES - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1')
+
+
+class EmbeddingWriter:
+    """Append-only writer for an embedding artifact.
+
+    Files are written under temporary names and moved into place on
+    close(), so an interrupted run never leaves a half-written artifact.
+    """
+
+    def __init__(self, name, dim=None):
+        self.name = name
+        self.dim = dim
+        self.count = 0
+
+        self._npy_tmp = Path(f"{npy_path(name)}.tmp")
+        self._meta_tmp = Path(f"{meta_path(name)}.tmp")
+        for tmp in (self._npy_tmp, self._meta_tmp):
+            if tmp.exists():
+                tmp.unlink()
+
+        self._vectors = open(self._npy_tmp, 'wb')
+        self._vectors.write(b'\0' * NPY_HEADER_BYTES)
+
+        self._meta = sqlite3.connect(self._meta_tmp)
+        self._meta.execute("PRAGMA journal_mode = OFF")
+        self._meta.execute("PRAGMA synchronous = OFF")
+        self._meta.execute("""
+            CREATE TABLE vectors (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, vector_id, values, metadata=None):
+        """Append one vector."""
+        self.add_batch([vector_id], [values], [metadata])
+
+    def add_batch(self, ids, vectors, metadatas=None):
+        """Append a batch of vectors (list of lists or a 2-D array)."""
+        matrix = np.asarray(vectors, dtype=DTYPE)
+        if matrix.ndim != 2 or len(matrix) != len(ids):
+            raise ValueError(f"expected {len(ids)} vectors, got shape {matrix.shape}")
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"expected dimension {self.dim}, got {matrix.shape[1]}")
+
+        metadatas = metadatas or [None] * len(ids)
+        self._vectors.write(matrix.tobytes())
+        self._meta.executemany(
+            "INSERT INTO vectors (row, id, metadata) VALUES (?, ?, ?)",
+            [(self.count + i, str(vector_id), json.dumps(meta or {}, ensure_ascii=False))
+             for i, (vector_id, meta) in enumerate(zip(ids, metadatas))]
+        )
+        self.count += len(ids)
+
+    def close(self):
+        """Finish the .npy header and move both files into place."""
+        self._vectors.seek(0)
+        self._vectors.write(_npy_header(self.count, self.dim or 0))
+        self._vectors.close()
+        self._meta.commit()
+        self._meta.close()
+        os.replace(self._npy_tmp, npy_path(self.name))
+        os.replace(self._meta_tmp, meta_path(self.name))
+
+    def abort(self):
+        """Discard everything written so far."""
+        self._vectors.close()
+        self._meta.close()
+        for tmp in (self._npy_tmp, self._meta_tmp):
+            if tmp.exists():
+                tmp.unlink()
+
+
+class EmbeddingStore:
+    """Read side of an artifact: mmap'd vectors plus metadata rows."""
+
+    def __init__(self, name):
+        if not exists(name):
+            raise FileNotFoundError(f"No embedding artifact {npy_path(name)} / {meta_path(name)}")
+        self.name = name
+        self.vectors = np.load(npy_path(name), mmap_mode='r')
+        self._meta = sqlite3.connect(f"file:{meta_path(name).resolve()}?mode=ro", uri=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def close(self):
+        self._meta.close()
+
+    def records(self, start=0, stop=None):
+        """Yield (id, vector, metadata) for rows [start, stop)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        rows = self._meta.execute(
+            "SELECT row, id, metadata FROM vectors WHERE row >= ? AND row < ? ORDER BY row",
+            (start, stop)
+        )
+        for row, vector_id, metadata in rows:
+            yield vector_id, self.vectors[row], json.loads(metadata)
+
+    def ids(self):
+        """{vector id: row} for every vector."""
+        # Rows past the .npy count belong to an upsert() that did not finish
+        return dict(self._meta.execute("SELECT id, row FROM vectors WHERE row < ?", (len(self),)))
+
+    def get(self, ids, rows=None):
+        """(id, vector, metadata) for the given ids, skipping unknown ones.
+
+        rows is an ids() map to reuse across calls.
+        """
+        rows = rows if rows is not None else self.ids()
+        wanted = sorted(rows[vector_id] for vector_id in ids if vector_id in rows)
+        result = []
+        for start in range(0, len(wanted), 500):
+            batch = wanted[start:start + 500]
+            placeholders = ', '.join('?' * len(batch))
+            for row, vector_id, metadata in self._meta.execute(
+                    f"SELECT row, id, metadata FROM vectors WHERE row IN ({placeholders}) ORDER BY row", batch):
+                result.append((vector_id, self.vectors[row], json.loads(metadata)))
+        return result
+
+    def batches(self, batch_size, start=0):
+        """Yield (start, stop) row ranges covering the artifact."""
+        for first in range(start, len(self), batch_size):
+            yield first, min(first + batch_size, len(self))
+
+    def vectorize_records(self, start=0, stop=None, ids=None, rows=None):
+        """Rows [start, stop), or the vectors of ids (see get()), as
+        Vectorize {id, values, metadata} dicts."""
+        records = self.get(ids, rows) if ids is not None else self.records(start, stop)
+        for vector_id, vector, metadata in records:
+            values = np.round(vector.astype(np.float64), NDJSON_DECIMALS).tolist()
+            yield {'id': vector_id, 'values': values, 'metadata': metadata}
+
+    def write_ndjson(self, out, start=0, stop=None, ids=None, rows=None):
+        """Stream rows [start, stop) (or ids) as Vectorize NDJSON; returns the count.
+
+        out is a path or an open text file.
+        """
+        if isinstance(out, (str, Path)):
+            with open(out, 'w', encoding='utf-8') as f:
+                return self.write_ndjson(f, start, stop, ids, rows)
+
+        count = 0
+        for record in self.vectorize_records(start, stop, ids, rows):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+        return count
+
+
+@contextmanager
+def _locked(name):
+    """Exclusive lock on an artifact for the duration of the block."""
+    with open(lock_path(name), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def upsert(name, ids, vectors, metadatas=None):
+    """Write a batch into an artifact, creating it if needed; returns {id: row}.
+
+    Ids already present are overwritten in place, new ones are appended.
+    Safe across processes (file lock) and crashes: the row count in the
+    .npy header is the commit point, so a batch cut short is invisible to
+    readers and is cleared by the next upsert.
+    """
+    matrix = np.asarray(vectors, dtype=DTYPE)
+    if matrix.ndim != 2 or len(matrix) != len(ids):
+        raise ValueError(f"expected {len(ids)} vectors, got shape {matrix.shape}")
+    ids = [str(vector_id) for vector_id in ids]
+    metadatas = metadatas or [None] * len(ids)
+
+    with _locked(name):
+        if not exists(name):
+            with EmbeddingWriter(name, matrix.shape[1]):
+                pass
+
+        with open(npy_path(name), 'r+b') as f:
+            np.lib.format.read_magic(f)
+            (count, dim), _, _ = np.lib.format.read_array_header_1_0(f)
+            if f.tell() != NPY_HEADER_BYTES:
+                raise ValueError(f"{npy_path(name)} was not written by EmbeddingWriter; rebuild it to upsert")
+            if matrix.shape[1] != dim:
+                raise ValueError(f"expected dimension {dim}, got {matrix.shape[1]}")
+            row_bytes = dim * DTYPE.itemsize
+
+            meta = sqlite3.connect(meta_path(name), timeout=30)
+            try:
+                meta.execute("CREATE INDEX IF NOT EXISTS vectors_id ON vectors (id)")
+                meta.execute("DELETE FROM vectors WHERE row >= ?", (count,))
+                rows = {}
+                for start in range(0, len(ids), 500):
+                    batch = ids[start:start + 500]
+                    placeholders = ', '.join('?' * len(batch))
+                    rows.update(meta.execute(
+                        f"SELECT id, row FROM vectors WHERE id IN ({placeholders})", batch))
+                new = 0
+                for vector_id in ids:
+                    if vector_id not in rows:
+                        rows[vector_id] = count + new
+                        new += 1
+
+                f.truncate(NPY_HEADER_BYTES + count * row_bytes)
+                for vector_id, vector in zip(ids, matrix):
+                    f.seek(NPY_HEADER_BYTES + rows[vector_id] * row_bytes)
+                    f.write(vector.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+                meta.executemany("INSERT OR REPLACE INTO vectors (row, id, metadata) VALUES (?, ?, ?)",
+                                 [(rows[vector_id], vector_id, json.dumps(metadata or {}, ensure_ascii=False))
+                                  for vector_id, metadata in zip(ids, metadatas)])
+                meta.commit()
+            finally:
+                meta.close()
+
+            f.seek(0)
+            f.write(_npy_header(count + new, dim))
+    return {vector_id: rows[vector_id] for vector_id in ids}
+
+
+def update_metadata(name, items):
+    """Replace the metadata of existing vectors; items is {id: metadata}."""
+    conn = sqlite3.connect(meta_path(name), timeout=30)
+    with conn:
+        conn.executemany("UPDATE vectors SET metadata = ? WHERE id = ?",
+                         [(json.dumps(meta, ensure_ascii=False), str(vector_id)) for vector_id, meta in items.items()])
+    conn.close()
+
+
+def import_json(json_path, name):
+    """Convert a legacy JSON export ([{id, values|embedding, metadata?, ...}]) to an artifact.
+
+    Keys other than id/values/embedding/metadata become metadata, so the
+    older {'chunks': [...]} exports convert without a hand-written mapping.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('chunks') or data.get('embeddings') or data.get('vectors') or []
+
+    with EmbeddingWriter(name) as writer:
+        for item in data:
+            values = item.get('values', item.get('embedding'))
+            metadata = item.get('metadata')
+            if metadata is None:
+                metadata = {k: v for k, v in item.items() if k not in ('id', 'values', 'embedding')}
+            writer.add(item['id'], values, metadata)
+    return writer.count
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('info', 'ndjson', 'import-json'):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == 'import-json':
+        if len(sys.argv) < 4:
+            print("Usage: python3 embedding_store.py import-json FILE.json NAME")
+            sys.exit(1)
+        count = import_json(sys.argv[2], sys.argv[3])
+        print(f"✅ Converted {count:,} embeddings to {npy_path(sys.argv[3])} + {meta_path(sys.argv[3])}")
+        return
+
+    name = sys.argv[2]
+    with EmbeddingStore(name) as store:
+        if command == 'info':
+            print(f"📦 {name}: {len(store):,} vectors x {store.dim} ({size_mb(name):.1f} MB)")
+            return
+
+        out = sys.argv[3] if len(sys.argv) > 3 else f"{name}.ndjson"
+        count = store.write_ndjson(out)
+        print(f"✅ Wrote {count:,} vectors to {out}")
+
+
+if __name__ == "__main__":
+    main()
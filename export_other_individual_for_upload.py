@@ -1,23 +1,18 @@
 #!/usr/bin/env python3
 """
 Export individual OTHER books for upload to remote D1
+Streams rows into size-capped NDJSON shards (see shard_export.py)
 """
 
-import sqlite3
-import json
-from pathlib import Path
+import storage
+from storage import LOCAL_DB
+from shard_export import ShardWriter, stream_rows
 
-def get_local_db():
-    """Get connection to local D1 database"""
-    db_path = Path('.wrangler/state/v3/d1/miniflare-D1DatabaseObject')
-    db_files = list(db_path.glob('*.sqlite'))
-    if not db_files:
-        raise FileNotFoundError(f"No D1 database found in {db_path}")
-    return sqlite3.connect(db_files[0])
+EXPORT_NAME = 'other_individual_export_for_upload'
 
 def export_individual_books():
-    """Export individual books to JSON"""
-    conn = get_local_db()
+    """Export individual books as sharded NDJSON"""
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     print("=" * 80)
@@ -30,83 +25,47 @@ def export_individual_books():
 
     print(f"\nFound {len(books)} individual books to export")
 
-    all_data = {
-        'books': [],
-        'verses': [],
-        'chunks': []
-    }
+    with ShardWriter(EXPORT_NAME) as writer:
+        for book_id, book_code, book_name in books:
+            print(f"\n{book_code}: {book_name}")
 
-    for book_id, book_code, book_name in books:
-        print(f"\n{book_code}: {book_name}")
-
-        # Add book
-        all_data['books'].append({
-            'id': book_id,
-            'code': book_code,
-            'name': book_name
-        })
-
-        # Get verses for this book
-        cursor.execute('''
-            SELECT id, book_id, chapter, verse_number, sanskrit, synonyms, translation
-            FROM vedabase_verses
-            WHERE book_id = ?
-            ORDER BY id
-        ''', (book_id,))
-
-        verses = cursor.fetchall()
-        for row in verses:
-            all_data['verses'].append({
-                'id': row[0],
-                'book_id': row[1],
-                'chapter': row[2],
-                'verse_number': row[3],
-                'sanskrit': row[4],
-                'synonyms': row[5],
-                'translation': row[6]
-            })
-
-        # Get chunks for this book
-        cursor.execute('''
-            SELECT c.id, c.verse_id, c.chunk_type, c.chunk_index, c.content, c.word_count
-            FROM vedabase_chunks c
-            JOIN vedabase_verses v ON c.verse_id = v.id
-            WHERE v.book_id = ?
-            ORDER BY c.id
-        ''', (book_id,))
-
-        chunks = cursor.fetchall()
-        for row in chunks:
-            all_data['chunks'].append({
-                'id': row[0],
-                'verse_id': row[1],
-                'chunk_type': row[2],
-                'chunk_index': row[3],
-                'content': row[4],
-                'word_count': row[5]
+            # Add book
+            writer.write('books', {
+                'id': book_id,
+                'code': book_code,
+                'name': book_name
             })
 
-        print(f"  Verses: {len(verses)}, Chunks: {len(chunks)}")
+            # Get verses for this book
+            verses = writer.write_rows('verses', stream_rows(cursor, '''
+                SELECT id, book_id, chapter, verse_number, sanskrit, synonyms, translation
+                FROM vedabase_verses
+                WHERE book_id = ?
+                ORDER BY id
+            ''', (book_id,)))
+
+            # Get chunks for this book
+            chunks = writer.write_rows('chunks', stream_rows(cursor, '''
+                SELECT c.id, c.verse_id, c.chunk_type, c.chunk_index, c.content, c.word_count
+                FROM vedabase_chunks c
+                JOIN vedabase_verses v ON c.verse_id = v.id
+                WHERE v.book_id = ?
+                ORDER BY c.id
+            ''', (book_id,)))
+
+            print(f"  Verses: {verses}, Chunks: {chunks}")
 
     conn.close()
 
-    # Save to JSON
-    output_file = 'other_individual_export_for_upload.json'
-    print(f"\nSaving to {output_file}...")
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=2)
-
-    file_size = Path(output_file).stat().st_size / (1024 * 1024)
-    print(f"  ✓ Saved {file_size:.2f} MB")
+    print(f"\n  ✓ Saved {len(writer.shards)} shards, {writer.total_bytes / (1024 * 1024):.2f} MB")
 
     print("\n" + "=" * 80)
     print("EXPORT COMPLETE")
     print("=" * 80)
-    print(f"  Books: {len(all_data['books'])}")
-    print(f"  Verses: {len(all_data['verses'])}")
-    print(f"  Chunks: {len(all_data['chunks'])}")
-    print(f"  Output: {output_file}")
+    print(f"  Books: {writer.counts.get('books', 0)}")
+    print(f"  Verses: {writer.counts.get('verses', 0)}")
+    print(f"  Chunks: {writer.counts.get('chunks', 0)}")
+    print(f"  Output: {EXPORT_NAME}/")
     print("=" * 80)
 
 if __name__ == '__main__':
@@ -4,12 +4,21 @@ Extract coincidences and enriching differences from philosophical traditions.
 Analyzes responses to find common ground and complementary perspectives.
 """
 
-import re
-from collections import defaultdict, OrderedDict
+import os
+import sys
+
+import numpy as np
+
+import tradition_catalog
+from concept_engine import CONCEPTS_FILE, ConceptEngine
+from org_index import file_sha256, load_index
 
 INPUT_FILE = "2philosophical_questions.org"
 OUTPUT_FILE = "BOOK_SYNTHESIS.org"
 
+# Concept dictionary (add terms in synthesis_concepts.json)
+ENGINE = ConceptEngine.from_file(CONCEPTS_FILE)
+
 # Key questions to analyze (the most complete ones mapped to human problems)
 KEY_QUESTIONS = {
     "existence": [
@@ -79,110 +88,39 @@ def find_family(tradition_name):
 
 def parse_org_file(filename):
     """Parse the org file and extract responses by question."""
-    with open(filename, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    questions_data = defaultdict(dict)
-    current_question = None
-    current_tradition = None
-    current_response = []
-
-    for line in content.split('\n'):
-        # Question header
-        if re.match(r'^\*\* \d+\.\d+', line):
-            # Save previous
-            if current_tradition and current_response and current_question:
-                response_text = ' '.join(current_response).strip()
-                questions_data[current_question][current_tradition] = response_text
-
-            match = re.match(r'^\*\* [\d.]+\s+(.+)', line)
-            if match:
-                current_question = match.group(1).strip()
-            current_tradition = None
-            current_response = []
-
-        # Tradition response
-        elif re.match(r'^\*\*\* ', line):
-            # Save previous
-            if current_tradition and current_response and current_question:
-                response_text = ' '.join(current_response).strip()
-                questions_data[current_question][current_tradition] = response_text
-
-            match = re.match(r'^\*\*\* [\d.]+\s+(.+?)\s*Response', line)
-            if match:
-                current_tradition = match.group(1).strip()
-            current_response = []
-
-        # Response content
-        elif line.strip() and not line.startswith('*') and not line.startswith('#'):
-            current_response.append(line.strip())
-
-    # Save last
-    if current_tradition and current_response and current_question:
-        response_text = ' '.join(current_response).strip()
-        questions_data[current_question][current_tradition] = response_text
-
-    return questions_data
+    with load_index(filename) as index:
+        return index.by_question()
 
 def extract_key_concepts(response):
     """Extract key philosophical concepts from a response."""
-    # Key concept patterns
-    concepts = []
-
-    # Look for common philosophical terms
-    patterns = [
-        (r'\b(divine|God|transcendent|sacred|holy)\b', 'trascendencia'),
-        (r'\b(soul|spirit|consciousness|mind|self)\b', 'interioridad'),
-        (r'\b(illusion|maya|appearance|phenomenal)\b', 'ilusión'),
-        (r'\b(liberation|salvation|enlightenment|freedom|moksha|nirvana)\b', 'liberación'),
-        (r'\b(karma|causation|cause|effect|consequence)\b', 'causalidad'),
-        (r'\b(suffering|pain|evil|dukkha)\b', 'sufrimiento'),
-        (r'\b(love|compassion|mercy|grace)\b', 'amor/compasión'),
-        (r'\b(truth|reality|being|existence)\b', 'verdad/realidad'),
-        (r'\b(virtue|ethics|moral|duty|dharma)\b', 'virtud/deber'),
-        (r'\b(unity|oneness|non-dual|interconnected)\b', 'unidad'),
-        (r'\b(transformation|change|becoming|process)\b', 'transformación'),
-        (r'\b(eternal|timeless|permanent|unchanging)\b', 'eternidad'),
-        (r'\b(revelation|scripture|tradition|teaching)\b', 'revelación'),
-        (r'\b(reason|rational|logic|intellect)\b', 'razón'),
-        (r'\b(experience|practice|meditation|contemplation)\b', 'práctica'),
-    ]
-
-    response_lower = response.lower()
-    for pattern, concept in patterns:
-        if re.search(pattern, response_lower):
-            concepts.append(concept)
-
-    return list(set(concepts))
-
-def find_common_themes(responses_by_family):
-    """Find themes common across all or most families."""
-    all_concepts = defaultdict(int)
-    family_concepts = {}
-
-    for family, response in responses_by_family.items():
-        concepts = extract_key_concepts(response)
-        family_concepts[family] = concepts
-        for c in concepts:
-            all_concepts[c] += 1
+    return ENGINE.extract(response)
+
+def find_common_themes(families, presence):
+    """Find themes common across all or most families.
+
+    presence is the concept x family boolean matrix for this theme.
+    """
+    family_concepts = {
+        family: [ENGINE.concepts[i] for i in np.flatnonzero(presence[:, j])]
+        for j, family in enumerate(families)
+    }
 
     # Concepts present in 50%+ of families
-    threshold = len(responses_by_family) / 2
-    common = [c for c, count in all_concepts.items() if count >= threshold]
+    threshold = len(families) / 2
+    common = [ENGINE.concepts[i] for i in np.flatnonzero(presence.sum(axis=1) >= threshold)]
 
     return common, family_concepts
 
-def analyze_differences(responses_by_family, family_concepts):
+def analyze_differences(responses_by_family, families, presence):
     """Identify enriching differences (complementary perspectives)."""
     differences = []
 
-    # Find unique concepts per family
-    all_concepts = set()
-    for concepts in family_concepts.values():
-        all_concepts.update(concepts)
+    # Concepts emphasised by at most two families
+    rare = presence.sum(axis=1) <= 2
+    unique_mask = presence & rare[:, None]
 
-    for family, concepts in family_concepts.items():
-        unique = [c for c in concepts if sum(1 for f, cs in family_concepts.items() if c in cs) <= 2]
+    for j, family in enumerate(families):
+        unique = [ENGINE.concepts[i] for i in np.flatnonzero(unique_mask[:, j])]
         if unique:
             differences.append({
                 'family': family,
@@ -226,28 +164,41 @@ Para cada tema se identifican:
         "suffering": "¿Por Qué Sufrimos?",
     }
 
+    # Scan every candidate response once into a concept x (question, tradition) matrix
+    matrix = ENGINE.matrix(
+        ((q, tradition), response)
+        for question_list in KEY_QUESTIONS.values()
+        for q in question_list
+        for tradition, response in questions_data.get(q, {}).items()
+    )
+
     for theme_key, question_list in KEY_QUESTIONS.items():
         title = chapter_titles.get(theme_key, theme_key.title())
         output.append(f"\n* {title}\n")
 
         # Gather all responses for this theme
         all_responses = {}
+        sources = {}
         for q in question_list:
             if q in questions_data:
                 for tradition, response in questions_data[q].items():
                     family = find_family(tradition)
                     if family not in all_responses:
                         all_responses[family] = response
+                        sources[family] = (q, tradition)
 
         if not all_responses:
             output.append("/(No hay suficientes respuestas para este tema)/\n")
             continue
 
+        families = list(all_responses)
+        presence = matrix.presence([sources[f] for f in families])
+
         # Find common themes
-        common_themes, family_concepts = find_common_themes(all_responses)
+        common_themes, family_concepts = find_common_themes(families, presence)
 
         # Find differences
-        differences = analyze_differences(all_responses, family_concepts)
+        differences = analyze_differences(all_responses, families, presence)
 
         # Write coincidences
         output.append("\n** Coincidencias (Lo que Comparten)\n")
@@ -283,6 +234,17 @@ Para cada tema se identifican:
     return '\n'.join(output)
 
 def main():
+    # Skip regeneration when neither the input nor the concept dictionary
+    # has changed since the last run (the dictionary's hash is part of the key)
+    catalog = tradition_catalog.connect()
+    tradition_catalog.refresh_paths(catalog, [INPUT_FILE])
+    consumer = f"extract_synthesis:{OUTPUT_FILE}:concepts={file_sha256(CONCEPTS_FILE)[:16]}"
+    if ('--force' not in sys.argv and os.path.exists(OUTPUT_FILE)
+            and not tradition_catalog.needs_processing(catalog, consumer, INPUT_FILE)):
+        print(f"{INPUT_FILE} and {CONCEPTS_FILE.name} unchanged; {OUTPUT_FILE} is up to date (use --force to regenerate)")
+        catalog.close()
+        return
+
     print("Parsing philosophical questions database...")
     questions_data = parse_org_file(INPUT_FILE)
     print(f"Found {len(questions_data)} questions")
@@ -293,6 +255,9 @@ def main():
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         f.write(synthesis)
 
+    tradition_catalog.mark_processed(catalog, consumer, INPUT_FILE)
+    catalog.close()
+
     print(f"\nSynthesis saved to: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
@@ -3,13 +3,13 @@
 Identify and re-upload missing lecture_segment chunks to remote D1
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 import json
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 100
 PAUSE_BETWEEN_BATCHES = 3
 
@@ -54,7 +54,7 @@ def get_local_chunks():
     """Get all lecture_segment chunks from local DB"""
     print("📂 Loading lecture segments from local database...")
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     cursor.execute("""
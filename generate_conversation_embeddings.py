@@ -3,15 +3,15 @@
 Generate embeddings for conversation chunks
 """
 
-import sqlite3
-import json
+import storage
+from storage import LOCAL_DB
+from embedding_store import EmbeddingWriter, npy_path, size_mb
 import openai
+import rate_limit
 import time
 import os
-from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
-OUTPUT_FILE = "conversation_embeddings.json"
+EMBEDDINGS_NAME = "conversation_embeddings"
 BATCH_SIZE = 100
 EMBEDDING_MODEL = "text-embedding-3-small"
 
@@ -20,7 +20,7 @@ openai.api_key = os.environ.get("OPENAI_API_KEY")
 
 def get_conversation_chunks():
     """Get all conversation chunks from local DB"""
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -47,7 +47,7 @@ def get_conversation_chunks():
 def generate_embeddings_batch(texts):
     """Generate embeddings for a batch of texts"""
     try:
-        response = openai.embeddings.create(
+        response = rate_limit.embed(openai,
             input=texts,
             model=EMBEDDING_MODEL
         )
@@ -79,7 +79,7 @@ def main():
     print(f"📦 Processing {num_batches} batches of {BATCH_SIZE}...")
     print()
 
-    all_embeddings = []
+    writer = EmbeddingWriter(EMBEDDINGS_NAME)
     success_count = 0
     start_time = time.time()
 
@@ -97,14 +97,21 @@ def main():
         embeddings = generate_embeddings_batch(texts)
 
         if embeddings:
-            # Store embeddings with metadata
-            for chunk, embedding in zip(batch, embeddings):
-                all_embeddings.append({
-                    'id': chunk['id'],
-                    'verse_id': chunk['verse_id'],
-                    'chunk_type': chunk['chunk_type'],
-                    'embedding': embedding
-                })
+            # Store embeddings with their Vectorize metadata
+            writer.add_batch(
+                [str(chunk['id']) for chunk in batch],
+                embeddings,
+                [
+                    {
+                        'source': 'vedabase',
+                        'book_code': 'conversations',
+                        'chunk_id': chunk['id'],
+                        'chunk_type': chunk['chunk_type'],
+                        'verse_id': chunk['verse_id']
+                    }
+                    for chunk in batch
+                ]
+            )
             print("✅")
             success_count += len(batch)
         else:
@@ -117,9 +124,6 @@ def main():
             remaining = (num_batches - batch_num) / rate if rate > 0 else 0
             print(f"   Progress: {batch_num}/{num_batches} ({batch_num*100//num_batches}%) | Rate: {rate:.1f} batches/min | ETA: {remaining:.1f} min")
 
-        # Small pause to avoid rate limiting
-        time.sleep(0.1)
-
     elapsed = time.time() - start_time
 
     print()
@@ -133,16 +137,15 @@ def main():
     print("=" * 80)
     print()
 
-    # Save to JSON
-    print(f"💾 Saving embeddings to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(all_embeddings, f)
+    # Finish the embedding artifact
+    print(f"💾 Saving embeddings to {npy_path(EMBEDDINGS_NAME)}...")
+    writer.close()
 
-    print(f"✅ Saved {len(all_embeddings):,} embeddings")
+    print(f"✅ Saved {writer.count:,} embeddings")
     print()
 
     # Calculate file size
-    file_size = Path(OUTPUT_FILE).stat().st_size / (1024 * 1024)
+    file_size = size_mb(EMBEDDINGS_NAME)
     print(f"📊 File size: {file_size:.1f} MB")
     print()
 
@@ -13,7 +13,9 @@ import sqlite3
 import numpy as np
 from openai import OpenAI
 from dotenv import load_dotenv
-import time
+
+import near_dup
+import rate_limit
 
 load_dotenv()
 
@@ -27,7 +29,7 @@ BATCH_SIZE = 100  # Process in batches to avoid rate limits
 def get_embedding(text: str) -> np.ndarray:
     """Generate embedding for a text chunk"""
     try:
-        response = client.embeddings.create(
+        response = rate_limit.embed(client,
             model=MODEL,
             input=text
         )
@@ -106,6 +108,16 @@ def generate_all_embeddings(db_path='philosophical_traditions_sample.db', clear_
     """)
 
     responses = cursor.fetchall()
+
+    # Embed one response per near-duplicate cluster
+    near_dup.build('responses', db_path)
+    dedup = near_dup.connect()
+    duplicates = near_dup.duplicate_ids(dedup, near_dup.corpus_key('responses', db_path))
+    dedup.close()
+    if duplicates:
+        responses = [row for row in responses if row[0] not in duplicates]
+        print(f"Skipping {len(duplicates)} near-duplicate responses")
+
     print(f"Found {len(responses)} responses to process\n")
 
     if not responses:
@@ -176,9 +188,6 @@ def generate_all_embeddings(db_path='philosophical_traditions_sample.db', clear_
 
         print(f"✅ {chunk_count} chunks (${chunk_cost:.5f})")
 
-        # Rate limiting: small pause between responses
-        time.sleep(0.1)
-
     conn.close()
 
     # Print summary
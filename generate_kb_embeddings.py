@@ -3,13 +3,15 @@
 Generate embeddings for Krishna Book chunks
 """
 
-import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
+from embedding_store import EmbeddingWriter, npy_path, size_mb
 import os
 from openai import OpenAI
-from pathlib import Path
+import rate_limit
+
+EMBEDDINGS_NAME = "kb_embeddings"
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 
 def generate_embeddings():
     """Generate embeddings for Krishna Book chunks"""
@@ -27,7 +29,7 @@ def generate_embeddings():
     client = OpenAI(api_key=api_key)
 
     # Connect to database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get the Krishna Book ID
@@ -58,7 +60,7 @@ def generate_embeddings():
     print(f"Found {total_chunks} chunks to process")
 
     # Prepare embeddings data
-    embeddings_data = []
+    writer = EmbeddingWriter(EMBEDDINGS_NAME)
     batch_size = 100
     processed = 0
 
@@ -68,7 +70,7 @@ def generate_embeddings():
 
         # Generate embeddings for batch
         try:
-            response = client.embeddings.create(
+            response = rate_limit.embed(client,
                 model="text-embedding-3-small",
                 input=texts,
                 dimensions=1536
@@ -83,20 +85,16 @@ def generate_embeddings():
                 chapter = chunk[4]
                 verse_number = chunk[5]
 
-                embeddings_data.append({
-                    'id': f"vedabase_chunk_{chunk_id}",
-                    'values': response.data[j].embedding,
-                    'metadata': {
-                        'source': 'vedabase',
-                        'chunk_id': chunk_id,
-                        'verse_id': verse_id,
-                        'book_code': 'kb',
-                        'book_name': 'Krishna Book',
-                        'chapter': chapter,
-                        'verse_number': verse_number,
-                        'chunk_type': chunk_type,
-                        'content': content[:500]
-                    }
+                writer.add(f"vedabase_chunk_{chunk_id}", response.data[j].embedding, {
+                    'source': 'vedabase',
+                    'chunk_id': chunk_id,
+                    'verse_id': verse_id,
+                    'book_code': 'kb',
+                    'book_name': 'Krishna Book',
+                    'chapter': chapter,
+                    'verse_number': verse_number,
+                    'chunk_type': chunk_type,
+                    'content': content[:500]
                 })
 
             processed += len(batch)
@@ -109,17 +107,15 @@ def generate_embeddings():
     conn.close()
 
     # Save embeddings to file
-    output_file = 'kb_embeddings_for_upload.json'
-    with open(output_file, 'w') as f:
-        json.dump(embeddings_data, f)
+    writer.close()
 
-    file_size = Path(output_file).stat().st_size / (1024 * 1024)
+    file_size = size_mb(EMBEDDINGS_NAME)
 
     print("\n" + "=" * 80)
     print("EMBEDDING GENERATION COMPLETE")
     print("=" * 80)
-    print(f"  Total chunks processed: {len(embeddings_data)}")
-    print(f"  Output file: {output_file}")
+    print(f"  Total chunks processed: {writer.count}")
+    print(f"  Output file: {npy_path(EMBEDDINGS_NAME)}")
     print(f"  File size: {file_size:.2f} MB")
     print("=" * 80)
 
@@ -8,16 +8,23 @@ import os
 import requests
 from pathlib import Path
 from openai import OpenAI
+import embedding_store
+import metrics
+import rate_limit
+
+from shard_export import load_export
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
-def generate_embeddings_batch(texts: list) -> list:
+EMBEDDINGS_NAME = "lecture_embeddings"
+
+def generate_embeddings_batch(texts: list, job=None) -> list:
     """Generate embeddings using OpenAI"""
     client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-    response = client.embeddings.create(
+    response = rate_limit.embed(client, job,
         model="text-embedding-3-small",
         input=texts
     )
@@ -44,8 +51,7 @@ def main():
     """Generate and upload lecture embeddings"""
 
     # Load lecture export
-    with open('lectures_export.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_export('lectures_export')
 
     chunks = data['chunks']
     print(f"Loaded {len(chunks)} chunks to process")
@@ -72,6 +78,8 @@ def main():
         start_index = 0
         progress = {'last_chunk_index': -1}
 
+    job = metrics.Job(EMBEDDINGS_NAME, total=len(chunks), done=min(start_index, len(chunks)))
+
     for i in range(start_index, len(chunks), batch_size):
         batch = chunks[i:i+batch_size]
         batch_num = (i // batch_size) + 1
@@ -84,27 +92,39 @@ def main():
 
         # Generate embeddings
         print("  Generating embeddings...")
-        embeddings = generate_embeddings_batch(texts)
-
-        # Prepare vectors for Vectorize
-        vectors = []
-        for j, (chunk, embedding) in enumerate(zip(batch, embeddings)):
-            vectors.append({
-                'id': str(chunk['id']),
-                'values': embedding,
-                'metadata': {
-                    'chunk_id': chunk['id'],
-                    'verse_id': chunk['verse_id'],
-                    'chunk_type': chunk['chunk_type'],
-                    'source': 'vedabase_lectures'
-                }
-            })
+        try:
+            with job.timed('openai'):
+                embeddings = generate_embeddings_batch(texts, job)
+        except Exception:
+            job.error(len(batch))
+            job.finish('failed')
+            raise
+
+        # Save to the lecture_embeddings artifact, then read the batch back for Vectorize
+        rows = embedding_store.upsert(EMBEDDINGS_NAME, [str(chunk['id']) for chunk in batch], embeddings, [
+            {
+                'chunk_id': chunk['id'],
+                'verse_id': chunk['verse_id'],
+                'chunk_type': chunk['chunk_type'],
+                'source': 'vedabase_lectures'
+            }
+            for chunk in batch
+        ])
+        with embedding_store.EmbeddingStore(EMBEDDINGS_NAME) as store:
+            vectors = list(store.vectorize_records(ids=list(rows), rows=rows))
 
         # Upload to Vectorize
         print("  Uploading to Vectorize...")
-        result = upload_to_vectorize(vectors, account_id, api_token)
+        try:
+            with job.timed('vectorize'):
+                result = upload_to_vectorize(vectors, account_id, api_token)
+        except Exception:
+            job.error(len(batch))
+            job.finish('failed')
+            raise
 
         total_uploaded += len(batch)
+        job.advance(len(batch), nbytes=sum(len(text.encode('utf-8')) for text in texts))
         print(f"  ✓ Successfully uploaded {len(batch)} vectors")
         print(f"  Progress: {total_uploaded}/{len(chunks)} ({100 * total_uploaded / len(chunks):.1f}%)")
 
@@ -116,6 +136,7 @@ def main():
     # Clean up progress file
     if progress_file.exists():
         progress_file.unlink()
+    job.finish()
 
     print(f"\n✅ All embeddings generated and uploaded!")
     print(f"   Total chunks processed: {total_uploaded}")
@@ -4,15 +4,16 @@ Generate embeddings for lecture_segment chunks
 These are the newly created smaller lecture chunks from rechunking optimization
 """
 
-import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
+from embedding_store import EmbeddingWriter, npy_path, size_mb
+import metrics
+import rate_limit
 import os
 from openai import OpenAI
-from pathlib import Path
 import time
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
-OUTPUT_FILE = "lecture_segments_embeddings.json"
+EMBEDDINGS_NAME = "lecture_segments_embeddings"
 
 def generate_embeddings():
     """Generate embeddings for lecture_segment chunks"""
@@ -30,7 +31,7 @@ def generate_embeddings():
     client = OpenAI(api_key=api_key)
 
     # Connect to database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get all lecture_segment chunks
@@ -55,7 +56,8 @@ def generate_embeddings():
         return
 
     # Prepare embeddings data
-    embeddings_data = []
+    writer = EmbeddingWriter(EMBEDDINGS_NAME)
+    job = metrics.Job(EMBEDDINGS_NAME, total=total_chunks)
     batch_size = 100
     processed = 0
     errors = 0
@@ -72,33 +74,31 @@ def generate_embeddings():
 
         # Generate embeddings for batch
         try:
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=texts,
-                dimensions=1536
-            )
+            with job.timed('openai'):
+                response = rate_limit.embed(client, job,
+                    model="text-embedding-3-small",
+                    input=texts,
+                    dimensions=1536
+                )
 
             # Store embeddings
             for j, chunk in enumerate(batch):
                 chunk_id, verse_id, content, word_count, chapter, verse_number, book_id, book_code, book_name = chunk
 
-                embeddings_data.append({
-                    'id': f"lecture_segment_{chunk_id}",
-                    'values': response.data[j].embedding,
-                    'metadata': {
-                        'source': 'vedabase',
-                        'chunk_id': chunk_id,
-                        'verse_id': verse_id,
-                        'book_code': book_code,
-                        'book_name': book_name,
-                        'chapter': chapter,
-                        'verse_number': verse_number,
-                        'chunk_type': 'lecture_segment',
-                        'content': content[:500]  # First 500 chars for metadata
-                    }
+                writer.add(f"lecture_segment_{chunk_id}", response.data[j].embedding, {
+                    'source': 'vedabase',
+                    'chunk_id': chunk_id,
+                    'verse_id': verse_id,
+                    'book_code': book_code,
+                    'book_name': book_name,
+                    'chapter': chapter,
+                    'verse_number': verse_number,
+                    'chunk_type': 'lecture_segment',
+                    'content': content[:500]  # First 500 chars for metadata
                 })
 
             processed += len(batch)
+            job.advance(len(batch), nbytes=sum(len(text.encode('utf-8')) for text in texts))
             elapsed = time.time() - start_time
             rate = processed / elapsed if elapsed > 0 else 0
             remaining = (total_chunks - processed) / rate if rate > 0 else 0
@@ -109,26 +109,27 @@ def generate_embeddings():
         except Exception as e:
             print(f"  ❌ Error processing batch {i//batch_size + 1}: {e}")
             errors += 1
+            job.error(len(batch))
             if errors > 5:
                 print("  ⚠️  Too many errors, stopping...")
                 break
             continue
 
     conn.close()
+    job.finish('done' if errors <= 5 else 'failed')
 
     # Save embeddings to file
-    print(f"\n💾 Saving to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(embeddings_data, f)
+    print(f"\n💾 Saving to {npy_path(EMBEDDINGS_NAME)}...")
+    writer.close()
 
-    file_size = Path(OUTPUT_FILE).stat().st_size / (1024 * 1024)
+    file_size = size_mb(EMBEDDINGS_NAME)
     total_time = time.time() - start_time
 
     print("\n" + "=" * 80)
     print("✅ EMBEDDING GENERATION COMPLETE")
     print("=" * 80)
-    print(f"  Total chunks processed: {len(embeddings_data):,}")
-    print(f"  Output file: {OUTPUT_FILE}")
+    print(f"  Total chunks processed: {writer.count:,}")
+    print(f"  Output file: {npy_path(EMBEDDINGS_NAME)}")
     print(f"  File size: {file_size:.2f} MB")
     print(f"  Total time: {total_time/60:.1f} minutes")
     print(f"  Average rate: {processed/total_time:.1f} chunks/second")
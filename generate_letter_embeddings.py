@@ -3,17 +3,20 @@
 Generate embeddings for Srila Prabhupada's Letters chunks
 """
 
-import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
+from embedding_store import EmbeddingWriter, npy_path, size_mb
+import metrics
 import os
 from openai import OpenAI
-from pathlib import Path
+import rate_limit
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
+EMBEDDINGS_NAME = "letter_embeddings"
+
 
 def generate_embeddings():
     """Generate embeddings for letter chunks"""
@@ -31,7 +34,7 @@ def generate_embeddings():
     client = OpenAI(api_key=api_key)
 
     # Connect to database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get the LETTERS book ID
@@ -62,7 +65,8 @@ def generate_embeddings():
     print(f"Found {total_chunks} chunks to process")
 
     # Prepare embeddings data
-    embeddings_data = []
+    writer = EmbeddingWriter(EMBEDDINGS_NAME)
+    job = metrics.Job(EMBEDDINGS_NAME, total=total_chunks)
     batch_size = 100
     processed = 0
 
@@ -80,11 +84,12 @@ def generate_embeddings():
 
         # Generate embeddings for batch
         try:
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=texts,
-                dimensions=1536
-            )
+            with job.timed('openai'):
+                response = rate_limit.embed(client, job,
+                    model="text-embedding-3-small",
+                    input=texts,
+                    dimensions=1536
+                )
 
             # Store embeddings
             for j, chunk in enumerate(batch):
@@ -96,44 +101,41 @@ def generate_embeddings():
                 recipient = chunk[6]
                 date = chunk[7]
 
-                embeddings_data.append({
-                    'id': f"letters_{chunk_id}",
-                    'values': response.data[j].embedding,
-                    'metadata': {
-                        'source': 'vedabase',  # Critical: identifies this as Vedabase content
-                        'chunk_id': chunk_id,
-                        'verse_id': verse_id,
-                        'book_code': 'LETTERS',
-                        'book_name': "Srila Prabhupada's Letters",
-                        'chapter': chapter,
-                        'verse_number': verse_number,
-                        'recipient': recipient,
-                        'date': date,
-                        'content': content[:500]  # First 500 chars for metadata
-                    }
+                writer.add(f"letters_{chunk_id}", response.data[j].embedding, {
+                    'source': 'vedabase',  # Critical: identifies this as Vedabase content
+                    'chunk_id': chunk_id,
+                    'verse_id': verse_id,
+                    'book_code': 'LETTERS',
+                    'book_name': "Srila Prabhupada's Letters",
+                    'chapter': chapter,
+                    'verse_number': verse_number,
+                    'recipient': recipient,
+                    'date': date,
+                    'content': content[:500]  # First 500 chars for metadata
                 })
 
             processed += len(batch)
+            job.advance(len(batch), nbytes=sum(len(text.encode('utf-8')) for text in texts))
             print(f"  Processed {processed}/{total_chunks} chunks ({processed*100//total_chunks}%)")
 
         except Exception as e:
             print(f"  Error processing batch {i//batch_size + 1}: {e}")
+            job.error(len(batch))
             continue
 
     conn.close()
 
     # Save embeddings to file
-    output_file = 'letter_embeddings_for_upload.json'
-    with open(output_file, 'w') as f:
-        json.dump(embeddings_data, f)
+    writer.close()
+    job.finish('done' if processed == total_chunks else 'incomplete')
 
-    file_size = Path(output_file).stat().st_size / (1024 * 1024)
+    file_size = size_mb(EMBEDDINGS_NAME)
 
     print("\n" + "=" * 80)
     print("EMBEDDING GENERATION COMPLETE")
     print("=" * 80)
-    print(f"  Total chunks processed: {len(embeddings_data)}")
-    print(f"  Output file: {output_file}")
+    print(f"  Total chunks processed: {writer.count}")
+    print(f"  Output file: {npy_path(EMBEDDINGS_NAME)}")
     print(f"  File size: {file_size:.2f} MB")
     print("=" * 80)
 
@@ -3,13 +3,13 @@
 Generate embeddings for individual OTHER books using OpenAI API
 """
 
-import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
+from embedding_store import EmbeddingWriter, npy_path, size_mb
 import os
 from pathlib import Path
 from typing import List
-import requests
-import time
+import rate_limit
 
 # Load environment variables
 try:
@@ -18,7 +18,8 @@ try:
 except ImportError:
     pass
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
+EMBEDDINGS_NAME = "other_individual_embeddings"
+
 
 def generate_embeddings(texts: List[str], api_key: str, batch_size: int = 100) -> List[List[float]]:
     """Generate embeddings using OpenAI API"""
@@ -27,7 +28,7 @@ def generate_embeddings(texts: List[str], api_key: str, batch_size: int = 100) -
     for i in range(0, len(texts), batch_size):
         batch = texts[i:i+batch_size]
 
-        response = requests.post(
+        response = rate_limit.post(
             'https://api.openai.com/v1/embeddings',
             headers={
                 'Authorization': f'Bearer {api_key}',
@@ -47,7 +48,6 @@ def generate_embeddings(texts: List[str], api_key: str, batch_size: int = 100) -
         all_embeddings.extend(embeddings)
 
         print(f"  Generated embeddings for batch {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size}")
-        time.sleep(0.5)
 
     return all_embeddings
 
@@ -65,7 +65,7 @@ def main():
         print(f"Error: Database not found at {LOCAL_DB}")
         return
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get all chunks for books with ID >= 16 (individual books)
@@ -107,29 +107,25 @@ def main():
 
     print(f"  ✓ Generated {len(embeddings)} embeddings")
 
-    # Prepare data for upload
-    print("\nPreparing data for Vectorize upload...")
-    vectors_data = []
-
-    for i, chunk in enumerate(chunks):
-        vectors_data.append({
-            'id': chunk['id'],
-            'verse_id': chunk['verse_id'],
-            'chunk_type': chunk['chunk_type'],
-            'book_code': chunk['book_code'],
-            'embedding': embeddings[i]
-        })
-
-    # Save to file
-    output_file = 'other_individual_embeddings_export.json'
-    print(f"\nSaving to {output_file}...")
-    with open(output_file, 'w') as f:
-        json.dump({
-            'chunks': vectors_data,
-            'total': len(vectors_data)
-        }, f, indent=2)
+    # Save vectors with their Vectorize ids and metadata
+    print(f"\nSaving to {npy_path(EMBEDDINGS_NAME)}...")
+    with EmbeddingWriter(EMBEDDINGS_NAME) as writer:
+        writer.add_batch(
+            [str(chunk['id']) for chunk in chunks],
+            embeddings,
+            [
+                {
+                    'chunk_id': chunk['id'],
+                    'verse_id': chunk['verse_id'],
+                    'chunk_type': chunk['chunk_type'],
+                    'source': 'vedabase',
+                    'book_code': chunk['book_code']
+                }
+                for chunk in chunks
+            ]
+        )
 
-    file_size = Path(output_file).stat().st_size / (1024 * 1024)
+    file_size = size_mb(EMBEDDINGS_NAME)
     print(f"  ✓ Saved {file_size:.2f} MB")
 
     # Calculate cost
@@ -143,7 +139,7 @@ def main():
     print(f"  Total embeddings: {len(embeddings)}")
     print(f"  Estimated tokens: {estimated_tokens:,}")
     print(f"  Estimated cost: ${estimated_cost:.4f}")
-    print(f"  Output file: {output_file}")
+    print(f"  Output file: {npy_path(EMBEDDINGS_NAME)}")
     print("=" * 80)
 
 if __name__ == '__main__':
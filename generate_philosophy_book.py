@@ -4,104 +4,20 @@ Generate a 200-page philosophy book from the philosophical questions database.
 Extracts questions and responses organized by category.
 """
 
-import re
-from collections import defaultdict, OrderedDict
+import os
+import sys
 from datetime import datetime
 
+import tradition_catalog
+from org_index import load_index
+
 INPUT_FILE = "2philosophical_questions.org"
 OUTPUT_FILE = "philosophy_book.org"
 
 def parse_org_file(filename):
     """Parse the org file and extract all content."""
-    with open(filename, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Structure to hold everything
-    categories = OrderedDict()
-
-    current_category = None
-    current_question = None
-    current_tradition = None
-    current_response_lines = []
-
-    lines = content.split('\n')
-
-    for i, line in enumerate(lines):
-        # Category header: * 1. METAPHYSICS: What is the nature of reality?
-        if re.match(r'^\* \d+\.', line):
-            # Save previous
-            if current_tradition and current_response_lines and current_category and current_question:
-                response = ' '.join(current_response_lines).strip()
-                if response:
-                    if current_category not in categories:
-                        categories[current_category] = OrderedDict()
-                    if current_question not in categories[current_category]:
-                        categories[current_category][current_question] = OrderedDict()
-                    categories[current_category][current_question][current_tradition] = response
-
-            match = re.match(r'^\* \d+\.\s*([A-Z][A-Z\s]+):', line)
-            if match:
-                current_category = match.group(1).strip()
-            current_question = None
-            current_tradition = None
-            current_response_lines = []
-
-        # Question header: ** 1.1 What exists? or ** 2.1.1 Are moral truths...
-        elif re.match(r'^\*\* \d+\.\d+', line):
-            # Save previous
-            if current_tradition and current_response_lines and current_category and current_question:
-                response = ' '.join(current_response_lines).strip()
-                if response:
-                    if current_category not in categories:
-                        categories[current_category] = OrderedDict()
-                    if current_question not in categories[current_category]:
-                        categories[current_category][current_question] = OrderedDict()
-                    categories[current_category][current_question][current_tradition] = response
-
-            match = re.match(r'^\*\* [\d.]+\s+(.+)', line)
-            if match:
-                current_question = match.group(1).strip()
-            current_tradition = None
-            current_response_lines = []
-
-        # Tradition response: *** 2.1.1 Catholic Response
-        elif re.match(r'^\*\*\* ', line):
-            # Save previous
-            if current_tradition and current_response_lines and current_category and current_question:
-                response = ' '.join(current_response_lines).strip()
-                if response:
-                    if current_category not in categories:
-                        categories[current_category] = OrderedDict()
-                    if current_question not in categories[current_category]:
-                        categories[current_category][current_question] = OrderedDict()
-                    categories[current_category][current_question][current_tradition] = response
-
-            # Extract tradition name
-            match = re.match(r'^\*\*\* [\d.]+\s+(.+?)\s*Response', line)
-            if match:
-                current_tradition = match.group(1).strip()
-            else:
-                match = re.match(r'^\*\*\* [\d.]+\s+(.+)', line)
-                if match:
-                    trad = match.group(1).strip()
-                    current_tradition = trad.replace(' Response', '')
-            current_response_lines = []
-
-        # Response content (non-heading lines)
-        elif line.strip() and not line.startswith('*') and not line.startswith('#'):
-            current_response_lines.append(line.strip())
-
-    # Save last item
-    if current_tradition and current_response_lines and current_category and current_question:
-        response = ' '.join(current_response_lines).strip()
-        if response:
-            if current_category not in categories:
-                categories[current_category] = OrderedDict()
-            if current_question not in categories[current_category]:
-                categories[current_category][current_question] = OrderedDict()
-            categories[current_category][current_question][current_tradition] = response
-
-    return categories
+    with load_index(filename) as index:
+        return index.category_tree()
 
 def generate_book(categories):
     """Generate book content from parsed categories."""
@@ -314,6 +230,16 @@ def main():
     print("GENERADOR DE LIBRO DE FILOSOFIA COMPARADA")
     print("=" * 60)
 
+    # Nada que hacer si la entrada no cambio desde la ultima generacion
+    catalog = tradition_catalog.connect()
+    tradition_catalog.refresh_paths(catalog, [INPUT_FILE])
+    consumer = f"generate_philosophy_book:{OUTPUT_FILE}"
+    if ('--force' not in sys.argv and os.path.exists(OUTPUT_FILE)
+            and not tradition_catalog.needs_processing(catalog, consumer, INPUT_FILE)):
+        print(f"\n{INPUT_FILE} sin cambios; {OUTPUT_FILE} esta al dia (usar --force para regenerar)")
+        catalog.close()
+        return
+
     print(f"\nLeyendo archivo: {INPUT_FILE}")
     categories = parse_org_file(INPUT_FILE)
 
@@ -344,6 +270,9 @@ def main():
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
         f.write(book_content)
 
+    tradition_catalog.mark_processed(catalog, consumer, INPUT_FILE)
+    catalog.close()
+
     print(f"\nLibro guardado en: {OUTPUT_FILE}")
     print("\nPara exportar a PDF en Emacs:")
     print("  1. Abrir el archivo en Emacs")
@@ -4,16 +4,16 @@ Generate embeddings for newly created purport_segment chunks
 """
 
 import os
-import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
+from embedding_store import EmbeddingWriter, npy_path, size_mb
 from openai import OpenAI
+import rate_limit
 from dotenv import load_dotenv
-import time
 
 load_dotenv()
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
-OUTPUT_FILE = "rechunked_embeddings.json"
+EMBEDDINGS_NAME = "rechunked_embeddings"
 
 def generate_embeddings():
     """Generate embeddings for purport_segment chunks"""
@@ -23,12 +23,12 @@ def generate_embeddings():
     print("=" * 80)
 
     # Connect to database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get only purport_segment chunks (the newly created ones)
     cursor.execute("""
-        SELECT c.id, c.content, b.code, v.chapter, v.verse_number
+        SELECT c.id, c.content, b.code, v.chapter, v.verse_number, c.verse_id
         FROM vedabase_chunks c
         JOIN vedabase_verses v ON c.verse_id = v.id
         JOIN vedabase_books b ON v.book_id = b.id
@@ -45,7 +45,7 @@ def generate_embeddings():
     # Initialize OpenAI client
     client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-    embeddings_data = []
+    writer = EmbeddingWriter(EMBEDDINGS_NAME)
     batch_size = 100
     total_batches = (total_chunks + batch_size - 1) // batch_size
 
@@ -60,7 +60,7 @@ def generate_embeddings():
         texts = [chunk[1] for chunk in batch]  # content
 
         # Generate embeddings
-        response = client.embeddings.create(
+        response = rate_limit.embed(client,
             model="text-embedding-3-small",
             input=texts,
             dimensions=1536
@@ -68,38 +68,31 @@ def generate_embeddings():
 
         # Store embeddings with metadata
         for j, chunk in enumerate(batch):
-            chunk_id, content, book_code, chapter, verse_number = chunk
-
-            embeddings_data.append({
-                'id': f"vedabase_chunk_{chunk_id}",
-                'values': response.data[j].embedding,
-                'metadata': {
-                    'source': 'vedabase',
-                    'chunk_id': chunk_id,
-                    'book_code': book_code,
-                    'chapter': chapter,
-                    'verse_number': verse_number,
-                    'chunk_type': 'purport_segment'
-                }
+            chunk_id, content, book_code, chapter, verse_number, verse_id = chunk
+
+            writer.add(f"vedabase_chunk_{chunk_id}", response.data[j].embedding, {
+                'source': 'vedabase',
+                'chunk_id': chunk_id,
+                'verse_id': verse_id,
+                'book_code': book_code,
+                'chapter': chapter,
+                'verse_number': verse_number,
+                'chunk_type': 'purport_segment'
             })
 
         print(f"  Batch {batch_idx + 1}/{total_batches}: {end_idx}/{total_chunks} embeddings")
 
-        # Rate limiting
-        time.sleep(0.5)
-
     # Save embeddings
-    print(f"\nSaving embeddings to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(embeddings_data, f)
+    print(f"\nSaving embeddings to {npy_path(EMBEDDINGS_NAME)}...")
+    writer.close()
 
-    file_size_mb = os.path.getsize(OUTPUT_FILE) / (1024 * 1024)
+    file_size_mb = size_mb(EMBEDDINGS_NAME)
 
     print("\n" + "=" * 80)
     print("EMBEDDING GENERATION COMPLETE")
     print("=" * 80)
     print(f"  ✓ {total_chunks} embeddings generated")
-    print(f"  ✓ Saved to {OUTPUT_FILE} ({file_size_mb:.2f} MB)")
+    print(f"  ✓ Saved to {npy_path(EMBEDDINGS_NAME)} ({file_size_mb:.2f} MB)")
     print(f"  ✓ Ready to upload to Vectorize")
     print("=" * 80)
 
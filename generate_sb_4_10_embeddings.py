@@ -3,14 +3,16 @@
 Generate embeddings for Srimad Bhagavatam Cantos 4-10 chunks
 """
 
-import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
+from embedding_store import EmbeddingWriter, npy_path, size_mb
 import os
 from openai import OpenAI
-from pathlib import Path
+import rate_limit
 from dotenv import load_dotenv
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
+EMBEDDINGS_NAME = "sb_cantos_4_10_embeddings"
+
 
 def generate_embeddings():
     """Generate embeddings for Srimad Bhagavatam Cantos 4-10 chunks"""
@@ -32,7 +34,7 @@ def generate_embeddings():
     client = OpenAI(api_key=api_key)
 
     # Connect to database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get all chunks for Cantos 4-10
@@ -51,7 +53,7 @@ def generate_embeddings():
     print(f"Found {total_chunks} chunks to process")
 
     # Prepare embeddings data
-    embeddings_data = []
+    writer = EmbeddingWriter(EMBEDDINGS_NAME)
     batch_size = 100
     processed = 0
 
@@ -61,7 +63,7 @@ def generate_embeddings():
 
         # Generate embeddings for batch
         try:
-            response = client.embeddings.create(
+            response = rate_limit.embed(client,
                 model="text-embedding-3-small",
                 input=texts,
                 dimensions=1536
@@ -78,20 +80,16 @@ def generate_embeddings():
                 book_code = chunk[6]
                 book_name = chunk[7]
 
-                embeddings_data.append({
-                    'id': f"vedabase_chunk_{chunk_id}",
-                    'values': response.data[j].embedding,
-                    'metadata': {
-                        'source': 'vedabase',
-                        'chunk_id': chunk_id,
-                        'verse_id': verse_id,
-                        'book_code': book_code,
-                        'book_name': book_name,
-                        'chapter': chapter,
-                        'verse_number': verse_number,
-                        'chunk_type': chunk_type,
-                        'content': content[:500]
-                    }
+                writer.add(f"vedabase_chunk_{chunk_id}", response.data[j].embedding, {
+                    'source': 'vedabase',
+                    'chunk_id': chunk_id,
+                    'verse_id': verse_id,
+                    'book_code': book_code,
+                    'book_name': book_name,
+                    'chapter': chapter,
+                    'verse_number': verse_number,
+                    'chunk_type': chunk_type,
+                    'content': content[:500]
                 })
 
             processed += len(batch)
@@ -104,17 +102,15 @@ def generate_embeddings():
     conn.close()
 
     # Save embeddings to file
-    output_file = 'sb_cantos_4_10_embeddings.json'
-    with open(output_file, 'w') as f:
-        json.dump(embeddings_data, f)
+    writer.close()
 
-    file_size = Path(output_file).stat().st_size / (1024 * 1024)
+    file_size = size_mb(EMBEDDINGS_NAME)
 
     print("\n" + "=" * 80)
     print("EMBEDDING GENERATION COMPLETE")
     print("=" * 80)
-    print(f"  Total chunks processed: {len(embeddings_data)}")
-    print(f"  Output file: {output_file}")
+    print(f"  Total chunks processed: {writer.count}")
+    print(f"  Output file: {npy_path(EMBEDDINGS_NAME)}")
     print(f"  File size: {file_size:.2f} MB")
     print("=" * 80)
 
@@ -5,14 +5,22 @@ Generate embeddings for Vedabase chunks and upload to Cloudflare Vectorize.
 This script:
 1. Reads chunks from local D1 database
 2. Generates embeddings in batches (respecting OpenAI rate limits)
-3. Uploads directly to Vectorize via Cloudflare API
-4. Tracks progress and supports resuming
+3. Writes each batch to the vedabase_embeddings artifact (embedding_store)
+4. Uploads the batch from the artifact to Vectorize via Cloudflare API
+5. Tracks progress and supports resuming
 """
 
 import os
 import sqlite3
+import embedding_store
+import job_ledger
+import metrics
+import near_dup
+import rate_limit
+import storage
+import vectorize_api
+from storage import LOCAL_DB
 import json
-import time
 import sys
 from typing import List, Dict, Any
 from pathlib import Path
@@ -25,44 +33,33 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Configuration
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
-PROGRESS_FILE = "vedabase_embedding_progress.json"
+JOB_NAME = "vedabase_embeddings"
+EMBEDDINGS_NAME = "vedabase_embeddings"
+LEGACY_PROGRESS_FILE = "vedabase_embedding_progress.json"  # pre-ledger runs
 BATCH_SIZE = 100  # Process 100 chunks at a time
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
 
 # Cloudflare configuration (from environment variables)
 ACCOUNT_ID = os.getenv("CLOUDFLARE_ACCOUNT_ID")
-VECTORIZE_INDEX_ID = os.getenv("CLOUDFLARE_VECTORIZE_INDEX_ID", "philosophy-vectors")
 CLOUDFLARE_API_TOKEN = os.getenv("CLOUDFLARE_API_TOKEN")
 
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-def load_progress() -> Dict[str, Any]:
-    """Load progress from file if it exists."""
-    if Path(PROGRESS_FILE).exists():
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {
-        'last_chunk_id': 0,
-        'total_processed': 0,
-        'total_uploaded': 0,
-        'started_at': datetime.now().isoformat(),
-        'last_updated': None,
-        'batches_completed': []
-    }
-
-def save_progress(progress: Dict[str, Any]):
-    """Save progress to file."""
-    progress['last_updated'] = datetime.now().isoformat()
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
+def legacy_done_ids(conn: sqlite3.Connection) -> List[int]:
+    """Chunk ids already covered by an old high-water-mark progress file."""
+    if not Path(LEGACY_PROGRESS_FILE).exists():
+        return []
+    with open(LEGACY_PROGRESS_FILE, 'r') as f:
+        last_chunk_id = json.load(f).get('last_chunk_id', 0)
+    return [row[0] for row in conn.execute("SELECT id FROM vedabase_chunks WHERE id <= ?", (last_chunk_id,))]
 
-def get_chunks_batch(conn: sqlite3.Connection, last_chunk_id: int, batch_size: int) -> List[Dict[str, Any]]:
-    """Fetch a batch of chunks from the database."""
+def get_chunks(conn: sqlite3.Connection, chunk_ids: List[int]) -> List[Dict[str, Any]]:
+    """Fetch the given chunks from the database."""
     cursor = conn.cursor()
-    cursor.execute("""
+    placeholders = ', '.join('?' * len(chunk_ids))
+    cursor.execute(f"""
         SELECT
             c.id,
             c.verse_id,
@@ -78,10 +75,9 @@ def get_chunks_batch(conn: sqlite3.Connection, last_chunk_id: int, batch_size: i
         FROM vedabase_chunks c
         JOIN vedabase_verses v ON c.verse_id = v.id
         JOIN vedabase_books b ON v.book_id = b.id
-        WHERE c.id > ?
+        WHERE c.id IN ({placeholders})
         ORDER BY c.id
-        LIMIT ?
-    """, (last_chunk_id, batch_size))
+    """, chunk_ids)
 
     chunks = []
     for row in cursor.fetchall():
@@ -104,7 +100,7 @@ def get_chunks_batch(conn: sqlite3.Connection, last_chunk_id: int, batch_size: i
 def generate_embeddings(client: OpenAI, texts: List[str]) -> List[List[float]]:
     """Generate embeddings using OpenAI API."""
     try:
-        response = client.embeddings.create(
+        response = rate_limit.embed(client,
             model=EMBEDDING_MODEL,
             input=texts,
             dimensions=EMBEDDING_DIMENSIONS
@@ -114,41 +110,27 @@ def generate_embeddings(client: OpenAI, texts: List[str]) -> List[List[float]]:
         print(f"Error generating embeddings: {e}")
         raise
 
-def upload_to_vectorize(vectors: List[Dict[str, Any]]) -> bool:
-    """Upload vectors to Cloudflare Vectorize."""
+def upload_to_vectorize(rows: Dict[str, int], job=None) -> bool:
+    """Upload vectors (an {id: row} map into the artifact) to Cloudflare Vectorize."""
     if not ACCOUNT_ID or not CLOUDFLARE_API_TOKEN:
         print("Warning: Cloudflare credentials not set. Skipping Vectorize upload.")
         return False
 
-    url = f"https://api.cloudflare.com/client/v4/accounts/{ACCOUNT_ID}/vectorize/v2/indexes/{VECTORIZE_INDEX_ID}/insert"
+    url = f"https://api.cloudflare.com/client/v4/accounts/{ACCOUNT_ID}/vectorize/v2/indexes/{vectorize_api.index_name()}/insert"
 
     headers = {
         "Authorization": f"Bearer {CLOUDFLARE_API_TOKEN}",
         "Content-Type": "application/json"
     }
 
-    # Format vectors for Vectorize API
-    formatted_vectors = []
-    for vec in vectors:
-        formatted_vectors.append({
-            "id": f"vedabase_chunk_{vec['chunk_id']}",
-            "values": vec['embedding'],
-            "metadata": {
-                "source": "vedabase",
-                "chunk_id": vec['chunk_id'],
-                "verse_id": vec['verse_id'],
-                "book_code": vec['book_code'],
-                "book_name": vec['book_name'],
-                "chapter": vec['chapter'],
-                "verse_number": vec['verse_number'],
-                "chunk_type": vec['chunk_type'],
-                "chunk_index": vec['chunk_index'],
-                "word_count": vec['word_count']
-            }
-        })
+    # Read the batch back from the artifact in Vectorize format
+    with embedding_store.EmbeddingStore(EMBEDDINGS_NAME) as store:
+        formatted_vectors = list(store.vectorize_records(ids=list(rows), rows=rows))
 
     try:
         response = requests.post(url, headers=headers, json={"vectors": formatted_vectors})
+        if job and response.status_code == 429:
+            job.rate_limited()
         response.raise_for_status()
         return True
     except Exception as e:
@@ -157,8 +139,9 @@ def upload_to_vectorize(vectors: List[Dict[str, Any]]) -> bool:
             print(f"Response: {e.response.text}")
         return False
 
-def process_batch(client: OpenAI, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Process a batch of chunks: generate embeddings and prepare for upload."""
+def process_batch(client: OpenAI, chunks: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Process a batch of chunks: generate embeddings and write them to the
+    artifact. Returns {vector id: row} for the upload."""
     # Extract texts for embedding
     texts = [chunk['content'] for chunk in chunks]
 
@@ -166,23 +149,27 @@ def process_batch(client: OpenAI, chunks: List[Dict[str, Any]]) -> List[Dict[str
     print(f"  Generating embeddings for {len(texts)} chunks...")
     embeddings = generate_embeddings(client, texts)
 
-    # Combine chunks with embeddings
-    vectors = []
-    for chunk, embedding in zip(chunks, embeddings):
-        vectors.append({
-            'chunk_id': chunk['id'],
-            'verse_id': chunk['verse_id'],
-            'book_code': chunk['book_code'],
-            'book_name': chunk['book_name'],
-            'chapter': chunk['chapter'],
-            'verse_number': chunk['verse_number'],
-            'chunk_type': chunk['chunk_type'],
-            'chunk_index': chunk['chunk_index'],
-            'word_count': chunk['word_count'],
-            'embedding': embedding
-        })
-
-    return vectors
+    # Save with their Vectorize ids and metadata (reruns overwrite in place)
+    return embedding_store.upsert(
+        EMBEDDINGS_NAME,
+        [f"vedabase_chunk_{chunk['id']}" for chunk in chunks],
+        embeddings,
+        [
+            {
+                "source": "vedabase",
+                "chunk_id": chunk['id'],
+                "verse_id": chunk['verse_id'],
+                "book_code": chunk['book_code'],
+                "book_name": chunk['book_name'],
+                "chapter": chunk['chapter'],
+                "verse_number": chunk['verse_number'],
+                "chunk_type": chunk['chunk_type'],
+                "chunk_index": chunk['chunk_index'],
+                "word_count": chunk['word_count']
+            }
+            for chunk in chunks
+        ]
+    )
 
 def main():
     """Main execution function."""
@@ -203,95 +190,135 @@ def main():
         print(f"Error: Database not found at {LOCAL_DB}")
         sys.exit(1)
 
-    conn = sqlite3.connect(LOCAL_DB)
-
-    # Get total chunk count
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM vedabase_chunks")
-    total_chunks = cursor.fetchone()[0]
+    conn = storage.connect(LOCAL_DB)
+
+    # Register every chunk in the ledger once; reruns resume from it
+    ledger = job_ledger.connect()
+    if job_ledger.create_job(ledger, JOB_NAME,
+                             (row[0] for row in conn.execute("SELECT id FROM vedabase_chunks ORDER BY id")),
+                             done_ids=legacy_done_ids(conn)):
+        print(f"\nCreated job {JOB_NAME} in {job_ledger.LEDGER_DB}")
+
+    # Embed one representative per near-duplicate cluster
+    clusters = near_dup.build('vedabase_chunks')
+    print(f"Near-duplicates: {clusters['duplicates']:,} of {clusters['items']:,} chunks "
+          f"share a representative ({clusters['signed']:,} newly signed)")
+    dedup = near_dup.connect()
+    duplicates = near_dup.duplicate_ids(dedup, 'vedabase_chunks')
+    dedup.close()
+
+    state = job_ledger.counts(ledger, JOB_NAME)
+    total_chunks = sum(state.values())
     print(f"\nTotal chunks to process: {total_chunks:,}")
-
-    # Load progress
-    progress = load_progress()
-    print(f"Resuming from chunk ID: {progress['last_chunk_id']}")
-    print(f"Already processed: {progress['total_processed']:,} chunks")
+    print(f"Already processed: {state['done']:,} chunks ({state['failed']:,} failed)")
     print()
 
-    # Process in batches
-    batch_num = len(progress['batches_completed']) + 1
+    job = metrics.Job(JOB_NAME, total=total_chunks, done=state['done'])
+    owner = job_ledger.worker_id()
+    started_at = datetime.now().isoformat()
+    processed = 0
+    batch_num = 1
 
     try:
         while True:
-            # Fetch next batch
-            chunks = get_chunks_batch(conn, progress['last_chunk_id'], BATCH_SIZE)
+            # Lease the next batch (other workers may be running too)
+            chunk_ids = job_ledger.claim(ledger, JOB_NAME, owner, BATCH_SIZE)
 
-            if not chunks:
-                print("\nAll chunks processed!")
+            if not chunk_ids:
+                print("\nNo chunks left to claim!")
                 break
 
+            skipped = [chunk_id for chunk_id in chunk_ids if chunk_id in duplicates]
+            if skipped:
+                # Covered by their representative's vector
+                job_ledger.complete(ledger, JOB_NAME, owner, skipped)
+                job.advance(len(skipped))
+                chunk_ids = [chunk_id for chunk_id in chunk_ids if chunk_id not in duplicates]
+                if not chunk_ids:
+                    continue
+
+            chunks = get_chunks(conn, chunk_ids)
+            found = {chunk['id'] for chunk in chunks}
+            missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in found]
+            if missing:
+                # Deleted from D1 since the job was created: nothing left to embed
+                print(f"  ⚠️  {len(missing)} claimed chunk ids are no longer in D1; marking them done")
+                job_ledger.complete(ledger, JOB_NAME, owner, missing)
+                job.advance(len(missing))
+                chunk_ids = [chunk_id for chunk_id in chunk_ids if chunk_id in found]
+            if not chunks:
+                continue
+
             print(f"Batch {batch_num}: Processing chunk IDs {chunks[0]['id']} to {chunks[-1]['id']} ({len(chunks)} chunks)")
 
-            # Generate embeddings
-            vectors = process_batch(client, chunks)
+            try:
+                # Generate embeddings
+                with job.timed('openai'):
+                    rows = process_batch(client, chunks)
+
+                # Embedding may have waited on the limiter: keep the lease for the upload
+                job_ledger.renew(ledger, JOB_NAME, owner, chunk_ids)
 
-            # Upload to Vectorize
-            print(f"  Uploading to Vectorize...")
-            upload_success = upload_to_vectorize(vectors)
+                # Upload to Vectorize
+                print(f"  Uploading to Vectorize...")
+                with job.timed('vectorize'):
+                    upload_success = upload_to_vectorize(rows, job)
+            except Exception as e:
+                job_ledger.fail(ledger, JOB_NAME, owner, chunk_ids, e)
+                job.error(len(chunk_ids))
+                raise
 
             if upload_success:
-                print(f"  ✓ Successfully uploaded {len(vectors)} vectors")
+                print(f"  ✓ Successfully uploaded {len(rows)} vectors")
+                job_ledger.complete(ledger, JOB_NAME, owner, chunk_ids)
+                processed += len(chunks)
+                job.advance(len(chunks), nbytes=sum(len(chunk['content'].encode('utf-8')) for chunk in chunks))
             else:
-                print(f"  ⚠ Vectorize upload skipped (credentials not set)")
-
-            # Update progress
-            progress['last_chunk_id'] = chunks[-1]['id']
-            progress['total_processed'] += len(chunks)
-            progress['total_uploaded'] += len(vectors) if upload_success else 0
-            progress['batches_completed'].append({
-                'batch_num': batch_num,
-                'chunk_ids': f"{chunks[0]['id']}-{chunks[-1]['id']}",
-                'count': len(chunks),
-                'uploaded': upload_success,
-                'timestamp': datetime.now().isoformat()
-            })
-            save_progress(progress)
+                print(f"  ✗ Vectorize upload failed; batch left for retry")
+                job_ledger.fail(ledger, JOB_NAME, owner, chunk_ids, 'Vectorize upload failed')
+                job.error(len(chunk_ids))
 
             # Progress report
-            percent_complete = (progress['total_processed'] / total_chunks) * 100
-            print(f"  Progress: {progress['total_processed']:,}/{total_chunks:,} ({percent_complete:.1f}%)")
+            done = job_ledger.counts(ledger, JOB_NAME)['done']
+            percent_complete = (done / total_chunks) * 100
+            print(f"  Progress: {done:,}/{total_chunks:,} ({percent_complete:.1f}%)")
             print()
 
-            # Rate limiting: wait 1 second between batches to respect OpenAI limits
-            if chunks:  # If there are more chunks to process
-                time.sleep(1)
-
             batch_num += 1
 
     except KeyboardInterrupt:
-        print("\n\nInterrupted by user. Progress saved.")
+        # Hand the current batch back so a restart can claim it right away
+        job_ledger.release(ledger, JOB_NAME, owner)
+        print("\n\nInterrupted by user. Progress is in the job ledger.")
         print(f"Resume by running this script again.")
-        save_progress(progress)
+        job.finish('interrupted')
         sys.exit(0)
 
     except Exception as e:
         print(f"\n\nError: {e}")
-        print("Progress saved. Fix the issue and run again to resume.")
-        save_progress(progress)
+        print("Progress is in the job ledger. Fix the issue and run again to resume.")
+        job.finish('failed')
         raise
 
     finally:
         conn.close()
 
+    state = job_ledger.counts(ledger, JOB_NAME)
+    ledger.close()
+    job.finish('done' if state['done'] == total_chunks else 'incomplete')
+
     # Final summary
     print("\n" + "=" * 80)
     print("SUMMARY")
     print("=" * 80)
-    print(f"Total chunks processed: {progress['total_processed']:,}")
-    print(f"Total vectors uploaded: {progress['total_uploaded']:,}")
-    print(f"Batches completed: {len(progress['batches_completed'])}")
-    print(f"Started at: {progress['started_at']}")
+    print(f"Chunks processed by this worker: {processed:,}")
+    print(f"Job total: {state['done']:,}/{total_chunks:,} done, {state['failed']:,} failed")
+    print(f"Started at: {started_at}")
     print(f"Completed at: {datetime.now().isoformat()}")
-    print("\nVedabase RAG is now ready for queries!")
+    if state['failed']:
+        print(f"\nRetry failures with: python3 job_ledger.py retry {JOB_NAME}")
+    else:
+        print("\nVedabase RAG is now ready for queries!")
     print("=" * 80)
 
 if __name__ == "__main__":
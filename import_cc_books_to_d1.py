@@ -6,10 +6,11 @@ Adds to the existing vedabase tables without re-importing other books
 
 import json
 import re
-import sqlite3
 from pathlib import Path
 from typing import List, Dict
 
+import storage
+
 def split_purport_into_paragraphs(purport: str) -> List[str]:
     """Split purport text into paragraphs for better RAG chunking"""
     if not purport:
@@ -46,14 +47,14 @@ def main():
         del cc_data['lec1c']
 
     # Connect to local D1 database
-    db_path = Path('.wrangler/state/v3/d1/miniflare-D1DatabaseObject/') / '3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite'
+    db_path = Path(storage.LOCAL_DB)
 
     if not db_path.exists():
         print(f"Error: Database not found at {db_path}")
         print("Make sure you've run 'npx wrangler dev' at least once")
         return
 
-    conn = sqlite3.connect(db_path)
+    conn = storage.connect(db_path, bulk=True)
     cursor = conn.cursor()
 
     # Get existing book IDs
@@ -91,51 +92,44 @@ def main():
         verses = cc_data[book_code]
         print(f"\n{book_code.upper()}: Processing {len(verses)} verses...")
 
-        verse_count = 0
-        chunk_count = 0
+        verse_rows = []
+        chunk_rows = []
 
         for verse in verses:
             max_verse_id += 1
-            chapter = verse.get('chapter', '')
-            verse_num = verse.get('verse', '')
-
-            # Insert verse
-            cursor.execute("""
-                INSERT INTO vedabase_verses (id, book_id, chapter, verse_number, sanskrit, synonyms, translation)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
+            verse_rows.append((
                 max_verse_id,
                 book_id,
-                chapter,
-                verse_num,
+                verse.get('chapter', ''),
+                verse.get('verse', ''),
                 verse.get('sanskrit', ''),
                 verse.get('synonyms', ''),
                 verse.get('translation', '')
             ))
 
-            verse_count += 1
-
             # Create chunks for purport paragraphs
             purport = verse.get('purport', '')
             if purport:
-                paragraphs = split_purport_into_paragraphs(purport)
-
-                for para in paragraphs:
+                for para in split_purport_into_paragraphs(purport):
                     max_chunk_id += 1
-                    word_count = count_words(para)
-
-                    cursor.execute("""
-                        INSERT INTO vedabase_chunks (id, verse_id, chunk_type, content, word_count)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
+                    chunk_rows.append((
                         max_chunk_id,
                         max_verse_id,
                         'purport_paragraph',
                         para,
-                        word_count
+                        count_words(para)
                     ))
 
-                    chunk_count += 1
+        # IDs are preassigned, so both tables load with plain batched inserts
+        # (indexes stay in place: these append to already-populated tables)
+        verse_count = storage.executemany_chunked(conn, """
+            INSERT INTO vedabase_verses (id, book_id, chapter, verse_number, sanskrit, synonyms, translation)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, verse_rows)
+        chunk_count = storage.executemany_chunked(conn, """
+            INSERT INTO vedabase_chunks (id, verse_id, chunk_type, content, word_count)
+            VALUES (?, ?, ?, ?, ?)
+        """, chunk_rows)
 
         print(f"  ✓ Inserted {verse_count} verses, {chunk_count} chunks")
         total_verses += verse_count
@@ -6,10 +6,11 @@ Adds to the existing vedabase tables without re-importing other books
 
 import json
 import re
-import sqlite3
 from pathlib import Path
 from typing import List, Dict
 
+import storage
+
 def split_purport_into_paragraphs(purport: str) -> List[str]:
     """Split purport text into paragraphs for better RAG chunking"""
     if not purport:
@@ -46,14 +47,14 @@ def main():
         del kb_data['lec1c']
 
     # Connect to local D1 database
-    db_path = Path('.wrangler/state/v3/d1/miniflare-D1DatabaseObject/') / '3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite'
+    db_path = Path(storage.LOCAL_DB)
 
     if not db_path.exists():
         print(f"Error: Database not found at {db_path}")
         print("Make sure you've run 'npx wrangler dev' at least once")
         return
 
-    conn = sqlite3.connect(db_path)
+    conn = storage.connect(db_path, bulk=True)
     cursor = conn.cursor()
 
     # Get existing book IDs
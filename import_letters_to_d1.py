@@ -4,10 +4,10 @@ Import Srila Prabhupada's Letters to local D1 database
 """
 
 import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 
 def import_letters():
     """Import letters to D1"""
@@ -20,7 +20,7 @@ def import_letters():
     with open('letters_parsed_for_rag.json', 'r') as f:
         book = json.load(f)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get next book ID
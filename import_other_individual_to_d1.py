@@ -4,16 +4,9 @@ Import individual OTHER books to local D1 database
 """
 
 import json
-import sqlite3
-from pathlib import Path
 
-def get_local_db():
-    """Get connection to local D1 database"""
-    db_path = Path('.wrangler/state/v3/d1/miniflare-D1DatabaseObject')
-    db_files = list(db_path.glob('*.sqlite'))
-    if not db_files:
-        raise FileNotFoundError(f"No D1 database found in {db_path}")
-    return sqlite3.connect(db_files[0])
+import storage
+from storage import LOCAL_DB
 
 def import_individual_books():
     """Import individual books from other.html to D1"""
@@ -22,7 +15,7 @@ def import_individual_books():
     with open('other_individual_parsed.json', 'r', encoding='utf-8') as f:
         books_data = json.load(f)
 
-    conn = get_local_db()
+    conn = storage.connect(LOCAL_DB, bulk=True)
     cursor = conn.cursor()
 
     # Check current max IDs
@@ -4,10 +4,10 @@ Import Srimad Bhagavatam Cantos 4-10 to local D1 database
 """
 
 import json
-import sqlite3
+import storage
+from storage import LOCAL_DB
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 
 def import_verses():
     """Import verses to local D1 database"""
@@ -26,7 +26,7 @@ def import_verses():
     print(f"Loaded {len(verses)} verses")
 
     # Connect to database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Import books first
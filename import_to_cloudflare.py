@@ -2,86 +2,206 @@
 """
 Import Vedabase verses to Cloudflare
 Sends verses in batches to the import worker
+
+Batches are sized by payload bytes and adapt to the worker: they grow
+while responses are fast and shrink on 503s or timeouts, with several
+batches in flight over one pooled HTTP session.
 """
 
 import json
-import requests
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
 IMPORT_WORKER_URL = "https://vedabase-import.joanmanelferrera-400.workers.dev"
-BATCH_SIZE = 1  # Send 1 verse at a time (avoid Worker CPU limit)
 
-def import_book(book_code: str, verses: list):
-    """Import a single book's verses"""
+# Batch budget in bytes of serialized JSON
+INITIAL_BATCH_BYTES = 16 * 1024
+MIN_BATCH_BYTES = 2 * 1024         # a single verse is always sent alone if larger
+MAX_BATCH_BYTES = 512 * 1024
+FAST_LATENCY = 5.0                 # seconds; faster responses grow the batch
+GROWTH_FACTOR = 1.5
+CEILING_RECOVERY = 1.02            # per success, after a 503 lowered the ceiling
+IN_FLIGHT = 4                      # concurrent batches
+MAX_RETRIES = 5                    # attempts per verse, whatever its batch size
+BACKOFF_BASE = 1.0                 # seconds, doubled per retry
+BACKOFF_DOUBLINGS = 10             # exponent cap, so the delay never overflows
+BACKOFF_MAX = 30.0
+REQUEST_TIMEOUT = 120
+
+
+class AdaptiveBatcher:
+    """Byte-budget controller shared by all in-flight requests."""
+
+    def __init__(self, initial=INITIAL_BATCH_BYTES, minimum=MIN_BATCH_BYTES,
+                 maximum=MAX_BATCH_BYTES, fast_latency=FAST_LATENCY):
+        self.target = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.fast_latency = fast_latency
+        self.ceiling = maximum
+        self._lock = threading.Lock()
+
+    def take(self, pending):
+        """Pop verses from the pending deque until the byte budget is used.
+
+        Returns (batch, attempt) where attempt is the highest retry count
+        of the verses taken.
+        """
+        batch = []
+        size = 0
+        attempt = 0
+        while pending:
+            verse, tries, verse_size = pending[0]
+            if batch and size + verse_size > self.target:
+                break
+            pending.popleft()
+            batch.append((verse, tries, verse_size))
+            size += verse_size
+            attempt = max(attempt, tries)
+        return batch, attempt
+
+    def success(self, latency):
+        """Grow the budget after a fast 200."""
+        with self._lock:
+            if latency < self.fast_latency:
+                self.target = int(min(self.maximum, self.ceiling, self.target * GROWTH_FACTOR))
+            # Probe slowly past the size that last overloaded the worker
+            self.ceiling = min(self.maximum, self.ceiling * CEILING_RECOVERY)
+
+    def overloaded(self, size):
+        """Halve the budget after a batch of size bytes got a 503 or timed out."""
+        with self._lock:
+            self.ceiling = max(self.minimum, min(self.ceiling, size * 0.9))
+            self.target = int(max(self.minimum, min(self.target, size) // 2))
+
+
+def make_session(pool_size=IN_FLIGHT):
+    """requests.Session with a connection pool sized for the in-flight batches."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def post_batch(session, url, book_code, verses):
+    """Send one batch; returns (status, chunks_created, latency)."""
+    started = time.monotonic()
+    try:
+        response = session.post(
+            url,
+            json={
+                "book_code": book_code,
+                "verses": verses
+            },
+            timeout=REQUEST_TIMEOUT
+        )
+    except requests.exceptions.Timeout:
+        return 'timeout', 0, time.monotonic() - started
+    except requests.exceptions.RequestException as e:
+        return f"exception {str(e)[:50]}", 0, time.monotonic() - started
+
+    latency = time.monotonic() - started
+    if response.status_code == 200:
+        return 200, response.json().get('chunks_created', 0), latency
+    return response.status_code, 0, latency
+
+
+def import_book(book_code: str, verses: list, url=IMPORT_WORKER_URL, session=None,
+                in_flight=IN_FLIGHT, batcher=None, job=None):
+    """Import a single book's verses with adaptive, concurrent batches
+
+    job: optional metrics.Job that receives progress, latency and retries.
+    """
     print(f"\nImporting {book_code}: {len(verses)} verses")
 
-    total_batches = (len(verses) + BATCH_SIZE - 1) // BATCH_SIZE
+    own_session = session is None
+    session = session or make_session(in_flight)
+    batcher = batcher or AdaptiveBatcher()
+
+    pending = deque(
+        (verse, 0, len(json.dumps(verse, ensure_ascii=False).encode('utf-8')))
+        for verse in verses
+    )
     successful = 0
     failed = 0
+    chunks = 0
+    requests_sent = 0
+
+    def send(batch, attempt):
+        if attempt:
+            time.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** min(attempt - 1, BACKOFF_DOUBLINGS)))
+        return post_batch(session, url, book_code, [verse for verse, _, _ in batch])
+
+    try:
+        with ThreadPoolExecutor(max_workers=in_flight) as executor:
+            running = {}
+            while pending or running:
+                while pending and len(running) < in_flight:
+                    batch, attempt = batcher.take(pending)
+                    running[executor.submit(send, batch, attempt)] = batch
+                    requests_sent += 1
+
+                if job:
+                    job.queue_depth('pending_verses', len(pending))
+                    job.queue_depth('in_flight', len(running))
 
-    for i in range(0, len(verses), BATCH_SIZE):
-        batch = verses[i:i + BATCH_SIZE]
-        batch_num = (i // BATCH_SIZE) + 1
-        verse_ref = batch[0]['verse'] if batch else '?'
-
-        print(f"  {batch_num}/{total_batches} ({verse_ref})...", end=" ", flush=True)
-
-        # Retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    IMPORT_WORKER_URL,
-                    json={
-                        "book_code": book_code,
-                        "verses": batch
-                    },
-                    timeout=120
-                )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    print(f"✓ {result.get('chunks_created', 0)} chunks")
-                    successful += 1
-                    break
-                elif response.status_code == 503:
-                    # Worker overloaded, wait and retry
-                    if attempt < max_retries - 1:
-                        print(f"⏳ retry {attempt + 1}...", end=" ", flush=True)
-                        time.sleep(5)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = running.pop(future)
+                    status, created, latency = future.result()
+                    verse_ref = batch[0][0].get('verse', '?')
+                    if job:
+                        job.observe('import_worker', latency)
+
+                    if status == 200:
+                        batcher.success(latency)
+                        if job:
+                            job.advance(len(batch), nbytes=sum(size for _, _, size in batch))
+                        successful += len(batch)
+                        chunks += created
+                        print(f"  ✓ {verse_ref} +{len(batch) - 1} ({created} chunks, "
+                              f"{latency:.1f}s, next {batcher.target // 1024} KB)")
                         continue
-                    else:
-                        print(f"✗ Error 503 (max retries)")
-                        failed += 1
-                        break
-                else:
-                    print(f"✗ Error {response.status_code}")
-                    failed += 1
-                    break
-
-            except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    print(f"⏳ timeout, retry {attempt + 1}...", end=" ", flush=True)
-                    time.sleep(5)
-                    continue
-                else:
-                    print(f"✗ Timeout (max retries)")
-                    failed += 1
-                    break
-            except Exception as e:
-                print(f"✗ Exception: {str(e)[:50]}")
-                failed += 1
-                break
 
-        # Rate limiting - wait between requests
-        time.sleep(3)
+                    if status in (503, 'timeout'):
+                        # Worker overloaded: shrink and requeue at the front
+                        batcher.overloaded(sum(size for _, _, size in batch))
+                        if job and status == 503:
+                            job.rate_limited()
+                        # Every attempt counts against each verse in the batch, so a
+                        # worker that never recovers cannot keep a batch looping
+                        retry = [(verse, tries + 1, size) for verse, tries, size in batch if tries + 1 < MAX_RETRIES]
+                        if retry:
+                            if job:
+                                job.retry(len(retry))
+                            pending.extendleft(reversed(retry))
+                            print(f"  ⏳ {verse_ref}: {status}, requeued {len(retry)} "
+                                  f"(next {batcher.target // 1024} KB)")
+                        if len(retry) == len(batch):
+                            continue
+                        batch = [item for item in batch if item[1] + 1 >= MAX_RETRIES]
+                        verse_ref = batch[0][0].get('verse', '?')
+
+                    print(f"  ✗ {verse_ref}: Error {status}")
+                    failed += len(batch)
+                    if job:
+                        job.error(len(batch))
 
-        # Progress report every 50 verses
-        if batch_num % 50 == 0:
-            print(f"  Progress: {successful} successful, {failed} failed")
+    finally:
+        if own_session:
+            session.close()
 
-    print(f"\n  Final: {successful} successful, {failed} failed")
+    print(f"\n  Final: {successful} successful, {failed} failed, "
+          f"{chunks} chunks in {requests_sent} requests")
     return failed == 0
 
 def main():
@@ -120,6 +240,8 @@ def main():
             print(f"  {code}: {name} ({count} verses)")
 
     print("\nStarting import...")
+    job = metrics.Job('import_to_cloudflare',
+                      total=sum(len(all_verses.get(code, [])) for code in book_mapping))
 
     # Import each book
     for book_code in book_mapping.keys():
@@ -129,11 +251,14 @@ def main():
             print(f"\nSkipping {book_code}: No verses found")
             continue
 
-        success = import_book(book_code, verses)
+        success = import_book(book_code, verses, job=job)
 
         if not success:
             print(f"\n❌ Import failed for {book_code}, stopping")
+            job.finish('failed')
             break
+    else:
+        job.finish()
 
     print("\n" + "=" * 60)
     print("IMPORT COMPLETE")
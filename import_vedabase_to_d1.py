@@ -6,10 +6,11 @@ Processes verses and splits purports into paragraphs for better retrieval
 
 import json
 import re
-import sqlite3
 from pathlib import Path
 from typing import List, Dict
 
+import storage
+
 def split_purport_into_paragraphs(purport: str) -> List[str]:
     """Split purport text into paragraphs for better RAG chunking"""
     if not purport:
@@ -55,7 +56,7 @@ def import_vedabase_to_d1(json_path: str, db_path: str):
         data = json.load(f)
 
     print(f"Connecting to database at {db_path}...")
-    conn = sqlite3.connect(db_path)
+    conn = storage.connect(db_path, bulk=True)
     cursor = conn.cursor()
 
     # Apply schema
@@ -79,61 +80,64 @@ def import_vedabase_to_d1(json_path: str, db_path: str):
         'cc3': 'Caitanya Caritamrita Antya-lila'
     }
 
-    # Process each book
-    for book_code, verses in data.items():
-        if not verses:
-            print(f"Skipping {book_code} (no verses)")
-            continue
-
-        print(f"\nProcessing {book_code}: {len(verses)} verses...")
-
-        # Get book_id
-        cursor.execute("SELECT id FROM books WHERE code = ?", (book_code,))
-        result = cursor.fetchone()
-        if not result:
-            print(f"  ERROR: Book {book_code} not found in database!")
-            continue
-        book_id = result[0]
-
-        # Process each verse
-        for verse_data in verses:
-            # Insert verse
-            cursor.execute("""
+    # Indexes are rebuilt once after the load instead of per row
+    with storage.deferred_indexes(conn, 'verses', 'chunks'):
+        # Process each book
+        for book_code, verses in data.items():
+            if not verses:
+                print(f"Skipping {book_code} (no verses)")
+                continue
+
+            print(f"\nProcessing {book_code}: {len(verses)} verses...")
+
+            # Get book_id
+            cursor.execute("SELECT id FROM books WHERE code = ?", (book_code,))
+            result = cursor.fetchone()
+            if not result:
+                print(f"  ERROR: Book {book_code} not found in database!")
+                continue
+            book_id = result[0]
+
+            verse_rows = (
+                (
+                    book_id,
+                    verse_data.get('chapter', ''),
+                    verse_data.get('verse', ''),
+                    verse_data.get('sanskrit', ''),
+                    verse_data.get('synonyms', ''),
+                    verse_data.get('translation', '')
+                )
+                for verse_data in verses
+            )
+            verse_ids = storage.insert_returning(conn, """
                 INSERT INTO verses (book_id, chapter, verse_number, sanskrit, synonyms, translation)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                book_id,
-                verse_data.get('chapter', ''),
-                verse_data.get('verse', ''),
-                verse_data.get('sanskrit', ''),
-                verse_data.get('synonyms', ''),
-                verse_data.get('translation', '')
-            ))
-            verse_id = cursor.lastrowid
-            total_verses += 1
-
-            # Create verse text chunk (combines sanskrit, translation, synonyms)
-            verse_text = create_verse_text_chunk(verse_data)
-            if verse_text:
-                cursor.execute("""
-                    INSERT INTO chunks (verse_id, chunk_type, chunk_index, content, word_count)
-                    VALUES (?, 'verse_text', 0, ?, ?)
-                """, (verse_id, verse_text, count_words(verse_text)))
-                total_chunks += 1
-
-            # Split purport into paragraphs and create chunks
-            purport = verse_data.get('purport', '')
-            if purport:
-                paragraphs = split_purport_into_paragraphs(purport)
-                for idx, para in enumerate(paragraphs, start=1):
-                    cursor.execute("""
-                        INSERT INTO chunks (verse_id, chunk_type, chunk_index, content, word_count)
-                        VALUES (?, 'purport_paragraph', ?, ?, ?)
-                    """, (verse_id, idx, para, count_words(para)))
-                    total_chunks += 1
-
-        print(f"  ✓ Imported {len(verses)} verses")
-        conn.commit()
+            """, verse_rows)
+
+            # Chunks are collected per book and written in one batch
+            chunk_rows = []
+            for verse_data, verse_id in zip(verses, verse_ids):
+                total_verses += 1
+
+                # Create verse text chunk (combines sanskrit, translation, synonyms)
+                verse_text = create_verse_text_chunk(verse_data)
+                if verse_text:
+                    chunk_rows.append((verse_id, 'verse_text', 0, verse_text, count_words(verse_text)))
+
+                # Split purport into paragraphs and create chunks
+                purport = verse_data.get('purport', '')
+                if purport:
+                    paragraphs = split_purport_into_paragraphs(purport)
+                    for idx, para in enumerate(paragraphs, start=1):
+                        chunk_rows.append((verse_id, 'purport_paragraph', idx, para, count_words(para)))
+
+            total_chunks += storage.executemany_chunked(conn, """
+                INSERT INTO chunks (verse_id, chunk_type, chunk_index, content, word_count)
+                VALUES (?, ?, ?, ?, ?)
+            """, chunk_rows)
+
+            print(f"  ✓ Imported {len(verses)} verses")
+            conn.commit()
 
     print(f"\n{'='*60}")
     print(f"Import Summary:")
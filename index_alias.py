@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Blue/green index generations behind a single alias.
+
+A rechunk or metadata fix no longer mutates the live index. Instead:
+
+    create   a new generation: a fresh Vectorize index (metadata indexes
+             copied from the live one) and/or a new local responses DB
+    build    upload the generation's embedding artifacts into its index
+             (resumable ledger job, --workers threads), skipping vectors
+             tombstoned by delete_vectors.py
+    verify   counts and checksums against D1 (and the responses DB),
+             plus a sample of vectors read back and compared
+    flip     point the alias at the verified generation in one
+             transaction; the wrangler configs' index_name is rewritten
+             (and redeployed with --deploy)
+    rollback flip back to the previous generation
+    gc       delete retired generations beyond --keep
+
+Readers resolve the alias instead of hard-coding a name:
+index_alias.local_db('philosophy-responses', default) for query_rag.py /
+streamlit_app.py, vectorize_api.index_name() for Python-side Vectorize
+calls, and the index_name in wrangler.toml for the workers.
+
+Usage:
+    python3 index_alias.py status [ALIAS]
+    python3 index_alias.py adopt philosophy-vectors --remote-index philosophy-vectors
+    python3 index_alias.py create philosophy-vectors --stores kb_embeddings,cc_embeddings
+    python3 index_alias.py create philosophy-responses --local-db philosophical_traditions.g2.db
+    python3 index_alias.py build philosophy-vectors-g2 [--workers 4] [--rebuild]
+    python3 index_alias.py verify philosophy-vectors-g2 [--sample 200]
+    python3 index_alias.py flip philosophy-vectors philosophy-vectors-g2 [--deploy]
+    python3 index_alias.py rollback philosophy-vectors [--deploy]
+    python3 index_alias.py gc philosophy-vectors [--keep 1]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+import delete_vectors
+import embedding_store
+import job_ledger
+import near_dup
+import storage
+import vectorize_api
+
+load_dotenv()
+
+REGISTRY_DB = "index_generations.db"
+
+# Alias -> wrangler configs whose [[vectorize]] index_name follows it
+WRANGLER_CONFIGS = {
+    'philosophy-vectors': ['wrangler.toml', 'wrangler.vedabase.toml'],
+}
+DIMENSIONS = 1536
+METRIC = 'cosine'
+BUILD_BATCH = 500
+WORKERS = 4
+VERIFY_SAMPLE = 200
+VALUE_TOLERANCE = 1e-5
+
+INDEX_NAME_RE = re.compile(r'(\[\[vectorize\]\][^\[]*?index_name\s*=\s*")([^"]*)(")', re.S)
+
+
+def connect(db_path=REGISTRY_DB):
+    """Open the generation registry, creating it on first use."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS generations (
+        name TEXT PRIMARY KEY,
+        alias TEXT NOT NULL,
+        remote_index TEXT,
+        local_db TEXT,
+        stores TEXT NOT NULL DEFAULT '[]',
+        state TEXT NOT NULL DEFAULT 'building',
+        vectors INTEGER,
+        checksum TEXT,
+        report TEXT,
+        created_at REAL NOT NULL,
+        verified_at REAL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS aliases (
+        alias TEXT PRIMARY KEY,
+        generation TEXT NOT NULL,
+        previous TEXT,
+        updated_at REAL NOT NULL
+    )
+    """)
+    return conn
+
+
+def resolve(alias, db_path=REGISTRY_DB):
+    """The live generation row of alias, or None (never creates the registry)."""
+    if not Path(db_path).exists():
+        return None
+    conn = sqlite3.connect(f"file:{Path(db_path).resolve()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute("""
+            SELECT g.* FROM aliases a JOIN generations g ON g.name = a.generation WHERE a.alias = ?
+        """, (alias,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def local_db(alias, default):
+    """Local database of alias's live generation, else default."""
+    generation = resolve(alias)
+    return generation['local_db'] if generation and generation['local_db'] else default
+
+
+def remote_index(alias, default=None):
+    """Vectorize index of alias's live generation, else default (or the alias name).
+
+    vectorize_api.index_name() resolves its default index the same way.
+    """
+    generation = resolve(alias)
+    return generation['remote_index'] if generation and generation['remote_index'] else (default or alias)
+
+
+def next_name(conn, alias):
+    numbers = [int(row[0].rsplit('-g', 1)[1]) for row in conn.execute(
+        "SELECT name FROM generations WHERE alias = ? AND name LIKE ?", (alias, f"{alias}-g%"))
+        if row[0].rsplit('-g', 1)[1].isdigit()]
+    return f"{alias}-g{max(numbers, default=0) + 1}"
+
+
+def stores_of(generation):
+    return json.loads(generation['stores'] or '[]')
+
+
+def get_generation(conn, name):
+    generation = conn.execute("SELECT * FROM generations WHERE name = ?", (name,)).fetchone()
+    if generation is None:
+        print(f"❌ Unknown generation {name}")
+        sys.exit(1)
+    return generation
+
+
+# --- create / adopt -------------------------------------------------------
+
+def adopt(conn, alias, remote=None, local=None):
+    """Register an existing index/DB as alias's live generation (bootstrap)."""
+    name = next_name(conn, alias)
+    with conn:
+        conn.execute("""
+            INSERT INTO generations (name, alias, remote_index, local_db, state, created_at, verified_at)
+            VALUES (?, ?, ?, ?, 'live', ?, ?)
+        """, (name, alias, remote, local, time.time(), time.time()))
+        conn.execute("INSERT OR REPLACE INTO aliases (alias, generation, previous, updated_at) VALUES (?, ?, NULL, ?)",
+                     (alias, name, time.time()))
+    return name
+
+
+def create(conn, alias, stores=(), local=None, dimensions=DIMENSIONS, metric=METRIC):
+    """New generation; creates its Vectorize index when it has stores."""
+    name = next_name(conn, alias)
+    remote = None
+    if stores:
+        remote = name
+        vectorize_api.create_index(remote, dimensions, metric, description=f"{alias} generation {name}")
+        live = resolve(alias)
+        source = live['remote_index'] if live and live['remote_index'] else None
+        for prop in (vectorize_api.metadata_indexes(source) if source else []):
+            vectorize_api.create_metadata_index(prop['propertyName'], prop['indexType'], remote)
+    with conn:
+        conn.execute("""
+            INSERT INTO generations (name, alias, remote_index, local_db, stores, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (name, alias, remote, local, json.dumps(list(stores)), time.time()))
+    return name
+
+
+# --- build ----------------------------------------------------------------
+
+def build(conn, name, workers=WORKERS, rebuild=False):
+    """Upload the generation's artifacts into its index through the job ledger.
+
+    An interrupted build resumes; rebuild=True re-uploads every batch.
+    """
+    generation = get_generation(conn, name)
+    job = f"build:{name}"
+    items = []
+    for store_name in stores_of(generation):
+        with embedding_store.EmbeddingStore(store_name) as store:
+            items.extend(f"{store_name}@{start}" for start, _ in store.batches(BUILD_BATCH))
+    ledger = job_ledger.connect()
+    if rebuild:
+        job_ledger.drop_job(ledger, job)
+    job_ledger.create_job(ledger, job, items)
+    ledger.close()
+    deleted = delete_vectors.tombstoned_ids()
+
+    def worker(number):
+        ledger = job_ledger.connect()
+        owner = f"{job_ledger.worker_id()}:{number}"
+        stores = {}
+        while True:
+            claimed = job_ledger.claim(ledger, job, owner, 1)
+            if not claimed:
+                break
+            store_name, start = claimed[0].rsplit('@', 1)
+            try:
+                store = stores.get(store_name) or stores.setdefault(store_name, embedding_store.EmbeddingStore(store_name))
+                records = [record for record in store.vectorize_records(int(start), int(start) + BUILD_BATCH)
+                           if record['id'] not in deleted]
+                if records:
+                    vectorize_api.upsert(records, generation['remote_index'])
+            except Exception as e:
+                job_ledger.fail(ledger, job, owner, claimed, e)
+                print(f"  ❌ {claimed[0]}: {e}")
+                continue
+            job_ledger.complete(ledger, job, owner, claimed)
+        for store in stores.values():
+            store.close()
+        ledger.close()
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ledger = job_ledger.connect()
+    state = job_ledger.counts(ledger, job)
+    ledger.close()
+    return state
+
+
+# --- verify ---------------------------------------------------------------
+
+def id_checksum(ids):
+    """sha256 over the sorted ids."""
+    digest = hashlib.sha256()
+    for item_id in sorted(ids):
+        digest.update(f"{item_id}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def expected_chunk_ids():
+    """D1 vedabase chunk ids that should have a vector (near-duplicates and deletions excluded)."""
+    ids = {row[0] for row in storage.read_connection().execute("SELECT id FROM vedabase_chunks")}
+    ids -= delete_vectors.tombstoned_chunks()
+    if Path(near_dup.DEDUP_DB).exists():
+        dedup = near_dup.connect()
+        ids -= near_dup.duplicate_ids(dedup, 'vedabase_chunks')
+        dedup.close()
+    return ids
+
+
+def verify_remote(generation, sample_size):
+    """Counts, D1 coverage and a sampled read-back for a Vectorize generation."""
+    problems, report = [], {}
+    vector_ids, chunk_ids = [], set()
+    deleted = delete_vectors.tombstoned_ids()
+    for store_name in stores_of(generation):
+        with embedding_store.EmbeddingStore(store_name) as store:
+            for vector_id, _, metadata in store.records():
+                if vector_id in deleted:
+                    continue
+                vector_ids.append(vector_id)
+                if metadata.get('source') == 'vedabase' and metadata.get('chunk_id') is not None:
+                    chunk_ids.add(metadata['chunk_id'])
+
+    remote_count = vectorize_api.index_info(generation['remote_index']).get('vectorCount')
+    report['local_vectors'] = len(vector_ids)
+    report['remote_vectors'] = remote_count
+    if remote_count != len(vector_ids):
+        problems.append(f"index has {remote_count} vectors, artifacts have {len(vector_ids)} "
+                        "(indexing may still be catching up; verify again shortly)")
+
+    expected = expected_chunk_ids()
+    missing, orphans = expected - chunk_ids, chunk_ids - expected
+    report['d1_chunks'] = len(expected)
+    report['d1_checksum'] = id_checksum(expected)
+    report['generation_checksum'] = id_checksum(chunk_ids)
+    report['missing_chunks'] = len(missing)
+    report['orphan_chunks'] = len(orphans)
+    if missing:
+        problems.append(f"{len(missing)} D1 chunks have no vector (e.g. {sorted(missing)[:5]})")
+    if orphans:
+        problems.append(f"{len(orphans)} vectors point at chunks not in D1 (e.g. {sorted(orphans)[:5]})")
+
+    sample = set(random.sample(vector_ids, min(sample_size, len(vector_ids))))
+    remote = {record['id']: record for record in vectorize_api.get_by_ids(sample, generation['remote_index'])}
+    mismatched = 0
+    for store_name in stores_of(generation):
+        with embedding_store.EmbeddingStore(store_name) as store:
+            for vector_id, values, metadata in store.get(sample):
+                record = remote.get(vector_id)
+                if (record is None or record.get('metadata') != metadata
+                        or not np.allclose(record['values'], values, atol=VALUE_TOLERANCE)):
+                    mismatched += 1
+    report['sampled'] = len(sample)
+    report['sample_mismatches'] = mismatched
+    if mismatched:
+        problems.append(f"{mismatched}/{len(sample)} sampled vectors differ from the artifacts")
+    return problems, report, id_checksum(vector_ids), len(vector_ids)
+
+
+def verify_local(generation):
+    """Every (non-duplicate) response of the generation's DB has embeddings."""
+    problems, report = [], {}
+    conn = storage.read_connection(generation['local_db'])
+    responses = {row[0] for row in conn.execute("SELECT id FROM responses")}
+    if Path(near_dup.DEDUP_DB).exists():
+        dedup = near_dup.connect()
+        responses -= near_dup.duplicate_ids(dedup, near_dup.corpus_key('responses', generation['local_db']))
+        dedup.close()
+    embedded = {row[0] for row in conn.execute("SELECT DISTINCT response_id FROM embeddings")}
+    vectors = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    report.update(responses=len(responses), embedded_responses=len(embedded), vectors=vectors,
+                  responses_checksum=id_checksum(responses), embedded_checksum=id_checksum(embedded & responses))
+    if responses - embedded:
+        problems.append(f"{len(responses - embedded)} responses have no embeddings")
+    if embedded - responses:
+        problems.append(f"{len(embedded - responses)} embeddings belong to missing or duplicate responses")
+    return problems, report, id_checksum(embedded), vectors
+
+
+def verify(conn, name, sample_size=VERIFY_SAMPLE):
+    generation = get_generation(conn, name)
+    problems, report, checksum, vectors = [], {}, None, 0
+    if generation['remote_index']:
+        problems, report, checksum, vectors = verify_remote(generation, sample_size)
+    if generation['local_db']:
+        local_problems, local_report, local_checksum, local_vectors = verify_local(generation)
+        problems += local_problems
+        report['local_db'] = local_report
+        checksum = checksum or local_checksum
+        vectors += local_vectors
+    with conn:
+        conn.execute("""
+            UPDATE generations SET state = ?, vectors = ?, checksum = ?, report = ?, verified_at = ?
+            WHERE name = ? AND state IN ('building', 'verified', 'failed')
+        """, ('failed' if problems else 'verified', vectors, checksum, json.dumps(report),
+              time.time(), name))
+    return problems, report
+
+
+# --- flip / rollback / gc -------------------------------------------------
+
+def rewrite_wrangler_configs(alias, index):
+    """Point the [[vectorize]] index_name of alias's wrangler configs at index."""
+    changed = []
+    for config in WRANGLER_CONFIGS.get(alias, []):
+        path = Path(config)
+        if not path.exists():
+            continue
+        text = path.read_text()
+        updated = INDEX_NAME_RE.sub(lambda m: m.group(1) + index + m.group(3), text)
+        if updated != text:
+            tmp = path.with_suffix(path.suffix + '.tmp')
+            tmp.write_text(updated)
+            os.replace(tmp, path)
+            changed.append(config)
+    return changed
+
+
+def deploy(alias):
+    for config in WRANGLER_CONFIGS.get(alias, []):
+        print(f"🚀 npx wrangler deploy --config {config}")
+        subprocess.run(['npx', 'wrangler', 'deploy', '--config', config], check=True)
+
+
+def flip(conn, alias, name, force=False):
+    """Make name the live generation of alias; returns the previous one."""
+    generation = get_generation(conn, name)
+    if generation['alias'] != alias:
+        raise ValueError(f"{name} belongs to {generation['alias']}, not {alias}")
+    if generation['state'] not in ('verified', 'live', 'retired') and not force:
+        raise ValueError(f"{name} is {generation['state']}; verify it first (or --force)")
+
+    current = conn.execute("SELECT generation FROM aliases WHERE alias = ?", (alias,)).fetchone()
+    previous = current[0] if current else None
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO aliases (alias, generation, previous, updated_at) VALUES (?, ?, ?, ?)",
+                     (alias, name, previous if previous != name else None, time.time()))
+        conn.execute("UPDATE generations SET state = 'retired' WHERE alias = ? AND state = 'live' AND name != ?",
+                     (alias, name))
+        conn.execute("UPDATE generations SET state = 'live' WHERE name = ?", (name,))
+    if generation['remote_index']:
+        rewrite_wrangler_configs(alias, generation['remote_index'])
+    return previous
+
+
+def gc(conn, alias, keep=1):
+    """Delete retired generations of alias beyond the newest keep (never the previous one)."""
+    previous = conn.execute("SELECT previous FROM aliases WHERE alias = ?", (alias,)).fetchone()
+    protected = {previous[0]} if previous and previous[0] else set()
+    retired = [row for row in conn.execute("""
+        SELECT * FROM generations WHERE alias = ? AND state IN ('retired', 'failed') ORDER BY created_at DESC
+    """, (alias,)) if row['name'] not in protected]
+
+    removed = []
+    for generation in retired[keep:]:
+        if generation['remote_index'] and generation['remote_index'] != alias:
+            vectorize_api.delete_index(generation['remote_index'])
+        if generation['local_db'] and Path(generation['local_db']).exists():
+            Path(generation['local_db']).unlink()
+        ledger = job_ledger.connect()
+        job_ledger.drop_job(ledger, f"build:{generation['name']}")
+        ledger.close()
+        with conn:
+            conn.execute("DELETE FROM generations WHERE name = ?", (generation['name'],))
+        removed.append(generation['name'])
+    return removed
+
+
+def print_status(conn, alias=None):
+    aliases = [alias] if alias else [row[0] for row in conn.execute("SELECT DISTINCT alias FROM generations ORDER BY alias")]
+    for name in aliases:
+        live = conn.execute("SELECT generation, previous FROM aliases WHERE alias = ?", (name,)).fetchone()
+        print(f"🔀 {name} -> {live[0] if live else '(unset)'}"
+              + (f"  (rollback: {live[1]})" if live and live[1] else ""))
+        for generation in conn.execute("SELECT * FROM generations WHERE alias = ? ORDER BY created_at", (name,)):
+            target = ', '.join(filter(None, [generation['remote_index'], generation['local_db']]))
+            vectors = f"{generation['vectors']:,} vectors" if generation['vectors'] is not None else ''
+            print(f"   {generation['name']:<32} {generation['state']:<9} {target}  {vectors}")
+    if not aliases:
+        print("(no generations registered)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Blue/green index generations behind an alias')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('status'); p.add_argument('alias', nargs='?')
+    p = sub.add_parser('adopt'); p.add_argument('alias')
+    p.add_argument('--remote-index'); p.add_argument('--local-db')
+    p = sub.add_parser('create'); p.add_argument('alias')
+    p.add_argument('--stores', default='', help='comma-separated embedding artifacts')
+    p.add_argument('--local-db'); p.add_argument('--dimensions', type=int, default=DIMENSIONS)
+    p.add_argument('--metric', default=METRIC)
+    p = sub.add_parser('build'); p.add_argument('generation'); p.add_argument('--workers', type=int, default=WORKERS)
+    p.add_argument('--rebuild', action='store_true', help='re-upload batches already done')
+    p = sub.add_parser('verify'); p.add_argument('generation'); p.add_argument('--sample', type=int, default=VERIFY_SAMPLE)
+    p = sub.add_parser('flip'); p.add_argument('alias'); p.add_argument('generation')
+    p.add_argument('--force', action='store_true'); p.add_argument('--deploy', action='store_true')
+    p = sub.add_parser('rollback'); p.add_argument('alias'); p.add_argument('--deploy', action='store_true')
+    p = sub.add_parser('gc'); p.add_argument('alias'); p.add_argument('--keep', type=int, default=1)
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.command == 'status':
+        print_status(conn, args.alias)
+    elif args.command == 'adopt':
+        name = adopt(conn, args.alias, args.remote_index, args.local_db)
+        print(f"✅ {args.alias} -> {name} (adopted)")
+    elif args.command == 'create':
+        stores = [s for s in args.stores.split(',') if s]
+        for store_name in stores:
+            if not embedding_store.exists(store_name):
+                print(f"❌ Error: {embedding_store.npy_path(store_name)} not found")
+                sys.exit(1)
+        name = create(conn, args.alias, stores, args.local_db, args.dimensions, args.metric)
+        print(f"✅ Created {name}. Next: python3 index_alias.py build {name}" if stores else
+              f"✅ Created {name}. Populate {args.local_db}, then: python3 index_alias.py verify {name}")
+    elif args.command == 'build':
+        state = build(conn, args.generation, args.workers, args.rebuild)
+        print(f"📤 {args.generation}: {state['done']:,} batches done, {state['failed']:,} failed")
+        if not state['failed']:
+            print(f"   Next: python3 index_alias.py verify {args.generation}")
+    elif args.command == 'verify':
+        problems, report = verify(conn, args.generation, args.sample)
+        print(json.dumps(report, indent=2))
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"✅ {args.generation} verified. Next: python3 index_alias.py flip "
+              f"{get_generation(conn, args.generation)['alias']} {args.generation}")
+    elif args.command in ('flip', 'rollback'):
+        if args.command == 'rollback':
+            row = conn.execute("SELECT previous FROM aliases WHERE alias = ?", (args.alias,)).fetchone()
+            if not row or not row[0]:
+                print(f"❌ {args.alias} has no previous generation")
+                sys.exit(1)
+            target, force = row[0], False
+        else:
+            target, force = args.generation, args.force
+        try:
+            previous = flip(conn, args.alias, target, force)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"🔀 {args.alias}: {previous or '(unset)'} -> {target}")
+        if args.deploy:
+            deploy(args.alias)
+        elif WRANGLER_CONFIGS.get(args.alias):
+            print("   Workers pick it up on the next deploy (or rerun with --deploy)")
+    elif args.command == 'gc':
+        removed = gc(conn, args.alias, args.keep)
+        print(f"🗑️  Removed {', '.join(removed)}" if removed else "Nothing to collect")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
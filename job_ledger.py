@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Crash-safe ledger of per-item work for the embedding and upload jobs.
+
+Every item of a job (usually a chunk id) has its own row:
+
+    pending -> in_flight (leased to one worker until lease_expires)
+            -> done | failed (with the last error)
+
+Workers claim a batch under a lease, renew() it between slow steps, then
+complete() or fail() it (release() hands it back untouched on Ctrl-C). State changes are single WAL transactions, so a crash loses
+at most the in-flight leases, and those are handed out again once they
+expire. Several worker processes can pull from the same job at once, a
+restart resumes exactly where the ledger says, and a failed batch in the
+middle stays visible instead of being skipped by a high-water mark.
+
+    ledger = job_ledger.connect()
+    job_ledger.create_job(ledger, 'vedabase_embeddings', chunk_ids)
+    owner = job_ledger.worker_id()
+    while ids := job_ledger.claim(ledger, 'vedabase_embeddings', owner, 100):
+        ...
+        job_ledger.complete(ledger, 'vedabase_embeddings', owner, ids)
+
+Usage:
+    python3 job_ledger.py status [JOB]
+    python3 job_ledger.py retry JOB        # failed -> pending
+    python3 job_ledger.py drop JOB
+"""
+
+import os
+import socket
+import sys
+import time
+from contextlib import contextmanager
+
+import storage
+
+LEDGER_DB = "job_ledger.db"
+LEASE_SECONDS = 600
+MAX_ATTEMPTS = 3
+
+STATES = ('pending', 'in_flight', 'done', 'failed')
+
+
+def connect(db_path=LEDGER_DB):
+    """Open the ledger (WAL, autocommit; transactions are explicit)."""
+    conn = storage.connect(db_path, bulk=True)
+    conn.isolation_level = None
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        name TEXT PRIMARY KEY,
+        total INTEGER NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS items (
+        job TEXT NOT NULL,
+        item_id NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        owner TEXT,
+        lease_expires REAL,
+        error TEXT,
+        updated_at REAL,
+        PRIMARY KEY (job, item_id)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_claim ON items(job, state, lease_expires)")
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT, so claims never race each other."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def worker_id():
+    """host:pid, unique enough to own leases."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def create_job(conn, job, item_ids, done_ids=()):
+    """Register a job and its items once; returns False if it already exists.
+
+    done_ids are recorded as already done (e.g. migrated from an old
+    progress file). Existing jobs are left untouched, so restarts never
+    rescan the source.
+    """
+    if conn.execute("SELECT 1 FROM jobs WHERE name = ?", (job,)).fetchone():
+        return False
+
+    done_ids = set(done_ids)
+    now = time.time()
+    with transaction(conn):
+        total = storage.executemany_chunked(conn, """
+            INSERT OR IGNORE INTO items (job, item_id, state, updated_at) VALUES (?, ?, ?, ?)
+        """, ((job, item_id, 'done' if item_id in done_ids else 'pending', now) for item_id in item_ids))
+        conn.execute("INSERT INTO jobs (name, total, created_at) VALUES (?, ?, ?)", (job, total, now))
+    return True
+
+
+def claim(conn, job, owner, limit, lease_seconds=LEASE_SECONDS):
+    """Lease up to limit pending (or expired in-flight) items; returns their ids."""
+    now = time.time()
+    with transaction(conn):
+        rows = conn.execute("""
+            UPDATE items
+            SET state = 'in_flight', owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+            WHERE rowid IN (
+                SELECT rowid FROM items
+                WHERE job = ? AND (state = 'pending' OR (state = 'in_flight' AND lease_expires < ?))
+                ORDER BY item_id
+                LIMIT ?
+            )
+            RETURNING item_id
+        """, (owner, now + lease_seconds, now, job, now, limit)).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+def renew(conn, job, owner, item_ids, lease_seconds=LEASE_SECONDS):
+    """Extend the lease on items this owner still holds."""
+    expires = time.time() + lease_seconds
+    with transaction(conn):
+        conn.executemany("""
+            UPDATE items SET lease_expires = ?
+            WHERE job = ? AND item_id = ? AND owner = ? AND state = 'in_flight'
+        """, [(expires, job, item_id, owner) for item_id in item_ids])
+
+
+def complete(conn, job, owner, item_ids):
+    """Mark leased items done."""
+    now = time.time()
+    with transaction(conn):
+        conn.executemany("""
+            UPDATE items SET state = 'done', owner = NULL, lease_expires = NULL, error = NULL, updated_at = ?
+            WHERE job = ? AND item_id = ? AND owner = ? AND state = 'in_flight'
+        """, [(now, job, item_id, owner) for item_id in item_ids])
+
+
+def fail(conn, job, owner, item_ids, error, max_attempts=MAX_ATTEMPTS):
+    """Release leased items after an error; they go back to pending until
+    they have been tried max_attempts times, then stay failed."""
+    now = time.time()
+    with transaction(conn):
+        conn.executemany("""
+            UPDATE items
+            SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                owner = NULL, lease_expires = NULL, error = ?, updated_at = ?
+            WHERE job = ? AND item_id = ? AND owner = ? AND state = 'in_flight'
+        """, [(max_attempts, str(error)[:1000], now, job, item_id, owner) for item_id in item_ids])
+
+
+def release(conn, job, owner, item_ids=None):
+    """Hand leased items (default: all this owner holds) back to pending at
+    once, without counting the attempt, e.g. on Ctrl-C."""
+    now = time.time()
+    sql = """
+        UPDATE items
+        SET state = 'pending', owner = NULL, lease_expires = NULL, attempts = MAX(attempts - 1, 0), updated_at = ?
+        WHERE job = ? AND owner = ? AND state = 'in_flight'
+    """
+    with transaction(conn):
+        if item_ids is None:
+            return conn.execute(sql, (now, job, owner)).rowcount
+        return sum(conn.execute(sql + " AND item_id = ?", (now, job, owner, item_id)).rowcount
+                   for item_id in item_ids)
+
+
+def retry_failed(conn, job):
+    """Put every failed item of a job back to pending; returns the count."""
+    with transaction(conn):
+        return conn.execute("""
+            UPDATE items SET state = 'pending', attempts = 0, updated_at = ?
+            WHERE job = ? AND state = 'failed'
+        """, (time.time(), job)).rowcount
+
+
+def counts(conn, job):
+    """{state: count} for a job (every state present, zeros included)."""
+    result = dict.fromkeys(STATES, 0)
+    result.update(conn.execute(
+        "SELECT state, COUNT(*) FROM items WHERE job = ? GROUP BY state", (job,)).fetchall())
+    return result
+
+
+def failures(conn, job, limit=10):
+    return conn.execute("""
+        SELECT item_id, attempts, error FROM items
+        WHERE job = ? AND state = 'failed' ORDER BY item_id LIMIT ?
+    """, (job, limit)).fetchall()
+
+
+def drop_if_done(conn, job):
+    """Drop a job whose items are all done, so the same name can run again
+    (a repeated delete or patch); returns True if it was dropped."""
+    state = counts(conn, job)
+    if not state['done'] or state['done'] != sum(state.values()):
+        return False
+    drop_job(conn, job)
+    return True
+
+
+def drop_job(conn, job):
+    with transaction(conn):
+        conn.execute("DELETE FROM items WHERE job = ?", (job,))
+        conn.execute("DELETE FROM jobs WHERE name = ?", (job,))
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('status', 'retry', 'drop'):
+        print(__doc__)
+        sys.exit(1)
+
+    conn = connect()
+    command = sys.argv[1]
+    job = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if command == 'status':
+        jobs = [job] if job else [row[0] for row in conn.execute("SELECT name FROM jobs ORDER BY name")]
+        for name in jobs:
+            state = counts(conn, name)
+            total = sum(state.values())
+            print(f"📋 {name}: {state['done']:,}/{total:,} done, {state['in_flight']:,} in flight, "
+                  f"{state['pending']:,} pending, {state['failed']:,} failed")
+            for item_id, attempts, error in failures(conn, name):
+                print(f"   ✗ {item_id} ({attempts} attempts): {error[:100] if error else ''}")
+        if not jobs:
+            print("(no jobs in the ledger)")
+    elif job is None:
+        print(f"Usage: python3 job_ledger.py {command} JOB")
+        sys.exit(1)
+    elif command == 'retry':
+        print(f"🔁 {retry_failed(conn, job):,} failed items of {job} back to pending")
+    else:
+        drop_job(conn, job)
+        print(f"🗑️  Dropped {job}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
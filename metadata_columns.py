@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Columnar metadata aligned with a vector matrix, and filter expressions
+compiled to boolean masks.
+
+Each column has one entry per vector row. Text columns are dictionary
+encoded (int32 codes plus a sorted vocabulary), so a comparison is
+resolved against the small vocabulary once and then becomes an integer
+test over the codes. Numeric columns are int32 arrays, with MISSING
+meaning "no value".
+
+Filters are Python-syntax boolean expressions, parsed with ast (never
+eval'd) and compiled to one NumPy mask before any vector is scored:
+
+    book == 'letters' and 1968 <= year <= 1970 and contains(recipient, 'brahmananda')
+    chunk_type in ('verse_text', 'purport_paragraph') and not canto == 10
+    section_type != 'opening' or tradition == 'Zen Buddhism'
+
+Supported: and / or / not, == != < <= > >= (chained too), in / not in
+over tuples or lists of constants, and contains(column, 'text') for a
+case-insensitive substring match on a text column.
+"""
+
+import ast
+from functools import lru_cache
+
+import numpy as np
+
+MISSING = -1
+
+
+class FilterError(ValueError):
+    pass
+
+
+class MetadataColumns:
+    """Named columns of length n, aligned with the rows of a vector matrix."""
+
+    def __init__(self, n):
+        self.n = n
+        self.codes = {}         # text column -> int32 codes
+        self.vocab = {}         # text column -> sorted list of values
+        self.numbers = {}       # numeric column -> int32 values
+        self._compiled = lru_cache(maxsize=256)(self._compile)
+
+    def add_text(self, name, values):
+        vocab, codes = np.unique(np.asarray([value or '' for value in values], dtype=object).astype(str),
+                                 return_inverse=True)
+        self.vocab[name] = list(vocab)
+        self.codes[name] = codes.astype(np.int32)
+
+    def add_number(self, name, values):
+        self.numbers[name] = np.asarray([MISSING if value is None else value for value in values], dtype=np.int32)
+
+    def names(self):
+        return sorted(self.codes) + sorted(self.numbers)
+
+    def take(self, rows):
+        """Columns for a row selection / reordering (e.g. after sorting the matrix)."""
+        taken = MetadataColumns(len(rows))
+        for name, codes in self.codes.items():
+            taken.codes[name] = codes[rows]
+            taken.vocab[name] = self.vocab[name]
+        for name, values in self.numbers.items():
+            taken.numbers[name] = values[rows]
+        return taken
+
+    def value(self, name, row):
+        if name in self.codes:
+            return self.vocab[name][self.codes[name][row]]
+        value = int(self.numbers[name][row])
+        return None if value == MISSING else value
+
+    def mask(self, expression):
+        """Boolean row mask for a filter expression (None or '' selects everything)."""
+        if not expression:
+            return np.ones(self.n, dtype=bool)
+        return self._compiled(expression)
+
+    # --- compiler -------------------------------------------------------
+
+    def _compile(self, expression):
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise FilterError(f"Invalid filter {expression!r}: {e.msg}")
+        mask = self._node(tree.body)
+        mask.setflags(write=False)
+        return mask
+
+    def _node(self, node):
+        if isinstance(node, ast.BoolOp):
+            masks = [self._node(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return combine.reduce(masks)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self._node(node.operand)
+        if isinstance(node, ast.Compare):
+            masks, left = [], node.left
+            for op, right in zip(node.ops, node.comparators):
+                masks.append(self._compare(left, op, right))
+                left = right
+            return np.logical_and.reduce(masks)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'contains':
+            if len(node.args) != 2:
+                raise FilterError("contains() takes a column and a string")
+            column, text = self._column(node.args[0]), self._constant(node.args[1])
+            if column not in self.codes:
+                raise FilterError(f"contains() needs a text column, not {column}")
+            wanted = [code for code, value in enumerate(self.vocab[column]) if str(text).lower() in value.lower()]
+            return np.isin(self.codes[column], wanted)
+        raise FilterError(f"Unsupported filter syntax: {ast.dump(node)[:80]}")
+
+    def _column(self, node):
+        if not isinstance(node, ast.Name):
+            raise FilterError(f"Expected a column name, got {ast.dump(node)[:60]}")
+        if node.id not in self.codes and node.id not in self.numbers:
+            raise FilterError(f"Unknown column {node.id!r} (columns: {', '.join(self.names())})")
+        return node.id
+
+    def _constant(self, node):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+            return [self._constant(element) for element in node.elts]
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+            if isinstance(node.operand.value, bool) or not isinstance(node.operand.value, (int, float)):
+                raise FilterError(f"Cannot negate {node.operand.value!r}")
+            return -node.operand.value
+        raise FilterError(f"Expected a constant, got {ast.dump(node)[:60]}")
+
+    def _compare(self, left, op, right):
+        # Allow both "year >= 1968" and "1968 <= year"
+        if not isinstance(left, ast.Name) and isinstance(right, ast.Name):
+            flipped = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE,
+                       ast.Eq: ast.Eq, ast.NotEq: ast.NotEq}
+            if type(op) not in flipped:
+                raise FilterError("'in' needs the column on the left")
+            left, op, right = right, flipped[type(op)](), left
+        column, value = self._column(left), self._constant(right)
+
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if not isinstance(value, list):
+                raise FilterError(f"'in' needs a list or tuple, got {value!r}")
+            mask = (np.isin(self.codes[column], [self._code(column, v) for v in value]) if column in self.codes
+                    else np.isin(self.numbers[column], [self._number(column, v) for v in value]))
+            return ~mask if isinstance(op, ast.NotIn) else mask
+
+        if column in self.codes:
+            if not isinstance(op, (ast.Eq, ast.NotEq)):
+                raise FilterError(f"{column} is a text column: use ==, !=, in or contains()")
+            mask = self.codes[column] == self._code(column, value)
+            return ~mask if isinstance(op, ast.NotEq) else mask
+
+        values = self.numbers[column]
+        compare = {ast.Eq: np.equal, ast.NotEq: np.not_equal, ast.Lt: np.less, ast.LtE: np.less_equal,
+                   ast.Gt: np.greater, ast.GtE: np.greater_equal}[type(op)]
+        mask = compare(values, self._number(column, value))
+        # Rows without a value never satisfy a comparison, except !=
+        return mask if isinstance(op, ast.NotEq) else mask & (values != MISSING)
+
+    def _number(self, column, value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise FilterError(f"{column} is a numeric column: compare it to a number, not {value!r}")
+        return value
+
+    def _code(self, column, value):
+        """Vocabulary code of value, or -1 (matches no row)."""
+        vocab = self.vocab[column]
+        position = np.searchsorted(vocab, str(value))
+        return int(position) if position < len(vocab) and vocab[position] == str(value) else -1
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Live metrics for the ingest, embedding and upload jobs.
+
+Pipeline scripts record what they are doing through a Job:
+
+    job = metrics.Job('vedabase_embeddings', total=total_chunks)
+    with job.timed('openai'):
+        embeddings = generate_embeddings(client, texts)
+    job.advance(len(chunks), nbytes=payload_size)
+    job.retry(); job.rate_limited(); job.queue_depth('pending', len(queue))
+    job.finish()
+
+Each process keeps its counters in memory and writes a snapshot to a
+shared SQLite file (METRICS_DB) at most once per FLUSH_SECONDS, one row
+per (job, worker), so several jobs, and several workers of one job, can
+run at once and one reader sees all of them. The dashboard and the
+Prometheus endpoint sum a job's workers (aggregate()). Rates and ETAs
+come from the job's real total and the last RATE_WINDOW seconds of
+progress. A 'running' row whose process is gone shows as 'dead'.
+
+Usage:
+    python3 metrics.py watch [JOB]     # live terminal dashboard
+    python3 metrics.py serve [PORT]    # Prometheus text on /metrics
+    python3 metrics.py clear           # forget finished and dead workers
+"""
+
+import atexit
+import bisect
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_DB = "pipeline_metrics.db"
+FLUSH_SECONDS = 1.0
+RATE_WINDOW = 60.0           # seconds of history used for items/sec and ETA
+STALE_SECONDS = 120          # a running job silent this long is shown as stalled
+DEFAULT_PORT = 9108
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def connect(db_path=METRICS_DB):
+    conn = sqlite3.connect(db_path, timeout=10)
+    conn.execute("PRAGMA journal_mode = WAL")
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+    if columns and 'worker' not in columns:
+        # One row per job name (before workers were tracked): a live snapshot, safe to drop
+        conn.execute("DROP TABLE jobs")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        name TEXT NOT NULL,
+        worker TEXT NOT NULL,
+        pid INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (name, worker)
+    )
+    """)
+    return conn
+
+
+def worker_id():
+    """host:pid of this process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_alive(worker, pid):
+    """False only when worker ran on this host and its pid is gone."""
+    if worker.rpartition(':')[0] != socket.gethostname():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Job:
+    """In-process metrics for one pipeline job; thread-safe."""
+
+    def __init__(self, name, total=None, done=0, db_path=METRICS_DB, worker=None):
+        """done: items already finished by an earlier (resumed) run.
+        worker: this process's row within the job (default host:pid)."""
+        self.name = name
+        self.worker = worker or worker_id()
+        self.db_path = db_path
+        self.started_at = time.time()
+        self.status = 'running'
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._state = {
+            'total': total,
+            'done': done,        # items finished before this worker started
+            'items': done,
+            'bytes': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'errors': 0,
+            'queues': {},
+            'latency': {},       # api -> {'buckets': [...], 'sum': s, 'count': n}
+            'samples': [],       # [(time, items, bytes)] over RATE_WINDOW
+        }
+        self.flush(force=True)
+        atexit.register(self._at_exit)
+
+    def set_total(self, total):
+        with self._lock:
+            self._state['total'] = total
+        self.flush()
+
+    def advance(self, items=1, nbytes=0):
+        """Record finished work items (and the bytes they carried)."""
+        with self._lock:
+            self._state['items'] += items
+            self._state['bytes'] += nbytes
+        self.flush()
+
+    def observe(self, api, seconds):
+        """Add one request latency to the api's histogram."""
+        with self._lock:
+            hist = self._state['latency'].setdefault(
+                api, {'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'sum': 0.0, 'count': 0})
+            hist['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            hist['sum'] += seconds
+            hist['count'] += 1
+        self.flush()
+
+    @contextmanager
+    def timed(self, api):
+        """Time a block as one call to api."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(api, time.perf_counter() - start)
+
+    def retry(self, count=1):
+        self._bump('retries', count)
+
+    def rate_limited(self, count=1):
+        """A 429/503 style throttling response."""
+        self._bump('rate_limited', count)
+
+    def error(self, count=1):
+        self._bump('errors', count)
+
+    def queue_depth(self, queue, depth):
+        with self._lock:
+            self._state['queues'][queue] = depth
+        self.flush()
+
+    def finish(self, status='done'):
+        self.status = status
+        self.flush(force=True)
+
+    def _bump(self, key, count):
+        with self._lock:
+            self._state[key] += count
+        self.flush()
+
+    def _at_exit(self):
+        if self.status == 'running':
+            self.finish('exited')
+
+    def flush(self, force=False):
+        """Write a snapshot to METRICS_DB (rate-limited unless forced)."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_flush < FLUSH_SECONDS:
+                return
+            self._last_flush = now
+            samples = self._state['samples']
+            samples.append((now, self._state['items'], self._state['bytes']))
+            while len(samples) > 2 and samples[1][0] < now - RATE_WINDOW:
+                samples.pop(0)
+            state = json.dumps(self._state)
+
+        conn = connect(self.db_path)
+        try:
+            conn.execute("""
+                INSERT INTO jobs (name, worker, pid, status, started_at, updated_at, state)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name, worker) DO UPDATE SET
+                    pid = excluded.pid, status = excluded.status, started_at = excluded.started_at,
+                    updated_at = excluded.updated_at, state = excluded.state
+            """, (self.name, self.worker, os.getpid(), self.status, self.started_at, now, state))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def load_jobs(db_path=METRICS_DB, name=None):
+    """Per-worker snapshots of every job (or one), with derived rates and ETA."""
+    if not os.path.exists(db_path):
+        return []
+    conn = connect(db_path)
+    sql = "SELECT name, worker, pid, status, started_at, updated_at, state FROM jobs"
+    rows = (conn.execute(sql + " WHERE name = ? ORDER BY worker", (name,)) if name
+            else conn.execute(sql + " ORDER BY name, worker"))
+    jobs = []
+    now = time.time()
+    for job_name, worker, pid, status, started_at, updated_at, state in rows.fetchall():
+        job = json.loads(state)
+        job.setdefault('done', 0)
+        job.update(name=job_name, worker=worker, pid=pid, status=status, started_at=started_at,
+                   updated_at=updated_at)
+
+        first, last = job['samples'][0], job['samples'][-1]
+        span = last[0] - first[0]
+        job['items_per_sec'] = (last[1] - first[1]) / span if span > 0 else 0.0
+        job['bytes_per_sec'] = (last[2] - first[2]) / span if span > 0 else 0.0
+        remaining = (job['total'] or 0) - job['items']
+        job['eta_seconds'] = (remaining / job['items_per_sec']
+                              if job['total'] and job['items_per_sec'] > 0 and status == 'running' else None)
+        if status == 'running' and not is_alive(worker, pid):
+            job['status'] = 'dead'
+        elif status == 'running' and now - updated_at > STALE_SECONDS:
+            job['status'] = 'stalled'
+        jobs.append(job)
+    conn.close()
+    return jobs
+
+
+def current_run(workers):
+    """The workers of a job's latest run: those still running (or stalled)
+    and any that were still reporting after the latest run began. Rows
+    left by earlier, finished runs of the same name are dropped."""
+    active = [job for job in workers if job['status'] in ('running', 'stalled')]
+    began = (min(job['started_at'] for job in active) if active
+             else max(job['started_at'] for job in workers))
+    return [job for job in workers if job in active or job['updated_at'] >= began]
+
+
+def aggregate(jobs):
+    """Fold per-worker snapshots (load_jobs) into one snapshot per job name.
+
+    Only the latest run counts (current_run()). Counters, rates and
+    histograms are summed. Items are the earliest worker's starting point
+    plus everything each worker has advanced since, so a resumed job is
+    not counted once per worker, and never exceed the total.
+    """
+    by_name = {}
+    for job in jobs:
+        by_name.setdefault(job['name'], []).append(job)
+
+    merged = []
+    for name, workers in by_name.items():
+        workers = current_run(workers)
+        running = [job for job in workers if job['status'] == 'running']
+        first = min(workers, key=lambda job: job['started_at'])
+        latency = {}
+        for job in workers:
+            for api, hist in job['latency'].items():
+                total = latency.setdefault(api, {'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'sum': 0.0, 'count': 0})
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], hist['buckets'])]
+                total['sum'] += hist['sum']
+                total['count'] += hist['count']
+        queues = {}
+        for job in workers:
+            for queue, depth in job['queues'].items():
+                queues[queue] = queues.get(queue, 0) + depth
+        totals = [job['total'] for job in workers if job['total'] is not None]
+
+        job = {
+            'name': name,
+            'workers': len(workers),
+            'running_workers': len(running),
+            'pids': [job['pid'] for job in workers],
+            'total': max(totals) if totals else None,
+            'items': max(first['done'] + sum(job['items'] - job['done'] for job in workers),
+                         max(job['items'] for job in workers)),
+            'queues': queues,
+            'latency': latency,
+            'started_at': first['started_at'],
+            'updated_at': max(job['updated_at'] for job in workers),
+            'items_per_sec': sum(job['items_per_sec'] for job in running),
+            'bytes_per_sec': sum(job['bytes_per_sec'] for job in running),
+        }
+        if job['total'] is not None:
+            job['items'] = min(job['items'], job['total'])
+        for key in ('bytes', 'retries', 'rate_limited', 'errors'):
+            job[key] = sum(worker[key] for worker in workers)
+        if running:
+            job['status'] = 'running'
+        else:
+            statuses = {worker['status'] for worker in workers}
+            job['status'] = next((status for status in ('stalled', 'dead', 'failed') if status in statuses),
+                                 max(workers, key=lambda worker: worker['updated_at'])['status'])
+        remaining = (job['total'] or 0) - job['items']
+        job['eta_seconds'] = (remaining / job['items_per_sec']
+                              if job['total'] and job['items_per_sec'] > 0 and running else None)
+        merged.append(job)
+    return merged
+
+
+def latency_quantile(hist, q):
+    """Approximate quantile (upper bucket bound) of a latency histogram."""
+    if not hist['count']:
+        return None
+    target = q * hist['count']
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), hist['buckets']):
+        seen += count
+        if seen >= target:
+            return bound
+    return float('inf')
+
+
+def prometheus_text(jobs):
+    """Render job snapshots (load_jobs) in the Prometheus text exposition
+    format, one series per job with its workers summed."""
+    jobs = aggregate(jobs)
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP pipeline_{name} {help_text}")
+        lines.append(f"# TYPE pipeline_{name} {kind}")
+        for labels, value in samples:
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"pipeline_{name}{{{label_text}}} {value}")
+
+    def per_job(key):
+        return [({'pipeline': job['name']}, job[key]) for job in jobs if job[key] is not None]
+
+    metric('items_total', 'counter', 'Work items completed', per_job('items'))
+    metric('bytes_total', 'counter', 'Payload bytes processed', per_job('bytes'))
+    metric('items_target', 'gauge', 'Total work items for the job', per_job('total'))
+    metric('items_per_second', 'gauge', f'Items/sec over the last {RATE_WINDOW:.0f}s', per_job('items_per_sec'))
+    metric('bytes_per_second', 'gauge', f'Bytes/sec over the last {RATE_WINDOW:.0f}s', per_job('bytes_per_sec'))
+    metric('eta_seconds', 'gauge', 'Estimated seconds to completion', per_job('eta_seconds'))
+    metric('retries_total', 'counter', 'Retried requests', per_job('retries'))
+    metric('rate_limited_total', 'counter', 'Throttled (429/503) responses', per_job('rate_limited'))
+    metric('errors_total', 'counter', 'Failed work items', per_job('errors'))
+    metric('running', 'gauge', '1 while the job is running',
+           [({'pipeline': job['name']}, int(job['status'] == 'running')) for job in jobs])
+    metric('workers', 'gauge', 'Worker processes reporting for the job', per_job('running_workers'))
+    metric('last_update_timestamp_seconds', 'gauge', 'Last snapshot time', per_job('updated_at'))
+    metric('queue_depth', 'gauge', 'Items waiting in a job queue',
+           [({'pipeline': job['name'], 'queue': queue}, depth)
+            for job in jobs for queue, depth in job['queues'].items()])
+
+    lines.append("# HELP pipeline_api_latency_seconds External API call latency")
+    lines.append("# TYPE pipeline_api_latency_seconds histogram")
+    for job in jobs:
+        for api, hist in job['latency'].items():
+            labels = f'pipeline="{job["name"]}",api="{api}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), hist['buckets']):
+                cumulative += count
+                lines.append(f'pipeline_api_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'pipeline_api_latency_seconds_sum{{{labels}}} {hist["sum"]}')
+            lines.append(f'pipeline_api_latency_seconds_count{{{labels}}} {hist["count"]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port=DEFAULT_PORT, db_path=METRICS_DB):
+    """Serve /metrics for every job in db_path until interrupted."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ('', '/metrics'):
+                self.send_error(404)
+                return
+            body = prometheus_text(load_jobs(db_path)).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    print(f"📈 Serving pipeline metrics on http://127.0.0.1:{port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return '-'
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+def render_dashboard(jobs):
+    """One text frame: a row per job (workers summed, see aggregate()),
+    slowest running job flagged."""
+    running = [job for job in jobs if job['status'] == 'running' and job['eta_seconds'] is not None]
+    slowest = max(running, key=lambda job: job['eta_seconds'])['name'] if len(running) > 1 else None
+
+    lines = [
+        f"PIPELINE METRICS  {time.strftime('%H:%M:%S')}",
+        "=" * 118,
+        f"{'job':<28} {'status':<8} {'progress':>22} {'items/s':>8} {'MB/s':>6} "
+        f"{'p50':>6} {'p95':>6} {'retry':>5} {'429':>5} {'err':>4} {'ETA':>8}",
+        "-" * 118,
+    ]
+    for job in jobs:
+        if job['total']:
+            progress = f"{job['items']:,}/{job['total']:,} {job['items'] * 100 / job['total']:5.1f}%"
+        else:
+            progress = f"{job['items']:,}"
+        calls = {'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'count': 0}
+        for hist in job['latency'].values():
+            calls['buckets'] = [a + b for a, b in zip(calls['buckets'], hist['buckets'])]
+            calls['count'] += hist['count']
+        p50, p95 = latency_quantile(calls, 0.5), latency_quantile(calls, 0.95)
+        flag = ' 🐢' if job['name'] == slowest else ''
+        label = job['name'] if job['workers'] == 1 else f"{job['name']} ×{job['workers']}"
+        lines.append(
+            f"{label[:28]:<28} {job['status']:<8} {progress:>22} {job['items_per_sec']:>8.1f} "
+            f"{job['bytes_per_sec'] / (1024 * 1024):>6.2f} "
+            f"{'-' if p50 is None else f'{p50}s':>6} {'-' if p95 is None else f'{p95}s':>6} "
+            f"{job['retries']:>5} {job['rate_limited']:>5} {job['errors']:>4} "
+            f"{format_duration(job['eta_seconds']):>8}{flag}"
+        )
+        for queue, depth in job['queues'].items():
+            lines.append(f"{'':<28}   queue {queue}: {depth:,}")
+    if not jobs:
+        lines.append("(no jobs have reported yet)")
+    return '\n'.join(lines)
+
+
+def watch(name=None, interval=2.0, db_path=METRICS_DB, until_done=False):
+    """Redraw the dashboard every interval seconds; returns the last
+    (aggregated) snapshots when until_done and every job has stopped."""
+    try:
+        while True:
+            jobs = aggregate(load_jobs(db_path, name))
+            print("\033[2J\033[H" + render_dashboard(jobs), flush=True)
+            if until_done and jobs and all(job['status'] != 'running' for job in jobs):
+                return jobs
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'watch'
+    if command == 'watch':
+        watch(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command == 'serve':
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT)
+    elif command == 'clear':
+        conn = connect()
+        gone = [(name, worker) for name, worker, pid, status in
+                conn.execute("SELECT name, worker, pid, status FROM jobs")
+                if status != 'running' or not is_alive(worker, pid)]
+        conn.executemany("DELETE FROM jobs WHERE name = ? AND worker = ?", gone)
+        conn.commit()
+        conn.close()
+        print(f"🗑️  Cleared {len(gone)} finished or dead workers")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
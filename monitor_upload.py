@@ -1,62 +1,38 @@
 #!/usr/bin/env python3
-"""Monitor upload progress and notify when complete"""
+"""Monitor upload progress (upload_vedabase_to_remote.py) and verify when complete"""
+import os
+import re
 import subprocess
-import time
-import sys
 
-print("Monitoring upload progress...")
-print("=" * 60)
+import metrics
 
-last_batch = 0
-while True:
-    # Check if upload process is running
-    result = subprocess.run(
-        ['ps', 'aux'],
-        capture_output=True,
-        text=True
-    )
+JOB_NAME = "vedabase_d1_upload"
 
-    if 'temp_batch' in result.stdout and '.sql' in result.stdout:
-        # Extract batch number
-        for line in result.stdout.split('\n'):
-            if 'temp_batch' in line and '.sql' in line:
-                import re
-                match = re.search(r'temp_batch_(\d+)\.sql', line)
-                if match:
-                    batch = int(match.group(1))
-                    if batch != last_batch:
-                        progress = (batch / 170) * 100
-                        print(f"[{time.strftime('%H:%M:%S')}] Batch {batch}/170 ({progress:.1f}%)")
-                        last_batch = batch
-                break
-        time.sleep(10)
-    else:
-        print("\n" + "=" * 60)
-        print("Upload process completed!")
-        print("=" * 60)
+jobs = metrics.watch(JOB_NAME, interval=5, until_done=True)
+expected = jobs[0]['total'] if jobs else None
 
-        # Verify count
-        print("\nVerifying upload...")
-        result = subprocess.run(
-            ['npx', 'wrangler', 'd1', 'execute', 'philosophy-db', '--remote',
-             '--command', 'SELECT COUNT(*) FROM vedabase_verses'],
-            capture_output=True,
-            text=True,
-            env={**subprocess.os.environ, 'CLOUDFLARE_API_TOKEN': ''}
-        )
+print("\n" + "=" * 60)
+print("Upload process completed!")
+print("=" * 60)
 
-        if 'COUNT(*)' in result.stdout:
-            import re
-            match = re.search(r'"COUNT\(\*\)":\s*(\d+)', result.stdout)
-            if match:
-                count = int(match.group(1))
-                print(f"✓ Total verses in remote D1: {count:,}")
+# Verify count
+print("\nVerifying upload...")
+result = subprocess.run(
+    ['npx', 'wrangler', 'd1', 'execute', 'philosophy-db', '--remote',
+     '--command', 'SELECT COUNT(*) FROM vedabase_verses'],
+    capture_output=True,
+    text=True,
+    env={**os.environ, 'CLOUDFLARE_API_TOKEN': ''}
+)
 
-                if count == 8481:
-                    print("✓ All verses uploaded successfully!")
-                elif count > 0:
-                    print(f"⚠ Partial upload: {count}/8,481 verses")
-                else:
-                    print("✗ No verses found in remote database")
+match = re.search(r'"COUNT\(\*\)":\s*(\d+)', result.stdout)
+if match:
+    count = int(match.group(1))
+    print(f"✓ Total verses in remote D1: {count:,}")
 
-        break
+    if expected and count >= expected:
+        print("✓ All verses uploaded successfully!")
+    elif count > 0:
+        print(f"⚠ Partial upload: {count:,}/{expected or 0:,} verses")
+    else:
+        print("✗ No verses found in remote database")
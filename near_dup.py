@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+MinHash/LSH near-duplicate clustering for the text corpora.
+
+Purport paragraphs, lecture segments and responses repeat heavily, and
+every copy used to be embedded and uploaded as its own vector. build()
+signs each text with a MinHash over word shingles, finds candidates with
+LSH banding, and assigns every item to a cluster whose representative is
+the lowest id it matches at >= THRESHOLD estimated Jaccard similarity:
+
+    member_id -> representative_id (similarity)
+
+Ingest embeds representatives only (duplicate_ids() lists the rest), and
+retrieval uses collapse()/expand() to fold copies out of top-k or list
+them next to their representative. Signatures are cached per item and
+text hash, so rebuilding after an import only signs the new texts.
+Representatives are the lowest id in their cluster, so appending items
+never demotes an already embedded representative.
+
+Clusters are stored under corpus_key(corpus, source_db): the corpus name
+for its default database, 'corpus@/abs/path' for any other, so building
+the responses of a second database never replaces the first one's
+clusters. The lookups below take that key.
+
+Usage:
+    python3 near_dup.py build vedabase_chunks [--db PATH] [--threshold 0.8]
+    python3 near_dup.py build responses --db philosophical_traditions.db
+    python3 near_dup.py stats [CORPUS [--db PATH]]
+    python3 near_dup.py show CORPUS ID [--db PATH]
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+import storage
+
+DEDUP_DB = "near_duplicates.db"
+
+NUM_PERM = 128
+BANDS = 16              # 16 bands x 8 rows: candidates from ~0.7 Jaccard up
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+THRESHOLD = 0.8
+SEED = 1
+PRIME = (1 << 31) - 1
+
+# Corpus name -> (default source database, SELECT id, text ... ORDER BY id)
+CORPORA = {
+    'vedabase_chunks': (storage.LOCAL_DB, "SELECT id, content FROM vedabase_chunks ORDER BY id"),
+    'responses': ('philosophical_traditions.db', "SELECT id, full_text FROM responses ORDER BY id"),
+}
+
+WORD_RE = re.compile(r'\w+')
+
+_rng = np.random.RandomState(SEED)
+PERM_A = _rng.randint(1, PRIME, NUM_PERM).astype(np.uint64)
+PERM_B = _rng.randint(0, PRIME, NUM_PERM).astype(np.uint64)
+
+
+def connect(db_path=DEDUP_DB):
+    """Open the duplicate map, creating it on first use."""
+    conn = storage.connect(db_path, bulk=True)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS signatures (
+        corpus TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        text_sha TEXT NOT NULL,
+        signature BLOB NOT NULL,
+        PRIMARY KEY (corpus, item_id)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS clusters (
+        corpus TEXT NOT NULL,
+        member_id INTEGER NOT NULL,
+        representative_id INTEGER NOT NULL,
+        similarity REAL NOT NULL,
+        PRIMARY KEY (corpus, member_id)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_clusters_rep ON clusters(corpus, representative_id)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS corpora (
+        name TEXT PRIMARY KEY,
+        threshold REAL NOT NULL,
+        items INTEGER NOT NULL,
+        clusters INTEGER NOT NULL,
+        built_at REAL NOT NULL
+    )
+    """)
+    return conn
+
+
+def corpus_key(corpus, source_db=None):
+    """Storage key of corpus as read from source_db (default: its own database)."""
+    default_db = CORPORA[corpus][0]
+    if not source_db or os.path.abspath(source_db) == os.path.abspath(default_db):
+        return corpus
+    return f"{corpus}@{os.path.abspath(source_db)}"
+
+
+def shingles(text):
+    """crc32 hashes of the lowercased word SHINGLE_WORDS-grams of text."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        grams = [' '.join(words)]
+    else:
+        grams = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return np.fromiter({zlib.crc32(gram.encode('utf-8')) % PRIME for gram in grams}, dtype=np.uint64)
+
+
+def minhash(text):
+    """NUM_PERM-value MinHash signature (uint32) of text."""
+    hashes = shingles(text)
+    return ((PERM_A[:, None] * hashes[None, :] + PERM_B[:, None]) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(sig_a == sig_b)) / NUM_PERM
+
+
+def cluster(items, threshold=THRESHOLD):
+    """Assign (item_id, signature) pairs, in id order, to clusters.
+
+    Returns {member_id: (representative_id, similarity)}. Only
+    representatives go into the LSH buckets, and a new item joins the
+    most similar representative that shares a band with it, so every
+    member is near-identical to its representative (no chaining).
+    """
+    assignment = {}
+    buckets = [defaultdict(list) for _ in range(BANDS)]
+    rep_signatures = {}
+
+    for item_id, sig in items:
+        keys = [sig[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+        candidates = {rep for band, key in enumerate(keys) for rep in buckets[band].get(key, ())}
+
+        best, best_sim = None, threshold
+        for rep in sorted(candidates):
+            sim = similarity(rep_signatures[rep], sig)
+            if sim > best_sim or (best is None and sim >= best_sim):
+                best, best_sim = rep, sim
+
+        if best is None:
+            assignment[item_id] = (item_id, 1.0)
+            rep_signatures[item_id] = sig
+            for band, key in enumerate(keys):
+                buckets[band][key].append(item_id)
+        else:
+            assignment[item_id] = (best, best_sim)
+
+    return assignment
+
+
+def _text_sha(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def build(corpus, source_db=None, threshold=THRESHOLD, db_path=DEDUP_DB):
+    """Sign new or changed texts of corpus and recompute its clusters.
+
+    Signatures and clusters are stored under corpus_key(corpus, source_db).
+    Returns {'items', 'clusters', 'duplicates', 'signed', 'seconds'}.
+    """
+    default_db, sql = CORPORA[corpus]
+    started = time.time()
+    source = storage.read_connection(source_db or default_db)
+    corpus = corpus_key(corpus, source_db)
+    conn = connect(db_path)
+
+    cached = {item_id: (sha, blob) for item_id, sha, blob in conn.execute(
+        "SELECT item_id, text_sha, signature FROM signatures WHERE corpus = ?", (corpus,))}
+
+    items, fresh = [], []
+    for item_id, text in source.execute(sql):
+        sha = _text_sha(text or '')
+        entry = cached.pop(item_id, None)
+        if entry and entry[0] == sha:
+            sig = np.frombuffer(entry[1], dtype=np.uint32)
+        else:
+            sig = minhash(text or '')
+            fresh.append((corpus, item_id, sha, sig.tobytes()))
+        items.append((item_id, sig))
+
+    assignment = cluster(items, threshold)
+    representatives = sum(1 for member, (rep, _) in assignment.items() if member == rep)
+
+    with conn:
+        storage.executemany_chunked(conn, """
+            INSERT OR REPLACE INTO signatures (corpus, item_id, text_sha, signature) VALUES (?, ?, ?, ?)
+        """, fresh)
+        # Items gone from the source
+        storage.executemany_chunked(conn, "DELETE FROM signatures WHERE corpus = ? AND item_id = ?",
+                                    ((corpus, item_id) for item_id in cached))
+        conn.execute("DELETE FROM clusters WHERE corpus = ?", (corpus,))
+        storage.executemany_chunked(conn, """
+            INSERT INTO clusters (corpus, member_id, representative_id, similarity) VALUES (?, ?, ?, ?)
+        """, ((corpus, member, rep, sim) for member, (rep, sim) in assignment.items()))
+        conn.execute("INSERT OR REPLACE INTO corpora VALUES (?, ?, ?, ?, ?)",
+                     (corpus, threshold, len(assignment), representatives, time.time()))
+    conn.close()
+
+    return {
+        'items': len(assignment),
+        'clusters': representatives,
+        'duplicates': len(assignment) - representatives,
+        'signed': len(fresh),
+        'seconds': time.time() - started,
+    }
+
+
+def duplicate_ids(conn, corpus):
+    """Ids that are not their cluster's representative (skip when embedding)."""
+    return {row[0] for row in conn.execute(
+        "SELECT member_id FROM clusters WHERE corpus = ? AND member_id != representative_id", (corpus,))}
+
+
+def representatives(conn, corpus, item_ids):
+    """{item_id: representative_id} for the given ids (unknown ids map to themselves)."""
+    item_ids = list(item_ids)
+    result = {item_id: item_id for item_id in item_ids}
+    for start in range(0, len(item_ids), 500):
+        batch = item_ids[start:start + 500]
+        placeholders = ', '.join('?' * len(batch))
+        result.update(conn.execute(f"""
+            SELECT member_id, representative_id FROM clusters
+            WHERE corpus = ? AND member_id IN ({placeholders})
+        """, [corpus] + batch).fetchall())
+    return result
+
+
+def members(conn, corpus, rep_ids):
+    """{representative_id: [other member ids]} for the given representatives."""
+    rep_ids = list(rep_ids)
+    result = {rep: [] for rep in rep_ids}
+    for start in range(0, len(rep_ids), 500):
+        batch = rep_ids[start:start + 500]
+        placeholders = ', '.join('?' * len(batch))
+        for member, rep in conn.execute(f"""
+            SELECT member_id, representative_id FROM clusters
+            WHERE corpus = ? AND representative_id IN ({placeholders}) AND member_id != representative_id
+            ORDER BY member_id
+        """, [corpus] + batch):
+            result[rep].append(member)
+    return result
+
+
+def collapse(conn, corpus, hits, key='id', part=None):
+    """Keep only the best-ranked hit of each cluster (hits are ranked dicts).
+
+    part names a field that distinguishes hits within one item (e.g. the
+    section of a response); hits are then collapsed per (cluster, part).
+    """
+    reps = representatives(conn, corpus, {hit[key] for hit in hits})
+    seen = set()
+    kept = []
+    for hit in hits:
+        group = (reps[hit[key]], hit[part] if part else None)
+        if group not in seen:
+            seen.add(group)
+            kept.append(hit)
+    return kept
+
+
+def expand(conn, corpus, hits, key='id'):
+    """Attach hit['duplicates']: the other members of each hit's cluster."""
+    reps = representatives(conn, corpus, {hit[key] for hit in hits})
+    clusters = members(conn, corpus, set(reps.values()))
+    for hit in hits:
+        rep = reps[hit[key]]
+        hit['duplicates'] = [member for member in [rep] + clusters.get(rep, []) if member != hit[key]]
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Near-duplicate clustering for embedding corpora')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_parser = sub.add_parser('build', help='sign new texts and recompute clusters')
+    build_parser.add_argument('corpus', choices=sorted(CORPORA))
+    build_parser.add_argument('--db', help='source database (default depends on corpus)')
+    build_parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    stats_parser = sub.add_parser('stats', help='cluster counts and the largest clusters')
+    stats_parser.add_argument('corpus', nargs='?', choices=sorted(CORPORA))
+    stats_parser.add_argument('--db', help='source database the clusters were built from')
+    show_parser = sub.add_parser('show', help='cluster of one item')
+    show_parser.add_argument('corpus', choices=sorted(CORPORA))
+    show_parser.add_argument('item_id', type=int)
+    show_parser.add_argument('--db', help='source database the clusters were built from')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        print(f"🔍 Clustering {args.corpus} (threshold {args.threshold})...")
+        result = build(args.corpus, args.db, args.threshold)
+        print(f"✅ {result['items']:,} items -> {result['clusters']:,} clusters "
+              f"({result['duplicates']:,} duplicates, {result['signed']:,} newly signed, "
+              f"{result['seconds']:.1f}s)")
+        return
+
+    conn = connect()
+    if args.command == 'stats':
+        names = ([corpus_key(args.corpus, args.db)] if args.corpus
+                 else [row[0] for row in conn.execute("SELECT name FROM corpora ORDER BY name")])
+        for name in names:
+            row = conn.execute("SELECT threshold, items, clusters, built_at FROM corpora WHERE name = ?", (name,)).fetchone()
+            if not row:
+                print(f"(no clusters for {name}; run: python3 near_dup.py build {args.corpus}"
+                      f"{f' --db {args.db}' if args.db else ''})")
+                continue
+            threshold, items, clusters, built_at = row
+            saved = (items - clusters) / items * 100 if items else 0
+            print(f"📊 {name}: {items:,} items, {clusters:,} clusters, {items - clusters:,} duplicates "
+                  f"({saved:.1f}% fewer vectors) at {threshold} "
+                  f"[built {time.strftime('%Y-%m-%d %H:%M', time.localtime(built_at))}]")
+            for rep, size in conn.execute("""
+                SELECT representative_id, COUNT(*) AS size FROM clusters
+                WHERE corpus = ? GROUP BY representative_id HAVING size > 1
+                ORDER BY size DESC LIMIT 5
+            """, (name,)):
+                print(f"   {rep}: {size} copies")
+        if not names:
+            print("(no corpora clustered yet)")
+    else:
+        corpus = corpus_key(args.corpus, args.db)
+        rep = representatives(conn, corpus, [args.item_id])[args.item_id]
+        print(f"{args.item_id} -> representative {rep}")
+        for member, sim in conn.execute("""
+            SELECT member_id, similarity FROM clusters
+            WHERE corpus = ? AND representative_id = ? ORDER BY member_id
+        """, (corpus, rep)):
+            print(f"   {member} ({sim:.2f})")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Byte-offset index for the philosophical questions org files.
+
+Scans an org file once and records where every category, question and
+tradition response starts and ends. The index is cached under .org_index/
+next to the source file and rebuilt whenever the file's SHA-256 changes, so
+scripts can mmap the file and slice out a single response without walking
+the whole document again.
+
+Usage:
+    python3 org_index.py 2philosophical_questions.org
+    python3 org_index.py 2philosophical_questions.org 1.12 Taoist
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+from collections import OrderedDict, defaultdict, namedtuple
+
+INDEX_VERSION = 1
+INDEX_DIR = ".org_index"
+
+# Heading patterns (same boundaries the book generators have always used)
+CATEGORY_RE = re.compile(rb'^\* \d+\.')
+CATEGORY_NAME_RE = re.compile(rb'^\* \d+\.\s*([A-Z][A-Z\s]+):')
+QUESTION_RE = re.compile(rb'^\*\* \d+\.\d+')
+QUESTION_TITLE_RE = re.compile(rb'^\*\* ([\d.]+)\s+(.+)')
+RESPONSE_RE = re.compile(rb'^\*\*\* ')
+RESPONSE_HEADING_RE = re.compile(rb'^\*\*\* ([\d.]+)\s+(.+)')
+RESPONSE_SUFFIX_RE = re.compile(r'^(.+?)\s*Response')
+
+Category = namedtuple('Category', 'name start end')
+Question = namedtuple('Question', 'number title category start end')
+Response = namedtuple(
+    'Response',
+    'number question_number question category tradition explicit start body end'
+)
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def index_path(path):
+    """Location of the cached index for an org file."""
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, INDEX_DIR, name + ".json")
+
+
+def _tradition_name(heading):
+    """Extract the tradition name from a response heading's text."""
+    match = RESPONSE_SUFFIX_RE.match(heading)
+    if match:
+        return match.group(1).strip(), True
+    return heading.replace(' Response', ''), False
+
+
+def build_index(path):
+    """Scan an org file once and return its offset index as a dict."""
+    categories = []
+    questions = []
+    responses = []
+
+    category = None       # index into categories
+    question = None       # index into questions
+    response = None       # index into responses
+
+    def close_open(offset):
+        # Every recognised heading ends whatever section is still open
+        if response is not None:
+            responses[response][-1] = offset
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        start = offset
+        offset += len(line)
+
+        if not line.startswith(b'*'):
+            continue
+
+        if CATEGORY_RE.match(line):
+            close_open(start)
+            if question is not None:
+                questions[question][-1] = start
+            match = CATEGORY_NAME_RE.match(line)
+            if match:
+                if category is not None:
+                    categories[category][-1] = start
+                categories.append([match.group(1).decode('utf-8').strip(), start, None])
+                category = len(categories) - 1
+            question = None
+            response = None
+
+        elif QUESTION_RE.match(line):
+            close_open(start)
+            if question is not None:
+                questions[question][-1] = start
+            match = QUESTION_TITLE_RE.match(line)
+            if match:
+                questions.append([
+                    match.group(1).decode('utf-8').rstrip('.'),
+                    match.group(2).decode('utf-8').strip(),
+                    category,
+                    start,
+                    None,
+                ])
+                question = len(questions) - 1
+            response = None
+
+        elif RESPONSE_RE.match(line):
+            close_open(start)
+            response = None
+            match = RESPONSE_HEADING_RE.match(line)
+            if match:
+                number = match.group(1).decode('utf-8').rstrip('.')
+                tradition, explicit = _tradition_name(match.group(2).decode('utf-8').strip())
+                responses.append([number, question, category, tradition, explicit,
+                                  start, offset, None])
+                response = len(responses) - 1
+
+    # Whatever is still open runs to the end of the file
+    end = len(data)
+    for entries in (categories, questions, responses):
+        for entry in entries:
+            if entry[-1] is None:
+                entry[-1] = end
+
+    return {
+        'version': INDEX_VERSION,
+        'source': os.path.basename(path),
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'size': len(data),
+        'categories': categories,
+        'questions': questions,
+        'responses': responses,
+    }
+
+
+def load_index(path, rebuild=False):
+    """Return an OrgIndex for path, rebuilding the cache if the file changed."""
+    cache = index_path(path)
+    digest = file_sha256(path)
+
+    data = None
+    if not rebuild and os.path.exists(cache):
+        try:
+            with open(cache, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data and (data.get('version') != INDEX_VERSION or data.get('sha256') != digest):
+            data = None
+
+    if data is None:
+        data = build_index(path)
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        tmp = cache + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, cache)
+
+    return OrgIndex(path, data)
+
+
+class OrgIndex:
+    """Offset index over one org file, with mmap-backed slicing."""
+
+    def __init__(self, path, data):
+        self.path = path
+        self.sha256 = data['sha256']
+
+        self.categories = [Category(*c) for c in data['categories']]
+        self.questions = []
+        for number, title, cat, start, end in data['questions']:
+            name = self.categories[cat].name if cat is not None else None
+            self.questions.append(Question(number, title, name, start, end))
+
+        self.responses = []
+        self._lookup = {}
+        for number, q, cat, tradition, explicit, start, body, end in data['responses']:
+            if q is not None:
+                question_number = self.questions[q].number
+                question_title = self.questions[q].title
+            else:
+                question_number = number.rsplit('.', 1)[0]
+                question_title = None
+            name = self.categories[cat].name if cat is not None else None
+            entry = Response(number, question_number, question_title, name,
+                             tradition, explicit, start, body, end)
+            self.responses.append(entry)
+            self._lookup.setdefault((question_number, tradition.lower()), entry)
+
+        self._file = None
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _buffer(self):
+        if self._mmap is None:
+            self._file = open(self.path, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def lookup(self, question_number, tradition):
+        """Find the response entry for e.g. ("1.12", "Taoist"), or None."""
+        return self._lookup.get((question_number, tradition.lower()))
+
+    def raw(self, entry):
+        """Raw body text of a response (everything under its heading)."""
+        if entry.end <= entry.body:
+            return ''
+        return self._buffer()[entry.body:entry.end].decode('utf-8')
+
+    def text(self, entry):
+        """Body text of a response joined into a single paragraph."""
+        lines = []
+        for line in self.raw(entry).split('\n'):
+            if line.strip() and not line.startswith('*') and not line.startswith('#'):
+                lines.append(line.strip())
+        return ' '.join(lines).strip()
+
+    def get(self, question_number, tradition):
+        """Slice out one response's text, or None if it is not in the file."""
+        entry = self.lookup(question_number, tradition)
+        return self.text(entry) if entry else None
+
+    def traditions(self):
+        """Tradition names in order of first appearance."""
+        seen = OrderedDict()
+        for entry in self.responses:
+            seen.setdefault(entry.tradition, True)
+        return list(seen.keys())
+
+    def category_tree(self):
+        """Return {category: {question: {tradition: text}}} in file order."""
+        categories = OrderedDict()
+        for entry in self.responses:
+            if not (entry.category and entry.question):
+                continue
+            response = self.text(entry)
+            if response:
+                questions = categories.setdefault(entry.category, OrderedDict())
+                questions.setdefault(entry.question, OrderedDict())[entry.tradition] = response
+        return categories
+
+    def by_question(self):
+        """Return {question: {tradition: text}} for "... Response" headings."""
+        questions_data = defaultdict(dict)
+        for entry in self.responses:
+            if not (entry.explicit and entry.question):
+                continue
+            response = self.text(entry)
+            if response:
+                questions_data[entry.question][entry.tradition] = response
+        return questions_data
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 org_index.py FILE.org [QUESTION TRADITION]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    with load_index(path) as index:
+        if len(sys.argv) >= 4:
+            text = index.get(sys.argv[2], " ".join(sys.argv[3:]))
+            if text is None:
+                print(f"❌ No response for {sys.argv[2]} / {' '.join(sys.argv[3:])}")
+                sys.exit(1)
+            print(text)
+            return
+
+        print(f"📄 {path}")
+        print(f"   SHA-256:    {index.sha256[:16]}...")
+        print(f"   Categories: {len(index.categories)}")
+        print(f"   Questions:  {len(index.questions)}")
+        print(f"   Responses:  {len(index.responses)}")
+        print(f"   Traditions: {len(index.traditions())}")
+        print(f"   Index:      {index_path(path)}")
+
+
+if __name__ == "__main__":
+    main()
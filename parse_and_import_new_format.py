@@ -15,66 +15,182 @@ NEW Format:
 - **Contemporary Applications:**
 """
 
+import os
 import re
-import sqlite3
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List
 
+import storage
+import tradition_catalog
+
+SECTION_KEYS = {
+    'historical development': 'historical_development',
+    'key concepts': 'key_concepts',
+    'core arguments': 'core_arguments',
+    'counter-arguments': 'counter_arguments',
+    'counterarguments': 'counter_arguments',
+    'textual foundation': 'textual_foundation',
+    'internal variations': 'internal_variations',
+    'contemporary applications': 'contemporary_applications',
+}
+
+# One sweep finds every boundary in a file:
+#   heading - "*** 1.24.1 Catholic Response" (any "*** N.N.N" line ends a response)
+#   section - "**Key Concepts:**" style headers
+#   bold    - any other "**" (ends the opening paragraph; at line start with a
+#             letter after it, ends the current section)
+TOKEN_RE = re.compile(
+    r'^\*\*\* (?P<question>\d+\.\d+)\.(?P<tradition>\d+)(?P<heading>[^\n]*)'
+    r'|\*\*(?P<section>Historical Development|Key Concepts|Core Arguments|Counter-?Arguments|'
+    r'Textual Foundation|Internal Variations|Contemporary Applications):?\*\*\s*'
+    r'|\*\*(?P<bold>[A-Z])?',
+    re.MULTILINE | re.IGNORECASE
+)
+HEADING_NAME_RE = re.compile(r'^ (.+?) Response$')
+
+
 def parse_new_format_file(filepath: Path) -> List[Dict]:
     """Extract structured data from new format .txt files"""
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
+    return parse_new_format_text(content)
 
-    # Pattern for new format: *** 1.24.1 Catholic Response
-    pattern = r'\*\*\* (\d+\.\d+)\.(\d+) (.+?) Response\n\n(.+?)(?=\n\*\*\* \d+\.\d+\.\d+|\Z)'
-    matches = re.findall(pattern, content, re.DOTALL)
 
+def parse_new_format_text(content: str) -> List[Dict]:
+    """Split a file's text into responses and sections in one finditer pass"""
     parsed_data = []
-    for question_num, tradition_num, tradition_name, full_text in matches:
-        sections = extract_sections_new_format(full_text)
-
+    response = None      # (question, tradition_number, name, body_start)
+    tokens = []          # section boundaries inside the open response
+
+    def close(end):
+        if response is None:
+            return
+        question_num, tradition_num, tradition_name, body_start = response
+        full_text = content[body_start:end]
+        if not full_text.strip():
+            return
         parsed_data.append({
             'question_number': question_num,
             'tradition_number': int(tradition_num),
             'tradition_name': tradition_name.strip(),
             'full_text': full_text.strip(),
-            'sections': sections
+            'sections': slice_sections(content, body_start, end, tokens)
         })
 
+    for match in TOKEN_RE.finditer(content):
+        if match.group('question') is None:
+            if response is not None:
+                tokens.append(match)
+            continue
+
+        close(match.start())
+        response = None
+        tokens = []
+
+        # Only "*** N.N.N Name Response" followed by a blank line opens a response
+        name = HEADING_NAME_RE.match(match.group('heading'))
+        if name and content.startswith('\n\n', match.end()):
+            response = (match.group('question'), match.group('tradition'),
+                        name.group(1), match.end() + 2)
+
+    close(len(content))
     return parsed_data
 
-def extract_sections_new_format(text: str) -> Dict[str, str]:
-    """Parse the 8 sections from NEW format response text"""
+
+def slice_sections(content: str, start: int, end: int, tokens) -> Dict[str, str]:
+    """Cut the opening and the bolded sections of one response by offset"""
     sections = {}
 
     # Opening paragraph (everything before first **)
-    opening_match = re.search(r'^(.+?)(?=\*\*|\Z)', text, re.DOTALL)
-    if opening_match:
-        sections['opening'] = opening_match.group(1).strip()
-
-    # Extract bolded sections with flexible patterns
-    section_patterns = {
-        'historical_development': r'\*\*Historical Development:?\*\*\s*(.+?)(?=\n\*\*[A-Z]|\Z)',
-        'key_concepts': r'\*\*Key Concepts:?\*\*\s*(.+?)(?=\n\*\*[A-Z]|\Z)',
-        'core_arguments': r'\*\*Core Arguments:?\*\*\s*(.+?)(?=\n\*\*[A-Z]|\Z)',
-        'counter_arguments': r'\*\*Counter-?Arguments:?\*\*\s*(.+?)(?=\n\*\*[A-Z]|\Z)',
-        'textual_foundation': r'\*\*Textual Foundation:?\*\*\s*(.+?)(?=\n\*\*[A-Z]|\Z)',
-        'internal_variations': r'\*\*Internal Variations:?\*\*\s*(.+?)(?=\n\*\*[A-Z]|\Z)',
-        'contemporary_applications': r'\*\*Contemporary Applications:?\*\*\s*(.+?)(?=\n\*\*[A-Z]|\Z)'
-    }
-
-    for key, pattern in section_patterns.items():
-        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-        if match:
-            sections[key] = match.group(1).strip()
+    opening_end = tokens[0].start() if tokens else end
+    opening = content[start:opening_end].strip()
+    if opening:
+        sections['opening'] = opening
+
+    # A section runs until the next line that starts with "**<letter>"
+    open_key = None
+    open_start = None
+    for token in tokens:
+        at_line_start = token.start() > start and content[token.start() - 1] == '\n'
+        if open_key and at_line_start and (token.group('section') or token.group('bold')):
+            sections.setdefault(open_key, content[open_start:token.start()].strip())
+            open_key = None
+        if token.group('section') and open_key is None:
+            key = SECTION_KEYS[token.group('section').lower()]
+            if key not in sections:
+                open_key, open_start = key, token.end()
+    if open_key:
+        sections.setdefault(open_key, content[open_start:end].strip())
 
     return sections
 
-def import_to_database(db_path='philosophical_traditions_sample.db', file_pattern='question_1.2*.txt'):
-    """Import all new format .txt files into SQLite database"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
 
+def extract_sections_new_format(text: str) -> Dict[str, str]:
+    """Parse the 8 sections from NEW format response text"""
+    return slice_sections(text, 0, len(text), list(TOKEN_RE.finditer(text)))
+
+
+def parse_worker(filepath: Path):
+    """Process-pool entry point: (filepath, traditions, error)"""
+    try:
+        return filepath, parse_new_format_file(filepath), None
+    except Exception as e:
+        return filepath, None, str(e)
+
+
+def write_file_responses(conn, traditions):
+    """Write one file's responses with one executemany per table"""
+    conn.executemany("""
+        INSERT OR IGNORE INTO questions (number, title, category, section)
+        VALUES (?, ?, ?, ?)
+    """, [(q, f"Question {q}", 'METAPHYSICS', 1)
+          for q in dict.fromkeys(t['question_number'] for t in traditions)])
+
+    conn.executemany("""
+        INSERT OR IGNORE INTO traditions (number, name)
+        VALUES (?, ?)
+    """, [(t['tradition_number'], t['tradition_name']) for t in traditions])
+
+    conn.executemany("""
+        INSERT OR REPLACE INTO responses
+        (question_id, tradition_id, full_text, opening, historical_development,
+         key_concepts, core_arguments, counter_arguments, textual_foundation,
+         internal_variations, contemporary_applications, word_count)
+        VALUES ((SELECT id FROM questions WHERE number = ?),
+                (SELECT id FROM traditions WHERE number = ?),
+                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (
+            trad['question_number'], trad['tradition_number'], trad['full_text'],
+            trad['sections'].get('opening'), trad['sections'].get('historical_development'),
+            trad['sections'].get('key_concepts'), trad['sections'].get('core_arguments'),
+            trad['sections'].get('counter_arguments'), trad['sections'].get('textual_foundation'),
+            trad['sections'].get('internal_variations'), trad['sections'].get('contemporary_applications'),
+            len(trad['full_text'].split())
+        )
+        for trad in traditions
+    ])
+
+
+def database_id(conn):
+    """Random id stored in the target database on first import, so a deleted
+    and recreated database is a new catalog consumer, not "already imported"."""
+    conn.execute("CREATE TABLE IF NOT EXISTS import_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO import_meta (key, value) VALUES ('database_id', ?)", (uuid.uuid4().hex,))
+    conn.commit()
+    return conn.execute("SELECT value FROM import_meta WHERE key = 'database_id'").fetchone()[0]
+
+
+def import_to_database(db_path='philosophical_traditions_sample.db', file_pattern='question_1.2*.txt', force=False,
+                       workers=None):
+    """Import all new format .txt files into SQLite database
+
+    Files already imported into this db_path database (by path and
+    database_id) in their current version are skipped (see tradition_catalog) unless force is set. Files are parsed
+    in parallel across `workers` processes (default: one per CPU).
+    """
     # Parse all matching question files
     txt_files = sorted(Path('.').glob(file_pattern))
     print(f"📁 Found {len(txt_files)} files matching pattern '{file_pattern}'")
@@ -84,66 +200,53 @@ def import_to_database(db_path='philosophical_traditions_sample.db', file_patter
         print("❌ No files found! Check your file pattern.")
         return
 
+    conn = storage.connect(db_path, bulk=True)
+    consumer = f"import_new_format:{Path(db_path).resolve()}:{database_id(conn)}"
+    catalog = tradition_catalog.connect()
+    tradition_catalog.refresh_paths(catalog, txt_files)
+    if not force:
+        unchanged = len(txt_files)
+        txt_files = tradition_catalog.pending(catalog, consumer, txt_files)
+        unchanged -= len(txt_files)
+        if unchanged:
+            print(f"⏭️  Skipping {unchanged} files already imported (unchanged)\n")
+        if not txt_files:
+            print("✅ Nothing to import - all files are up to date.")
+            catalog.close()
+            conn.close()
+            return
+
     total_imported = 0
     questions_found = set()
 
-    for filepath in txt_files:
-        print(f"Processing {filepath.name}...")
-        try:
-            traditions = parse_new_format_file(filepath)
-
-            if not traditions:
-                print(f"  ⚠️  No traditions parsed from {filepath.name}")
-                continue
-
-            for trad in traditions:
-                questions_found.add(trad['question_number'])
-
-                # Insert or get question
-                cursor.execute("""
-                    INSERT OR IGNORE INTO questions (number, title, category, section)
-                    VALUES (?, ?, ?, ?)
-                """, (trad['question_number'], f"Question {trad['question_number']}", 'METAPHYSICS', 1))
-
-                cursor.execute("SELECT id FROM questions WHERE number = ?", (trad['question_number'],))
-                question_id = cursor.fetchone()[0]
-
-                # Insert or get tradition
-                cursor.execute("""
-                    INSERT OR IGNORE INTO traditions (number, name)
-                    VALUES (?, ?)
-                """, (trad['tradition_number'], trad['tradition_name']))
-
-                cursor.execute("SELECT id FROM traditions WHERE number = ?", (trad['tradition_number'],))
-                tradition_id = cursor.fetchone()[0]
-
-                # Insert response
-                sections = trad['sections']
-                word_count = len(trad['full_text'].split())
-
-                cursor.execute("""
-                    INSERT OR REPLACE INTO responses
-                    (question_id, tradition_id, full_text, opening, historical_development,
-                     key_concepts, core_arguments, counter_arguments, textual_foundation,
-                     internal_variations, contemporary_applications, word_count)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    question_id, tradition_id, trad['full_text'],
-                    sections.get('opening'), sections.get('historical_development'),
-                    sections.get('key_concepts'), sections.get('core_arguments'),
-                    sections.get('counter_arguments'), sections.get('textual_foundation'),
-                    sections.get('internal_variations'), sections.get('contemporary_applications'),
-                    word_count
-                ))
-
-            conn.commit()
-            total_imported += len(traditions)
-            print(f"  ✅ Imported {len(traditions)} traditions from {filepath.name}\n")
-
-        except Exception as e:
-            print(f"  ❌ Error processing {filepath.name}: {e}\n")
+    # Parse across processes; this process does all the writing
+    workers = workers or min(len(txt_files), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for filepath, traditions, error in executor.map(parse_worker, txt_files):
+            print(f"Processing {filepath.name}...")
+            try:
+                if error:
+                    raise ValueError(error)
+
+                if not traditions:
+                    print(f"  ⚠️  No traditions parsed from {filepath.name}")
+                    tradition_catalog.mark_processed(catalog, consumer, filepath, status='empty')
+                    continue
+
+                write_file_responses(conn, traditions)
+                conn.commit()
+                tradition_catalog.mark_processed(catalog, consumer, filepath)
+                questions_found.update(t['question_number'] for t in traditions)
+                total_imported += len(traditions)
+                print(f"  ✅ Imported {len(traditions)} traditions from {filepath.name}\n")
+
+            except Exception as e:
+                conn.rollback()
+                tradition_catalog.mark_processed(catalog, consumer, filepath, status='failed', error=str(e))
+                print(f"  ❌ Error processing {filepath.name}: {e}\n")
 
     conn.close()
+    catalog.close()
 
     print(f"\n{'='*70}")
     print(f"✅ IMPORT COMPLETE!")
@@ -154,7 +257,7 @@ def import_to_database(db_path='philosophical_traditions_sample.db', file_patter
     print(f"{'='*70}")
 
     # Verify database
-    conn = sqlite3.connect(db_path)
+    conn = storage.connect(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM responses")
     response_count = cursor.fetchone()[0]
@@ -172,8 +275,10 @@ def import_to_database(db_path='philosophical_traditions_sample.db', file_patter
 if __name__ == '__main__':
     import sys
 
-    # Allow custom file pattern from command line
-    file_pattern = sys.argv[1] if len(sys.argv) > 1 else 'question_1.2[45]*.txt'
+    # Allow custom file pattern from command line (--force re-imports everything)
+    args = [a for a in sys.argv[1:] if a != '--force']
+    force = '--force' in sys.argv[1:]
+    file_pattern = args[0] if args else 'question_1.2[45]*.txt'
 
     print("="*70)
     print("PHILOSOPHICAL RESPONSES IMPORTER (NEW FORMAT)")
@@ -181,4 +286,4 @@ if __name__ == '__main__':
     print(f"File pattern: {file_pattern}")
     print(f"Target: Questions with 8-section format\n")
 
-    import_to_database(file_pattern=file_pattern)
+    import_to_database(file_pattern=file_pattern, force=force)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of parsed Vedabase HTML.
+
+cached_parse(parser, path, *args) returns parser(path, *args), but stores
+the result (gzip-compressed JSON) under the hash of the source file's
+bytes, the parser's name and arguments, and the PARSER_VERSION constant
+of the parser's module. Rerunning a parse script on an unchanged book is
+then a file read instead of a full BeautifulSoup parse, so iterating on
+chunking or import logic is cheap. Bump PARSER_VERSION in a parser module
+whenever its output changes; edits to chunking code in the same module
+do not need a bump.
+
+Usage:
+    python3 parse_cache.py list                 # entries, newest first
+    python3 parse_cache.py evict kb.html        # drop entries for a source
+    python3 parse_cache.py evict --stale        # drop entries whose source changed
+    python3 parse_cache.py evict --all
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from org_index import file_sha256
+
+CACHE_DIR = Path('.parse_cache')
+INDEX_DB = CACHE_DIR / 'index.db'
+
+
+def connect():
+    """Open the cache index, creating it on first use."""
+    CACHE_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(INDEX_DB)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        source_sha256 TEXT NOT NULL,
+        parser TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        bytes INTEGER NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    return conn
+
+
+def parser_name(parser):
+    """module.function, using the script name when run as __main__."""
+    module = parser.__module__
+    if module == '__main__':
+        module = Path(sys.modules['__main__'].__file__).stem
+    return f"{module}.{parser.__qualname__}"
+
+
+def parser_version(parser):
+    return getattr(sys.modules[parser.__module__], 'PARSER_VERSION', 0)
+
+
+def entry_path(key):
+    return CACHE_DIR / key[:2] / f"{key}.json.gz"
+
+
+def cache_key(source_sha256, name, version, args):
+    payload = json.dumps([source_sha256, name, version, [str(a) for a in args]])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cached_parse(parser, path, *args):
+    """parser(path, *args), served from the cache when nothing changed."""
+    name = parser_name(parser)
+    version = parser_version(parser)
+    source_sha256 = file_sha256(path)
+    key = cache_key(source_sha256, name, version, args)
+    artifact = entry_path(key)
+
+    conn = connect()
+    try:
+        if artifact.exists():
+            with gzip.open(artifact, 'rt', encoding='utf-8') as f:
+                result = json.load(f)
+            conn.execute("""
+                UPDATE entries SET hits = hits + 1, last_used = CURRENT_TIMESTAMP
+                WHERE key = ?
+            """, (key,))
+            conn.commit()
+            print(f"  ⚡ Cache hit for {Path(path).name} ({name} v{version})")
+            return result
+
+        result = parser(path, *args)
+
+        artifact.parent.mkdir(exist_ok=True)
+        tmp = artifact.with_suffix('.tmp')
+        with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp, artifact)
+
+        conn.execute("""
+            INSERT OR REPLACE INTO entries (key, source, source_sha256, parser, version, bytes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (key, str(Path(path).resolve()), source_sha256, name, version, artifact.stat().st_size))
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+def list_entries(conn):
+    return conn.execute("""
+        SELECT key, source, parser, version, bytes, hits, last_used
+        FROM entries ORDER BY last_used DESC
+    """).fetchall()
+
+
+def evict(conn, keys):
+    """Delete the given entries and their artifacts; returns the count."""
+    for key in keys:
+        entry_path(key).unlink(missing_ok=True)
+    conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+    conn.commit()
+    return len(keys)
+
+
+def stale_keys(conn):
+    """Entries whose source file is gone or no longer has the cached hash."""
+    stale = []
+    hashes = {}
+    for key, source, source_sha256 in conn.execute("SELECT key, source, source_sha256 FROM entries"):
+        if source not in hashes:
+            hashes[source] = file_sha256(source) if os.path.exists(source) else None
+        if hashes[source] != source_sha256:
+            stale.append(key)
+    return stale
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('list', 'evict'):
+        print(__doc__)
+        sys.exit(1)
+
+    conn = connect()
+
+    if sys.argv[1] == 'list':
+        entries = list_entries(conn)
+        total = sum(entry[4] for entry in entries)
+        for key, source, parser, version, size, hits, last_used in entries:
+            print(f"  {key[:12]}  {Path(source).name:<20} {parser} v{version}  "
+                  f"{size / 1024:,.0f} KB  {hits} hits  {last_used}")
+        print(f"📦 {len(entries)} entries, {total / (1024 * 1024):.1f} MB in {CACHE_DIR}/")
+
+    elif len(sys.argv) < 3:
+        print("Usage: python3 parse_cache.py evict (SOURCE | KEY_PREFIX | --stale | --all)")
+        sys.exit(1)
+
+    else:
+        target = sys.argv[2]
+        if target == '--all':
+            keys = [row[0] for row in conn.execute("SELECT key FROM entries")]
+        elif target == '--stale':
+            keys = stale_keys(conn)
+        else:
+            keys = [key for key, source in conn.execute("SELECT key, source FROM entries")
+                    if key.startswith(target) or Path(source).name == Path(target).name]
+        print(f"🗑️  Evicted {evict(conn, keys)} entries")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,15 @@ Parse Conversations.epub HTML files and prepare for RAG
 Extracts Room Conversations and Morning Walks
 """
 
-import sqlite3
 import re
 from pathlib import Path
 from bs4 import BeautifulSoup
 import json
 
+import storage
+from storage import LOCAL_DB
+
 EPUB_DIR = "/Users/jaganat/.emacs.d/git_projects/questions_answers/Conversations.epub"
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 CONVERSATIONS_BOOK_ID = 45  # book_id for Conversations collection
 
 def parse_conversation_html(html_path):
@@ -145,7 +146,7 @@ def main():
     print()
 
     # Connect to database and get next available verse_id
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB, bulk=True)
     cursor = conn.cursor()
 
     cursor.execute("SELECT MAX(id) FROM vedabase_verses")
@@ -216,11 +217,11 @@ def main():
     print("📥 Inserting into local database...")
 
     # Insert verses
-    for verse in verse_entries:
-        cursor.execute("""
-            INSERT INTO vedabase_verses (id, book_id, chapter, verse_number, sanskrit, synonyms, translation, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    storage.executemany_chunked(conn, """
+        INSERT INTO vedabase_verses (id, book_id, chapter, verse_number, sanskrit, synonyms, translation, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        (
             verse['id'],
             verse['book_id'],
             verse['chapter'],
@@ -229,20 +230,24 @@ def main():
             verse['synonyms'],
             verse['translation'],
             verse['created_at']
-        ))
+        )
+        for verse in verse_entries
+    ))
 
     # Insert chunks
-    for chunk in all_chunks:
-        cursor.execute("""
-            INSERT INTO vedabase_chunks (verse_id, chunk_type, chunk_index, content, word_count)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
+    storage.executemany_chunked(conn, """
+        INSERT INTO vedabase_chunks (verse_id, chunk_type, chunk_index, content, word_count)
+        VALUES (?, ?, ?, ?, ?)
+    """, (
+        (
             chunk['verse_id'],
             chunk['chunk_type'],
             chunk['chunk_index'],
             chunk['content'],
             chunk['word_count']
-        ))
+        )
+        for chunk in all_chunks
+    ))
 
     conn.commit()
     conn.close()
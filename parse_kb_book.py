@@ -9,6 +9,11 @@ from pathlib import Path
 from bs4 import BeautifulSoup
 import re
 
+from parse_cache import cached_parse
+
+# Bump when the parser output changes (invalidates parse_cache entries)
+PARSER_VERSION = 1
+
 def parse_krishna_book(html_path: Path) -> list:
     """Parse Krishna Book HTML and extract chapters as verse units"""
 
@@ -77,7 +82,7 @@ def main():
     print(f"\nParsing kb.html ({kb_path.stat().st_size / (1024*1024):.1f} MB)...")
 
     try:
-        verses = parse_krishna_book(kb_path)
+        verses = cached_parse(parse_krishna_book, kb_path)
         print(f"  ✓ Found {len(verses)} chapters in Krishna Book")
 
         # Save to JSON
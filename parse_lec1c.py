@@ -12,6 +12,11 @@ import json
 from bs4 import BeautifulSoup
 from pathlib import Path
 
+from parse_cache import cached_parse
+
+# Bump when the parser output changes (invalidates parse_cache entries)
+PARSER_VERSION = 1
+
 def clean_text(text: str) -> str:
     """Clean and normalize text"""
     if not text:
@@ -138,7 +143,7 @@ if __name__ == '__main__':
 
     print(f"\nParsing {file_path} ({file_path.stat().st_size / (1024*1024):.1f} MB)...")
 
-    lectures = parse_lec1c(file_path)
+    lectures = cached_parse(parse_lec1c, file_path)
     print(f"  Found {len(lectures)} lectures")
 
     # Create chunks
@@ -10,6 +10,11 @@ from bs4 import BeautifulSoup
 from pathlib import Path
 from typing import Dict, List
 
+from parse_cache import cached_parse
+
+# Bump when the parser output changes (invalidates parse_cache entries)
+PARSER_VERSION = 1
+
 def clean_text(text: str) -> str:
     """Clean and normalize text"""
     if not text:
@@ -144,7 +149,7 @@ if __name__ == '__main__':
         file_path = Path(f'{file_key}.html')
         if file_path.exists():
             print(f"Parsing {book_name}...")
-            lectures = parse_lectures(file_path, book_name)
+            lectures = cached_parse(parse_lectures, file_path, book_name)
 
             # Create chunks
             all_chunks = []
@@ -159,7 +164,7 @@ if __name__ == '__main__':
     other_path = Path('other.html')
     if other_path.exists():
         print("Parsing other.html...")
-        other_lectures = parse_other(other_path)
+        other_lectures = cached_parse(parse_other, other_path)
         other_chunks = []
         for lecture in other_lectures:
             chunks = chunk_lecture(lecture)
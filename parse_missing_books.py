@@ -12,6 +12,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 from parse_vedabase import parse_caitanya_caritamrta
 from parse_lectures import parse_lectures
+from parse_cache import cached_parse
 
 def main():
     print("=" * 80)
@@ -28,7 +29,7 @@ def main():
         if cc_path.exists():
             print(f"\n  Parsing cc{volume}.html...")
             try:
-                verses = parse_caitanya_caritamrta(cc_path, str(volume))
+                verses = cached_parse(parse_caitanya_caritamrta, cc_path, str(volume))
                 all_new_books[f'cc{volume}'] = verses
                 print(f"  ✓ Found {len(verses)} verses in CC{volume}")
             except Exception as e:
@@ -42,7 +43,7 @@ def main():
     if lec1c_path.exists():
         print(f"\n  Parsing lec1c.html...")
         try:
-            lectures = parse_lectures(lec1c_path, 'Lectures Part 1C')
+            lectures = cached_parse(parse_lectures, lec1c_path, 'Lectures Part 1C')
             all_new_books['lec1c'] = lectures
             print(f"  ✓ Found {len(lectures)} lecture sections in LEC1C")
         except Exception as e:
@@ -9,6 +9,11 @@ import re
 from bs4 import BeautifulSoup
 from pathlib import Path
 
+from parse_cache import cached_parse
+
+# Bump when the parser output changes (invalidates parse_cache entries)
+PARSER_VERSION = 1
+
 def clean_text(text: str) -> str:
     """Clean and normalize text"""
     if not text:
@@ -160,7 +165,7 @@ if __name__ == '__main__':
         exit(1)
 
     print(f"\nParsing {html_path}...")
-    books = parse_other_individual(html_path)
+    books = cached_parse(parse_other_individual, html_path)
 
     print(f"\nFound {len(books)} individual books")
 
@@ -10,6 +10,11 @@ from bs4 import BeautifulSoup
 from pathlib import Path
 from typing import Dict, List
 
+from parse_cache import cached_parse
+
+# Bump when the parser output changes (invalidates parse_cache entries)
+PARSER_VERSION = 1
+
 def clean_text(text: str) -> str:
     """Clean and normalize text"""
     if not text:
@@ -288,7 +293,7 @@ def parse_all_vedabase(source_dir: Path) -> Dict[str, List[Dict]]:
     print("Parsing Bhagavad Gita...")
     bg_path = source_dir / 'bg.html'
     if bg_path.exists():
-        all_verses['bg'] = parse_bhagavad_gita(bg_path)
+        all_verses['bg'] = cached_parse(parse_bhagavad_gita, bg_path)
         print(f"  Found {len(all_verses['bg'])} verses")
 
     # Parse Srimad Bhagavatam Cantos
@@ -296,14 +301,14 @@ def parse_all_vedabase(source_dir: Path) -> Dict[str, List[Dict]]:
         print(f"Parsing Srimad Bhagavatam Canto {canto}...")
         sb_path = source_dir / f'sb{canto}.html'
         if sb_path.exists():
-            all_verses[f'sb{canto}'] = parse_srimad_bhagavatam(sb_path, str(canto))
+            all_verses[f'sb{canto}'] = cached_parse(parse_srimad_bhagavatam, sb_path, str(canto))
             print(f"  Found {len(all_verses[f'sb{canto}'])} verses")
 
     # Parse Krishna Book
     print("Parsing Krishna Book...")
     kb_path = source_dir / 'kb.html'
     if kb_path.exists():
-        all_verses['kb'] = parse_bhagavad_gita(kb_path)  # Same structure as BG
+        all_verses['kb'] = cached_parse(parse_bhagavad_gita, kb_path)  # Same structure as BG
         print(f"  Found {len(all_verses['kb'])} verses")
 
     # Parse Caitanya Caritamrita
@@ -311,7 +316,7 @@ def parse_all_vedabase(source_dir: Path) -> Dict[str, List[Dict]]:
         print(f"Parsing Caitanya Caritamrita Volume {volume}...")
         cc_path = source_dir / f'cc{volume}.html'
         if cc_path.exists():
-            all_verses[f'cc{volume}'] = parse_caitanya_caritamrta(cc_path, str(volume))
+            all_verses[f'cc{volume}'] = cached_parse(parse_caitanya_caritamrta, cc_path, str(volume))
             print(f"  Found {len(all_verses[f'cc{volume}'])} verses")
 
     return all_verses
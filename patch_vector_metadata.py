@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Patch Vectorize metadata in place, without re-embedding.
+
+Reads each vector's existing values from a local embedding artifact
+(--store NAME) or from the index itself (get_by_ids), applies metadata
+patches and upserts the same values back. No OpenAI calls, so fixing a
+metadata mistake costs minutes instead of a full regeneration.
+
+Work runs through the job ledger: --workers threads claim batches of ids
+concurrently, and an interrupted run resumes where it stopped. The
+default job name includes a digest of the ids and --where filters, and a
+finished job is started over when run again. --dry-run
+prints a field-by-field diff and writes nothing.
+
+Patches:
+    --patch lectures          source -> 'vedabase', book_code from verse_id
+    --set key=value           set a field (value parsed as JSON if possible)
+    --unset key               drop a field
+    --where key=value         only touch vectors whose metadata matches
+
+Usage:
+    python3 patch_vector_metadata.py --store lecture_embeddings --patch lectures --dry-run
+    python3 patch_vector_metadata.py --store letters_embeddings --set book_code=LETTERS --workers 4
+    python3 patch_vector_metadata.py --ids 19824-26863 --patch lectures    # values from the index
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from collections import Counter
+
+from dotenv import load_dotenv
+
+import embedding_store
+import job_ledger
+import storage
+import vectorize_api
+
+load_dotenv()
+
+BATCH_SIZE = 100
+WORKERS = 4
+DRY_RUN_SAMPLE = 10
+REMOTE_DRY_RUN_LIMIT = 200
+
+
+def lectures_patch():
+    """The lecture fix: source 'vedabase', book_code looked up from verse_id."""
+    conn = storage.read_connection()
+    verse_to_book = dict(conn.execute("""
+        SELECT v.id, b.code FROM vedabase_verses v JOIN vedabase_books b ON v.book_id = b.id
+    """))
+
+    def apply(metadata):
+        metadata['source'] = 'vedabase'
+        if metadata.get('verse_id') in verse_to_book:
+            metadata['book_code'] = verse_to_book[metadata['verse_id']]
+        return metadata
+    return apply
+
+
+# --patch name -> factory returning metadata -> metadata
+PATCHES = {
+    'lectures': lectures_patch,
+}
+
+
+def parse_assignment(text):
+    """'key=value' -> (key, value), value decoded as JSON when it parses."""
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def build_patch(args):
+    """Compose --patch/--set/--unset into one metadata -> metadata function."""
+    steps = [PATCHES[name]() for name in args.patch]
+    assignments = [parse_assignment(item) for item in args.set]
+
+    def apply(metadata):
+        metadata = dict(metadata)
+        for step in steps:
+            metadata = step(metadata)
+        for key, value in assignments:
+            metadata[key] = value
+        for key in args.unset:
+            metadata.pop(key, None)
+        return metadata
+    return apply
+
+
+def build_filter(args):
+    conditions = [parse_assignment(item) for item in args.where]
+    return lambda metadata: all(metadata.get(key) == value for key, value in conditions)
+
+
+def job_name(args, ids):
+    """Default ledger job: the patch, the target, and a digest of the ids and
+    filters, so another id range or --where is a new job, not a resume."""
+    digest = hashlib.sha256(json.dumps([sorted(ids), sorted(args.where)]).encode()).hexdigest()[:12]
+    return 'patch:' + ':'.join(args.patch + args.set + [f"-{key}" for key in args.unset] +
+                               [args.store or vectorize_api.index_name(args.index), digest])
+
+
+def parse_ids(spec):
+    """'19824-26863' or 'a,b,c' or '@file' (one id per line)."""
+    if spec.startswith('@'):
+        with open(spec[1:], 'r') as f:
+            return [line.strip() for line in f if line.strip()]
+    if '-' in spec and spec.replace('-', '').isdigit():
+        first, last = spec.split('-')
+        return [str(i) for i in range(int(first), int(last) + 1)]
+    return [item.strip() for item in spec.split(',') if item.strip()]
+
+
+class Source:
+    """Where the current values and metadata come from (one per thread)."""
+
+    def __init__(self, store_name, index):
+        self.store_name = store_name
+        self.index = index
+        self.store = embedding_store.EmbeddingStore(store_name) if store_name else None
+        self.rows = self.store.ids() if self.store else None
+
+    def fetch(self, ids):
+        """[(id, values, metadata)] for ids."""
+        if self.store:
+            return self.store.get(ids, self.rows)
+        return [(record['id'], record['values'], record.get('metadata') or {})
+                for record in vectorize_api.get_by_ids(ids, self.index)]
+
+    def close(self):
+        if self.store:
+            self.store.close()
+
+
+def diff(old, new):
+    """{field: (old, new)} for fields that differ."""
+    return {key: (old.get(key), new.get(key))
+            for key in sorted(set(old) | set(new)) if old.get(key) != new.get(key)}
+
+
+def dry_run(args, ids, patch, matches):
+    source = Source(args.store, args.index)
+    if not args.store:
+        ids = ids[:args.limit or REMOTE_DRY_RUN_LIMIT]
+    changed_fields = Counter()
+    checked = changed = skipped = 0
+    shown = 0
+
+    for start in range(0, len(ids), BATCH_SIZE):
+        for vector_id, _, metadata in source.fetch(ids[start:start + BATCH_SIZE]):
+            checked += 1
+            if not matches(metadata):
+                skipped += 1
+                continue
+            changes = diff(metadata, patch(metadata))
+            if not changes:
+                continue
+            changed += 1
+            changed_fields.update(changes.keys())
+            if shown < DRY_RUN_SAMPLE:
+                shown += 1
+                print(f"~ {vector_id}")
+                for key, (before, after) in changes.items():
+                    print(f"    {key}: {json.dumps(before, ensure_ascii=False)} -> {json.dumps(after, ensure_ascii=False)}")
+    source.close()
+
+    print(f"\n🔍 Dry run: {checked:,} vectors read ({len(ids) - checked:,} missing), "
+          f"{skipped:,} filtered out, {changed:,} would change")
+    for key, count in changed_fields.most_common():
+        print(f"   {key}: {count:,}")
+
+
+def worker(args, job, patch, matches, number, totals, lock):
+    """Claim batches until the job is drained."""
+    ledger = job_ledger.connect()
+    owner = f"{job_ledger.worker_id()}:{number}"
+    source = Source(args.store, args.index)
+    try:
+        while True:
+            ids = job_ledger.claim(ledger, job, owner, BATCH_SIZE)
+            if not ids:
+                break
+            try:
+                records = []
+                for vector_id, values, metadata in source.fetch(ids):
+                    if not matches(metadata):
+                        continue
+                    patched = patch(metadata)
+                    if patched != metadata:
+                        records.append({'id': vector_id, 'values': values, 'metadata': patched})
+                if records:
+                    vectorize_api.upsert(records, args.index)
+                    if args.store:
+                        embedding_store.update_metadata(args.store, {r['id']: r['metadata'] for r in records})
+            except Exception as e:
+                job_ledger.fail(ledger, job, owner, ids, e)
+                print(f"  ❌ [{owner}] {ids[0]}..{ids[-1]}: {e}")
+                continue
+            job_ledger.complete(ledger, job, owner, ids)
+            with lock:
+                totals['batches'] += 1
+                totals['patched'] += len(records)
+                if totals['batches'] % 10 == 0:
+                    state = job_ledger.counts(ledger, job)
+                    print(f"  📤 {state['done']:,}/{sum(state.values()):,} ids done, "
+                          f"{totals['patched']:,} vectors patched this run")
+    finally:
+        source.close()
+        ledger.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Patch Vectorize metadata without re-embedding')
+    parser.add_argument('--store', help='local embedding artifact holding the vectors')
+    parser.add_argument('--ids', help="ids to patch: '19824-26863', 'a,b,c' or '@file' (default: every id in --store)")
+    parser.add_argument('--index', help=f'Vectorize index (default: {vectorize_api.index_name()})')
+    parser.add_argument('--patch', action='append', default=[], choices=sorted(PATCHES))
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE')
+    parser.add_argument('--unset', action='append', default=[], metavar='KEY')
+    parser.add_argument('--where', action='append', default=[], metavar='KEY=VALUE')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--job', help='ledger job name (default derived from the patch)')
+    parser.add_argument('--dry-run', action='store_true', help='print the diff, change nothing')
+    parser.add_argument('--limit', type=int, help='dry run: check only the first N ids')
+    args = parser.parse_args()
+
+    if not (args.patch or args.set or args.unset):
+        parser.error('nothing to do: give --patch, --set or --unset')
+    if not (args.store or args.ids):
+        parser.error('give --store and/or --ids')
+    if args.store and not embedding_store.exists(args.store):
+        print(f"❌ Error: {embedding_store.npy_path(args.store)} not found")
+        sys.exit(1)
+
+    if args.ids:
+        ids = parse_ids(args.ids)
+    else:
+        with embedding_store.EmbeddingStore(args.store) as store:
+            ids = list(store.ids())
+    if args.limit:
+        ids = ids[:args.limit]
+
+    patch = build_patch(args)
+    matches = build_filter(args)
+    source_name = f"artifact {args.store}" if args.store else f"index {vectorize_api.index_name(args.index)}"
+    print(f"🩹 Patching metadata of {len(ids):,} vectors (values from {source_name})")
+
+    if args.dry_run:
+        dry_run(args, ids, patch, matches)
+        return
+
+    job = args.job or job_name(args, ids)
+    ledger = job_ledger.connect()
+    if job_ledger.drop_if_done(ledger, job):
+        print(f"🔁 Ledger job {job} finished earlier; running it again")
+    if not job_ledger.create_job(ledger, job, ids):
+        print(f"↩️  Resuming ledger job {job}")
+    ledger.close()
+
+    totals = {'batches': 0, 'patched': 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=worker, args=(args, job, patch, matches, number, totals, lock))
+               for number in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ledger = job_ledger.connect()
+    state = job_ledger.counts(ledger, job)
+    ledger.close()
+    print(f"\n✅ {totals['patched']:,} vectors patched this run; job {job}: "
+          f"{state['done']:,} done, {state['failed']:,} failed, {state['pending'] + state['in_flight']:,} left")
+    if state['failed']:
+        print(f"   Retry failures with: python3 job_ledger.py retry {job} && rerun this command")
+
+
+if __name__ == "__main__":
+    main()
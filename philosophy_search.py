@@ -11,33 +11,18 @@ Usage:
 """
 
 import sys
-import re
-import glob
-from collections import OrderedDict
+
+import tradition_catalog
 
 def extract_traditions():
     """Extract all tradition names from the files"""
-    traditions = OrderedDict()
-
-    # Find all tradition files
-    files = glob.glob("*traditions*.txt") + glob.glob("*responses*.txt")
-
-    for file_path in files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Find all tradition headers: *** 1.25.1 Catholic Response
-            matches = re.findall(r'\*\*\*\s+[\d.]+\s+(.+?)\s+Response', content)
-            for tradition in matches:
-                tradition = tradition.strip()
-                if tradition and tradition not in traditions:
-                    traditions[tradition] = True
-
-        except Exception as e:
-            continue
+    # Only new or changed tradition files are rescanned
+    conn = tradition_catalog.connect()
+    tradition_catalog.refresh(conn, ["*traditions*.txt", "*responses*.txt"])
+    traditions = tradition_catalog.all_traditions(conn)
+    conn.close()
 
-    return list(traditions.keys())
+    return traditions
 
 def main():
     if len(sys.argv) < 2:
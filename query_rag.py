@@ -5,210 +5,56 @@ RAG Query Interface for Philosophical Traditions
 Retrieves relevant philosophical responses using semantic search
 and synthesizes answers using Claude Sonnet 4.
 
+Retrieval and synthesis run in the warm daemon when it is up
+(python3 rag_daemon.py serve), otherwise in-process (rag_engine.py).
+
 Cost: ~$0.03 per query (embedding + Claude synthesis)
 """
 
-import os
-import sqlite3
-import numpy as np
-from openai import OpenAI
-from anthropic import Anthropic
-from dotenv import load_dotenv
+import time
 from typing import List, Dict
 import argparse
 
-load_dotenv()
-
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-anthropic_client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+# Thin client: numpy, the API SDKs and the index live in rag_engine,
+# loaded by the daemon (rag_daemon.py) or here only when it is absent
+import query_trace
+import rag_daemon
 
 # Configuration
-EMBEDDING_MODEL = "text-embedding-3-small"
-CLAUDE_MODEL = "claude-sonnet-4-20250514"
 DEFAULT_TOP_K = 8  # Number of chunks to retrieve
-
-def get_query_embedding(query: str) -> np.ndarray:
-    """Generate embedding for user query"""
-    try:
-        response = openai_client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=query
-        )
-        return np.array(response.data[0].embedding, dtype=np.float32)
-    except Exception as e:
-        print(f"❌ Error generating query embedding: {e}")
-        return None
-
-def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    """Calculate cosine similarity between two vectors"""
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-def retrieve_relevant_chunks(
-    query_embedding: np.ndarray,
-    db_path: str = 'philosophical_traditions.db',
-    top_k: int = DEFAULT_TOP_K,
-    traditions_filter: List[str] = None
-) -> List[Dict]:
-    """
-    Retrieve most relevant chunks using semantic search.
-
-    Args:
-        query_embedding: Query vector embedding
-        db_path: Path to SQLite database
-        top_k: Number of top chunks to retrieve
-        traditions_filter: Optional list of tradition names to filter by
-
-    Returns:
-        List of chunk dictionaries with metadata and similarity scores
-    """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Build query with optional tradition filter
-    query = """
-        SELECT
-            e.chunk_text, e.section_type, e.chunk_index, e.embedding,
-            r.full_text, r.id as response_id,
-            q.number as question_number, q.title as question_title,
-            t.name as tradition_name, t.id as tradition_id
-        FROM embeddings e
-        JOIN responses r ON e.response_id = r.id
-        JOIN questions q ON r.question_id = q.id
-        JOIN traditions t ON r.tradition_id = t.id
-    """
-
-    params = []
-    if traditions_filter:
-        placeholders = ','.join('?' * len(traditions_filter))
-        query += f" WHERE t.name IN ({placeholders})"
-        params = traditions_filter
-
-    cursor.execute(query, params)
-    all_chunks = cursor.fetchall()
-
-    if not all_chunks:
-        print("❌ No embeddings found in database!")
-        print("Run generate_embeddings.py first.")
-        return []
-
-    # Calculate similarities
-    chunks_with_scores = []
-    for row in all_chunks:
-        # Deserialize embedding from binary blob
-        stored_embedding = np.frombuffer(row[3], dtype=np.float32)
-
-        # Calculate similarity
-        similarity = cosine_similarity(query_embedding, stored_embedding)
-
-        chunks_with_scores.append({
-            'chunk_text': row[0],
-            'section_type': row[1],
-            'chunk_index': row[2],
-            'similarity': similarity,
-            'response_id': row[5],
-            'question_number': row[6],
-            'question_title': row[7],
-            'tradition_name': row[8],
-            'tradition_id': row[9]
-        })
-
-    conn.close()
-
-    # Sort by similarity and return top_k
-    chunks_with_scores.sort(key=lambda x: x['similarity'], reverse=True)
-    return chunks_with_scores[:top_k]
-
-def format_context_for_claude(chunks: List[Dict]) -> str:
-    """Format retrieved chunks into context for Claude"""
-    context_parts = []
-
-    for i, chunk in enumerate(chunks, 1):
-        context_parts.append(
-            f"**Source {i}: {chunk['tradition_name']} "
-            f"(Q{chunk['question_number']}, {chunk['section_type'].replace('_', ' ').title()}) "
-            f"[Relevance: {chunk['similarity']:.2f}]**\n\n"
-            f"{chunk['chunk_text']}\n"
-        )
-
-    return "\n---\n\n".join(context_parts)
-
-def synthesize_answer(query: str, context: str, chunks: List[Dict]) -> Dict:
-    """Use Claude to synthesize answer from retrieved context"""
-
-    # Get unique traditions mentioned
-    traditions = sorted(set(c['tradition_name'] for c in chunks))
-
-    prompt = f"""You are a philosophical research assistant. A user has asked the following question:
-
-**QUESTION**: {query}
-
-I have retrieved the most relevant passages from a database of philosophical responses across {len(traditions)} traditions. Please synthesize a comprehensive answer that:
-
-1. Directly addresses the user's question
-2. Draws on multiple philosophical perspectives from the sources
-3. Highlights key agreements and disagreements between traditions
-4. Uses specific concepts and arguments from the sources
-5. Maintains scholarly accuracy and nuance
-
-**RETRIEVED SOURCES**:
-
-{context}
-
-**SYNTHESIS GUIDELINES**:
-- Begin with a direct answer to the question
-- Reference specific traditions by name when presenting their views
-- Compare and contrast different approaches
-- Use technical terminology from the sources where appropriate
-- Keep the answer comprehensive but concise (~400-600 words)
-- End with a brief note on why these differences exist (e.g., different metaphysical assumptions)
-
-Please provide your synthesis now."""
-
-    try:
-        message = anthropic_client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=2000,
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        answer = message.content[0].text
-
-        # Estimate cost
-        input_tokens = len(prompt.split()) * 1.3
-        output_tokens = len(answer.split()) * 1.3
-        cost = (input_tokens / 1_000_000 * 3) + (output_tokens / 1_000_000 * 15)
-
-        return {
-            'answer': answer,
-            'cost': cost,
-            'input_tokens': int(input_tokens),
-            'output_tokens': int(output_tokens)
-        }
-
-    except Exception as e:
-        print(f"❌ Error synthesizing answer: {e}")
-        return None
+CONTEXT_WINDOW = 1  # Neighbouring sections added around each hit
+CONTEXT_TOKENS = 6000  # Token budget of the expanded context
+# None: the live generation of the philosophy-responses alias (index_alias.py)
+DB_PATH = None
 
 def query_rag_system(
     question: str,
-    db_path: str = 'philosophical_traditions.db',
+    db_path: str = DB_PATH,
     top_k: int = DEFAULT_TOP_K,
     traditions_filter: List[str] = None,
-    verbose: bool = True
+    verbose: bool = True,
+    window: int = CONTEXT_WINDOW,
+    context_tokens: int = CONTEXT_TOKENS,
+    use_daemon: bool = True
 ) -> Dict:
     """
     Complete RAG query pipeline.
 
     Args:
         question: User's philosophical question
-        db_path: Path to SQLite database
+        db_path: Path to SQLite database (None: the philosophy-responses alias)
         top_k: Number of relevant chunks to retrieve
         traditions_filter: Optional list of traditions to filter by
         verbose: Print detailed progress information
+        window: Neighbouring chunks (by chunk_index) added around each hit
+        context_tokens: Token budget of the expanded context
+        use_daemon: Use rag_daemon.py when it is running
 
     Returns:
-        Dictionary with answer, sources, and metadata
+        Dictionary with answer, sources, metadata and 'trace' (stage timings)
     """
+    trace = query_trace.start('query_rag', question=question, top_k=top_k, window=window,
+                              traditions=traditions_filter)
     if verbose:
         print("="*80)
         print("RAG QUERY SYSTEM")
@@ -219,49 +65,52 @@ def query_rag_system(
             print(f"Filtered to traditions: {', '.join(traditions_filter)}")
         print()
 
-    # Step 1: Generate query embedding
-    if verbose:
-        print("🔍 Generating query embedding...", end=' ')
-
-    query_embedding = get_query_embedding(question)
-    if query_embedding is None:
-        return None
-
-    if verbose:
-        print("✅")
-
-    # Step 2: Retrieve relevant chunks
+    # Steps 1-3: Embed the question, retrieve chunks, add neighbouring sections
     if verbose:
         print("📚 Retrieving relevant passages...", end=' ')
 
-    chunks = retrieve_relevant_chunks(
-        query_embedding,
-        db_path=db_path,
-        top_k=top_k,
-        traditions_filter=traditions_filter
-    )
+    client = rag_daemon.Client(use_daemon)
+    started = time.perf_counter()
+    try:
+        with query_trace.stage('retrieve'):
+            chunks = client.retrieve(
+                question,
+                db_path=db_path,
+                top_k=top_k,
+                traditions=traditions_filter,
+                window=window,
+                context_tokens=context_tokens
+            )
+    except Exception as e:
+        print(f"❌ Error retrieving passages: {e}")
+        return None
 
     if not chunks:
+        print("❌ No matching passages found")
         return None
 
     if verbose:
-        print(f"✅ Found {len(chunks)} chunks")
+        print(f"✅ Found {len(chunks)} chunks ({client.via}, {(time.perf_counter() - started) * 1000:.0f} ms)")
         print(f"\nTop sources:")
         for i, chunk in enumerate(chunks[:5], 1):
             print(f"  {i}. {chunk['tradition_name']} "
                   f"({chunk['section_type'].replace('_', ' ').title()}) "
-                  f"- Similarity: {chunk['similarity']:.3f}")
+                  f"- Similarity: {chunk['similarity']:.3f}"
+                  + (f" (+{len(chunk['duplicates'])} near-duplicates)" if chunk.get('duplicates') else ""))
 
-    # Step 3: Format context
-    context = format_context_for_claude(chunks)
+    if verbose and window > 0:
+        sections = sum(len(c['context_indexes']) or 1 for c in chunks)
+        print(f"\n📎 Context: {len(chunks)} passages covering {sections} sections")
 
     # Step 4: Synthesize answer with Claude
     if verbose:
         print("\n🤖 Synthesizing answer with Claude Sonnet 4...", end=' ')
 
-    result = synthesize_answer(question, context, chunks)
-
-    if result is None:
+    try:
+        with query_trace.stage('synthesize'):
+            result = client.synthesize(question, chunks)
+    except Exception as e:
+        print(f"❌ Error synthesizing answer: {e}")
         return None
 
     if verbose:
@@ -284,7 +133,8 @@ def query_rag_system(
         'traditions': sorted(set(c['tradition_name'] for c in chunks)),
         'cost': result['cost'],
         'input_tokens': result['input_tokens'],
-        'output_tokens': result['output_tokens']
+        'output_tokens': result['output_tokens'],
+        'trace': trace.finish(via=client.via, cost=result['cost'])
     }
 
 def main():
@@ -312,36 +162,76 @@ def main():
     parser.add_argument(
         '--db',
         type=str,
-        default='philosophical_traditions.db',
-        help='Path to database (default: philosophical_traditions.db)'
+        default=DB_PATH,
+        help='Path to database (default: the philosophy-responses alias, else philosophical_traditions.db)'
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=CONTEXT_WINDOW,
+        help=f'Neighbouring sections added around each hit (default: {CONTEXT_WINDOW}, 0 disables)'
+    )
+    parser.add_argument(
+        '--context-tokens',
+        type=int,
+        default=CONTEXT_TOKENS,
+        help=f'Token budget of the expanded context (default: {CONTEXT_TOKENS})'
+    )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Run in-process even if rag_daemon.py is running'
     )
     parser.add_argument(
         '--quiet',
         action='store_true',
         help='Only print the answer, no metadata'
     )
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='Print the per-stage latency breakdown'
+    )
+    parser.add_argument(
+        '--trace',
+        nargs='?',
+        const=query_trace.TRACE_LOG,
+        metavar='LOG',
+        help=f'Append the JSON trace of this query to LOG (default: {query_trace.TRACE_LOG})'
+    )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='cprofile',
+        choices=query_trace.PROFILERS,
+        help='Profile the query in-process (cprofile, or pyinstrument if installed); report on stderr'
+    )
+    parser.add_argument(
+        '--profile-output',
+        metavar='PATH',
+        help='Also save the profile (.prof for cprofile, .html for pyinstrument)'
+    )
 
     args = parser.parse_args()
 
-    # Check for API keys
-    if not os.getenv('OPENAI_API_KEY'):
-        print("❌ Error: OPENAI_API_KEY not found")
-        print("Add to .env file: OPENAI_API_KEY=your_key_here")
-        return
+    # Run query (a profile is only meaningful in-process)
+    def run():
+        return query_rag_system(
+            question=args.question,
+            db_path=args.db,
+            top_k=args.top_k,
+            traditions_filter=args.traditions,
+            verbose=not args.quiet,
+            window=args.window,
+            context_tokens=args.context_tokens,
+            use_daemon=not (args.no_daemon or args.profile)
+        )
 
-    if not os.getenv('ANTHROPIC_API_KEY'):
-        print("❌ Error: ANTHROPIC_API_KEY not found")
-        print("Add to .env file: ANTHROPIC_API_KEY=your_key_here")
-        return
-
-    # Run query
-    result = query_rag_system(
-        question=args.question,
-        db_path=args.db,
-        top_k=args.top_k,
-        traditions_filter=args.traditions,
-        verbose=not args.quiet
-    )
+    if args.profile:
+        with query_trace.profiled(args.profile, args.profile_output):
+            result = run()
+    else:
+        result = run()
 
     if result is None:
         print("❌ Query failed")
@@ -349,6 +239,11 @@ def main():
 
     if args.quiet:
         print(result['answer'])
+    if args.timings:
+        print()
+        query_trace.print_breakdown(result['trace'])
+    if args.trace:
+        query_trace.append(result['trace'], args.trace)
 
 if __name__ == '__main__':
     main()
@@ -7,98 +7,23 @@ then prints them for manual synthesis with Claude Code.
 
 This version doesn't use the Anthropic API, so it works
 with Claude Code Max subscription instead.
+
+Retrieval runs in the warm daemon when it is up
+(python3 rag_daemon.py serve), otherwise in-process (rag_engine.py).
 """
 
-import os
-import sqlite3
-import numpy as np
-from openai import OpenAI
-from dotenv import load_dotenv
+import time
 from typing import List, Dict
 import argparse
 
-load_dotenv()
-
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Cliente ligero: numpy, OpenAI y el índice viven en rag_engine, cargados
+# por el daemon (rag_daemon.py) o aquí solo cuando no está corriendo
+import query_trace
+import rag_daemon
 
-EMBEDDING_MODEL = "text-embedding-3-small"
 DEFAULT_TOP_K = 8
-
-def get_query_embedding(query: str) -> np.ndarray:
-    """Generate embedding for user query"""
-    try:
-        response = openai_client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=query
-        )
-        return np.array(response.data[0].embedding, dtype=np.float32)
-    except Exception as e:
-        print(f"❌ Error generating query embedding: {e}")
-        return None
-
-def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    """Calculate cosine similarity between two vectors"""
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-def retrieve_relevant_chunks(
-    query_embedding: np.ndarray,
-    db_path: str = 'philosophical_traditions_sample.db',
-    top_k: int = DEFAULT_TOP_K,
-    traditions_filter: List[str] = None
-) -> List[Dict]:
-    """Retrieve most relevant chunks using semantic search"""
-
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    query = """
-        SELECT
-            e.chunk_text, e.section_type, e.chunk_index, e.embedding,
-            r.full_text, r.id as response_id,
-            q.number as question_number, q.title as question_title,
-            t.name as tradition_name, t.id as tradition_id
-        FROM embeddings e
-        JOIN responses r ON e.response_id = r.id
-        JOIN questions q ON r.question_id = q.id
-        JOIN traditions t ON r.tradition_id = t.id
-    """
-
-    params = []
-    if traditions_filter:
-        placeholders = ','.join('?' * len(traditions_filter))
-        query += f" WHERE t.name IN ({placeholders})"
-        params = traditions_filter
-
-    cursor.execute(query, params)
-    all_chunks = cursor.fetchall()
-
-    if not all_chunks:
-        print("❌ No embeddings found in database!")
-        return []
-
-    # Calculate similarities
-    chunks_with_scores = []
-    for row in all_chunks:
-        stored_embedding = np.frombuffer(row[3], dtype=np.float32)
-        similarity = cosine_similarity(query_embedding, stored_embedding)
-
-        chunks_with_scores.append({
-            'chunk_text': row[0],
-            'section_type': row[1],
-            'chunk_index': row[2],
-            'similarity': similarity,
-            'response_id': row[5],
-            'question_number': row[6],
-            'question_title': row[7],
-            'tradition_name': row[8],
-            'tradition_id': row[9]
-        })
-
-    conn.close()
-
-    # Sort by similarity and return top_k
-    chunks_with_scores.sort(key=lambda x: x['similarity'], reverse=True)
-    return chunks_with_scores[:top_k]
+CONTEXT_WINDOW = 1  # Secciones vecinas añadidas a cada resultado
+CONTEXT_TOKENS = 6000  # Presupuesto de tokens del contexto ampliado
 
 def format_context_for_display(chunks: List[Dict]) -> str:
     """Format retrieved chunks for display"""
@@ -118,12 +43,17 @@ def query_rag_retrieval(
     question: str,
     db_path: str = 'philosophical_traditions_sample.db',
     top_k: int = DEFAULT_TOP_K,
-    traditions_filter: List[str] = None
+    traditions_filter: List[str] = None,
+    window: int = CONTEXT_WINDOW,
+    context_tokens: int = CONTEXT_TOKENS,
+    use_daemon: bool = True
 ):
     """
     RAG retrieval without synthesis.
     Prints context for manual synthesis with Claude Code.
     """
+    trace = query_trace.start('query_rag_manual', question=question, top_k=top_k, window=window,
+                              traditions=traditions_filter)
 
     print("="*80)
     print("RAG QUERY SYSTEM (Manual Synthesis)")
@@ -134,26 +64,33 @@ def query_rag_retrieval(
         print(f"Filtrado a tradiciones: {', '.join(traditions_filter)}")
     print()
 
-    # Step 1: Generate query embedding
-    print("🔍 Generando embedding de la pregunta...", end=' ')
-    query_embedding = get_query_embedding(question)
-    if query_embedding is None:
-        return None
-    print("✅")
-
-    # Step 2: Retrieve relevant chunks
+    # Pasos 1-2: embedding de la pregunta, búsqueda y secciones vecinas
     print("📚 Buscando pasajes relevantes...", end=' ')
-    chunks = retrieve_relevant_chunks(
-        query_embedding,
-        db_path=db_path,
-        top_k=top_k,
-        traditions_filter=traditions_filter
-    )
+    client = rag_daemon.Client(use_daemon)
+    started = time.perf_counter()
+    try:
+        with query_trace.stage('retrieve'):
+            chunks = client.retrieve(
+                question,
+                db_path=db_path,
+                top_k=top_k,
+                traditions=traditions_filter,
+                window=window,
+                context_tokens=context_tokens,
+                dedup=False
+            )
+    except Exception as e:
+        print(f"❌ Error en la búsqueda: {e}")
+        return None
 
     if not chunks:
+        print("❌ No se encontraron pasajes")
         return None
 
-    print(f"✅ Encontrados {len(chunks)} chunks")
+    print(f"✅ Encontrados {len(chunks)} chunks ({client.via}, {(time.perf_counter() - started) * 1000:.0f} ms)")
+    if window > 0:
+        sections = sum(len(c['context_indexes']) or 1 for c in chunks)
+        print(f"📎 Contexto: {len(chunks)} pasajes con {sections} secciones")
 
     # Step 3: Display results
     print("\n" + "="*80)
@@ -169,7 +106,8 @@ def query_rag_retrieval(
     print("CONTEXTO COMPLETO PARA SÍNTESIS:")
     print("="*80)
 
-    context = format_context_for_display(chunks)
+    with query_trace.stage('format'):
+        context = format_context_for_display(chunks)
     print(context)
 
     print("\n" + "="*80)
@@ -203,7 +141,8 @@ Responde de manera estructurada y comprehensiva (~400-600 palabras)."""
         'chunks': chunks,
         'traditions': traditions,
         'context': context,
-        'prompt': prompt
+        'prompt': prompt,
+        'trace': trace.finish(via=client.via)
     }
 
 def main():
@@ -234,25 +173,77 @@ def main():
         default='philosophical_traditions_sample.db',
         help='Path a la base de datos'
     )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=CONTEXT_WINDOW,
+        help=f'Secciones vecinas por resultado (default: {CONTEXT_WINDOW}, 0 desactiva)'
+    )
+    parser.add_argument(
+        '--context-tokens',
+        type=int,
+        default=CONTEXT_TOKENS,
+        help=f'Presupuesto de tokens del contexto (default: {CONTEXT_TOKENS})'
+    )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='Ejecutar en este proceso aunque rag_daemon.py esté corriendo'
+    )
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='Mostrar el desglose de latencia por etapa'
+    )
+    parser.add_argument(
+        '--trace',
+        nargs='?',
+        const=query_trace.TRACE_LOG,
+        metavar='LOG',
+        help=f'Añadir la traza JSON de la consulta a LOG (default: {query_trace.TRACE_LOG})'
+    )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='cprofile',
+        choices=query_trace.PROFILERS,
+        help='Perfilar la consulta en este proceso (cprofile, o pyinstrument si está instalado)'
+    )
+    parser.add_argument(
+        '--profile-output',
+        metavar='PATH',
+        help='Guardar también el perfil (.prof con cprofile, .html con pyinstrument)'
+    )
 
     args = parser.parse_args()
 
-    # Check for OpenAI API key
-    if not os.getenv('OPENAI_API_KEY'):
-        print("❌ Error: OPENAI_API_KEY not found")
-        print("Add to .env file: OPENAI_API_KEY=your_key_here")
-        return
+    # Run retrieval (un perfil solo tiene sentido en este proceso)
+    def run():
+        return query_rag_retrieval(
+            question=args.question,
+            db_path=args.db,
+            top_k=args.top_k,
+            traditions_filter=args.traditions,
+            window=args.window,
+            context_tokens=args.context_tokens,
+            use_daemon=not (args.no_daemon or args.profile)
+        )
 
-    # Run retrieval
-    result = query_rag_retrieval(
-        question=args.question,
-        db_path=args.db,
-        top_k=args.top_k,
-        traditions_filter=args.traditions
-    )
+    if args.profile:
+        with query_trace.profiled(args.profile, args.profile_output):
+            result = run()
+    else:
+        result = run()
 
     if result is None:
         print("❌ Query failed")
+        return
+
+    if args.timings:
+        print()
+        query_trace.print_breakdown(result['trace'])
+    if args.trace:
+        query_trace.append(result['trace'], args.trace)
 
 if __name__ == '__main__':
     main()
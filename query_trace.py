@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing traces for the query path (query_rag.py,
+query_rag_manual.py, streamlit_app.py, rag_engine.py).
+
+A Trace is a tree of timed stages. Code on the query path marks its
+stages with the module-level stage(), which records into the trace
+active in the current context and costs nothing when there is none:
+
+    trace = query_trace.start('query_rag', question=question)
+    with query_trace.stage('retrieve'):
+        with query_trace.stage('embed'):
+            ...
+            query_trace.note(cache_hits=1)
+    record = trace.finish(cost=0.03)
+    query_trace.print_breakdown(record)
+    query_trace.append(record)            # one JSON line in TRACE_LOG
+
+Stages timed in the retrieval daemon travel back with its reply and are
+grafted under the client's own stage, so a trace covers both processes.
+profiled() wraps a block in cProfile, or pyinstrument when installed.
+
+Usage:
+    python3 query_trace.py summary [LOG] [--last 100] [--script query_rag]
+    python3 query_trace.py show [LOG] [--last 1]
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+TRACE_LOG = "query_traces.jsonl"
+PROFILERS = ('cprofile', 'pyinstrument')
+
+_current = contextvars.ContextVar('query_trace', default=None)
+
+
+class Trace:
+    """Nested stage timings of one query."""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.root = {'name': name, 'ms': 0.0, 'children': []}
+        self._stack = [self.root]
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        node = {'name': name, 'ms': 0.0, **attrs, 'children': []}
+        self._stack[-1]['children'].append(node)
+        self._stack.append(node)
+        started = time.perf_counter()
+        try:
+            yield node
+        finally:
+            node['ms'] = (time.perf_counter() - started) * 1000
+            self._stack.pop()
+
+    def note(self, **attrs):
+        """Attach attributes (cache hits, row counts...) to the current stage."""
+        self._stack[-1].update(attrs)
+
+    def graft(self, nodes):
+        """Add stages recorded elsewhere (the daemon) under the current stage."""
+        self._stack[-1]['children'].extend(nodes)
+
+    def finish(self, **attrs):
+        """The trace as a JSON-able record."""
+        self.root['ms'] = (time.perf_counter() - self._started) * 1000
+        return {
+            'ts': self.started_at, 'script': self.name, **self.attrs, **attrs,
+            'total_ms': self.root['ms'], 'stages': self.root['children'],
+        }
+
+
+def start(name, **attrs):
+    """Start a trace and make it the active one for this context."""
+    trace = Trace(name, **attrs)
+    _current.set(trace)
+    return trace
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def activate(trace):
+    """Make trace the active one inside the block (e.g. per daemon request)."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name, **attrs):
+    """A timed stage of the active trace (a no-op without one)."""
+    trace = _current.get()
+    if trace is None:
+        yield None
+        return
+    with trace.stage(name, **attrs) as node:
+        yield node
+
+
+def note(**attrs):
+    trace = _current.get()
+    if trace is not None:
+        trace.note(**attrs)
+
+
+def flatten(stages, prefix=''):
+    """{'retrieve/embed/openai': ms, ...} for a stage tree."""
+    flat = {}
+    for node in stages:
+        path = f"{prefix}{node['name']}"
+        flat[path] = flat.get(path, 0.0) + node['ms']
+        flat.update(flatten(node['children'], f"{path}/"))
+    return flat
+
+
+def print_breakdown(record, file=None):
+    """Indented stage tree with ms and share of the total."""
+    file = file or sys.stdout
+    total = record['total_ms'] or 1
+    print(f"⏱️  {record['total_ms']:.1f} ms total", file=file)
+
+    def show(nodes, depth):
+        for node in nodes:
+            notes = ', '.join(f"{key}={value}" for key, value in node.items()
+                              if key not in ('name', 'ms', 'children'))
+            print(f"   {'  ' * depth}{node['name']:<{24 - 2 * depth}} {node['ms']:9.1f} ms "
+                  f"{node['ms'] / total:6.1%}" + (f"  ({notes})" if notes else ''), file=file)
+            show(node['children'], depth + 1)
+
+    show(record['stages'], 0)
+
+
+def append(record, log_path=TRACE_LOG):
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+def read(log_path=TRACE_LOG, last=None, script=None):
+    """Logged traces, oldest first ([] before the first one is written)."""
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if script:
+        records = [record for record in records if record.get('script') == script]
+    return records[-last:] if last else records
+
+
+@contextmanager
+def profiled(kind='cprofile', output=None):
+    """Profile the block; print the report to stderr (and save a .prof
+    / .html to output when given)."""
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise SystemExit("❌ pyinstrument is not installed (pip install pyinstrument), use --profile cprofile")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            print(profiler.output_text(unicode=True, color=False), file=sys.stderr)
+            if output:
+                with open(output, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+        return
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+        if output:
+            profiler.dump_stats(output)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query latency traces')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('summary', 'p50/p95 per stage across traces'), ('show', 'stage trees of traces')):
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument('log', nargs='?', default=TRACE_LOG)
+        p.add_argument('--last', type=int, default=100 if command == 'summary' else 1)
+        p.add_argument('--script', help='only traces of this script (query_rag, query_rag_manual, streamlit_app)')
+    args = parser.parse_args()
+
+    records = read(args.log, args.last, args.script)
+    if not records:
+        print(f"⚪ No traces in {args.log}")
+        return
+    if args.command == 'show':
+        for record in records:
+            print(f"\n🔎 {record['script']}: {record.get('question', '')[:80]}")
+            print_breakdown(record)
+        return
+
+    stages = {}
+    for record in records:
+        for path, ms in {'total': record['total_ms'], **flatten(record['stages'])}.items():
+            stages.setdefault(path, []).append(ms)
+    print(f"📊 {len(records)} traces from {args.log}")
+    print(f"   {'stage':<40} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    for path, values in sorted(stages.items(), key=lambda item: item[0] != 'total'):
+        print(f"   {path:<40} {len(values):>5} {percentile(values, 0.5):9.1f} "
+              f"{percentile(values, 0.95):9.1f} {sum(values) / len(values):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
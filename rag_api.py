@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Local asyncio HTTP API over the philosophy RAG engine.
+
+    POST /search      {"question": ..., "top_k": 8, "traditions": [...], "db_path": ...,
+                       "window": 1, "context_tokens": 6000, "dedup": true}
+                      -> {"chunks": [...]}
+    POST /synthesize  {"question": ..., "chunks": [...]}   (or the /search fields)
+                      -> NDJSON stream: sources, text..., done
+    GET  /health      engine and API counters
+
+Searches that arrive within BATCH_WINDOW_MS of each other are coalesced
+into one batch. The batch makes one OpenAI embedding call for all of
+its questions, then one matrix product per database
+(rag_engine.Engine.retrieve_many). Under concurrent load, embedding
+calls and scoring work per query drop with the batch size. /health
+reports the counts.
+
+Backpressure: beyond MAX_IN_FLIGHT open requests the API answers 503
+with Retry-After instead of queueing without bound, and at most
+SYNTHESIS_CONCURRENCY Claude streams run at once. Streamed text goes
+through a bounded queue drained at the client's pace, so a slow reader
+slows the Claude stream rather than piling text up in memory.
+
+Every response carries a Server-Timing header with the stages (queue,
+embed, score, expand, total) plus X-Batch-Size. The stream's done
+event adds the synthesis time.
+
+Usage:
+    python3 rag_api.py serve [--port 8765] [--batch-window-ms 5] [--preload DB ...]
+    python3 rag_api.py bench "question" [--concurrency 32] [--requests 256]
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import rag_engine
+
+HOST = '127.0.0.1'
+PORT = 8765
+BATCH_WINDOW_MS = 5
+MAX_BATCH = 64
+MAX_IN_FLIGHT = 256
+SYNTHESIS_CONCURRENCY = 4
+STREAM_BUFFER = 64          # text pieces buffered between Claude and a slow client
+MAX_BODY = 4 * 1024 * 1024
+IDLE_TIMEOUT = 30           # seconds a keep-alive connection may sit idle
+SEARCH_FIELDS = {'question', 'db_path', 'top_k', 'traditions', 'window', 'context_tokens', 'dedup'}
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def server_timing(timings):
+    return ', '.join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+
+
+class Batcher:
+    """Coalesces concurrent searches into Engine.retrieve_many batches."""
+
+    def __init__(self, engine, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self.engine = engine
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.pending = []
+        self.running = set()    # batch tasks, referenced until done so they are not collected
+        self.timer = None
+        self.batches = 0
+        self.batched = 0
+
+    async def retrieve(self, params):
+        """(chunks, timings, batch size) for one search, run as part of the current batch."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((params, future, time.perf_counter()))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        self.batches += 1
+        self.batched += len(batch)
+        timings = {}
+        try:
+            results = await asyncio.to_thread(self.engine.retrieve_many, [params for params, _, _ in batch], timings)
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future, enqueued), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result((result, {'queue': (started - enqueued) * 1000, **timings}, len(batch)))
+
+
+class API:
+    def __init__(self, engine, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH,
+                 max_in_flight=MAX_IN_FLIGHT, synthesis_concurrency=SYNTHESIS_CONCURRENCY):
+        self.engine = engine
+        self.batcher = Batcher(engine, window_ms, max_batch)
+        self.max_in_flight = max_in_flight
+        self.synthesis_slots = asyncio.Semaphore(synthesis_concurrency)
+        self.in_flight = 0
+        self.rejected = 0
+
+    # --- HTTP plumbing ----------------------------------------------------
+
+    async def handle(self, reader, writer):
+        """One connection: requests until the client closes (keep-alive)."""
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    await self.send_json(writer, 413, {'error': f"Body over {MAX_BODY} bytes"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self.dispatch(method, target.split('?')[0], body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def head(self, status, headers):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def send_json(self, writer, status, payload, headers=None, close=False):
+        body = json.dumps(payload).encode()
+        writer.write(self.head(status, {
+            'Content-Type': 'application/json', 'Content-Length': len(body),
+            'Connection': 'close' if close else 'keep-alive', **(headers or {})}) + body)
+        await writer.drain()
+
+    async def dispatch(self, method, path, body, writer, keep_alive):
+        routes = {('GET', '/health'): self.health, ('POST', '/search'): self.search,
+                  ('POST', '/synthesize'): self.synthesize}
+        started = time.perf_counter()
+        try:
+            if (method, path) not in routes:
+                known = any(route_path == path for _, route_path in routes)
+                raise HTTPError(405 if known else 404, f"No route for {method} {path}")
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise HTTPError(503, 'Too many requests in flight', {'Retry-After': 1})
+            self.in_flight += 1
+            try:
+                params = json.loads(body or b'{}')
+                if not isinstance(params, dict):
+                    raise HTTPError(400, 'Body must be a JSON object')
+                await routes[(method, path)](params, writer, started, keep_alive)
+            finally:
+                self.in_flight -= 1
+        except HTTPError as e:
+            await self.send_json(writer, e.status, {'error': str(e)}, e.headers, close=not keep_alive)
+        except json.JSONDecodeError as e:
+            await self.send_json(writer, 400, {'error': f"Invalid JSON: {e}"}, close=not keep_alive)
+        except (FileNotFoundError, LookupError, ValueError, TypeError) as e:
+            await self.send_json(writer, 400, {'error': f"{type(e).__name__}: {e}"}, close=not keep_alive)
+        except Exception as e:
+            await self.send_json(writer, 500, {'error': f"{type(e).__name__}: {e}"}, close=not keep_alive)
+
+    # --- routes -----------------------------------------------------------
+
+    async def retrieve(self, params):
+        unknown = set(params) - SEARCH_FIELDS
+        if unknown:
+            raise HTTPError(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+        # Checked here so a malformed request never joins (or fails) a batch
+        try:
+            rag_engine.check_request(params)
+        except TypeError as e:
+            raise HTTPError(400, str(e))
+        return await self.batcher.retrieve(params)
+
+    async def health(self, params, writer, started, keep_alive):
+        status = self.engine.status()
+        status.update(in_flight=self.in_flight, rejected=self.rejected, batches=self.batcher.batches,
+                      batched_queries=self.batcher.batched)
+        await self.send_json(writer, 200, status, close=not keep_alive)
+
+    async def search(self, params, writer, started, keep_alive):
+        chunks, timings, batch_size = await self.retrieve(params)
+        timings['total'] = (time.perf_counter() - started) * 1000
+        await self.send_json(writer, 200, {'chunks': chunks}, {
+            'Server-Timing': server_timing(timings), 'X-Batch-Size': batch_size}, close=not keep_alive)
+
+    async def synthesize(self, params, writer, started, keep_alive):
+        chunks = params.pop('chunks', None)
+        timings, batch_size = {}, 0
+        if chunks is None:
+            chunks, timings, batch_size = await self.retrieve(params)
+        elif not isinstance(params.get('question'), str):
+            raise HTTPError(400, "'question' is required")
+
+        async with self.synthesis_slots:
+            timings['total'] = (time.perf_counter() - started) * 1000
+            writer.write(self.head(200, {
+                'Content-Type': 'application/x-ndjson', 'Transfer-Encoding': 'chunked',
+                'Connection': 'keep-alive' if keep_alive else 'close',
+                'Server-Timing': server_timing(timings), 'X-Batch-Size': batch_size}))
+
+            async def send(event):
+                data = (json.dumps(event) + '\n').encode()
+                writer.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                await writer.drain()
+
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue(STREAM_BUFFER)
+            stop = threading.Event()
+
+            def produce():
+                # Runs in a worker thread; blocks while the queue is full
+                events = self.engine.synthesize_stream(params['question'], chunks)
+                try:
+                    for event in events:
+                        if stop.is_set():
+                            break
+                        asyncio.run_coroutine_threadsafe(queue.put(event), loop).result()
+                except Exception as e:
+                    asyncio.run_coroutine_threadsafe(queue.put(('error', f"{type(e).__name__}: {e}")), loop).result()
+                finally:
+                    events.close()
+
+            synthesis_started = time.perf_counter()
+            producer = loop.run_in_executor(None, produce)
+            try:
+                await send({'event': 'sources', 'chunks': chunks})
+                while True:
+                    kind, value = await queue.get()
+                    if kind == 'text':
+                        await send({'event': 'text', 'text': value})
+                        continue
+                    if kind == 'done':
+                        timings['synthesize'] = (time.perf_counter() - synthesis_started) * 1000
+                        timings['total'] = (time.perf_counter() - started) * 1000
+                        await send({'event': 'done', **value, 'timings': timings})
+                    else:
+                        await send({'event': 'error', 'error': value})
+                    break
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+            finally:
+                # A client gone mid-stream: let the producer see stop and end the Claude stream
+                stop.set()
+                while not producer.done():
+                    while not queue.empty():
+                        queue.get_nowait()
+                    await asyncio.sleep(0.01)
+
+
+async def serve(host=HOST, port=PORT, preload=(), **options):
+    engine = rag_engine.Engine()
+    for db_path in preload:
+        index = engine.index(engine.resolve_db(db_path or None))
+        print(f"📚 {index.db_path}: {len(index):,} chunks")
+    api = API(engine, **options)
+    server = await asyncio.start_server(api.handle, host, port)
+    print(f"🟢 Listening on http://{host}:{port} (batch window {api.batcher.window * 1000:.0f} ms)")
+    async with server:
+        await server.serve_forever()
+
+
+def bench(question, host=HOST, port=PORT, concurrency=32, requests=256):
+    """Fire requests concurrent /search calls and report latency and batching."""
+    import http.client
+    from concurrent.futures import ThreadPoolExecutor
+
+    def get(path, body=None):
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        conn.request('POST' if body else 'GET', path, json.dumps(body) if body else None)
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        conn.close()
+        return response.status, payload
+
+    before = get('/health')[1]
+
+    run = time.time_ns()
+
+    def one(i):
+        # Distinct questions, so the embedding LRU does not hide the batching
+        started = time.perf_counter()
+        status, _ = get('/search', {'question': f"{question} [{run}-{i}]", 'window': 0})
+        return status, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    after = get('/health')[1]
+
+    latencies = sorted(ms for status, ms in results if status == 200)
+    delta = {key: after[key] - before[key] for key in ('embedding_calls', 'scoring_passes', 'batches',
+                                                      'batched_queries', 'rejected')}
+    print(f"⏱️  {len(latencies)}/{requests} ok in {elapsed:.2f}s ({requests / elapsed:.0f} req/s), "
+          f"p50 {latencies[len(latencies) // 2]:.0f} ms, p95 {latencies[int(len(latencies) * 0.95)]:.0f} ms")
+    print(f"   {delta['batches']} batches (mean {delta['batched_queries'] / max(delta['batches'], 1):.1f} queries), "
+          f"{delta['embedding_calls']} embedding calls, {delta['scoring_passes']} scoring passes, "
+          f"{delta['rejected']} rejected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Async HTTP API for the philosophy RAG')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve')
+    p.add_argument('--batch-window-ms', type=float, default=BATCH_WINDOW_MS)
+    p.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    p.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT)
+    p.add_argument('--synthesis-concurrency', type=int, default=SYNTHESIS_CONCURRENCY)
+    p.add_argument('--preload', nargs='*', metavar='DB', default=[],
+                   help="databases to load before listening ('' for the philosophy-responses alias)")
+    p = sub.add_parser('bench', help='concurrent /search load against a running server')
+    p.add_argument('question')
+    p.add_argument('--concurrency', type=int, default=32)
+    p.add_argument('--requests', type=int, default=256)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        bench(args.question, args.host, args.port, args.concurrency, args.requests)
+        return
+    try:
+        asyncio.run(serve(args.host, args.port, args.preload, window_ms=args.batch_window_ms,
+                          max_batch=args.max_batch, max_in_flight=args.max_in_flight,
+                          synthesis_concurrency=args.synthesis_concurrency))
+    except KeyboardInterrupt:
+        print("🛑 Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Long-running retrieval daemon for query_rag.py and query_rag_manual.py.
+
+Scripted research runs call the CLIs hundreds of times. Each run used to
+import numpy and both API SDKs, open new HTTPS connections, and reload
+every embedding from SQLite. The daemon keeps one rag_engine.Engine warm
+(clients, per-database matrices, query-embedding LRU) and answers on a
+Unix socket, one JSON line in and one JSON line out:
+
+    {"op": "retrieve", "params": {"question": "...", "top_k": 8}}
+    {"ok": true, "result": [...], "ms": 3.1}
+
+Client() is the CLIs' side of this. It imports only the standard
+library, sends each op to the daemon when one is listening, and
+otherwise runs it on an in-process Engine. The daemon is optional:
+everything works without it, only slower.
+
+Requests are served by a fixed pool of threads, so each worker's SQLite
+and rate-limiter connections stay open between requests.
+
+Usage:
+    python3 rag_daemon.py serve [--workers 8] [--preload DB ...]
+    python3 rag_daemon.py status
+    python3 rag_daemon.py stop
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+
+import query_trace
+
+SOCKET_PATH = os.getenv('RAG_DAEMON_SOCKET', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.rag_daemon.sock'))
+WORKERS = 8
+CONNECT_TIMEOUT = 0.05      # seconds; an absent daemon must not slow the CLI down
+OPS = ('retrieve', 'synthesize', 'status')
+
+_engine = None
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+def request(op, socket_path=SOCKET_PATH, **params):
+    """Result of op from the daemon, or None when no daemon is listening."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    with sock, query_trace.stage('daemon', op=op):
+        sock.settimeout(None)
+        sock.sendall(json.dumps({'op': op, 'params': params}).encode() + b'\n')
+        reply = sock.makefile('rb').readline()
+        if not reply:
+            raise DaemonError(f"Daemon closed the connection during {op}")
+        response = json.loads(reply)
+        # Stages the daemon timed for this request, under ours
+        trace = query_trace.current()
+        if trace is not None and response.get('trace'):
+            trace.graft(response['trace'])
+    if not response['ok']:
+        raise DaemonError(response['error'])
+    return response['result']
+
+
+def local_engine():
+    """This process's Engine, for when there is no daemon."""
+    global _engine
+    if _engine is None:
+        import rag_engine
+        _engine = rag_engine.Engine()
+    return _engine
+
+
+class Client:
+    """Engine ops through the daemon when it is running, in-process otherwise."""
+
+    def __init__(self, use_daemon=True, socket_path=SOCKET_PATH):
+        self.use_daemon = use_daemon
+        self.socket_path = socket_path
+        self.via = None
+
+    def call(self, op, **params):
+        if self.use_daemon and self.via != 'in-process':
+            result = request(op, self.socket_path, **params)
+            if result is not None:
+                self.via = 'daemon'
+                return result
+        self.via = 'in-process'
+        return getattr(local_engine(), op)(**params)
+
+    def retrieve(self, question, **params):
+        return self.call('retrieve', question=question, **params)
+
+    def synthesize(self, question, chunks):
+        return self.call('synthesize', question=question, chunks=chunks)
+
+
+def serve(socket_path=SOCKET_PATH, workers=WORKERS, preload=()):
+    """Answer engine ops on socket_path until stopped."""
+    import socketserver
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = local_engine()
+    for db_path in preload:
+        started = time.time()
+        index = engine.index(engine.resolve_db(db_path or None))
+        print(f"📚 {index.db_path}: {len(index):,} chunks ({time.time() - started:.1f}s)")
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            started = time.perf_counter()
+            trace = query_trace.Trace('rag_daemon')
+            try:
+                message = json.loads(self.rfile.readline())
+                op = message['op']
+                if op == 'stop':
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    result = {'stopping': True}
+                elif op in OPS:
+                    with query_trace.activate(trace):
+                        result = getattr(engine, op)(**message.get('params', {}))
+                else:
+                    raise ValueError(f"Unknown op {op!r} (ops: {', '.join(OPS + ('stop',))})")
+                response = {'ok': True, 'result': result}
+            except Exception as e:
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            response['ms'] = (time.perf_counter() - started) * 1000
+            response['trace'] = trace.finish()['stages']
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+
+    class Server(socketserver.UnixStreamServer):
+        pool = ThreadPoolExecutor(workers, thread_name_prefix='rag')
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._work, request, client_address)
+
+        def _work(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    if os.path.exists(socket_path):
+        if request('status', socket_path) is not None:
+            raise SystemExit(f"❌ A daemon is already listening on {socket_path}")
+        os.unlink(socket_path)      # left behind by a daemon that died
+
+    with Server(socket_path, Handler) as server:
+        print(f"🟢 Listening on {socket_path} ({workers} workers)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.pool.shutdown(wait=True)
+            os.unlink(socket_path)
+    print("🛑 Stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warm retrieval daemon for the RAG CLIs')
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve', help='run the daemon in the foreground')
+    p.add_argument('--workers', type=int, default=WORKERS)
+    p.add_argument('--preload', nargs='*', metavar='DB', default=[],
+                   help="databases to load before listening ('' for the philosophy-responses alias)")
+    sub.add_parser('status')
+    sub.add_parser('stop')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.socket, args.workers, args.preload)
+        return
+
+    result = request(args.command, args.socket)
+    if result is None:
+        print(f"⚪ No daemon listening on {args.socket}")
+    elif args.command == 'stop':
+        print("🛑 Daemon stopping")
+    else:
+        print(f"🟢 Up {result['uptime'] / 60:.1f} min on {args.socket}")
+        for path, chunks in result['indexes'].items():
+            print(f"   📚 {path}: {chunks:,} chunks")
+        print(f"   {result['retrieve']} retrievals, {result['synthesize']} syntheses, "
+              f"{result['embedding_hits']} embedding cache hits ({result['cached_embeddings']} cached), "
+              f"{result['index_loads']} index loads")
+
+
+if __name__ == "__main__":
+    main()
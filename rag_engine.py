@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Warm retrieval state for the philosophy RAG (query_rag.py, query_rag_manual.py).
+
+Each CLI run used to start from nothing. It built both API clients,
+read every embedding blob from SQLite, and scored them one row at a
+time. An Engine keeps that state for as long as it lives:
+
+    clients     OpenAI / Anthropic, created on first use (HTTP pools stay open)
+    indexes     per database, one normalised matrix plus metadata columns,
+                reloaded when the file changes (an alias flip, a re-import)
+    embeddings  LRU of recent query vectors
+
+rag_daemon.py keeps one Engine alive between CLI runs. Without the
+daemon, the CLIs build one in-process.
+
+    engine = rag_engine.Engine()
+    chunks = engine.retrieve(question, top_k=8, traditions=['Stoicism'])
+    result = engine.synthesize(question, chunks)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import context_window
+import index_alias
+import metadata_columns
+import near_dup
+import query_trace
+import rate_limit
+import storage
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+RESPONSES_ALIAS = 'philosophy-responses'
+DEFAULT_DB = 'philosophical_traditions.db'
+EMBEDDING_CACHE = 1024      # query vectors kept
+DEDUP_FACTOR = 4            # candidates per hit before near-duplicates are collapsed
+
+
+def file_signature(db_path):
+    """(mtime, size) of a database and its WAL: changes whenever the data does."""
+    signature = []
+    for path in (Path(db_path), Path(f"{db_path}-wal")):
+        stat = path.stat() if path.exists() else None
+        signature.append((stat.st_mtime_ns, stat.st_size) if stat else None)
+    return tuple(signature)
+
+
+class ResponsesIndex:
+    """Every embedded chunk of a responses database as one normalised matrix."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.signature = file_signature(db_path)
+        with query_trace.stage('sqlite'):
+            # A fresh connection: a pooled one may still see a file since replaced
+            conn = sqlite3.connect(f"file:{Path(db_path).resolve()}?mode=ro", uri=True)
+            rows = conn.execute("""
+            SELECT
+                e.chunk_text, e.section_type, e.chunk_index, e.embedding,
+                r.id as response_id,
+                q.number as question_number, q.title as question_title,
+                t.name as tradition_name, t.id as tradition_id
+            FROM embeddings e
+            JOIN responses r ON e.response_id = r.id
+            JOIN questions q ON r.question_id = q.id
+            JOIN traditions t ON r.tradition_id = t.id
+            """).fetchall()
+            conn.close()
+            query_trace.note(rows=len(rows))
+        with query_trace.stage('deserialize'):
+            self.chunks = [{
+                'chunk_text': row[0], 'section_type': row[1], 'chunk_index': row[2],
+                'response_id': row[4], 'question_number': row[5], 'question_title': row[6],
+                'tradition_name': row[7], 'tradition_id': row[8],
+            } for row in rows]
+            vectors = (np.stack([np.frombuffer(row[3], dtype=np.float32) for row in rows]) if rows
+                       else np.empty((0, 0), dtype=np.float32))
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            self.vectors = np.ascontiguousarray(vectors / norms)
+        with query_trace.stage('columns'):
+            self.columns = metadata_columns.MetadataColumns(len(rows))
+            self.columns.add_text('tradition', [chunk['tradition_name'] for chunk in self.chunks])
+            self.columns.add_text('section_type', [chunk['section_type'] for chunk in self.chunks])
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query, top_k, where=None):
+        """[chunk dict with 'similarity'] for the top_k rows allowed by where."""
+        return self.search_many(np.asarray(query)[None, :], [top_k], [where])[0]
+
+    def search_many(self, queries, top_ks, wheres):
+        """search() for a batch of query vectors, scored in one matrix product."""
+        with query_trace.stage('score', vectors=len(self), queries=len(queries)):
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+            scores = queries @ self.vectors.T
+            for row_scores, where in zip(scores, wheres):
+                if where:
+                    row_scores[~self.columns.mask(where)] = -np.inf
+        results = []
+        with query_trace.stage('sort'):
+            for row_scores, top_k in zip(scores, top_ks):
+                k = min(top_k, len(row_scores))
+                if k <= 0:
+                    results.append([])
+                    continue
+                top = np.argpartition(-row_scores, k - 1)[:k]
+                top = top[np.argsort(-row_scores[top], kind='stable')]
+                results.append([dict(self.chunks[row], similarity=float(row_scores[row]))
+                                for row in top if np.isfinite(row_scores[row])])
+        return results
+
+
+def format_context(chunks):
+    """Format retrieved chunks into context for Claude"""
+    context_parts = []
+
+    for i, chunk in enumerate(chunks, 1):
+        context_parts.append(
+            f"**Source {i}: {chunk['tradition_name']} "
+            f"(Q{chunk['question_number']}, {chunk['section_type'].replace('_', ' ').title()}) "
+            f"[Relevance: {chunk['similarity']:.2f}]**\n\n"
+            f"{chunk['chunk_text']}\n"
+        )
+
+    return "\n---\n\n".join(context_parts)
+
+
+def synthesis_prompt(query, context, chunks):
+    traditions = sorted(set(c['tradition_name'] for c in chunks))
+    return f"""You are a philosophical research assistant. A user has asked the following question:
+
+**QUESTION**: {query}
+
+I have retrieved the most relevant passages from a database of philosophical responses across {len(traditions)} traditions. Please synthesize a comprehensive answer that:
+
+1. Directly addresses the user's question
+2. Draws on multiple philosophical perspectives from the sources
+3. Highlights key agreements and disagreements between traditions
+4. Uses specific concepts and arguments from the sources
+5. Maintains scholarly accuracy and nuance
+
+**RETRIEVED SOURCES**:
+
+{context}
+
+**SYNTHESIS GUIDELINES**:
+- Begin with a direct answer to the question
+- Reference specific traditions by name when presenting their views
+- Compare and contrast different approaches
+- Use technical terminology from the sources where appropriate
+- Keep the answer comprehensive but concise (~400-600 words)
+- End with a brief note on why these differences exist (e.g., different metaphysical assumptions)
+
+Please provide your synthesis now."""
+
+
+def synthesis_result(prompt, answer):
+    # Estimate cost
+    input_tokens = len(prompt.split()) * 1.3
+    output_tokens = len(answer.split()) * 1.3
+    cost = (input_tokens / 1_000_000 * 3) + (output_tokens / 1_000_000 * 15)
+    return {
+        'answer': answer,
+        'cost': cost,
+        'input_tokens': int(input_tokens),
+        'output_tokens': int(output_tokens)
+    }
+
+
+def check_request(request):
+    """Raise TypeError for a malformed retrieve() request (a dict of its arguments)."""
+    question = request.get('question')
+    if not isinstance(question, str) or not question.strip():
+        raise TypeError("'question' must be a non-empty string")
+    for field in ('top_k', 'window', 'context_tokens'):
+        value = request.get(field, 0)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise TypeError(f"'{field}' must be a non-negative integer, got {value!r}")
+    traditions = request.get('traditions')
+    if traditions is not None and (not isinstance(traditions, (list, tuple))
+                                   or not all(isinstance(name, str) for name in traditions)):
+        raise TypeError(f"'traditions' must be a list of strings, got {traditions!r}")
+    if not isinstance(request.get('dedup', True), bool):
+        raise TypeError(f"'dedup' must be true or false, got {request['dedup']!r}")
+    if not isinstance(request.get('db_path') or '', str):
+        raise TypeError(f"'db_path' must be a string, got {request['db_path']!r}")
+
+
+class Engine:
+    """Clients, indexes and query embeddings shared by every request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._indexes = {}
+        self._embeddings = OrderedDict()
+        self.started = time.time()
+        self.counters = {'retrieve': 0, 'synthesize': 0, 'embedding_calls': 0, 'embedding_hits': 0,
+                         'scoring_passes': 0, 'index_loads': 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _client(self, name):
+        with self._lock:
+            if name not in self._clients:
+                from dotenv import load_dotenv
+                load_dotenv()
+                key = f"{name.upper()}_API_KEY"
+                if not os.getenv(key):
+                    raise RuntimeError(f"{key} not found (add to .env file: {key}=your_key_here)")
+                if name == 'openai':
+                    from openai import OpenAI
+                    self._clients[name] = OpenAI(api_key=os.getenv(key))
+                else:
+                    from anthropic import Anthropic
+                    self._clients[name] = Anthropic(api_key=os.getenv(key))
+            return self._clients[name]
+
+    def resolve_db(self, db_path=None):
+        """db_path, else the live generation of the responses alias."""
+        return db_path or index_alias.local_db(RESPONSES_ALIAS, DEFAULT_DB)
+
+    def index(self, db_path):
+        """ResponsesIndex of db_path, rebuilt when the file has changed."""
+        with self._lock, query_trace.stage('index'):
+            index = self._indexes.get(db_path)
+            if index is None or index.signature != file_signature(db_path):
+                if not Path(db_path).exists():
+                    raise FileNotFoundError(f"Database not found: {db_path}")
+                index = self._indexes[db_path] = ResponsesIndex(db_path)
+                self.counters['index_loads'] += 1
+                query_trace.note(loaded=True)
+            return index
+
+    def embed(self, text):
+        """Query embedding, from the LRU when this text was seen recently."""
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts):
+        """Embeddings of texts (one row each): cached ones from the LRU, the
+        rest in a single API call."""
+        with query_trace.stage('embed'):
+            return self._embed_many(texts)
+
+    def _embed_many(self, texts):
+        vectors = {}
+        with self._lock:
+            for text in texts:
+                if text in self._embeddings:
+                    self._embeddings.move_to_end(text)
+                    vectors[text] = self._embeddings[text]
+            self.counters['embedding_hits'] += sum(text in vectors for text in texts)
+        missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+        query_trace.note(cache_hits=len(texts) - len(missing))
+        if missing:
+            with query_trace.stage('openai', texts=len(missing)):
+                response = rate_limit.embed(self._client('openai'), model=EMBEDDING_MODEL, input=missing)
+            self._count('embedding_calls')
+            with self._lock:
+                for text, item in zip(missing, response.data):
+                    vectors[text] = self._embeddings[text] = np.array(item.embedding, dtype=np.float32)
+                while len(self._embeddings) > EMBEDDING_CACHE:
+                    self._embeddings.popitem(last=False)
+        return np.stack([vectors[text] for text in texts])
+
+    def retrieve(self, question, db_path=None, top_k=8, traditions=None, window=1,
+                 context_tokens=context_window.TOKEN_BUDGET, dedup=True):
+        """Top-k chunks for question, near-duplicates folded and neighbours added."""
+        result = self.retrieve_many([{
+            'question': question, 'db_path': db_path, 'top_k': top_k, 'traditions': traditions,
+            'window': window, 'context_tokens': context_tokens, 'dedup': dedup,
+        }])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def retrieve_many(self, requests, timings=None):
+        """retrieve() for a batch of requests (dicts of retrieve()'s arguments).
+
+        All questions are embedded in one call, and the requests against
+        one database are scored in one matrix product. Returns one chunk
+        list per request, or the exception that request failed with (a
+        malformed request is rejected before the batch is embedded).
+        timings, if given, receives the ms spent per stage.
+        """
+        timings = {} if timings is None else timings
+        results = [None] * len(requests)
+        # A malformed request fails alone, never the rest of its batch
+        valid = []
+        for i, request in enumerate(requests):
+            try:
+                check_request(request)
+                valid.append(i)
+            except Exception as e:
+                results[i] = e
+        timings['score'] = timings['expand'] = 0.0
+        if not valid:
+            timings['embed'] = 0.0
+            return results
+
+        started = time.perf_counter()
+        vectors = self.embed_many([requests[i]['question'] for i in valid])
+        vectors = dict(zip(valid, vectors))
+        timings['embed'] = (time.perf_counter() - started) * 1000
+
+        by_db = {}
+        for i in valid:
+            by_db.setdefault(self.resolve_db(requests[i].get('db_path')), []).append(i)
+        dedup_available = Path(near_dup.DEDUP_DB).exists()
+        for db_path, members in by_db.items():
+            started = time.perf_counter()
+            try:
+                index = self.index(db_path)
+                if not len(index):
+                    raise LookupError(f"No embeddings found in {db_path} (run generate_embeddings.py first)")
+            except Exception as e:
+                for i in members:
+                    results[i] = e
+                continue
+            scored, top_ks, wheres = [], [], []
+            for i in members:
+                request = requests[i]
+                top_k = request.get('top_k', 8)
+                traditions = request.get('traditions')
+                where = f"tradition in {list(traditions)!r}" if traditions else None
+                try:
+                    index.columns.mask(where)       # compiled and cached for search_many
+                except Exception as e:
+                    results[i] = e
+                    continue
+                scored.append(i)
+                top_ks.append(top_k * DEDUP_FACTOR if request.get('dedup', True) and dedup_available else top_k)
+                wheres.append(where)
+            if not scored:
+                continue
+            hits = index.search_many(np.stack([vectors[i] for i in scored]), top_ks, wheres)
+            self._count('scoring_passes')
+            timings['score'] += (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            for i, chunks in zip(scored, hits):
+                try:
+                    results[i] = self._finish(db_path, chunks, requests[i], dedup_available)
+                except Exception as e:
+                    results[i] = e
+            timings['expand'] += (time.perf_counter() - started) * 1000
+        self._count('retrieve', len(requests))
+        return results
+
+    def _finish(self, db_path, chunks, request, dedup_available):
+        """Fold near-duplicates out of ranked chunks, then add neighbouring sections."""
+        top_k = request.get('top_k', 8)
+        # Copies of the same response would fill top-k with one passage
+        if request.get('dedup', True) and dedup_available:
+            with query_trace.stage('dedup'):
+                conn = near_dup.connect()
+                try:
+                    corpus = near_dup.corpus_key('responses', db_path)
+                    top = near_dup.collapse(conn, corpus, chunks, key='response_id', part='section_type')
+                    chunks = near_dup.expand(conn, corpus, top[:top_k], key='response_id')
+                finally:
+                    conn.close()
+        chunks = chunks[:top_k]
+
+        window = request.get('window', 1)
+        if window > 0:
+            with query_trace.stage('context'):
+                chunks = context_window.expand(storage.read_connection(db_path), chunks, 'responses', window,
+                                               request.get('context_tokens', context_window.TOKEN_BUDGET))
+        return chunks
+
+    def synthesize(self, question, chunks):
+        """Claude's synthesis of chunks: {'answer', 'cost', 'input_tokens', 'output_tokens'}."""
+        with query_trace.stage('format'):
+            prompt = synthesis_prompt(question, format_context(chunks), chunks)
+        with query_trace.stage('claude'):
+            message = self._client('anthropic').messages.create(
+                model=CLAUDE_MODEL,
+                max_tokens=2000,
+                messages=[{"role": "user", "content": prompt}]
+            )
+        self._count('synthesize')
+        return synthesis_result(prompt, message.content[0].text)
+
+    def synthesize_stream(self, question, chunks):
+        """synthesize() as it is written: yields ('text', piece) events, then
+        ('done', the synthesize() result)."""
+        prompt = synthesis_prompt(question, format_context(chunks), chunks)
+        pieces = []
+        with self._client('anthropic').messages.stream(
+            model=CLAUDE_MODEL,
+            max_tokens=2000,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            for piece in stream.text_stream:
+                pieces.append(piece)
+                yield 'text', piece
+        self._count('synthesize')
+        yield 'done', synthesis_result(prompt, ''.join(pieces))
+
+    def status(self):
+        with self._lock:
+            return {
+                'uptime': time.time() - self.started,
+                'indexes': {path: len(index) for path, index in self._indexes.items()},
+                'cached_embeddings': len(self._embeddings),
+                'clients': sorted(self._clients),
+                **self.counters,
+            }
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Cross-process token-bucket rate limiter for OpenAI calls.
+
+Every process that calls OpenAI draws from the same two buckets per
+model, requests/min and tokens/min, kept in a small SQLite file
+(BEGIN IMMEDIATE, so concurrent embedding scripts never overdraw). The
+buckets start from DEFAULT_LIMITS and are re-sized from the
+x-ratelimit-limit-* / x-ratelimit-remaining-* headers of every
+response. A 429 sets a shared pause for the model, so all workers back
+off together once instead of each sleeping on its own and then
+retrying at the same moment. The SDK's own retries are switched off
+(they would bypass that pause), so call() also retries 5xx responses,
+timeouts and connection errors, TRANSIENT_RETRIES times, after the same
+shared pause.
+
+    response = rate_limit.embed(client, model=..., input=texts)
+    response = rate_limit.chat(client, model=..., messages=..., max_tokens=...)
+    response = rate_limit.post('https://api.openai.com/v1/embeddings', headers=..., json=...)
+
+Usage:
+    python3 rate_limit.py status
+    python3 rate_limit.py reset
+"""
+
+import re
+import sys
+import threading
+import time
+
+import requests
+
+import storage
+
+LIMITER_DB = "rate_limits.db"
+
+# Fraction of the account limit we aim for
+SAFETY = 0.9
+# Per-model (requests/min, tokens/min) until headers say otherwise
+DEFAULT_LIMITS = {
+    'text-embedding-3-small': (3000, 1_000_000),
+    'gpt-4o': (500, 30_000),
+}
+FALLBACK_LIMITS = (500, 200_000)
+MAX_RETRIES = 6
+TRANSIENT_RETRIES = 3      # 5xx / timeout / connection error (the SDK default was 2)
+CHARS_PER_TOKEN = 4
+
+DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+_local = threading.local()
+
+
+def connect(db_path=LIMITER_DB):
+    """This thread's connection to the shared bucket file."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = storage.connect(db_path, bulk=True)
+        conn.isolation_level = None
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS buckets (
+            name TEXT PRIMARY KEY,
+            capacity REAL NOT NULL,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            paused_until REAL NOT NULL DEFAULT 0
+        )
+        """)
+    return conn
+
+
+def parse_duration(value):
+    """'6m0s' / '1.5s' / '20ms' -> seconds."""
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in DURATION_RE.findall(value or ''))
+
+
+def estimate_tokens(inputs):
+    """Rough token count of a string, a list of strings or chat messages."""
+    if isinstance(inputs, str):
+        return len(inputs) // CHARS_PER_TOKEN + 1
+    total = 0
+    for item in inputs or ():
+        total += estimate_tokens(item.get('content') or '' if isinstance(item, dict) else item)
+    return total
+
+
+def _bucket(conn, name, default_capacity, now):
+    """Load (capacity, tokens, paused_until) of a bucket, refilled up to now."""
+    row = conn.execute("SELECT capacity, tokens, updated_at, paused_until FROM buckets WHERE name = ?",
+                       (name,)).fetchone()
+    if row is None:
+        capacity = default_capacity * SAFETY
+        conn.execute("INSERT INTO buckets (name, capacity, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                     (name, capacity, capacity, now))
+        return capacity, capacity, 0.0
+    capacity, tokens, updated_at, paused_until = row
+    return capacity, min(capacity, tokens + capacity * (now - updated_at) / 60), paused_until
+
+
+def acquire(model, tokens=0, requests=1):
+    """Block until the model's buckets can cover requests and tokens, then take them."""
+    conn = connect()
+    rpm, tpm = DEFAULT_LIMITS.get(model, FALLBACK_LIMITS)
+    while True:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            req_cap, req_left, paused_until = _bucket(conn, f"{model}:requests", rpm, now)
+            tok_cap, tok_left, _ = _bucket(conn, f"{model}:tokens", tpm, now)
+            # A single call bigger than the whole bucket waits for a full bucket
+            need_tokens = min(tokens, tok_cap)
+            wait = max(paused_until - now,
+                       (requests - req_left) * 60 / req_cap,
+                       (need_tokens - tok_left) * 60 / tok_cap)
+            if wait <= 0:
+                req_left -= requests
+                tok_left -= tokens
+            conn.executemany("UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?",
+                             [(req_left, now, f"{model}:requests"), (tok_left, now, f"{model}:tokens")])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if wait <= 0:
+            return
+        time.sleep(min(wait, 30))
+
+
+def observe(model, headers):
+    """Resize the model's buckets from x-ratelimit-* response headers."""
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    conn = connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for kind in ('requests', 'tokens'):
+            limit = headers.get(f'x-ratelimit-limit-{kind}')
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            if limit is None:
+                continue
+            name = f"{model}:{kind}"
+            capacity = float(limit) * SAFETY
+            _, tokens, _ = _bucket(conn, name, float(limit), now)
+            if remaining is not None:
+                # The server sees every process; never hold more than it says is left
+                tokens = min(tokens, float(remaining) - float(limit) * (1 - SAFETY))
+            conn.execute("UPDATE buckets SET capacity = ?, tokens = ?, updated_at = ? WHERE name = ?",
+                         (capacity, min(tokens, capacity), now, name))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def backoff(model, headers=None, attempt=1):
+    """Pause every worker on the model after a 429 (or a transient failure);
+    returns the pause in seconds."""
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+    if 'retry-after-ms' in headers:
+        seconds = float(headers['retry-after-ms']) / 1000
+    elif 'retry-after' in headers:
+        seconds = float(headers['retry-after'])
+    else:
+        seconds = max(parse_duration(headers.get('x-ratelimit-reset-requests')),
+                      parse_duration(headers.get('x-ratelimit-reset-tokens'))) or 2 ** attempt
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rpm, _ = DEFAULT_LIMITS.get(model, FALLBACK_LIMITS)
+        _bucket(conn, f"{model}:requests", rpm, time.time())
+        conn.execute("UPDATE buckets SET paused_until = MAX(paused_until, ?) WHERE name = ?",
+                     (time.time() + seconds, f"{model}:requests"))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return seconds
+
+
+def _transient(error):
+    """Whether error is worth retrying: 5xx, timeout or dropped connection."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if type(error).__name__ in ('APIConnectionError', 'APITimeoutError'):
+        return True
+    return (getattr(error, 'status_code', None) or 0) >= 500
+
+
+def call(model, tokens, send, job=None):
+    """Run send() under the limiter, retrying 429s after the shared pause.
+
+    send() returns (status_code, headers, result); the result of the first
+    non-429 response is returned. 5xx responses and transient exceptions
+    are retried up to TRANSIENT_RETRIES times, after which the last one is
+    returned or raised.
+    """
+    transient = 0
+    for attempt in range(1, MAX_RETRIES + 1):
+        acquire(model, tokens)
+        try:
+            status, headers, result = send()
+        except Exception as e:
+            if not _transient(e) or transient >= TRANSIENT_RETRIES:
+                raise
+            transient += 1
+            if job:
+                job.retry()
+            backoff(model, getattr(getattr(e, 'response', None), 'headers', None), transient)
+            continue
+        if headers:
+            observe(model, headers)
+        if status >= 500 and transient < TRANSIENT_RETRIES:
+            transient += 1
+            if job:
+                job.retry()
+            backoff(model, headers, transient)
+            continue
+        if status != 429:
+            return result
+        if job:
+            job.rate_limited()
+            job.retry()
+        backoff(model, headers, attempt)
+    raise RuntimeError(f"{model}: still rate limited or failing after {MAX_RETRIES} attempts")
+
+
+def _sdk_call(create, model, tokens, job, kwargs):
+    """Drive an OpenAI SDK with_raw_response create() through call()."""
+    def send():
+        try:
+            raw = create(**kwargs)
+        except Exception as e:
+            if getattr(e, 'status_code', None) != 429:
+                raise
+            return 429, dict(e.response.headers), None
+        return raw.status_code, dict(raw.headers), raw.parse()
+    return call(model, tokens, send, job)
+
+
+def _no_retries(client):
+    # The SDK's own retries would bypass the shared pause
+    return client.with_options(max_retries=0) if hasattr(client, 'with_options') else client
+
+
+def embed(client, job=None, **kwargs):
+    """client.embeddings.create(**kwargs) under the shared limiter."""
+    create = _no_retries(client).embeddings.with_raw_response.create
+    return _sdk_call(create, kwargs['model'], estimate_tokens(kwargs['input']), job, kwargs)
+
+
+def chat(client, job=None, **kwargs):
+    """client.chat.completions.create(**kwargs) under the shared limiter.
+
+    Counts prompt tokens plus max_tokens, which is what OpenAI reserves.
+    """
+    create = _no_retries(client).chat.completions.with_raw_response.create
+    tokens = estimate_tokens(kwargs['messages']) + kwargs.get('max_tokens', 0)
+    return _sdk_call(create, kwargs['model'], tokens, job, kwargs)
+
+
+def post(url, job=None, **kwargs):
+    """requests.post() to an OpenAI endpoint under the shared limiter."""
+    body = kwargs.get('json') or {}
+    tokens = estimate_tokens(body.get('input') or body.get('messages'))
+
+    def send():
+        response = requests.post(url, **kwargs)
+        return response.status_code, response.headers, response
+
+    return call(body.get('model', 'unknown'), tokens, send, job)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('status', 'reset'):
+        print(__doc__)
+        sys.exit(1)
+
+    conn = connect()
+    if sys.argv[1] == 'reset':
+        conn.execute("DELETE FROM buckets")
+        print("🧹 Rate-limit buckets cleared")
+        return
+
+    now = time.time()
+    rows = conn.execute("SELECT name, capacity, tokens, updated_at, paused_until FROM buckets ORDER BY name").fetchall()
+    for name, capacity, tokens, updated_at, paused_until in rows:
+        available = min(capacity, tokens + capacity * (now - updated_at) / 60)
+        line = f"🪣 {name:<40} {available:>12,.0f} / {capacity:>12,.0f} per min"
+        if paused_until > now:
+            line += f"  ⏸️  paused {paused_until - now:.1f}s"
+        print(line)
+    if not rows:
+        print("(no calls recorded yet)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,11 @@ Re-chunk large purport paragraphs into smaller segments
 This helps with retrieval when specific names/concepts are buried in long text
 """
 
-import sqlite3
 import re
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
+import storage
+from storage import LOCAL_DB
+
 MAX_CHUNK_SIZE = 600  # Target chunk size in characters
 
 def split_into_sentences(text):
@@ -50,7 +51,7 @@ def rechunk_large_purports():
     print("RE-CHUNKING LARGE PURPORT PARAGRAPHS")
     print("=" * 80)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB, bulk=True)
     cursor = conn.cursor()
 
     # Find large purport chunks
@@ -67,6 +68,8 @@ def rechunk_large_purports():
 
     chunks_added = 0
     chunks_deleted = 0
+    deleted_ids = []
+    new_rows = []
 
     for chunk_id, verse_id, content, chunk_index in large_chunks:
         # Split into smaller chunks
@@ -76,15 +79,12 @@ def rechunk_large_purports():
             print(f"  Splitting chunk {chunk_id}: {len(content)} chars → {len(smaller_chunks)} sub-chunks")
 
             # Delete original chunk
-            cursor.execute("DELETE FROM vedabase_chunks WHERE id = ?", (chunk_id,))
+            deleted_ids.append((chunk_id,))
             chunks_deleted += 1
 
             # Insert smaller chunks
             for i, small_chunk in enumerate(smaller_chunks):
-                cursor.execute("""
-                    INSERT INTO vedabase_chunks (verse_id, chunk_type, chunk_index, content, word_count)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
+                new_rows.append((
                     verse_id,
                     'purport_segment',  # New type to distinguish from original paragraphs
                     chunk_index + i if chunk_index else None,
@@ -93,6 +93,12 @@ def rechunk_large_purports():
                 ))
                 chunks_added += 1
 
+    # Apply all splits in two batched statements
+    storage.executemany_chunked(conn, "DELETE FROM vedabase_chunks WHERE id = ?", deleted_ids)
+    storage.executemany_chunked(conn, """
+        INSERT INTO vedabase_chunks (verse_id, chunk_type, chunk_index, content, word_count)
+        VALUES (?, ?, ?, ?, ?)
+    """, new_rows)
     conn.commit()
     conn.close()
 
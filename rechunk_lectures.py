@@ -4,10 +4,11 @@ Split large lecture_content chunks into smaller segments for better retrieval
 Target: 404 words avg → 100-150 words
 """
 
-import sqlite3
 import re
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
+import storage
+from storage import LOCAL_DB
+
 TARGET_WORDS = 125  # Target chunk size in words
 MAX_WORDS = 175     # Maximum before forcing a split
 
@@ -59,7 +60,7 @@ def rechunk_lectures():
     print(f"Target: {TARGET_WORDS} words per chunk (max {MAX_WORDS})")
     print("=" * 80)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB, bulk=True)
     cursor = conn.cursor()
 
     # Find lecture chunks that are too large (>175 words)
@@ -81,6 +82,8 @@ def rechunk_lectures():
 
     chunks_added = 0
     chunks_deleted = 0
+    deleted_ids = []
+    new_rows = []
     total_original_words = 0
     total_new_chunks = 0
 
@@ -94,16 +97,13 @@ def rechunk_lectures():
             print(f"  Chunk {chunk_id}: {word_count} words → {len(smaller_chunks)} sub-chunks")
 
             # Delete original chunk
-            cursor.execute("DELETE FROM vedabase_chunks WHERE id = ?", (chunk_id,))
+            deleted_ids.append((chunk_id,))
             chunks_deleted += 1
 
             # Insert smaller chunks
             for i, small_chunk in enumerate(smaller_chunks):
                 words_in_chunk = len(small_chunk.split())
-                cursor.execute("""
-                    INSERT INTO vedabase_chunks (verse_id, chunk_type, chunk_index, content, word_count)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
+                new_rows.append((
                     verse_id,
                     'lecture_segment',  # New type to distinguish from original
                     (chunk_index * 100 + i) if chunk_index else i,
@@ -113,6 +113,12 @@ def rechunk_lectures():
                 chunks_added += 1
                 total_new_chunks += 1
 
+    # Apply all splits in two batched statements
+    storage.executemany_chunked(conn, "DELETE FROM vedabase_chunks WHERE id = ?", deleted_ids)
+    storage.executemany_chunked(conn, """
+        INSERT INTO vedabase_chunks (verse_id, chunk_type, chunk_index, content, word_count)
+        VALUES (?, ?, ?, ?, ?)
+    """, new_rows)
     conn.commit()
 
     # Get statistics
@@ -4,12 +4,12 @@ Fast D1 retry - targets 1 hour completion
 Batch size: 100, Pause: 1s, Total batches: ~250
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 100  # Larger batches for speed
 PAUSE_BETWEEN_BATCHES = 1  # Minimal pause
 MAX_RETRIES = 3  # Standard retries
@@ -75,7 +75,7 @@ def get_all_local_chunks():
     """Get all lecture_segment chunks from local DB"""
     print("📂 Loading all lecture segments from local database...")
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -4,12 +4,12 @@ Retry failed D1 upload batches with ultra-conservative settings
 Uses smaller batch size (25) and longer pauses (5s) to work around API issues
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 25  # Ultra-conservative batch size
 PAUSE_BETWEEN_BATCHES = 5  # Longer pause
 MAX_RETRIES = 5  # More retry attempts
@@ -75,7 +75,7 @@ def get_all_local_chunks():
     """Get all lecture_segment chunks from local DB"""
     print("📂 Loading all lecture segments from local database...")
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -3,11 +3,12 @@
 Retry the failed Vectorize batch (batch 56: embeddings 27,500-28,000)
 """
 
-import json
 import subprocess
 from pathlib import Path
 
-EMBEDDINGS_FILE = "lecture_segments_embeddings.json"
+from embedding_store import EmbeddingStore, exists, npy_path
+
+EMBEDDINGS_NAME = "lecture_segments_embeddings"
 FAILED_BATCH = 56
 BATCH_SIZE = 500
 
@@ -20,26 +21,18 @@ def retry_batch():
     print()
 
     # Load embeddings
-    if not Path(EMBEDDINGS_FILE).exists():
-        print(f"❌ Error: {EMBEDDINGS_FILE} not found")
+    if not exists(EMBEDDINGS_NAME):
+        print(f"❌ Error: {npy_path(EMBEDDINGS_NAME)} not found")
         return
 
-    print(f"📂 Loading embeddings from {EMBEDDINGS_FILE}...")
-    with open(EMBEDDINGS_FILE, 'r') as f:
-        embeddings = json.load(f)
-
-    # Extract the failed batch
+    # Extract the failed batch straight from the artifact
     start_idx = (FAILED_BATCH - 1) * BATCH_SIZE
     end_idx = FAILED_BATCH * BATCH_SIZE
-    batch = embeddings[start_idx:end_idx]
-
-    print(f"✅ Extracted {len(batch)} embeddings from batch {FAILED_BATCH}")
-
-    # Create batch file
     batch_file = f"retry_batch_{FAILED_BATCH}.ndjson"
-    with open(batch_file, 'w') as f:
-        for embedding in batch:
-            f.write(json.dumps(embedding) + '\n')
+    with EmbeddingStore(EMBEDDINGS_NAME) as store:
+        count = store.write_ndjson(batch_file, start_idx, end_idx)
+
+    print(f"✅ Extracted {count} embeddings from batch {FAILED_BATCH}")
 
     print(f"📝 Created {batch_file}")
 
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Streaming, sharded exports of local D1 tables for the remote uploaders.
+
+An export called NAME is a directory:
+    NAME/manifest.json       shard list with row counts and sha256 checksums
+    NAME/shard-0001.ndjson   one {"table": ..., "row": {...}} object per line
+    NAME/shard-0002.ndjson   ...
+
+Rows are pulled from SQLite with fetchmany() and written straight to the
+current shard, so memory stays flat however large the corpus is. A shard
+is closed once it reaches max_bytes (the import worker's request limit),
+renamed into place and added to the manifest, so an uploader started
+with follow=True can work on shard 1 while later shards are still being
+written. The manifest says complete=true once the export has finished.
+
+Usage:
+    python3 shard_export.py verify kb_books_export_for_upload
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+FETCH_SIZE = 1000
+SHARD_BYTES = 512 * 1024   # keep equal to import_to_cloudflare.MAX_BATCH_BYTES
+FOLLOW_POLL_SECONDS = 1.0
+
+
+def manifest_path(name):
+    return Path(name) / 'manifest.json'
+
+
+def stream_rows(cursor, sql, params=()):
+    """Yield query rows as dicts, FETCH_SIZE rows at a time"""
+    cursor.execute(sql, params)
+    columns = [col[0] for col in cursor.description]
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(columns, row))
+
+
+class ShardWriter:
+    """Write (table, row) records into size-capped NDJSON shards."""
+
+    def __init__(self, name, max_bytes=SHARD_BYTES):
+        self.dir = Path(name)
+        self.max_bytes = max_bytes
+        self.counts = {}
+        self.shards = []
+
+        if self.dir.exists():
+            shutil.rmtree(self.dir)
+        self.dir.mkdir(parents=True)
+
+        self._file = None
+        self._hash = None
+        self._bytes = 0
+        self._tables = {}
+        self._write_manifest(complete=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._file:
+            self._file.close()
+
+    def write(self, table, row):
+        """Append one row; rolls over to a new shard at max_bytes"""
+        line = (json.dumps({'table': table, 'row': row}, ensure_ascii=False) + '\n').encode('utf-8')
+        if self._file and self._bytes + len(line) > self.max_bytes:
+            self._finish_shard()
+        if not self._file:
+            self._start_shard()
+
+        self._file.write(line)
+        self._hash.update(line)
+        self._bytes += len(line)
+        self._tables[table] = self._tables.get(table, 0) + 1
+        self.counts[table] = self.counts.get(table, 0) + 1
+
+    def write_rows(self, table, rows):
+        """Append every row from an iterable; returns how many were written"""
+        count = 0
+        for row in rows:
+            self.write(table, row)
+            count += 1
+        return count
+
+    def close(self):
+        """Finish the last shard and mark the export complete"""
+        if self._file:
+            self._finish_shard()
+        self._write_manifest(complete=True)
+
+    def _shard_path(self, number):
+        return self.dir / f"shard-{number:04d}.ndjson"
+
+    def _start_shard(self):
+        path = self._shard_path(len(self.shards) + 1)
+        self._file = open(f"{path}.tmp", 'wb')
+        self._hash = hashlib.sha256()
+        self._bytes = 0
+        self._tables = {}
+
+    def _finish_shard(self):
+        path = self._shard_path(len(self.shards) + 1)
+        self._file.close()
+        self._file = None
+        os.replace(f"{path}.tmp", path)
+        self.shards.append({
+            'file': path.name,
+            'bytes': self._bytes,
+            'rows': sum(self._tables.values()),
+            'tables': self._tables,
+            'sha256': self._hash.hexdigest(),
+        })
+        self._write_manifest(complete=False)
+
+    def _write_manifest(self, complete):
+        manifest = {
+            'complete': complete,
+            'max_shard_bytes': self.max_bytes,
+            'counts': self.counts,
+            'shards': self.shards,
+        }
+        tmp = manifest_path(self.dir).with_suffix('.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, manifest_path(self.dir))
+
+    @property
+    def total_bytes(self):
+        return sum(shard['bytes'] for shard in self.shards)
+
+
+def load_manifest(name):
+    with open(manifest_path(name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_shards(name, follow=False):
+    """Yield (shard entry, path) in order, verifying each checksum.
+
+    With follow=True, waits for shards that have not been written yet
+    until the manifest is marked complete.
+    """
+    done = 0
+    while True:
+        if not manifest_path(name).exists():
+            if not follow:
+                raise FileNotFoundError(f"No export manifest at {manifest_path(name)}")
+            time.sleep(FOLLOW_POLL_SECONDS)
+            continue
+
+        manifest = load_manifest(name)
+        for shard in manifest['shards'][done:]:
+            path = Path(name) / shard['file']
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            if digest != shard['sha256']:
+                raise ValueError(f"Checksum mismatch in {path}")
+            done += 1
+            yield shard, path
+
+        if manifest['complete'] and done == len(manifest['shards']):
+            return
+        if not follow:
+            raise ValueError(f"Export {name} is incomplete ({done} shards so far)")
+        time.sleep(FOLLOW_POLL_SECONDS)
+
+
+def iter_records(name, follow=False):
+    """Yield (table, row) for every row in an export"""
+    for shard, path in iter_shards(name, follow):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                yield record['table'], record['row']
+
+
+def load_export(name):
+    """Read a whole export back as {table: [rows]}, for small exports"""
+    data = {}
+    for table, row in iter_records(name):
+        data.setdefault(table, []).append(row)
+    return data
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != 'verify':
+        print(__doc__)
+        sys.exit(1)
+
+    name = sys.argv[2]
+    manifest = load_manifest(name)
+    for shard, path in iter_shards(name):
+        print(f"  ✓ {shard['file']}: {shard['rows']:,} rows, {shard['bytes'] / 1024:.0f} KB")
+    status = "complete" if manifest['complete'] else "incomplete"
+    print(f"✅ {name}: {len(manifest['shards'])} shards verified ({status})")
+    for table, count in manifest['counts'].items():
+        print(f"   {table}: {count:,}")
+
+
+if __name__ == "__main__":
+    main()
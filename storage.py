@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Shared SQLite access for the local D1 (miniflare) database.
+
+All scripts should open the local database through this module instead of
+calling sqlite3.connect() with default settings:
+
+    conn = storage.connect()               # tuned read/write connection
+    conn = storage.connect(bulk=True)      # WAL + relaxed sync for big loads
+    conn = storage.read_connection()       # pooled read-only (query paths)
+
+Bulk-write helpers:
+
+    storage.executemany_chunked(conn, sql, rows)     # rows may be a generator
+    for new_id in storage.insert_returning(conn, sql, rows): ...
+    with storage.deferred_indexes(conn, 'vedabase_chunks'): ...
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
+
+# Per-connection settings, safe for every connection
+BASE_PRAGMAS = [
+    "PRAGMA cache_size = -262144",      # 256 MB page cache
+    "PRAGMA mmap_size = 1073741824",    # map up to 1 GB of the file
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 30000",
+]
+
+# Settings for bulk loads (journal_mode is persistent in the file)
+BULK_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+]
+
+CHUNK_SIZE = 5000
+
+_read_pool = threading.local()
+
+
+def connect(db_path=LOCAL_DB, bulk=False):
+    """Open a tuned read/write connection to db_path."""
+    conn = sqlite3.connect(db_path)
+    for pragma in BASE_PRAGMAS + (BULK_PRAGMAS if bulk else []):
+        conn.execute(pragma)
+    return conn
+
+
+def read_connection(db_path=LOCAL_DB):
+    """Return this thread's pooled read-only connection to db_path.
+
+    Connections are opened once per thread and reused; callers must not
+    close them (use close_read_connections() at shutdown).
+    """
+    pool = getattr(_read_pool, 'connections', None)
+    if pool is None:
+        pool = _read_pool.connections = {}
+
+    key = str(Path(db_path).resolve())
+    conn = pool.get(key)
+    if conn is None:
+        conn = sqlite3.connect(f"file:{key}?mode=ro", uri=True, check_same_thread=False)
+        for pragma in BASE_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute("PRAGMA query_only = ON")
+        pool[key] = conn
+    return conn
+
+
+def close_read_connections():
+    """Close this thread's pooled read-only connections."""
+    pool = getattr(_read_pool, 'connections', None) or {}
+    for conn in pool.values():
+        conn.close()
+    pool.clear()
+
+
+def executemany_chunked(conn, sql, rows, chunk_size=CHUNK_SIZE):
+    """Run executemany over rows in chunks; rows may be any iterable.
+
+    Does not commit. Returns the number of rows written.
+    """
+    cursor = conn.cursor()
+    rows = iter(rows)
+    total = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        cursor.executemany(sql, chunk)
+        total += len(chunk)
+    return total
+
+
+def insert_returning(conn, sql, rows, returning='id'):
+    """Insert rows one statement at a time, yielding each RETURNING value.
+
+    sql is a plain INSERT without a RETURNING clause. Use this when later
+    rows need the generated ids (e.g. chunks that reference a new verse);
+    wrap the loop in a single transaction. Does not commit.
+    """
+    cursor = conn.cursor()
+    statement = f"{sql.rstrip().rstrip(';')} RETURNING {returning}"
+    for row in rows:
+        yield cursor.execute(statement, row).fetchone()[0]
+
+
+@contextmanager
+def deferred_indexes(conn, *tables):
+    """Drop the explicit indexes on tables for the duration of a bulk load.
+
+    The indexes are recreated (and the load committed) on exit, even if the
+    load fails part way. Indexes backing UNIQUE/PRIMARY KEY constraints are
+    left alone because SQLite cannot drop them.
+    """
+    placeholders = ', '.join('?' for _ in tables)
+    indexes = conn.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, tables).fetchall()
+
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        for _, sql in indexes:
+            conn.execute(sql)
+        conn.commit()
+
+
+@contextmanager
+def bulk_load(db_path=LOCAL_DB, tables=()):
+    """Connection for a large import: bulk pragmas, one transaction, deferred indexes.
+
+    Commits on success and rolls back on error (indexes are restored either way).
+    """
+    conn = connect(db_path, bulk=True)
+    try:
+        with deferred_indexes(conn, *tables):
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+        conn.commit()
+    finally:
+        conn.close()
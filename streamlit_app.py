@@ -14,6 +14,10 @@ from anthropic import Anthropic
 from dotenv import load_dotenv
 import streamlit as st
 from typing import List, Dict
+import context_window
+import index_alias
+import query_trace
+import rate_limit
 
 load_dotenv()
 
@@ -24,7 +28,9 @@ anthropic_client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
 EMBEDDING_MODEL = "text-embedding-3-small"
 CLAUDE_MODEL = "claude-sonnet-4-20250514"
 DEFAULT_TOP_K = 8
-DB_PATH = 'philosophical_traditions_sample.db'
+CONTEXT_WINDOW = 1  # Neighbouring sections added around each hit
+CONTEXT_TOKENS = 6000
+DB_PATH = index_alias.local_db('philosophy-responses', 'philosophical_traditions_sample.db')
 
 # Page config
 st.set_page_config(
@@ -83,7 +89,7 @@ st.markdown("""
 def get_query_embedding(query: str) -> np.ndarray:
     """Generate embedding for user query"""
     try:
-        response = openai_client.embeddings.create(
+        response = rate_limit.embed(openai_client,
             model=EMBEDDING_MODEL,
             input=query
         )
@@ -125,34 +131,40 @@ def retrieve_relevant_chunks(
         query += f" WHERE t.name IN ({placeholders})"
         params = traditions_filter
 
-    cursor.execute(query, params)
-    all_chunks = cursor.fetchall()
+    with query_trace.stage('sqlite'):
+        cursor.execute(query, params)
+        all_chunks = cursor.fetchall()
+        query_trace.note(rows=len(all_chunks))
 
     if not all_chunks:
         return []
 
+    with query_trace.stage('deserialize'):
+        stored_embeddings = [np.frombuffer(row[3], dtype=np.float32) for row in all_chunks]
+
     # Calculate similarities
     chunks_with_scores = []
-    for row in all_chunks:
-        stored_embedding = np.frombuffer(row[3], dtype=np.float32)
-        similarity = cosine_similarity(query_embedding, stored_embedding)
-
-        chunks_with_scores.append({
-            'chunk_text': row[0],
-            'section_type': row[1],
-            'chunk_index': row[2],
-            'similarity': similarity,
-            'response_id': row[5],
-            'question_number': row[6],
-            'question_title': row[7],
-            'tradition_name': row[8],
-            'tradition_id': row[9]
-        })
+    with query_trace.stage('score'):
+        for row, stored_embedding in zip(all_chunks, stored_embeddings):
+            similarity = cosine_similarity(query_embedding, stored_embedding)
+
+            chunks_with_scores.append({
+                'chunk_text': row[0],
+                'section_type': row[1],
+                'chunk_index': row[2],
+                'similarity': similarity,
+                'response_id': row[5],
+                'question_number': row[6],
+                'question_title': row[7],
+                'tradition_name': row[8],
+                'tradition_id': row[9]
+            })
 
     conn.close()
 
     # Sort by similarity and return top_k
-    chunks_with_scores.sort(key=lambda x: x['similarity'], reverse=True)
+    with query_trace.stage('sort'):
+        chunks_with_scores.sort(key=lambda x: x['similarity'], reverse=True)
     return chunks_with_scores[:top_k]
 
 def format_sources_display(chunks: List[Dict]) -> str:
@@ -169,11 +181,30 @@ def format_sources_display(chunks: List[Dict]) -> str:
 
     return "\n" + "="*80 + "\n\n".join(context_parts)
 
+def show_timings(record):
+    """Collapsible per-stage latency breakdown of one query"""
+    with st.expander(f"⏱️ Timings ({record['total_ms']:.0f} ms)", expanded=False):
+        rows = []
+
+        def add(nodes, depth):
+            for node in nodes:
+                rows.append({
+                    'stage': '\u2003' * depth + node['name'],
+                    'ms': round(node['ms'], 1),
+                    'share': f"{node['ms'] / (record['total_ms'] or 1):.1%}",
+                })
+                add(node['children'], depth + 1)
+
+        add(record['stages'], 0)
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        st.json(record, expanded=False)
+
 def synthesize_answer(question: str, chunks: List[Dict], word_limit: int = 400) -> str:
     """Synthesize answer using OpenAI GPT-4 based on retrieved sources"""
 
     # Format context
-    context = format_sources_display(chunks)
+    with query_trace.stage('format'):
+        context = format_sources_display(chunks)
 
     # Create prompt with strict word limit
     prompt = f"""Based on the philosophical sources below, synthesize an answer to the question.
@@ -199,15 +230,16 @@ WORD LIMIT: {word_limit} words maximum. Count carefully and stop at {word_limit}
         # Adjust max_tokens based on word limit (roughly 1.3 tokens per word)
         max_tokens = int(word_limit * 1.5)
 
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": f"You are an expert in comparative philosophy. CRITICAL: Always respect the word limit strictly. Your responses must not exceed {word_limit} words."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=0.7
-        )
+        with query_trace.stage('gpt-4o'):
+            response = rate_limit.chat(openai_client,
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": f"You are an expert in comparative philosophy. CRITICAL: Always respect the word limit strictly. Your responses must not exceed {word_limit} words."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.7
+            )
 
         return response.choices[0].message.content
 
@@ -241,6 +273,12 @@ with st.sidebar:
         help="Target word count for synthesized answer"
     )
 
+    log_traces = st.checkbox(
+        "Log query timings",
+        value=False,
+        help=f"Append each query's stage timings to {query_trace.TRACE_LOG}"
+    )
+
     st.divider()
 
     st.header("📊 System Stats")
@@ -286,23 +324,33 @@ if st.button("Search", type="primary", use_container_width=True) or query:
     if not query:
         st.warning("⚠️ Please enter a question")
     else:
-        with st.spinner("🔍 Generating query embedding..."):
+        trace = query_trace.start('streamlit_app', question=query, top_k=top_k, word_limit=word_limit)
+        with st.spinner("🔍 Generating query embedding..."), query_trace.stage('embed'):
             query_embedding = get_query_embedding(query)
 
         if query_embedding is not None:
             with st.spinner("📚 Searching relevant sources..."):
-                chunks = retrieve_relevant_chunks(
-                    query_embedding,
-                    db_path=DB_PATH,
-                    top_k=top_k
-                )
+                with query_trace.stage('retrieve'):
+                    chunks = retrieve_relevant_chunks(
+                        query_embedding,
+                        db_path=DB_PATH,
+                        top_k=top_k
+                    )
+                if chunks:
+                    with query_trace.stage('context'):
+                        conn = sqlite3.connect(DB_PATH)
+                        chunks = context_window.expand(conn, chunks, 'responses', CONTEXT_WINDOW, CONTEXT_TOKENS)
+                        conn.close()
 
             if chunks:
                 # Automatic Synthesis with OpenAI (shown first)
                 st.header("🤖 Answer")
 
-                with st.spinner(f"✨ Generating {word_limit}-word answer with GPT-4..."):
+                with st.spinner(f"✨ Generating {word_limit}-word answer with GPT-4..."), query_trace.stage('synthesize'):
                     synthesis = synthesize_answer(query, chunks, word_limit)
+                record = trace.finish()
+                if log_traces:
+                    query_trace.append(record)
 
                 # Display synthesis in a nice box with copy button
                 st.markdown(f"""
@@ -377,6 +425,8 @@ if st.button("Search", type="primary", use_container_width=True) or query:
                     context = format_sources_display(chunks)
                     st.code(context, language="markdown")
 
+                show_timings(record)
+
             else:
                 st.error("❌ No relevant sources found. Try rephrasing your question.")
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test adaptive batching in import_to_cloudflare against a local stand-in worker
+
+The stand-in accepts POSTs like the vedabase-import worker, but answers 503
+when a payload exceeds its CPU budget (in bytes) or when too many requests
+are in flight, so the batcher has to find the limit by itself. A second
+run makes it answer 503 to everything: the import has to give up after
+MAX_RETRIES attempts per verse instead of requeueing forever.
+
+Usage:
+    python3 test_import_batching.py
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import import_to_cloudflare
+import shard_export
+from import_to_cloudflare import AdaptiveBatcher, import_book, make_session
+
+PAYLOAD_LIMIT = 40 * 1024   # bytes the stand-in can process per request
+MAX_CONCURRENT = 3
+VERSE_COUNT = 600
+STUCK_VERSE_COUNT = 40      # small verses, several per batch even at MIN_BATCH_BYTES
+
+
+class StandInWorker(BaseHTTPRequestHandler):
+    """Minimal vedabase-import worker."""
+
+    lock = threading.Lock()
+    active = 0
+    received = []
+    requests = 0
+    rejected = 0
+    always_busy = False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            cls.active += 1
+            busy = cls.always_busy or cls.active > MAX_CONCURRENT
+        try:
+            if busy or len(body) > PAYLOAD_LIMIT:
+                with cls.lock:
+                    cls.rejected += 1
+                self.reply(503, {"error": "Worker exceeded CPU limit"})
+                return
+
+            verses = json.loads(body)['verses']
+            with cls.lock:
+                cls.received.extend(v['verse'] for v in verses)
+            self.reply(200, {"success": True, "chunks_created": 2 * len(verses)})
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def sample_verses(count):
+    """Verses of uneven size, like real purports."""
+    return [
+        {
+            "chapter": str(i // 40 + 1),
+            "verse": f"SB 1.{i // 40 + 1}.{i % 40 + 1}",
+            "translation": "translation " * 20,
+            "purport": "purport text " * (50 + (i * 37) % 400),
+        }
+        for i in range(count)
+    ]
+
+
+def stuck_worker_checks(url):
+    """A worker that answers 503 forever: the import fails in bounded requests."""
+    StandInWorker.always_busy = True
+    StandInWorker.requests = 0
+    StandInWorker.received = []
+    verses = [{"chapter": "1", "verse": f"BG 1.{i + 1}", "translation": "short"} for i in range(STUCK_VERSE_COUNT)]
+    session = make_session()
+    try:
+        ok = import_book('bg', verses, url=url, session=session)
+    except OverflowError:
+        ok = 'overflow'
+    finally:
+        session.close()
+        StandInWorker.always_busy = False
+
+    print(f"\nNever-clearing 503: {StandInWorker.requests} requests for {STUCK_VERSE_COUNT} verses")
+    return [
+        ("never-clearing 503: import gives up and reports failure", ok is False),
+        ("never-clearing 503: at most MAX_RETRIES attempts per verse",
+         StandInWorker.requests <= STUCK_VERSE_COUNT * import_to_cloudflare.MAX_RETRIES),
+        ("never-clearing 503: nothing delivered", not StandInWorker.received),
+    ]
+
+
+def main():
+    import_to_cloudflare.BACKOFF_BASE = 0.01
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInWorker)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    verses = sample_verses(VERSE_COUNT)
+    batcher = AdaptiveBatcher()
+    session = make_session()
+    try:
+        ok = import_book('sb1', verses, url=url, session=session, batcher=batcher)
+    finally:
+        session.close()
+
+    expected = sorted(v['verse'] for v in verses)
+    received = sorted(StandInWorker.received)
+    requests, rejected = StandInWorker.requests, StandInWorker.rejected
+
+    print("\n" + "=" * 60)
+    print(f"Requests: {requests} ({rejected} rejected with 503)")
+    print(f"Verses:   {len(received)}/{len(expected)}")
+    print(f"Final batch budget: {batcher.target // 1024} KB")
+
+    checks = [
+        ("import reported success", ok),
+        ("every verse delivered exactly once", received == expected),
+        ("fewer requests than verses", requests < VERSE_COUNT // 2),
+        ("batcher shrank after 503s", batcher.target < import_to_cloudflare.MAX_BATCH_BYTES),
+        ("export shards match the batch limit", shard_export.SHARD_BYTES == import_to_cloudflare.MAX_BATCH_BYTES),
+    ]
+    try:
+        checks += stuck_worker_checks(url)
+    finally:
+        server.shutdown()
+
+    failed = False
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+        failed |= not passed
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
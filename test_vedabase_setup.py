@@ -10,7 +10,8 @@ Checks:
 """
 
 import os
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import sys
 from pathlib import Path
 from openai import OpenAI
@@ -20,7 +21,6 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Configuration
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 
 def test_local_database():
     """Test local database has Vedabase data."""
@@ -31,7 +31,7 @@ def test_local_database():
         return False
 
     try:
-        conn = sqlite3.connect(LOCAL_DB)
+        conn = storage.connect(LOCAL_DB)
         cursor = conn.cursor()
 
         # Check books
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Persistent catalog (corpus manifest) of the philosophy response files.
+
+Keeps a small SQLite database with each response file's mtime, size,
+SHA-256, detected format (OLD/NEW) and every "*** N.N.N Tradition Response"
+heading found in it, plus which tools have already processed which
+version of each file. Refreshing only rescans files that are new or whose
+contents changed, so lookups like "which file has Taoist for 1.12?" are a
+single indexed query and importers can skip files they have already seen.
+
+Usage:
+    python3 tradition_catalog.py                    # refresh + summary
+    python3 tradition_catalog.py find Taoist 1.12   # where is it?
+"""
+
+import glob
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from org_index import OrgIndex, build_index, file_sha256
+
+CATALOG_DB = "tradition_catalog.db"
+DEFAULT_PATTERNS = ["*traditions*.txt", "*responses*.txt"]
+
+# NEW format responses carry 8 bolded section headers
+FORMAT_HEADER_RE = re.compile(
+    r'\*\*(Historical Development|Key Concepts|Core Arguments|Counter-Arguments|'
+    r'Textual Foundation|Internal Variations|Contemporary Applications)\*\*'
+)
+FORMAT_SAMPLE_CHARS = 5000
+
+
+def classify_format(content):
+    """Return 'NEW' if the text has 3+ distinct section headers, else 'OLD'."""
+    headers = set(FORMAT_HEADER_RE.findall(content))
+    return 'NEW' if len(headers) >= 3 else 'OLD'
+
+
+def connect(db_path=CATALOG_DB):
+    """Open the catalog, creating its tables on first use."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        mtime REAL NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        format TEXT,
+        scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+    # Catalogs created before format detection: force a rescan
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(files)")]
+    if 'format' not in columns:
+        cursor.execute("ALTER TABLE files ADD COLUMN format TEXT")
+        cursor.execute("UPDATE files SET mtime = -1, sha256 = ''")
+
+    # Which tool has processed which version of a file
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS file_imports (
+        path TEXT NOT NULL,
+        consumer TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        status TEXT NOT NULL,
+        error TEXT,
+        imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (path, consumer)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS file_traditions (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        question_number TEXT NOT NULL,
+        response_number TEXT NOT NULL,
+        tradition_number INTEGER,
+        tradition TEXT NOT NULL COLLATE NOCASE,
+        FOREIGN KEY (path) REFERENCES files(path)
+    )
+    """)
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_traditions_lookup ON file_traditions(tradition, question_number)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_traditions_path ON file_traditions(path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_traditions_question ON file_traditions(question_number)")
+
+    conn.commit()
+    return conn
+
+
+def scan_file(path):
+    """Return (format, rows) for a file.
+
+    rows are (question, response, tradition_number, tradition) tuples.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        file_format = classify_format(f.read(FORMAT_SAMPLE_CHARS))
+
+    index = OrgIndex(path, build_index(path))
+    rows = []
+    for entry in index.responses:
+        if not entry.explicit:
+            continue
+        last = entry.number.rsplit('.', 1)[-1]
+        tradition_number = int(last) if last.isdigit() else None
+        rows.append((entry.question_number, entry.number, tradition_number, entry.tradition))
+    return file_format, rows
+
+
+def refresh(conn, patterns=DEFAULT_PATTERNS):
+    """Bring the catalog up to date with the files matching patterns."""
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(pattern))
+    return refresh_paths(conn, sorted(paths))
+
+
+def refresh_paths(conn, paths):
+    """Bring the catalog up to date for an explicit list of files.
+
+    Files whose mtime and size are unchanged are skipped without being
+    read; files that were touched but not modified are hashed but not
+    rescanned. Returns a dict of counts.
+    """
+    stats = {'scanned': 0, 'unchanged': 0, 'removed': 0}
+    cursor = conn.cursor()
+
+    known = {
+        path: (mtime, size, sha256)
+        for path, mtime, size, sha256 in cursor.execute("SELECT path, mtime, size, sha256 FROM files")
+    }
+
+    for path in (str(p) for p in paths):
+        st = os.stat(path)
+        previous = known.get(path)
+        if previous and previous[0] == st.st_mtime and previous[1] == st.st_size:
+            stats['unchanged'] += 1
+            continue
+
+        digest = file_sha256(path)
+        if previous and previous[2] == digest:
+            cursor.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                           (st.st_mtime, st.st_size, path))
+            stats['unchanged'] += 1
+            continue
+
+        try:
+            file_format, rows = scan_file(path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"  ⚠️  Could not scan {path}: {e}")
+            continue
+
+        cursor.execute("DELETE FROM file_traditions WHERE path = ?", (path,))
+        cursor.execute("""
+            INSERT OR REPLACE INTO files (path, mtime, size, sha256, format, scanned_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (path, st.st_mtime, st.st_size, digest, file_format))
+        cursor.executemany("""
+            INSERT INTO file_traditions (path, question_number, response_number, tradition_number, tradition)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(path,) + row for row in rows])
+        stats['scanned'] += 1
+
+    # Forget files that have been deleted or renamed
+    for path in known:
+        if not os.path.exists(path):
+            cursor.execute("DELETE FROM file_traditions WHERE path = ?", (path,))
+            cursor.execute("DELETE FROM file_imports WHERE path = ?", (path,))
+            cursor.execute("DELETE FROM files WHERE path = ?", (path,))
+            stats['removed'] += 1
+
+    conn.commit()
+    return stats
+
+
+def find_files(conn, tradition, question_number=None):
+    """Return [(path, response_number)] holding a tradition (optionally for one question)."""
+    if question_number is None:
+        rows = conn.execute("""
+            SELECT path, response_number FROM file_traditions
+            WHERE tradition = ? ORDER BY question_number, path
+        """, (tradition,))
+    else:
+        rows = conn.execute("""
+            SELECT path, response_number FROM file_traditions
+            WHERE tradition = ? AND question_number = ? ORDER BY path
+        """, (tradition, question_number))
+    return rows.fetchall()
+
+
+def all_traditions(conn):
+    """Tradition names in order of first appearance in the catalog."""
+    rows = conn.execute("""
+        SELECT tradition FROM file_traditions
+        GROUP BY tradition COLLATE BINARY ORDER BY MIN(id)
+    """)
+    return [row[0] for row in rows]
+
+
+def question_ranges(conn, path):
+    """Return [(question, first_tradition_no, last_tradition_no, count)] for a file."""
+    rows = conn.execute("""
+        SELECT question_number, MIN(tradition_number), MAX(tradition_number), COUNT(*)
+        FROM file_traditions WHERE path = ?
+        GROUP BY question_number ORDER BY question_number
+    """, (path,))
+    return rows.fetchall()
+
+
+def file_format(conn, path):
+    """Detected format ('OLD'/'NEW') of a catalogued file, or None."""
+    row = conn.execute("SELECT format FROM files WHERE path = ?", (str(path),)).fetchone()
+    return row[0] if row else None
+
+
+def response_count(conn, path):
+    """Number of tradition responses catalogued for a file."""
+    row = conn.execute("SELECT COUNT(*) FROM file_traditions WHERE path = ?", (str(path),)).fetchone()
+    return row[0]
+
+
+def needs_processing(conn, consumer, path):
+    """True unless consumer already processed the current version of path."""
+    row = conn.execute("""
+        SELECT 1 FROM file_imports i JOIN files f ON f.path = i.path
+        WHERE i.path = ? AND i.consumer = ? AND i.status = 'done' AND i.sha256 = f.sha256
+    """, (str(path), consumer)).fetchone()
+    return row is None
+
+
+def pending(conn, consumer, paths):
+    """Filter paths down to those consumer has not processed in their current version."""
+    return [p for p in paths if needs_processing(conn, consumer, p)]
+
+
+def mark_processed(conn, consumer, path, status='done', error=None):
+    """Record that consumer processed the current version of path."""
+    conn.execute("""
+        INSERT OR REPLACE INTO file_imports (path, consumer, sha256, status, error, imported_at)
+        SELECT path, ?, sha256, ?, ?, CURRENT_TIMESTAMP FROM files WHERE path = ?
+    """, (consumer, status, error, str(path)))
+    conn.commit()
+
+
+def main():
+    conn = connect()
+    stats = refresh(conn)
+
+    if len(sys.argv) >= 3 and sys.argv[1] == 'find':
+        tradition = sys.argv[2]
+        question = sys.argv[3] if len(sys.argv) > 3 else None
+        matches = find_files(conn, tradition, question)
+        if not matches:
+            print(f"❌ No file holds {tradition}" + (f" for {question}" if question else ""))
+        for path, response_number in matches:
+            print(f"{response_number:<12} {path}")
+        conn.close()
+        return
+
+    files = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    responses = conn.execute("SELECT COUNT(*) FROM file_traditions").fetchone()[0]
+    formats = dict(conn.execute("SELECT format, COUNT(*) FROM files GROUP BY format").fetchall())
+    conn.close()
+
+    print(f"📚 Tradition catalog: {Path(CATALOG_DB).resolve()}")
+    print(f"   Rescanned: {stats['scanned']}  Unchanged: {stats['unchanged']}  Removed: {stats['removed']}")
+    print(f"   Files: {files} ({formats.get('NEW', 0)} NEW, {formats.get('OLD', 0)} OLD)  Responses: {responses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Genera las variantes de LIBRO_COMPLETO.org en una sola pasada.
+
+Cada paso de limpieza es una transformación registrada, de línea o de
+bloque (#+BEGIN_X ... #+END_X). El libro se lee una sola vez, capítulo a
+capítulo, y cada capítulo pasa por los pasos de todas las variantes:
+
+    impresion -> LIBRO_COMPLETO_IMPRESION.org  (separadores planos)
+    latex     -> LIBRO_COMPLETO_LATEX.org      (marcadores HTML + LaTeX)
+    audio     -> LIBRO_COMPLETO_AUDIO.txt      (sin markup, para TTS)
+
+Sustituye a la cadena limpiar_romanos -> centrar_separadores ->
+simplificar_separadores / exportacion_correcta_separadores ->
+regenerar_audio -> centrar_separadores_audio. Los separadores se
+reconocen en cualquiera de sus formas históricas, así que el orden ya no
+importa. Cada salida se escribe en un temporal y se renombra al terminar;
+los capítulos sin cambios se reutilizan desde .libro_cache/ por su hash.
+
+Uso:
+    python3 transformar_libro.py              # las tres variantes
+    python3 transformar_libro.py audio latex  # solo algunas
+"""
+
+import hashlib
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+ENTRADA = 'LIBRO_COMPLETO.org'
+CACHE_DIR = '.libro_cache'
+
+# Cambiar el código invalida todos los capítulos en caché
+VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+# Marca interna para "aquí va un separador de escena"
+SEPARADOR = '\x00SEPARADOR'
+
+Bloque = namedtuple('Bloque', 'tipo lineas')
+
+TRANSFORMACIONES = {}
+
+
+def transformacion_linea(nombre):
+    """Registra fn(linea) -> linea | lista de líneas | None (eliminar)."""
+    def registrar(fn):
+        TRANSFORMACIONES[nombre] = ('linea', fn)
+        return fn
+    return registrar
+
+
+def transformacion_bloque(nombre):
+    """Registra fn(bloque) -> lista de líneas | None (no la toca)."""
+    def registrar(fn):
+        TRANSFORMACIONES[nombre] = ('bloque', fn)
+        return fn
+    return registrar
+
+
+# ---------------------------------------------------------------------------
+# Separadores de escena
+# ---------------------------------------------------------------------------
+
+@transformacion_bloque('separadores_bloque')
+def separadores_bloque(bloque):
+    # #+BEGIN_CENTER / #+BEGIN_VERSE que solo contienen "* * *"
+    contenido = [l.strip() for l in bloque.lineas[1:-1] if l.strip()]
+    if bloque.tipo in ('CENTER', 'VERSE') and contenido == ['* * *']:
+        return [SEPARADOR]
+    return None
+
+
+@transformacion_linea('separadores')
+def separadores(linea):
+    # "***" suelto, "      * * *" centrado a mano o el marcador HTML
+    if linea == '***' or re.match(r'^\s+\* \* \*\s*$', linea):
+        return SEPARADOR
+    if linea.startswith('#+HTML:') and '* * *' in linea:
+        return SEPARADOR
+    # La línea LaTeX acompaña siempre a la HTML
+    if linea.startswith('#+LATEX:') and '* * *' in linea:
+        return None
+    return linea
+
+
+@transformacion_linea('romanos')
+def romanos(linea):
+    # "** I." (solo número) -> separador
+    if re.match(r'^\*\* [IVX]+\.\s*$', linea):
+        return SEPARADOR
+    # "** I. Título" -> "** Título"
+    return re.sub(r'^\*\* [IVX]+\.\s+(.+)$', r'** \1', linea)
+
+
+@transformacion_linea('separador_plano')
+def separador_plano(linea):
+    if linea == SEPARADOR:
+        return '                                   * * *'
+    return linea
+
+
+@transformacion_linea('separador_exportacion')
+def separador_exportacion(linea):
+    if linea == SEPARADOR:
+        return [
+            '#+HTML: <p style="text-align:center;">* * *</p>',
+            '#+LATEX: \\begin{center}* * *\\end{center}',
+        ]
+    return linea
+
+
+@transformacion_linea('separador_audio')
+def separador_audio(linea):
+    # Centrado aproximado a 40 espacios (línea de 80 caracteres)
+    if linea == SEPARADOR:
+        return '                                        * * *'
+    return linea
+
+
+# ---------------------------------------------------------------------------
+# Limpieza para audio (TTS)
+# ---------------------------------------------------------------------------
+
+@transformacion_linea('directivas')
+def directivas(linea):
+    # Directivas de Org-mode y de exportación HTML/LaTeX
+    if re.match(r'^#\+(TITLE|AUTHOR|DATE|OPTIONS|HTML|LATEX):', linea):
+        return None
+    return linea
+
+
+@transformacion_bloque('bloques_exportacion')
+def bloques_exportacion(bloque):
+    if bloque.tipo in ('HTML', 'LATEX'):
+        return []
+    return None
+
+
+@transformacion_bloque('desenvolver_bloques')
+def desenvolver_bloques(bloque):
+    # Quitar CENTER, QUOTE y VERSE pero mantener el contenido
+    if bloque.tipo in ('CENTER', 'QUOTE', 'VERSE'):
+        return bloque.lineas[1:-1]
+    return None
+
+
+@transformacion_linea('encabezados')
+def encabezados(linea):
+    # * CAPÍTULO 1 -> CAPÍTULO 1 (igual con Prólogo, Apertura, Día...)
+    match = re.match(r'^\* (.+)', linea)
+    if match:
+        return match.group(1)
+    # ** Sección -> Sección (con línea en blanco antes)
+    match = re.match(r'^\*\* (.+)', linea)
+    if match:
+        return ['', match.group(1)]
+    # *** Subsección -> Subsección
+    match = re.match(r'^\*\*\* (.+)', linea)
+    if match:
+        return match.group(1)
+    return linea
+
+
+@transformacion_linea('enfasis')
+def enfasis(linea):
+    linea = re.sub(r'/([^/]+)/', r'\1', linea)      # /cursiva/ -> cursiva
+    return re.sub(r'\*([^\*]+)\*', r'\1', linea)    # *negrita* -> negrita
+
+
+@transformacion_linea('lineas_separadoras')
+def lineas_separadoras(linea):
+    if re.match(r'^-{3,}\s*$', linea) or re.match(r'^─+\s*$', linea):
+        return ''
+    return linea
+
+
+@transformacion_linea('espacios_finales')
+def espacios_finales(linea):
+    return linea.rstrip(' ')
+
+
+# ---------------------------------------------------------------------------
+# Variantes
+# ---------------------------------------------------------------------------
+
+VARIANTES = {
+    'impresion': {
+        'salida': 'LIBRO_COMPLETO_IMPRESION.org',
+        'pasos': ['separadores_bloque', 'separadores', 'romanos', 'separador_plano'],
+    },
+    'latex': {
+        'salida': 'LIBRO_COMPLETO_LATEX.org',
+        'pasos': ['separadores_bloque', 'separadores', 'romanos', 'separador_exportacion'],
+    },
+    'audio': {
+        'salida': 'LIBRO_COMPLETO_AUDIO.txt',
+        'pasos': [
+            'separadores_bloque', 'bloques_exportacion', 'desenvolver_bloques',
+            'separadores', 'romanos', 'directivas', 'encabezados', 'enfasis',
+            'lineas_separadoras', 'espacios_finales', 'separador_audio',
+        ],
+        # Nunca más de dos líneas en blanco seguidas
+        'max_lineas_vacias': 2,
+    },
+}
+
+
+def fusionar(pasos):
+    """Compone los pasos de línea en una sola función y separa los de bloque."""
+    de_bloque = []
+    de_linea = []
+    for nombre in pasos:
+        tipo, fn = TRANSFORMACIONES[nombre]
+        (de_bloque if tipo == 'bloque' else de_linea).append(fn)
+
+    def aplicar_lineas(linea):
+        lineas = [linea]
+        for fn in de_linea:
+            siguientes = []
+            for l in lineas:
+                resultado = fn(l)
+                if resultado is None:
+                    continue
+                if isinstance(resultado, list):
+                    siguientes.extend(resultado)
+                else:
+                    siguientes.append(resultado)
+            lineas = siguientes
+            if not lineas:
+                break
+        return lineas
+
+    return de_bloque, aplicar_lineas
+
+
+def segmentar(lineas):
+    """Agrupa las líneas de un capítulo en líneas sueltas y Bloques."""
+    elementos = []
+    abierto = None
+    for linea in lineas:
+        if abierto is None:
+            match = re.match(r'^#\+BEGIN_([A-Z]+)', linea)
+            if match:
+                abierto = Bloque(match.group(1), [linea])
+            else:
+                elementos.append(linea)
+        else:
+            abierto.lineas.append(linea)
+            if linea.startswith('#+END_' + abierto.tipo):
+                elementos.append(abierto)
+                abierto = None
+    # Un bloque sin cerrar se deja como texto normal
+    if abierto is not None:
+        elementos.extend(abierto.lineas)
+    return elementos
+
+
+def transformar(elementos, de_bloque, aplicar_lineas):
+    """Aplica los pasos de una variante a un capítulo ya segmentado."""
+    salida = []
+    for elemento in elementos:
+        if isinstance(elemento, Bloque):
+            lineas = elemento.lineas
+            for fn in de_bloque:
+                resultado = fn(elemento)
+                if resultado is not None:
+                    lineas = resultado
+                    break
+        else:
+            lineas = [elemento]
+        for linea in lineas:
+            salida.extend(aplicar_lineas(linea))
+    return salida
+
+
+def capitulos(ruta):
+    """Lee el libro en streaming, capítulo a capítulo ('* ' de primer nivel)."""
+    actual = []
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.rstrip('\n')
+            if linea.startswith('* ') and actual:
+                yield actual
+                actual = []
+            actual.append(linea)
+    if actual:
+        yield actual
+
+
+def permisos(ruta):
+    """Modo del archivo existente, o el que daría open() con la umask actual."""
+    try:
+        return os.stat(ruta).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+class Salida:
+    """Escritura atómica de una variante (temporal + rename al cerrar)."""
+
+    def __init__(self, ruta, max_lineas_vacias=None):
+        self.ruta = ruta
+        self.max_lineas_vacias = max_lineas_vacias
+        self.vacias = 0
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        fd, self.temporal = tempfile.mkstemp(dir=directorio, prefix='.' + os.path.basename(ruta) + '.')
+        self.f = os.fdopen(fd, 'w', encoding='utf-8')
+        self.palabras = 0
+
+    def escribir(self, lineas):
+        for linea in lineas:
+            if not linea.strip():
+                self.vacias += 1
+                if self.max_lineas_vacias is not None and self.vacias > self.max_lineas_vacias:
+                    continue
+            else:
+                self.vacias = 0
+                self.palabras += len(linea.split())
+            self.f.write(linea + '\n')
+
+    def cerrar(self):
+        self.f.close()
+        # mkstemp crea el temporal con 0600: conservar los permisos del destino
+        os.chmod(self.temporal, permisos(self.ruta))
+        os.replace(self.temporal, self.ruta)
+
+    def abortar(self):
+        self.f.close()
+        os.unlink(self.temporal)
+
+
+def generar(variantes=None, entrada=ENTRADA):
+    """Genera las variantes pedidas leyendo el libro una sola vez."""
+    variantes = variantes or list(VARIANTES)
+    pasos = {v: fusionar(VARIANTES[v]['pasos']) for v in variantes}
+    salidas = {
+        v: Salida(VARIANTES[v]['salida'], VARIANTES[v].get('max_lineas_vacias'))
+        for v in variantes
+    }
+    usados = {v: set() for v in variantes}
+    stats = {'capitulos': 0, 'en_cache': 0}
+
+    for v in variantes:
+        os.makedirs(os.path.join(CACHE_DIR, v), exist_ok=True)
+
+    try:
+        for lineas in capitulos(entrada):
+            stats['capitulos'] += 1
+            clave_capitulo = hashlib.sha256('\n'.join(lineas).encode('utf-8')).hexdigest()
+            elementos = None
+
+            for v in variantes:
+                clave = hashlib.sha256(f"{VERSION}:{v}:{clave_capitulo}".encode()).hexdigest()
+                cache = os.path.join(CACHE_DIR, v, clave)
+                usados[v].add(clave)
+
+                if os.path.exists(cache):
+                    with open(cache, 'r', encoding='utf-8') as f:
+                        resultado = f.read().split('\n')[:-1]
+                    stats['en_cache'] += 1
+                else:
+                    if elementos is None:
+                        elementos = segmentar(lineas)
+                    resultado = transformar(elementos, *pasos[v])
+                    with open(cache + '.tmp', 'w', encoding='utf-8') as f:
+                        f.write(''.join(l + '\n' for l in resultado))
+                    os.replace(cache + '.tmp', cache)
+
+                salidas[v].escribir(resultado)
+    except BaseException:
+        for salida in salidas.values():
+            salida.abortar()
+        raise
+
+    for salida in salidas.values():
+        salida.cerrar()
+
+    # Capítulos que ya no existen en el libro
+    for v in variantes:
+        for nombre in os.listdir(os.path.join(CACHE_DIR, v)):
+            if nombre not in usados[v]:
+                os.unlink(os.path.join(CACHE_DIR, v, nombre))
+
+    return salidas, stats
+
+
+def main():
+    variantes = sys.argv[1:] or list(VARIANTES)
+    desconocidas = [v for v in variantes if v not in VARIANTES]
+    if desconocidas:
+        print(f"❌ Variantes desconocidas: {', '.join(desconocidas)}")
+        print(f"   Disponibles: {', '.join(VARIANTES)}")
+        sys.exit(1)
+
+    salidas, stats = generar(variantes)
+
+    total = stats['capitulos'] * len(variantes)
+    print(f"✅ {ENTRADA}: {stats['capitulos']} capítulos ({stats['en_cache']}/{total} desde caché)")
+    for v in variantes:
+        print(f"   {v:<10} -> {salidas[v].ruta} ({salidas[v].palabras:,} palabras)")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,18 +4,19 @@ Upload CC book embeddings to Cloudflare Vectorize
 Uses UPSERT to replace/add embeddings for CC chunks
 """
 
-import json
 import subprocess
 import sys
 from pathlib import Path
 
+import embedding_store
+
+EMBEDDINGS_NAME = "cc_embeddings"
+
 def upload_cc_embeddings():
     """Upload CC embeddings to Vectorize in batches"""
 
-    # Load embeddings
-    embeddings_file = 'cc_embeddings_export.json'
-    if not Path(embeddings_file).exists():
-        print(f"Error: {embeddings_file} not found")
+    if not embedding_store.exists(EMBEDDINGS_NAME):
+        print(f"Error: {embedding_store.npy_path(EMBEDDINGS_NAME)} not found")
         print("Run generate_cc_embeddings.py first")
         return
 
@@ -23,45 +24,25 @@ def upload_cc_embeddings():
     print("UPLOADING CC EMBEDDINGS TO VECTORIZE")
     print("=" * 80)
 
-    with open(embeddings_file, 'r') as f:
-        data = json.load(f)
-
-    chunks = data['chunks']
-    print(f"\nLoaded {len(chunks)} CC embeddings")
+    store = embedding_store.EmbeddingStore(EMBEDDINGS_NAME)
+    total = len(store)
+    print(f"\nLoaded {total} CC embeddings")
 
     # Upload in batches of 100
     batch_size = 100
-    total_batches = (len(chunks) + batch_size - 1) // batch_size
+    total_batches = (total + batch_size - 1) // batch_size
 
     print(f"\nUploading to Vectorize in batches of {batch_size}...")
     print(f"Total batches: {total_batches}\n")
 
     uploaded_count = 0
 
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i+batch_size]
+    for i in range(0, total, batch_size):
         batch_num = (i // batch_size) + 1
 
-        # Prepare NDJSON format for Vectorize
-        vectors_data = []
-        for chunk in batch:
-            vectors_data.append({
-                'id': str(chunk['id']),
-                'values': chunk['embedding'],
-                'metadata': {
-                    'chunk_id': chunk['id'],
-                    'verse_id': chunk['verse_id'],
-                    'chunk_type': chunk['chunk_type'],
-                    'source': 'vedabase',
-                    'book_code': chunk['book_code']
-                }
-            })
-
-        # Write to NDJSON file
+        # Write this slice as NDJSON for Vectorize
         ndjson_file = 'temp_vectors.ndjson'
-        with open(ndjson_file, 'w') as f:
-            for vec in vectors_data:
-                f.write(json.dumps(vec) + '\n')
+        batch_count = store.write_ndjson(ndjson_file, i, i + batch_size)
 
         # Upload using wrangler vectorize upsert
         result = subprocess.run(
@@ -75,8 +56,8 @@ def upload_cc_embeddings():
         Path(ndjson_file).unlink()
 
         if result.returncode == 0:
-            uploaded_count += len(batch)
-            print(f"  Batch {batch_num}/{total_batches}: ✓ Uploaded {len(batch)} vectors ({uploaded_count}/{len(chunks)} total)")
+            uploaded_count += batch_count
+            print(f"  Batch {batch_num}/{total_batches}: ✓ Uploaded {batch_count} vectors ({uploaded_count}/{total} total)")
         else:
             print(f"  Batch {batch_num}/{total_batches}: ✗ Failed")
             print(f"  Error: {result.stderr[:200]}")
@@ -4,12 +4,13 @@ Upload conversation embeddings to Vectorize in small batches using wrangler
 Splits large NDJSON file into manageable chunks
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
-EMBEDDINGS_FILE = "conversation_embeddings.json"
+from embedding_store import EmbeddingStore, npy_path
+
+EMBEDDINGS_NAME = "conversation_embeddings"
 BATCH_SIZE = 100  # Very small batches to avoid API errors
 PAUSE_BETWEEN_BATCHES = 3
 
@@ -22,11 +23,10 @@ def main():
     print()
 
     # Load embeddings
-    print(f"📂 Loading embeddings from {EMBEDDINGS_FILE}...")
-    with open(EMBEDDINGS_FILE, 'r') as f:
-        embeddings = json.load(f)
+    print(f"📂 Loading embeddings from {npy_path(EMBEDDINGS_NAME)}...")
+    store = EmbeddingStore(EMBEDDINGS_NAME)
 
-    total_embeddings = len(embeddings)
+    total_embeddings = len(store)
     num_batches = (total_embeddings + BATCH_SIZE - 1) // BATCH_SIZE
 
     print(f"✅ Loaded {total_embeddings:,} embeddings")
@@ -39,28 +39,13 @@ def main():
 
     for i in range(0, total_embeddings, BATCH_SIZE):
         batch_num = i // BATCH_SIZE + 1
-        batch = embeddings[i:i + BATCH_SIZE]
         batch_end = min(i + BATCH_SIZE, total_embeddings)
 
         print(f"[{batch_num}/{num_batches}] Uploading vectors {i+1}-{batch_end}...", end=" ", flush=True)
 
         # Create temporary NDJSON file for this batch
         batch_file = f"temp_conv_batch_{batch_num}.ndjson"
-
-        with open(batch_file, 'w') as f:
-            for item in batch:
-                ndjson_item = {
-                    "id": str(item['id']),
-                    "values": item['embedding'],
-                    "metadata": {
-                        "source": "vedabase",
-                        "book_code": "conversations",
-                        "chunk_id": item['id'],
-                        "chunk_type": item['chunk_type'],
-                        "verse_id": item['verse_id']
-                    }
-                }
-                f.write(json.dumps(ndjson_item) + '\n')
+        batch_count = store.write_ndjson(batch_file, i, i + BATCH_SIZE)
 
         # Upload via wrangler
         try:
@@ -77,7 +62,7 @@ def main():
 
             if result.returncode == 0:
                 print("✅")
-                success_count += len(batch)
+                success_count += batch_count
             else:
                 error_msg = result.stderr[:100] if result.stderr else result.stdout[:100]
                 print(f"❌ {error_msg}")
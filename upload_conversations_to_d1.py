@@ -4,12 +4,12 @@ Upload conversation verses and chunks to remote D1
 Includes book entry, verses, and chunks
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 50  # Conservative batch size
 PAUSE_BETWEEN_BATCHES = 2
 MAX_RETRIES = 3
@@ -74,7 +74,7 @@ def main():
     print("=" * 80)
     print()
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Step 1: Upload book entry
@@ -4,12 +4,13 @@ Upload conversation embeddings to Cloudflare Vectorize
 Uses the Vectorize HTTP API with batch upserts
 """
 
-import json
 import requests
 import time
 import os
 
-EMBEDDINGS_FILE = "conversation_embeddings.json"
+from embedding_store import EmbeddingStore, npy_path
+
+EMBEDDINGS_NAME = "conversation_embeddings"
 BATCH_SIZE = 100  # Vectorize batch limit
 PAUSE_BETWEEN_BATCHES = 0.5
 
@@ -18,7 +19,7 @@ ACCOUNT_ID = "40035612bce74407c306499494965595"
 VECTORIZE_INDEX_ID = "3e3b090d-245a-42b9-a77b-cef0fca9db31"
 API_TOKEN = os.environ.get("CLOUDFLARE_API_TOKEN")
 
-def upload_batch(batch, batch_num):
+def upload_batch(vectors, batch_num):
     """Upload a batch of vectors to Vectorize"""
 
     url = f"https://api.cloudflare.com/client/v4/accounts/{ACCOUNT_ID}/vectorize/v2/indexes/{VECTORIZE_INDEX_ID}/upsert"
@@ -28,21 +29,6 @@ def upload_batch(batch, batch_num):
         "Content-Type": "application/json"
     }
 
-    # Format batch for Vectorize API
-    vectors = []
-    for item in batch:
-        vectors.append({
-            "id": str(item['id']),
-            "values": item['embedding'],
-            "metadata": {
-                "source": "vedabase",
-                "book_code": "conversations",
-                "chunk_id": item['id'],
-                "chunk_type": item['chunk_type'],
-                "verse_id": item['verse_id']
-            }
-        })
-
     payload = {"vectors": vectors}
 
     try:
@@ -73,11 +59,9 @@ def main():
         return
 
     # Load embeddings
-    print(f"📂 Loading embeddings from {EMBEDDINGS_FILE}...")
-    with open(EMBEDDINGS_FILE, 'r') as f:
-        embeddings = json.load(f)
-
-    total_embeddings = len(embeddings)
+    print(f"📂 Loading embeddings from {npy_path(EMBEDDINGS_NAME)}...")
+    store = EmbeddingStore(EMBEDDINGS_NAME)
+    total_embeddings = len(store)
     num_batches = (total_embeddings + BATCH_SIZE - 1) // BATCH_SIZE
 
     print(f"✅ Loaded {total_embeddings:,} embeddings")
@@ -90,7 +74,7 @@ def main():
 
     for i in range(0, total_embeddings, BATCH_SIZE):
         batch_num = i // BATCH_SIZE + 1
-        batch = embeddings[i:i + BATCH_SIZE]
+        batch = list(store.vectorize_records(i, i + BATCH_SIZE))
         batch_end = min(i + BATCH_SIZE, total_embeddings)
 
         print(f"[{batch_num}/{num_batches}] Uploading vectors {i+1}-{batch_end}...", end=" ", flush=True)
@@ -2,12 +2,13 @@
 """
 Upload conversation embeddings to Vectorize with CORRECT index name
 """
-import json
 import subprocess
 import time
 from pathlib import Path
 
-EMBEDDINGS_FILE = "conversation_embeddings.json"
+from embedding_store import EmbeddingStore
+
+EMBEDDINGS_NAME = "conversation_embeddings"
 BATCH_SIZE = 500  # Larger batches since it's working now
 INDEX_NAME = "philosophy-vectors"  # CORRECT INDEX NAME
 
@@ -19,11 +20,9 @@ def main():
     print("=" * 80)
     print()
     
-    # Load embeddings
-    with open(EMBEDDINGS_FILE, 'r') as f:
-        embeddings = json.load(f)
-    
-    total = len(embeddings)
+    # Open embeddings (vectors are read per batch)
+    store = EmbeddingStore(EMBEDDINGS_NAME)
+    total = len(store)
     num_batches = (total + BATCH_SIZE - 1) // BATCH_SIZE
     
     print(f"📂 Total embeddings: {total:,}")
@@ -36,27 +35,13 @@ def main():
     
     for i in range(0, total, BATCH_SIZE):
         batch_num = i // BATCH_SIZE + 1
-        batch = embeddings[i:i + BATCH_SIZE]
         batch_end = min(i + BATCH_SIZE, total)
         
         print(f"[{batch_num}/{num_batches}] Uploading {i+1}-{batch_end}...", end=" ", flush=True)
         
         # Create temp NDJSON
         batch_file = f"temp_conv_{batch_num}.ndjson"
-        with open(batch_file, 'w') as f:
-            for item in batch:
-                ndjson_item = {
-                    "id": str(item['id']),
-                    "values": item['embedding'],
-                    "metadata": {
-                        "source": "vedabase",
-                        "book_code": "conversations",
-                        "chunk_id": item['id'],
-                        "chunk_type": item['chunk_type'],
-                        "verse_id": item['verse_id']
-                    }
-                }
-                f.write(json.dumps(ndjson_item) + '\n')
+        batch_count = store.write_ndjson(batch_file, i, i + BATCH_SIZE)
         
         # Upload
         try:
@@ -72,7 +57,7 @@ def main():
             
             if result.returncode == 0:
                 print("✅")
-                success_count += len(batch)
+                success_count += batch_count
             else:
                 error = result.stderr[:80] if result.stderr else result.stdout[:80]
                 print(f"❌ {error}")
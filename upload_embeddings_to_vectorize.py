@@ -6,6 +6,12 @@ Generates embeddings and uploads via wrangler vectorize insert.
 
 import os
 import sqlite3
+import job_ledger
+import metrics
+import rate_limit
+import storage
+import vectorize_api
+from storage import LOCAL_DB
 import json
 import time
 import sys
@@ -20,38 +26,28 @@ import subprocess
 load_dotenv()
 
 # Configuration
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
-PROGRESS_FILE = "vectorize_upload_progress.json"
+JOB_NAME = "vectorize_upload"
+LEGACY_PROGRESS_FILE = "vectorize_upload_progress.json"  # pre-ledger runs
 BATCH_SIZE = 100  # Upload 100 vectors at a time
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
-VECTORIZE_INDEX = "philosophy-vectors"
 
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-def load_progress() -> Dict[str, Any]:
-    """Load progress from file if it exists."""
-    if Path(PROGRESS_FILE).exists():
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {
-        'last_chunk_id': 0,
-        'total_uploaded': 0,
-        'started_at': datetime.now().isoformat(),
-        'last_updated': None
-    }
-
-def save_progress(progress: Dict[str, Any]):
-    """Save progress to file."""
-    progress['last_updated'] = datetime.now().isoformat()
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
-
-def get_chunks_batch(conn: sqlite3.Connection, last_chunk_id: int, batch_size: int) -> List[Dict[str, Any]]:
-    """Fetch a batch of chunks from the database."""
+def legacy_done_ids(conn: sqlite3.Connection) -> List[int]:
+    """Chunk ids already covered by an old high-water-mark progress file."""
+    if not Path(LEGACY_PROGRESS_FILE).exists():
+        return []
+    with open(LEGACY_PROGRESS_FILE, 'r') as f:
+        last_chunk_id = json.load(f).get('last_chunk_id', 0)
+    return [row[0] for row in conn.execute("SELECT id FROM vedabase_chunks WHERE id <= ?", (last_chunk_id,))]
+
+def get_chunks(conn: sqlite3.Connection, chunk_ids: List[int]) -> List[Dict[str, Any]]:
+    """Fetch the given chunks from the database."""
     cursor = conn.cursor()
-    cursor.execute("""
+    placeholders = ', '.join('?' * len(chunk_ids))
+    cursor.execute(f"""
         SELECT
             c.id,
             c.verse_id,
@@ -67,10 +63,9 @@ def get_chunks_batch(conn: sqlite3.Connection, last_chunk_id: int, batch_size: i
         FROM vedabase_chunks c
         JOIN vedabase_verses v ON c.verse_id = v.id
         JOIN vedabase_books b ON v.book_id = b.id
-        WHERE c.id > ?
+        WHERE c.id IN ({placeholders})
         ORDER BY c.id
-        LIMIT ?
-    """, (last_chunk_id, batch_size))
+    """, chunk_ids)
 
     chunks = []
     for row in cursor.fetchall():
@@ -93,7 +88,7 @@ def get_chunks_batch(conn: sqlite3.Connection, last_chunk_id: int, batch_size: i
 def generate_embeddings(client: OpenAI, texts: List[str]) -> List[List[float]]:
     """Generate embeddings using OpenAI API."""
     try:
-        response = client.embeddings.create(
+        response = rate_limit.embed(client,
             model=EMBEDDING_MODEL,
             input=texts,
             dimensions=EMBEDDING_DIMENSIONS
@@ -105,8 +100,8 @@ def generate_embeddings(client: OpenAI, texts: List[str]) -> List[List[float]]:
 
 def upload_to_vectorize_cli(vectors: List[Dict[str, Any]]) -> bool:
     """Upload vectors to Vectorize using wrangler CLI."""
-    # Create NDJSON file for wrangler
-    ndjson_file = "temp_vectors.ndjson"
+    # Create NDJSON file for wrangler (per process, workers run side by side)
+    ndjson_file = f"temp_vectors_{os.getpid()}.ndjson"
 
     try:
         with open(ndjson_file, 'w') as f:
@@ -135,7 +130,7 @@ def upload_to_vectorize_cli(vectors: List[Dict[str, Any]]) -> bool:
             del env['CLOUDFLARE_API_TOKEN']
 
         result = subprocess.run(
-            ['npx', 'wrangler', 'vectorize', 'insert', VECTORIZE_INDEX,
+            ['npx', 'wrangler', 'vectorize', 'insert', vectorize_api.index_name(),
              '--file', ndjson_file],
             capture_output=True,
             text=True,
@@ -177,38 +172,51 @@ def main():
         print(f"Error: Database not found at {LOCAL_DB}")
         sys.exit(1)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
 
-    # Get total chunk count
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM vedabase_chunks")
-    total_chunks = cursor.fetchone()[0]
-    print(f"\nTotal chunks to upload: {total_chunks:,}")
+    # Register every chunk in the ledger once; reruns resume from it
+    ledger = job_ledger.connect()
+    if job_ledger.create_job(ledger, JOB_NAME,
+                             (row[0] for row in conn.execute("SELECT id FROM vedabase_chunks ORDER BY id")),
+                             done_ids=legacy_done_ids(conn)):
+        print(f"\nCreated job {JOB_NAME} in {job_ledger.LEDGER_DB}")
 
-    # Load progress
-    progress = load_progress()
-    print(f"Resuming from chunk ID: {progress['last_chunk_id']}")
-    print(f"Already uploaded: {progress['total_uploaded']:,} chunks")
+    state = job_ledger.counts(ledger, JOB_NAME)
+    total_chunks = sum(state.values())
+    print(f"\nTotal chunks to upload: {total_chunks:,}")
+    print(f"Already uploaded: {state['done']:,} chunks ({state['failed']:,} failed)")
     print()
 
+    job = metrics.Job(JOB_NAME, total=total_chunks, done=state['done'])
+    owner = job_ledger.worker_id()
+    started_at = datetime.now().isoformat()
+    uploaded_count = 0
+
     # Process in batches
     batch_num = 1
 
     try:
         while True:
-            # Fetch next batch
-            chunks = get_chunks_batch(conn, progress['last_chunk_id'], BATCH_SIZE)
+            # Lease the next batch (other workers may be running too)
+            chunk_ids = job_ledger.claim(ledger, JOB_NAME, owner, BATCH_SIZE)
 
-            if not chunks:
-                print("\nAll chunks uploaded!")
+            if not chunk_ids:
+                print("\nNo chunks left to claim!")
                 break
 
+            chunks = get_chunks(conn, chunk_ids)
             print(f"Batch {batch_num}: Processing chunk IDs {chunks[0]['id']} to {chunks[-1]['id']} ({len(chunks)} chunks)")
 
             # Generate embeddings
             texts = [chunk['content'] for chunk in chunks]
             print(f"  Generating embeddings...")
-            embeddings = generate_embeddings(client, texts)
+            try:
+                with job.timed('openai'):
+                    embeddings = generate_embeddings(client, texts)
+            except Exception as e:
+                job_ledger.fail(ledger, JOB_NAME, owner, chunk_ids, e)
+                job.error(len(chunk_ids))
+                raise
 
             # Prepare vectors
             vectors = []
@@ -226,21 +234,27 @@ def main():
                     'embedding': embedding
                 })
 
+            # Embedding may have waited on the limiter: keep the lease for the upload
+            job_ledger.renew(ledger, JOB_NAME, owner, chunk_ids)
+
             # Upload to Vectorize
             print(f"  Uploading to Vectorize...")
-            if upload_to_vectorize_cli(vectors):
+            with job.timed('wrangler'):
+                uploaded = upload_to_vectorize_cli(vectors)
+            if uploaded:
                 print(f"  ✓ Successfully uploaded {len(vectors)} vectors")
-                progress['last_chunk_id'] = chunks[-1]['id']
-                progress['total_uploaded'] += len(vectors)
-                save_progress(progress)
+                job_ledger.complete(ledger, JOB_NAME, owner, chunk_ids)
+                uploaded_count += len(vectors)
+                job.advance(len(vectors), nbytes=sum(len(text.encode('utf-8')) for text in texts))
 
                 # Progress report
-                percent_complete = (progress['total_uploaded'] / total_chunks) * 100
-                print(f"  Progress: {progress['total_uploaded']:,}/{total_chunks:,} ({percent_complete:.1f}%)")
+                done = job_ledger.counts(ledger, JOB_NAME)['done']
+                percent_complete = (done / total_chunks) * 100
+                print(f"  Progress: {done:,}/{total_chunks:,} ({percent_complete:.1f}%)")
             else:
-                print(f"  ✗ Upload failed for batch {batch_num}")
-                print("  Stopping. Fix the issue and run again to resume.")
-                break
+                print(f"  ✗ Upload failed for batch {batch_num}; batch left for retry")
+                job_ledger.fail(ledger, JOB_NAME, owner, chunk_ids, 'wrangler vectorize insert failed')
+                job.error(len(vectors))
 
             print()
             batch_num += 1
@@ -249,28 +263,38 @@ def main():
             time.sleep(1)
 
     except KeyboardInterrupt:
-        print("\n\nInterrupted by user. Progress saved.")
+        # Hand the current batch back so a restart can claim it right away
+        job_ledger.release(ledger, JOB_NAME, owner)
+        print("\n\nInterrupted by user. Progress is in the job ledger.")
         print(f"Resume by running this script again.")
-        save_progress(progress)
+        job.finish('interrupted')
         sys.exit(0)
 
     except Exception as e:
         print(f"\n\nError: {e}")
-        print("Progress saved. Fix the issue and run again to resume.")
-        save_progress(progress)
+        print("Progress is in the job ledger. Fix the issue and run again to resume.")
+        job.finish('failed')
         raise
 
     finally:
         conn.close()
 
+    state = job_ledger.counts(ledger, JOB_NAME)
+    ledger.close()
+    job.finish('done' if state['done'] == total_chunks else 'incomplete')
+
     # Final summary
     print("\n" + "=" * 80)
     print("SUMMARY")
     print("=" * 80)
-    print(f"Total chunks uploaded: {progress['total_uploaded']:,}")
-    print(f"Started at: {progress['started_at']}")
+    print(f"Chunks uploaded by this worker: {uploaded_count:,}")
+    print(f"Job total: {state['done']:,}/{total_chunks:,} done, {state['failed']:,} failed")
+    print(f"Started at: {started_at}")
     print(f"Completed at: {datetime.now().isoformat()}")
-    print("\nVedabase RAG is now ready for queries!")
+    if state['failed']:
+        print(f"\nRetry failures with: python3 job_ledger.py retry {JOB_NAME}")
+    else:
+        print("\nVedabase RAG is now ready for queries!")
     print("=" * 80)
 
 if __name__ == "__main__":
@@ -2,13 +2,21 @@
 """
 Upload KB books (Caitanya Caritamrita) to remote D1 in batches
 Uploads KB1, KB2, KB3 verses and chunks
+Streams the sharded export, so it can run alongside export_kb_book_for_upload.py
+
+Usage:
+    python3 upload_kb_book_batch.py [--follow]
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
+from shard_export import iter_records
+
+EXPORT_NAME = 'kb_books_export_for_upload'
+BATCH_SIZE = 25
+
 def execute_remote_sql_batch(sql_statements: list):
     """Execute multiple SQL statements on remote D1"""
     # Combine into single SQL file
@@ -38,90 +46,76 @@ def execute_remote_sql_batch(sql_statements: list):
 
     return True, result.stdout
 
-def upload_kb_book():
-    """Upload KB books data in batches"""
-    # Load export
-    with open('kb_books_export_for_upload.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+def verse_statement(v):
+    chapter = v['chapter'].replace("'", "''") if v['chapter'] else ''
+    verse_num = v['verse_number'].replace("'", "''") if v['verse_number'] else ''
+    sanskrit = v['sanskrit'].replace("'", "''") if v['sanskrit'] else ''
+    synonyms = v['synonyms'].replace("'", "''") if v['synonyms'] else ''
+    translation = v['translation'].replace("'", "''") if v['translation'] else ''
+
+    return (
+        f"INSERT OR REPLACE INTO vedabase_verses (id, book_id, chapter, verse_number, sanskrit, synonyms, translation) "
+        f"VALUES ({v['id']}, {v['book_id']}, '{chapter}', '{verse_num}', '{sanskrit}', '{synonyms}', '{translation}');"
+    )
+
+def chunk_statement(c):
+    content = c['content'].replace("'", "''") if c['content'] else ''
+    chunk_type = c['chunk_type'].replace("'", "''") if c['chunk_type'] else ''
+    chunk_index = c['chunk_index'] if c['chunk_index'] is not None else 0
+
+    return (
+        f"INSERT OR REPLACE INTO vedabase_chunks (id, verse_id, chunk_type, chunk_index, content, word_count) "
+        f"VALUES ({c['id']}, {c['verse_id']}, '{chunk_type}', {chunk_index}, '{content}', {c['word_count']});"
+    )
+
+STATEMENT_BUILDERS = {'verses': verse_statement, 'chunks': chunk_statement}
+
+def upload_kb_book(follow=False):
+    """Upload KB books data in batches, one export shard at a time
 
+    With follow=True, shards are uploaded as the exporter finishes them.
+    """
     print("=" * 80)
     print("UPLOADING KB BOOKS TO REMOTE D1")
     print("=" * 80)
-    print(f"\nLoaded export:")
-    print(f"  KB Verses: {len(data['verses'])}")
-    print(f"  KB Chunks: {len(data['chunks'])}")
-
-    # Upload verses in batches of 25
-    print("\n1. Uploading KB verses...")
-    batch_size = 25
-    verses = data['verses']
-    total_uploaded = 0
-
-    for i in range(0, len(verses), batch_size):
-        batch = verses[i:i+batch_size]
-        batch_num = (i // batch_size) + 1
-
-        statements = []
-        for v in batch:
-            chapter = v['chapter'].replace("'", "''") if v['chapter'] else ''
-            verse_num = v['verse_number'].replace("'", "''") if v['verse_number'] else ''
-            sanskrit = v['sanskrit'].replace("'", "''") if v['sanskrit'] else ''
-            synonyms = v['synonyms'].replace("'", "''") if v['synonyms'] else ''
-            translation = v['translation'].replace("'", "''") if v['translation'] else ''
-
-            statements.append(
-                f"INSERT OR REPLACE INTO vedabase_verses (id, book_id, chapter, verse_number, sanskrit, synonyms, translation) "
-                f"VALUES ({v['id']}, {v['book_id']}, '{chapter}', '{verse_num}', '{sanskrit}', '{synonyms}', '{translation}');"
-            )
-
-        success, output = execute_remote_sql_batch(statements)
-        if success:
-            total_uploaded += len(batch)
-            total_batches = (len(verses) + batch_size - 1) // batch_size
-            print(f"   Batch {batch_num}/{total_batches}: ✓ Uploaded {len(batch)} verses ({total_uploaded}/{len(verses)} total)")
-        else:
-            print(f"   Batch {batch_num}: ✗ Failed - {output[:200]}")
-            return
 
-        time.sleep(0.5)  # Small delay between batches
+    uploaded = {'verses': 0, 'chunks': 0}
+    table, batch = None, []
 
-    # Upload chunks in batches of 25
-    print("\n2. Uploading KB chunks...")
-    chunks = data['chunks']
-    total_uploaded = 0
-
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i+batch_size]
-        batch_num = (i // batch_size) + 1
-
-        statements = []
-        for c in batch:
-            content = c['content'].replace("'", "''") if c['content'] else ''
-            chunk_type = c['chunk_type'].replace("'", "''") if c['chunk_type'] else ''
-            chunk_index = c['chunk_index'] if c['chunk_index'] is not None else 0
-
-            statements.append(
-                f"INSERT OR REPLACE INTO vedabase_chunks (id, verse_id, chunk_type, chunk_index, content, word_count) "
-                f"VALUES ({c['id']}, {c['verse_id']}, '{chunk_type}', {chunk_index}, '{content}', {c['word_count']});"
-            )
-
-        success, output = execute_remote_sql_batch(statements)
-        if success:
-            total_uploaded += len(batch)
-            total_batches = (len(chunks) + batch_size - 1) // batch_size
-            print(f"   Batch {batch_num}/{total_batches}: ✓ Uploaded {len(batch)} chunks ({total_uploaded}/{len(chunks)} total)")
-        else:
+    def flush():
+        if not batch:
+            return True
+        batch_num = uploaded[table] // BATCH_SIZE + 1
+        success, output = execute_remote_sql_batch([STATEMENT_BUILDERS[table](row) for row in batch])
+        if not success:
             print(f"   Batch {batch_num}: ✗ Failed - {output[:200]}")
-            return
-
+            return False
+        uploaded[table] += len(batch)
+        print(f"   Batch {batch_num}: ✓ Uploaded {len(batch)} {table} ({uploaded[table]} total)")
         time.sleep(0.5)  # Small delay between batches
+        return True
+
+    # Verses come before chunks in the export, so they are uploaded first
+    for row_table, row in iter_records(EXPORT_NAME, follow=follow):
+        if row_table != table or len(batch) == BATCH_SIZE:
+            if not flush():
+                return
+            if row_table != table:
+                print(f"\nUploading KB {row_table}...")
+            table, batch = row_table, []
+        batch.append(row)
+
+    if not flush():
+        return
 
     print("\n" + "=" * 80)
     print("UPLOAD COMPLETE")
     print("=" * 80)
-    print(f"  KB Verses uploaded: {len(verses)}")
-    print(f"  KB Chunks uploaded: {len(chunks)}")
+    print(f"  KB Verses uploaded: {uploaded['verses']}")
+    print(f"  KB Chunks uploaded: {uploaded['chunks']}")
     print("=" * 80)
 
 if __name__ == '__main__':
-    upload_kb_book()
+    import sys
+
+    upload_kb_book(follow='--follow' in sys.argv[1:])
@@ -3,11 +3,12 @@
 Upload LEC1C to remote D1 in batches
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
+from shard_export import load_export
+
 def execute_remote_sql_batch(sql_statements: list):
     """Execute multiple SQL statements on remote D1"""
     sql = '\n'.join(sql_statements)
@@ -33,8 +34,7 @@ def execute_remote_sql_batch(sql_statements: list):
 
 def upload_lec1c():
     """Upload LEC1C data in batches"""
-    with open('lec1c_export_for_upload.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_export('lec1c_export_for_upload')
 
     print("=" * 80)
     print("UPLOADING LEC1C TO REMOTE D1")
@@ -7,15 +7,21 @@ import json
 import os
 from pathlib import Path
 from openai import OpenAI
+import rate_limit
 from dotenv import load_dotenv
 
+import embedding_store
+from shard_export import load_export
+
 load_dotenv()
 
+EMBEDDINGS_NAME = "lecture_embeddings"
+
 def generate_embeddings_batch(texts: list) -> list:
     """Generate embeddings using OpenAI"""
     client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-    response = client.embeddings.create(
+    response = rate_limit.embed(client,
         model="text-embedding-3-small",
         input=texts
     )
@@ -26,8 +32,7 @@ def main():
     """Generate embeddings for lecture chunks"""
 
     # Load lecture export
-    with open('lectures_export.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_export('lectures_export')
 
     chunks = data['chunks']
     print(f"Loaded {len(chunks)} lecture chunks")
@@ -69,25 +74,21 @@ def main():
         texts = [chunk['content'][:8000] for chunk in batch]  # Truncate if needed
         embeddings = generate_embeddings_batch(texts)
 
-        # Prepare for upload (save to temp file for wrangler)
-        vectors_data = []
-        for chunk, embedding in zip(batch, embeddings):
-            vectors_data.append({
-                'id': str(chunk['id']),
-                'values': embedding,
-                'metadata': {
-                    'chunk_id': chunk['id'],
-                    'verse_id': chunk['verse_id'],
-                    'chunk_type': 'lecture_content',
-                    'source': 'vedabase_lectures'
-                }
-            })
-
-        # Save to temp NDJSON (newline-delimited JSON)
+        # Save to the lecture_embeddings artifact
+        rows = embedding_store.upsert(EMBEDDINGS_NAME, [str(chunk['id']) for chunk in batch], embeddings, [
+            {
+                'chunk_id': chunk['id'],
+                'verse_id': chunk['verse_id'],
+                'chunk_type': 'lecture_content',
+                'source': 'vedabase_lectures'
+            }
+            for chunk in batch
+        ])
+
+        # Write the batch from the artifact as NDJSON for wrangler
         temp_file = Path('temp_vectors.ndjson')
-        with open(temp_file, 'w') as f:
-            for vector in vectors_data:
-                f.write(json.dumps(vector) + '\n')
+        with embedding_store.EmbeddingStore(EMBEDDINGS_NAME) as store:
+            store.write_ndjson(temp_file, ids=list(rows), rows=rows)
 
         # Upload using wrangler (same as original vedabase script)
         print("  Uploading to Vectorize...")
@@ -7,18 +7,29 @@ Generate embeddings and upload to Vectorize with CORRECT metadata
 
 import json
 import os
-import sqlite3
+import sys
 from pathlib import Path
 from openai import OpenAI
+import rate_limit
 from dotenv import load_dotenv
 
+import embedding_store
+import job_ledger
+import storage
+import vectorize_api
+from shard_export import load_export
+
 load_dotenv()
 
+JOB_NAME = "lecture_vectorize_fixed"
+EMBEDDINGS_NAME = "lecture_embeddings"
+LEGACY_PROGRESS_FILE = Path('lecture_vectorize_progress_fixed.json')  # pre-ledger runs
+
 def generate_embeddings_batch(texts: list) -> list:
     """Generate embeddings using OpenAI"""
     client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-    response = client.embeddings.create(
+    response = rate_limit.embed(client,
         model="text-embedding-3-small",
         input=texts
     )
@@ -29,17 +40,13 @@ def main():
     """Generate embeddings for lecture chunks with correct metadata"""
 
     # Load lecture export
-    with open('lectures_export.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_export('lectures_export')
 
     chunks = data['chunks']
     print(f"Loaded {len(chunks)} lecture chunks")
 
     # Connect to local D1 to get book codes
-    db_path = Path('.wrangler/state/v3/d1/miniflare-D1DatabaseObject')
-    db_file = list(db_path.glob('*.sqlite'))[0]
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
+    cursor = storage.read_connection().cursor()
 
     # Build verse_id to book_code mapping
     print("Building verse_id to book_code mapping...")
@@ -52,107 +59,113 @@ def main():
     verse_to_book = dict(cursor.fetchall())
     print(f"Mapped {len(verse_to_book)} verses to book codes")
 
-    conn.close()
-
-    # Check for progress file
-    progress_file = Path('lecture_vectorize_progress_fixed.json')
-    if progress_file.exists():
-        with open(progress_file, 'r') as f:
-            progress = json.load(f)
-            uploaded_count = progress.get('uploaded_count', 0)
-            print(f"\nResuming from chunk ID: {chunks[uploaded_count]['id']}")
-            print(f"Already uploaded: {uploaded_count} chunks")
-    else:
-        uploaded_count = 0
-        progress = {'uploaded_count': 0}
-
-    # Process remaining chunks
-    remaining_chunks = chunks[uploaded_count:]
-
-    if not remaining_chunks:
-        print("\n✅ All chunks already uploaded!")
+    # Register every chunk in the ledger once; reruns resume from it
+    ledger = job_ledger.connect()
+    chunks_by_id = {chunk['id']: chunk for chunk in chunks}
+    done_ids = []
+    if LEGACY_PROGRESS_FILE.exists():
+        with open(LEGACY_PROGRESS_FILE, 'r') as f:
+            done_ids = [chunk['id'] for chunk in chunks[:json.load(f).get('uploaded_count', 0)]]
+    job_ledger.create_job(ledger, JOB_NAME, chunks_by_id, done_ids=done_ids)
+
+    state = job_ledger.counts(ledger, JOB_NAME)
+    print(f"\nAlready uploaded: {state['done']} chunks ({state['failed']} failed)")
+
+    if state['pending'] + state['in_flight'] == 0:
+        print("\n✅ No chunks left to upload!")
         return
 
     # Process in batches of 100
     batch_size = 100
+    owner = job_ledger.worker_id()
+    temp_file = Path(f'temp_vectors_{os.getpid()}.ndjson')
+    uploaded_count = 0
+    batch_num = 0
 
-    print(f"\nTotal chunks to upload: {len(remaining_chunks)}")
+    print(f"\nTotal chunks to upload: {state['pending'] + state['in_flight']}")
     print(f"Starting upload...\n")
 
-    for i in range(0, len(remaining_chunks), batch_size):
-        batch = remaining_chunks[i:i+batch_size]
-        batch_num = (i // batch_size) + 1
-
-        print(f"Batch {batch_num}: Processing chunk IDs {batch[0]['id']} to {batch[-1]['id']} ({len(batch)} chunks)")
-
-        # Generate embeddings
-        print("  Generating embeddings...")
-        texts = [chunk['content'][:8000] for chunk in batch]
-        embeddings = generate_embeddings_batch(texts)
-
-        # Prepare for upload with CORRECT metadata
-        vectors_data = []
-        for chunk, embedding in zip(batch, embeddings):
-            # Get book_code from mapping
-            book_code = verse_to_book.get(chunk['verse_id'], 'UNKNOWN')
-
-            vectors_data.append({
-                'id': str(chunk['id']),
-                'values': embedding,
-                'metadata': {
+    try:
+        while True:
+            chunk_ids = job_ledger.claim(ledger, JOB_NAME, owner, batch_size)
+            if not chunk_ids:
+                break
+            batch = [chunks_by_id[chunk_id] for chunk_id in chunk_ids]
+            batch_num += 1
+
+            print(f"Batch {batch_num}: Processing chunk IDs {batch[0]['id']} to {batch[-1]['id']} ({len(batch)} chunks)")
+
+            # Generate embeddings
+            print("  Generating embeddings...")
+            texts = [chunk['content'][:8000] for chunk in batch]
+            try:
+                embeddings = generate_embeddings_batch(texts)
+            except Exception as e:
+                job_ledger.fail(ledger, JOB_NAME, owner, chunk_ids, e)
+                raise
+
+            # Save to the lecture_embeddings artifact with CORRECT metadata
+            rows = embedding_store.upsert(EMBEDDINGS_NAME, [str(chunk['id']) for chunk in batch], embeddings, [
+                {
                     'chunk_id': chunk['id'],
                     'verse_id': chunk['verse_id'],
                     'chunk_type': 'lecture_content',
                     'source': 'vedabase',  # FIXED: was 'vedabase_lectures'
-                    'book_code': book_code  # ADDED: book code for filtering
+                    'book_code': verse_to_book.get(chunk['verse_id'], 'UNKNOWN')  # ADDED: book code for filtering
                 }
-            })
-
-        # Save to temp NDJSON
-        temp_file = Path('temp_vectors.ndjson')
-        with open(temp_file, 'w') as f:
-            for vector in vectors_data:
-                f.write(json.dumps(vector) + '\n')
-
-        # Upload using wrangler
-        print("  Uploading to Vectorize...")
-        import subprocess
-
-        result = subprocess.run(
-            ['npx', 'wrangler', 'vectorize', 'insert', 'philosophy-vectors', '--file=temp_vectors.ndjson'],
-            capture_output=True,
-            text=True
-        )
-
-        # Clean up temp file (ignore if already deleted)
-        try:
-            temp_file.unlink()
-        except FileNotFoundError:
-            pass
-
-        if result.returncode == 0:
-            print(f"  ✓ Successfully uploaded {len(batch)} vectors")
-            uploaded_count += len(batch)
-            print(f"  Progress: {uploaded_count}/{len(chunks)} ({100 * uploaded_count / len(chunks):.1f}%)\n")
-
-            # Update progress
-            progress['uploaded_count'] = uploaded_count
-            with open(progress_file, 'w') as f:
-                json.dump(progress, f)
-        else:
-            print(f"  ✗ Upload failed for batch {batch_num}")
-            print(f"  Error: {result.stderr}")
-            print(f"  Stopping. Fix the issue and run again to resume.")
-            return
-
-    # Clean up progress file on completion
-    if progress_file.exists():
-        progress_file.unlink()
+                for chunk in batch
+            ])
+
+            # Write the batch from the artifact as NDJSON for wrangler
+            with embedding_store.EmbeddingStore(EMBEDDINGS_NAME) as store:
+                store.write_ndjson(temp_file, ids=list(rows), rows=rows)
+
+            # Embedding may have waited on the limiter: keep the lease for the upload
+            job_ledger.renew(ledger, JOB_NAME, owner, chunk_ids)
+
+            # Upload using wrangler
+            print("  Uploading to Vectorize...")
+            import subprocess
+
+            result = subprocess.run(
+                ['npx', 'wrangler', 'vectorize', 'insert', vectorize_api.index_name(), f'--file={temp_file}'],
+                capture_output=True,
+                text=True
+            )
+
+            # Clean up temp file (ignore if already deleted)
+            try:
+                temp_file.unlink()
+            except FileNotFoundError:
+                pass
+
+            if result.returncode == 0:
+                print(f"  ✓ Successfully uploaded {len(batch)} vectors")
+                job_ledger.complete(ledger, JOB_NAME, owner, chunk_ids)
+                uploaded_count += len(batch)
+                done = job_ledger.counts(ledger, JOB_NAME)['done']
+                print(f"  Progress: {done}/{len(chunks)} ({100 * done / len(chunks):.1f}%)\n")
+            else:
+                print(f"  ✗ Upload failed for batch {batch_num}; batch left for retry")
+                print(f"  Error: {result.stderr}")
+                job_ledger.fail(ledger, JOB_NAME, owner, chunk_ids, result.stderr or 'wrangler vectorize insert failed')
+
+    except KeyboardInterrupt:
+        # Hand the current batch back so a restart can claim it right away
+        job_ledger.release(ledger, JOB_NAME, owner)
+        print("\n\nInterrupted by user. Progress is in the job ledger; run again to resume.")
+        sys.exit(0)
+
+    state = job_ledger.counts(ledger, JOB_NAME)
+    ledger.close()
 
     print("\n" + "="*80)
     print("SUMMARY")
     print("="*80)
-    print(f"Total chunks uploaded: {uploaded_count}")
+    print(f"Chunks uploaded by this worker: {uploaded_count}")
+    print(f"Job total: {state['done']}/{len(chunks)} done, {state['failed']} failed")
+    if state['failed']:
+        print(f"Retry failures with: python3 job_ledger.py retry {JOB_NAME}")
     print("\nLecture embeddings fixed with correct metadata:")
     print("  - source: 'vedabase' (searchable!)")
     print("  - book_code: added for filtering")
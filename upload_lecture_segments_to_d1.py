@@ -4,12 +4,12 @@ Upload lecture_segment chunks to remote D1 database
 Uses batched SQL commands via wrangler
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 100  # Chunks per batch (reduced for D1 SQL size limit)
 PAUSE_BETWEEN_BATCHES = 3  # seconds
 
@@ -28,7 +28,7 @@ def upload_to_d1():
     print("=" * 80)
 
     # Connect to local database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get all lecture_segment chunks
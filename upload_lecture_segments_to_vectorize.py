@@ -4,12 +4,13 @@ Upload lecture_segment embeddings to Cloudflare Vectorize
 Uses the Wrangler CLI with ultra-safe batching
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
-EMBEDDINGS_FILE = "lecture_segments_embeddings.json"
+import embedding_store
+
+EMBEDDINGS_NAME = "lecture_segments_embeddings"
 BATCH_SIZE = 500  # Conservative batch size
 PAUSE_BETWEEN_BATCHES = 10  # seconds
 TIMEOUT = 300  # 5 minutes per batch
@@ -23,16 +24,14 @@ def upload_to_vectorize():
     print("=" * 80)
 
     # Load embeddings
-    if not Path(EMBEDDINGS_FILE).exists():
-        print(f"❌ Error: {EMBEDDINGS_FILE} not found")
+    if not embedding_store.exists(EMBEDDINGS_NAME):
+        print(f"❌ Error: {embedding_store.npy_path(EMBEDDINGS_NAME)} not found")
         print("   Run: python3 generate_lecture_segment_embeddings.py first")
         return
 
-    print(f"\n📂 Loading embeddings from {EMBEDDINGS_FILE}...")
-    with open(EMBEDDINGS_FILE, 'r') as f:
-        embeddings = json.load(f)
-
-    total_embeddings = len(embeddings)
+    print(f"\n📂 Loading embeddings from {embedding_store.npy_path(EMBEDDINGS_NAME)}...")
+    store = embedding_store.EmbeddingStore(EMBEDDINGS_NAME)
+    total_embeddings = len(store)
     print(f"✅ Loaded {total_embeddings:,} embeddings")
 
     # Calculate batches
@@ -47,16 +46,13 @@ def upload_to_vectorize():
 
     for i in range(0, total_embeddings, BATCH_SIZE):
         batch_num = i // BATCH_SIZE + 1
-        batch = embeddings[i:i + BATCH_SIZE]
         batch_end = min(i + BATCH_SIZE, total_embeddings)
 
         print(f"[{batch_num}/{num_batches}] Uploading embeddings {i}-{batch_end}...", end=" ", flush=True)
 
         # Create temporary batch file
         batch_file = f"temp_lecture_batch_{batch_num}.ndjson"
-        with open(batch_file, 'w') as f:
-            for embedding in batch:
-                f.write(json.dumps(embedding) + '\n')
+        batch_count = store.write_ndjson(batch_file, i, i + BATCH_SIZE)
 
         # Upload using wrangler
         try:
@@ -70,7 +66,7 @@ def upload_to_vectorize():
 
             if result.returncode == 0:
                 print("✅ Success")
-                success_count += len(batch)
+                success_count += batch_count
             else:
                 print(f"❌ Failed")
                 print(f"   Error: {result.stderr}")
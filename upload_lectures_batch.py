@@ -3,11 +3,12 @@
 Upload lecture data to remote D1 in batches (no transactions)
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
+from shard_export import load_export
+
 def execute_remote_sql_batch(sql_statements: list):
     """Execute multiple SQL statements on remote D1 (without transactions)"""
     # Combine into single SQL file
@@ -34,8 +35,7 @@ def execute_remote_sql_batch(sql_statements: list):
 def upload_lectures():
     """Upload lecture data in small batches"""
     # Load export
-    with open('lectures_export.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_export('lectures_export')
 
     print(f"Loaded export:")
     print(f"  Books: {len(data['books'])}")
@@ -3,18 +3,12 @@
 Upload lecture data from local D1 to remote D1 using wrangler d1 execute
 """
 
-import sqlite3
 import json
 import subprocess
 from pathlib import Path
 
-def get_local_db():
-    """Get connection to local D1 database"""
-    db_path = Path('.wrangler/state/v3/d1/miniflare-D1DatabaseObject')
-    db_files = list(db_path.glob('*.sqlite'))
-    if not db_files:
-        raise FileNotFoundError(f"No D1 database found in {db_path}")
-    return sqlite3.connect(db_files[0])
+import storage
+from storage import LOCAL_DB
 
 def execute_remote_sql(sql: str):
     """Execute SQL on remote D1 database"""
@@ -38,7 +32,7 @@ def execute_remote_sql(sql: str):
 
 def upload_lectures():
     """Upload lecture data to remote D1"""
-    conn = get_local_db()
+    conn = storage.read_connection(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get lecture books (IDs 9+)
@@ -124,7 +118,7 @@ VALUES ({chunk_id}, {verse_id}, '{chunk_type}', {chunk_index_val}, '{content}',
             print(f"   ✗ Batch {batch_num} failed: {e}")
             break
 
-    conn.close()
+    storage.close_read_connections()
 
     print(f"\n✅ Upload complete!")
     print(f"   Total verses uploaded: {total_uploaded}")
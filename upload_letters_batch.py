@@ -3,10 +3,11 @@
 Upload letters to remote Cloudflare D1 in batches
 """
 
-import json
 import subprocess
 import time
 
+from shard_export import load_export
+
 def upload_batch(statements, batch_num, total_batches):
     """Upload a batch of SQL statements"""
     sql = '; '.join(statements) + ';'
@@ -31,10 +32,9 @@ def upload_letters():
     print("UPLOADING LETTERS TO REMOTE D1")
     print("=" * 80)
 
-    with open('letters_export_for_upload.json', 'r') as f:
-        data = json.load(f)
+    data = load_export('letters_export_for_upload')
 
-    book = data['book']
+    book = data['books'][0]
     verses = data['verses']
     chunks = data['chunks']
 
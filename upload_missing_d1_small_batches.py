@@ -3,13 +3,13 @@
 Upload missing lecture segments with small batches (10 chunks) and robust retry logic
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 import json
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 50  # Optimized batch size
 PAUSE_BETWEEN_BATCHES = 2  # Reduced pause
 MAX_RETRIES = 3  # Retry failed batches
@@ -49,7 +49,7 @@ def get_remote_chunk_count():
 
 def get_all_chunk_ids():
     """Get all lecture_segment chunk IDs from local DB"""
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     cursor.execute("SELECT id FROM vedabase_chunks WHERE chunk_type = 'lecture_segment' ORDER BY id")
@@ -60,7 +60,7 @@ def get_all_chunk_ids():
 
 def get_chunks_by_ids(chunk_ids):
     """Get chunk data for specific IDs"""
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     placeholders = ','.join('?' * len(chunk_ids))
@@ -4,12 +4,12 @@ Upload missing vedabase_verses to remote D1
 This fixes the FOREIGN KEY constraint issue preventing lecture segment uploads
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 100  # Verses are smaller than chunks
 PAUSE_BETWEEN_BATCHES = 2
 MAX_RETRIES = 3
@@ -54,7 +54,7 @@ def get_all_local_verses():
     """Get all verses from local DB"""
     print("📂 Loading all verses from local database...")
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     cursor.execute("""
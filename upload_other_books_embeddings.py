@@ -4,11 +4,14 @@ Upload embeddings for other individual books (NOI, SC, TLC, etc.) to Cloudflare
 These are the 21 smaller books that weren't included in the main SB upload
 """
 
-import json
 import requests
 import os
 import sys
 
+from embedding_store import EmbeddingStore, npy_path
+
+EMBEDDINGS_NAME = "other_individual_embeddings"
+
 # Vectorize endpoint
 ACCOUNT_ID = "40035612bce74407c306499494965595"
 INDEX_NAME = "philosophy-vectors"
@@ -22,23 +25,19 @@ if not API_TOKEN:
     sys.exit(1)
 
 # Load embeddings
-print("Loading embeddings from other_individual_embeddings_export.json...")
-with open('other_individual_embeddings_export.json', 'r') as f:
-    data = json.load(f)
-
-chunks = data['chunks']
-print(f"Total chunks to upload: {len(chunks)}")
+print(f"Loading embeddings from {npy_path(EMBEDDINGS_NAME)}...")
+store = EmbeddingStore(EMBEDDINGS_NAME)
+print(f"Total chunks to upload: {len(store)}")
 
 # Convert to Vectorize format
 vectors = []
-for chunk in chunks:
-    chunk_id = chunk['id']
-    embedding = chunk['embedding']
-    book_code = chunk.get('book_code', 'UNKNOWN')
+for record in store.vectorize_records():
+    chunk_id = record['metadata']['chunk_id']
+    book_code = record['metadata'].get('book_code', 'UNKNOWN')
 
     vector = {
         "id": f"vedabase_chunk_{chunk_id}",
-        "values": embedding,
+        "values": record['values'],
         "metadata": {
             "chunk_id": chunk_id,
             "source": "vedabase",
@@ -90,8 +89,8 @@ for i in range(0, len(vectors), BATCH_SIZE):
 print(f"\n✅ Upload complete! {total_uploaded} vectors uploaded to Vectorize")
 print("\nBooks included:")
 book_counts = {}
-for chunk in chunks:
-    code = chunk.get('book_code', 'UNKNOWN')
+for vector in vectors:
+    code = vector['metadata']['book_code']
     book_counts[code] = book_counts.get(code, 0) + 1
 
 for code, count in sorted(book_counts.items()):
@@ -3,11 +3,12 @@
 Upload individual OTHER books to remote D1 in batches
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
+from shard_export import load_export
+
 def execute_remote_sql_batch(sql_statements: list):
     """Execute multiple SQL statements on remote D1"""
     sql = '\n'.join(sql_statements)
@@ -34,8 +35,7 @@ def execute_remote_sql_batch(sql_statements: list):
 
 def upload_individual_books():
     """Upload individual books data in batches"""
-    with open('other_individual_export_for_upload.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_export('other_individual_export_for_upload')
 
     print("=" * 80)
     print("UPLOADING INDIVIDUAL OTHER BOOKS TO REMOTE D1")
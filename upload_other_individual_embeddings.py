@@ -3,61 +3,43 @@
 Upload individual OTHER books embeddings to Cloudflare Vectorize
 """
 
-import json
 import subprocess
 from pathlib import Path
 
+import embedding_store
+
+EMBEDDINGS_NAME = "other_individual_embeddings"
+
 def upload_embeddings():
     """Upload embeddings to Vectorize in batches"""
 
-    embeddings_file = 'other_individual_embeddings_export.json'
-    if not Path(embeddings_file).exists():
-        print(f"Error: {embeddings_file} not found")
+    if not embedding_store.exists(EMBEDDINGS_NAME):
+        print(f"Error: {embedding_store.npy_path(EMBEDDINGS_NAME)} not found")
         return
 
     print("=" * 80)
     print("UPLOADING INDIVIDUAL OTHER BOOKS EMBEDDINGS TO VECTORIZE")
     print("=" * 80)
 
-    with open(embeddings_file, 'r') as f:
-        data = json.load(f)
-
-    chunks = data['chunks']
-    print(f"\nLoaded {len(chunks)} embeddings")
+    store = embedding_store.EmbeddingStore(EMBEDDINGS_NAME)
+    total = len(store)
+    print(f"\nLoaded {total} embeddings")
 
     # Upload in batches of 100
     batch_size = 100
-    total_batches = (len(chunks) + batch_size - 1) // batch_size
+    total_batches = (total + batch_size - 1) // batch_size
 
     print(f"\nUploading to Vectorize in batches of {batch_size}...")
     print(f"Total batches: {total_batches}\n")
 
     uploaded_count = 0
 
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i+batch_size]
+    for i in range(0, total, batch_size):
         batch_num = (i // batch_size) + 1
 
-        # Prepare NDJSON format for Vectorize
-        vectors_data = []
-        for chunk in batch:
-            vectors_data.append({
-                'id': str(chunk['id']),
-                'values': chunk['embedding'],
-                'metadata': {
-                    'chunk_id': chunk['id'],
-                    'verse_id': chunk['verse_id'],
-                    'chunk_type': chunk['chunk_type'],
-                    'source': 'vedabase',
-                    'book_code': chunk['book_code']
-                }
-            })
-
-        # Write to NDJSON file
+        # Write this slice as NDJSON for Vectorize
         ndjson_file = 'temp_vectors.ndjson'
-        with open(ndjson_file, 'w') as f:
-            for vec in vectors_data:
-                f.write(json.dumps(vec) + '\n')
+        batch_count = store.write_ndjson(ndjson_file, i, i + batch_size)
 
         # Upload using wrangler vectorize upsert
         result = subprocess.run(
@@ -71,8 +53,8 @@ def upload_embeddings():
         Path(ndjson_file).unlink()
 
         if result.returncode == 0:
-            uploaded_count += len(batch)
-            print(f"  Batch {batch_num}/{total_batches}: ✓ Uploaded {len(batch)} vectors ({uploaded_count}/{len(chunks)} total)")
+            uploaded_count += batch_count
+            print(f"  Batch {batch_num}/{total_batches}: ✓ Uploaded {batch_count} vectors ({uploaded_count}/{total} total)")
         else:
             print(f"  Batch {batch_num}/{total_batches}: ✗ Failed")
             print(f"  Error: {result.stderr[:200]}")
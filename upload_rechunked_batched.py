@@ -3,11 +3,11 @@
 Upload re-chunked data to production D1 in batches
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 
 def upload_in_batches():
     """Upload re-chunked data in manageable batches"""
@@ -16,7 +16,7 @@ def upload_in_batches():
     print("UPLOADING RE-CHUNKED DATA TO PRODUCTION D1 (BATCHED)")
     print("=" * 80)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Step 1: Delete old purport_paragraph chunks
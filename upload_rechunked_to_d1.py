@@ -6,10 +6,10 @@ This will:
 2. Upload new purport_segment chunks
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 
 def upload_rechunked_data():
     """Upload re-chunked data to production D1"""
@@ -18,7 +18,7 @@ def upload_rechunked_data():
     print("UPLOADING RE-CHUNKED DATA TO PRODUCTION D1")
     print("=" * 80)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get purport_segment chunks (new chunks)
@@ -4,11 +4,11 @@ Upload re-chunked data to production D1 in small batches
 Uses wrangler d1 execute with inline SQL
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 100  # Small batches to avoid hitting size limits
 
 def upload_to_d1():
@@ -19,7 +19,7 @@ def upload_to_d1():
     print("=" * 80)
 
     # Connect to local database
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get all purport_segment chunks
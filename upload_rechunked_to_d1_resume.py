@@ -3,12 +3,12 @@
 Resume D1 upload from specific chunk index
 """
 
-import sqlite3
+import storage
+from storage import LOCAL_DB
 import subprocess
 import time
 import sys
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 100
 
 def upload_from_chunk(start_chunk=0):
@@ -18,7 +18,7 @@ def upload_from_chunk(start_chunk=0):
     print(f"RESUMING D1 UPLOAD FROM CHUNK {start_chunk}")
     print("=" * 80)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     cursor.execute("""
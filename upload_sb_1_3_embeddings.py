@@ -3,11 +3,14 @@
 Upload Srimad Bhagavatam Cantos 1-3 embeddings to Vectorize
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
+from embedding_store import EmbeddingStore, npy_path
+
+EMBEDDINGS_NAME = "sb_cantos_1_3_embeddings"
+
 def upload_embeddings():
     """Upload SB Cantos 1-3 embeddings to Vectorize"""
 
@@ -16,13 +19,9 @@ def upload_embeddings():
     print("=" * 80)
 
     # Load embeddings
-    embeddings_file = 'sb_cantos_1_3_embeddings.json'
-    print(f"\nLoading embeddings from {embeddings_file}...")
-
-    with open(embeddings_file, 'r') as f:
-        embeddings = json.load(f)
-
-    total_embeddings = len(embeddings)
+    print(f"\nLoading embeddings from {npy_path(EMBEDDINGS_NAME)}...")
+    store = EmbeddingStore(EMBEDDINGS_NAME)
+    total_embeddings = len(store)
     print(f"Loaded {total_embeddings} embeddings")
 
     # Upload in batches
@@ -32,14 +31,11 @@ def upload_embeddings():
     print(f"\nUploading in {total_batches} batches of {batch_size}...")
 
     for i in range(0, total_embeddings, batch_size):
-        batch = embeddings[i:i+batch_size]
         batch_num = (i // batch_size) + 1
 
         # Create temporary batch file
         batch_file = f'temp_batch_{batch_num}.ndjson'
-        with open(batch_file, 'w') as f:
-            for embedding in batch:
-                f.write(json.dumps(embedding) + '\n')
+        store.write_ndjson(batch_file, i, i + batch_size)
 
         # Upload batch using wrangler
         result = subprocess.run([
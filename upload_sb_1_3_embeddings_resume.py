@@ -4,11 +4,14 @@ Upload Srimad Bhagavatam Cantos 1-3 embeddings to Vectorize
 With retry logic and resume capability
 """
 
-import json
 import subprocess
 import time
 from pathlib import Path
 
+from embedding_store import EmbeddingStore, npy_path
+
+EMBEDDINGS_NAME = "sb_cantos_1_3_embeddings"
+
 def upload_embeddings(start_batch=0):
     """Upload SB Cantos 1-3 embeddings to Vectorize"""
 
@@ -19,13 +22,9 @@ def upload_embeddings(start_batch=0):
     print("=" * 80)
 
     # Load embeddings
-    embeddings_file = 'sb_cantos_1_3_embeddings.json'
-    print(f"\nLoading embeddings from {embeddings_file}...")
-
-    with open(embeddings_file, 'r') as f:
-        embeddings = json.load(f)
-
-    total_embeddings = len(embeddings)
+    print(f"\nLoading embeddings from {npy_path(EMBEDDINGS_NAME)}...")
+    store = EmbeddingStore(EMBEDDINGS_NAME)
+    total_embeddings = len(store)
     print(f"Loaded {total_embeddings} embeddings")
 
     # Upload in batches
@@ -38,14 +37,11 @@ def upload_embeddings(start_batch=0):
 
     for batch_idx in range(start_batch, total_batches):
         i = batch_idx * batch_size
-        batch = embeddings[i:i+batch_size]
         batch_num = batch_idx + 1
 
         # Create temporary batch file
         batch_file = f'temp_batch_{batch_num}.ndjson'
-        with open(batch_file, 'w') as f:
-            for embedding in batch:
-                f.write(json.dumps(embedding) + '\n')
+        store.write_ndjson(batch_file, i, i + batch_size)
 
         # Retry logic
         max_retries = 3
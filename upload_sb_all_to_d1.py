@@ -4,12 +4,14 @@ Upload ALL Vedabase data (Cantos 1-10) from local D1 to remote D1
 """
 
 import os
-import sqlite3
 import subprocess
 import json
+from collections import defaultdict
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
+import storage
+from storage import LOCAL_DB
+
 BATCH_SIZE = 100  # Verses per batch
 
 def upload_all_vedabase():
@@ -19,7 +21,7 @@ def upload_all_vedabase():
     print("UPLOADING ALL VEDABASE DATA TO PRODUCTION D1")
     print("=" * 80)
 
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.read_connection(LOCAL_DB)
     cursor = conn.cursor()
 
     # Step 1: Upload books
@@ -71,6 +73,19 @@ INSERT OR IGNORE INTO vedabase_books (code, name) VALUES ('{code}', '{name.repla
 
         sql_statements = []
 
+        # One chunk query per batch instead of one per verse
+        verse_ids = [verse_data[0] for verse_data in batch]
+        placeholders = ', '.join('?' for _ in verse_ids)
+        cursor.execute(f"""
+            SELECT verse_id, id, chunk_type, chunk_index, content, word_count
+            FROM vedabase_chunks
+            WHERE verse_id IN ({placeholders})
+            ORDER BY id
+        """, verse_ids)
+        chunks_by_verse = defaultdict(list)
+        for verse_id, *chunk in cursor.fetchall():
+            chunks_by_verse[verse_id].append(chunk)
+
         for verse_data in batch:
             verse_id, book_code, chapter, verse_num, sanskrit, synonyms, translation = verse_data
 
@@ -88,17 +103,7 @@ SELECT {verse_id}, id, '{chapter}', '{verse_num}', '{sanskrit}', '{synonyms}', '
 FROM vedabase_books WHERE code = '{book_code}';
 """)
 
-            # Get chunks for this verse
-            cursor.execute("""
-                SELECT id, chunk_type, chunk_index, content, word_count
-                FROM vedabase_chunks
-                WHERE verse_id = ?
-                ORDER BY id
-            """, (verse_id,))
-
-            chunks = cursor.fetchall()
-
-            for chunk_id, chunk_type, chunk_index, content, word_count in chunks:
+            for chunk_id, chunk_type, chunk_index, content, word_count in chunks_by_verse[verse_id]:
                 content = (content or '').replace("'", "''")
                 chunk_index_val = chunk_index if chunk_index is not None else 'NULL'
                 word_count_val = word_count if word_count is not None else 0
@@ -122,7 +127,7 @@ VALUES ({chunk_id}, {verse_id}, '{chunk_type}', {chunk_index_val}, '{content}',
             uploaded += len(batch)
             print(f"  ✓ Batch {batch_num}: {uploaded}/{total_verses} verses ({uploaded*100//total_verses}%)")
 
-    conn.close()
+    storage.close_read_connections()
 
     print("\n" + "=" * 80)
     print("UPLOAD COMPLETE")
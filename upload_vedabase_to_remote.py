@@ -5,17 +5,19 @@ Handles the 8,481 verses and 19,823 chunks
 """
 
 import os
-import sqlite3
+import metrics
+import storage
+from storage import LOCAL_DB
 import subprocess
 import json
+from contextlib import nullcontext
 from pathlib import Path
 
-LOCAL_DB = ".wrangler/state/v3/d1/miniflare-D1DatabaseObject/3e3b090d-245a-42b9-a77b-cef0fca9db31.sqlite"
 BATCH_SIZE = 50  # Upload in batches of 50 verses (smaller to avoid D1 limits)
 
 def get_verse_count():
     """Get total verse count"""
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM vedabase_verses")
     count = cursor.fetchone()[0]
@@ -24,7 +26,7 @@ def get_verse_count():
 
 def export_verses_batch(offset, limit):
     """Export a batch of verses with their chunks as INSERT statements"""
-    conn = sqlite3.connect(LOCAL_DB)
+    conn = storage.connect(LOCAL_DB)
     cursor = conn.cursor()
 
     # Get verses in this batch
@@ -80,7 +82,7 @@ VALUES ({chunk_id}, {verse_id}, '{chunk_type}', {chunk_index_val}, '{content}',
     conn.close()
     return sql_statements
 
-def upload_batch_to_remote(sql_statements, batch_num):
+def upload_batch_to_remote(sql_statements, batch_num, job=None):
     """Upload a batch of SQL statements to remote D1"""
 
     # Save to temp file
@@ -97,13 +99,14 @@ def upload_batch_to_remote(sql_statements, batch_num):
         if 'CLOUDFLARE_API_TOKEN' in env:
             del env['CLOUDFLARE_API_TOKEN']
 
-        result = subprocess.run(
-            ['npx', 'wrangler', 'd1', 'execute', 'philosophy-db', '--remote', f'--file={temp_file}'],
-            capture_output=True,
-            text=True,
-            timeout=300,
-            env=env
-        )
+        with job.timed('wrangler_d1') if job else nullcontext():
+            result = subprocess.run(
+                ['npx', 'wrangler', 'd1', 'execute', 'philosophy-db', '--remote', f'--file={temp_file}'],
+                capture_output=True,
+                text=True,
+                timeout=300,
+                env=env
+            )
 
         if result.returncode == 0:
             print(f"  ✓ Batch {batch_num} uploaded successfully")
@@ -133,6 +136,7 @@ def main():
 
     successful_batches = 0
     failed_batches = 0
+    job = metrics.Job('vedabase_d1_upload', total=total_verses)
 
     for batch_num in range(total_batches):
         offset = (start_from_id - 1) + (batch_num * BATCH_SIZE)
@@ -141,13 +145,19 @@ def main():
 
         sql_statements = export_verses_batch(offset, BATCH_SIZE)
 
-        if upload_batch_to_remote(sql_statements, batch_num + 1):
+        job.queue_depth('batches_left', total_batches - batch_num)
+        if upload_batch_to_remote(sql_statements, batch_num + 1, job):
             successful_batches += 1
+            job.advance(min(BATCH_SIZE, total_verses - offset),
+                        nbytes=sum(len(sql.encode('utf-8')) for sql in sql_statements))
         else:
             failed_batches += 1
+            job.error()
             print(f"  Stopping due to error. You can retry from batch {batch_num + 1}")
             break
 
+    job.finish('done' if not failed_batches else 'failed')
+
     print(f"\n{'='*60}")
     print(f"Upload Summary:")
     print(f"  Successful batches: {successful_batches}/{total_batches}")
@@ -3,19 +3,24 @@
 Re-upload lecture vectors using UPSERT to replace existing ones with correct metadata
 """
 
-import json
 import subprocess
 from pathlib import Path
+import embedding_store
+import rate_limit
+import vectorize_api
+
+from shard_export import load_export
+
+EMBEDDINGS_NAME = "lecture_embeddings"
 
 print("="*80)
 print("UPSERTING LECTURES WITH CORRECT METADATA")
 print("="*80)
 print("Note: UPSERT will replace any existing vectors with the same IDs\n")
 
-# Load parsed lectures from lectures_export.json
-print("Loading lecture data from lectures_export.json...")
-with open('lectures_export.json', 'r') as f:
-    lectures_data = json.load(f)
+# Load parsed lectures from the lectures_export shards
+print("Loading lecture data from the lectures_export shards...")
+lectures_data = load_export('lectures_export')
 
 # Get chunks and verses
 all_chunks = lectures_data['chunks']
@@ -56,8 +61,7 @@ for i in range(0, len(all_chunks), batch_size):
     texts = [chunk['content'] for chunk in batch]
 
     # Call OpenAI API
-    import requests
-    response = requests.post(
+    response = rate_limit.post(
         'https://api.openai.com/v1/embeddings',
         headers={
             'Content-Type': 'application/json',
@@ -77,32 +81,28 @@ for i in range(0, len(all_chunks), batch_size):
     embeddings_data = response.json()
     embeddings = [item['embedding'] for item in embeddings_data['data']]
 
-    # Prepare vectors with correct metadata
-    vectors_data = []
-    for chunk, embedding in zip(batch, embeddings):
-        vectors_data.append({
-            'id': str(chunk['id']),
-            'values': embedding,
-            'metadata': {
-                'chunk_id': chunk['id'],
-                'verse_id': chunk['verse_id'],
-                'chunk_type': 'lecture_content',
-                'source': 'vedabase',  # Correct source for searching
-                'book_code': chunk['book_code']  # For filtering
-            }
-        })
-
-    # Save to temp NDJSON
+    # Save to the lecture_embeddings artifact with correct metadata
+    rows = embedding_store.upsert(EMBEDDINGS_NAME, [str(chunk['id']) for chunk in batch], embeddings, [
+        {
+            'chunk_id': chunk['id'],
+            'verse_id': chunk['verse_id'],
+            'chunk_type': 'lecture_content',
+            'source': 'vedabase',  # Correct source for searching
+            'book_code': chunk['book_code']  # For filtering
+        }
+        for chunk in batch
+    ])
+
+    # Write the batch from the artifact as NDJSON for wrangler
     temp_file = Path('temp_vectors.ndjson')
-    with open(temp_file, 'w') as f:
-        for vector in vectors_data:
-            f.write(json.dumps(vector) + '\n')
+    with embedding_store.EmbeddingStore(EMBEDDINGS_NAME) as store:
+        store.write_ndjson(temp_file, ids=list(rows), rows=rows)
 
     # Upload using wrangler with UPSERT
     print("  Upserting to Vectorize...")
 
     result = subprocess.run(
-        ['npx', 'wrangler', 'vectorize', 'upsert', 'philosophy-vectors', '--file=temp_vectors.ndjson'],
+        ['npx', 'wrangler', 'vectorize', 'upsert', vectorize_api.index_name(), '--file=temp_vectors.ndjson'],
         capture_output=True,
         text=True
     )
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Thin client for the Cloudflare Vectorize v2 REST API.
+
+Credentials come from CLOUDFLARE_ACCOUNT_ID / CLOUDFLARE_API_TOKEN and
+the default index from CLOUDFLARE_VECTORIZE_INDEX_ID; they are read at
+call time so scripts can load_dotenv() after importing this module. The
+default index is an alias: it resolves to the live generation recorded
+by index_alias.py (read-only, so this module never imports it), and an
+index passed explicitly is used as is.
+Each thread gets its own HTTP session, and 429/5xx responses are retried
+with backoff, so callers can fan batches out over a thread pool.
+
+    records = vectorize_api.get_by_ids(['19824', '19825'])
+    vectorize_api.upsert([{'id': ..., 'values': [...], 'metadata': {...}}])
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+DEFAULT_INDEX = "philosophy-vectors"            # alias, see index_alias.py
+REGISTRY_DB = "index_generations.db"            # index_alias.REGISTRY_DB
+GET_BATCH = 20          # ids per get_by_ids call
+DELETE_BATCH = 1000     # ids per delete_by_ids call (API maximum)
+MAX_RETRIES = 5
+BACKOFF_BASE = 2
+TIMEOUT = 120
+
+_local = threading.local()
+
+
+class VectorizeError(Exception):
+    pass
+
+
+def live_index(alias, registry_db=REGISTRY_DB):
+    """Vectorize index of alias's live generation, else alias itself."""
+    if not Path(registry_db).exists():
+        return alias
+    conn = sqlite3.connect(f"file:{Path(registry_db).resolve()}?mode=ro", uri=True)
+    try:
+        row = conn.execute("""
+            SELECT g.remote_index FROM aliases a JOIN generations g ON g.name = a.generation WHERE a.alias = ?
+        """, (alias,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    return row[0] if row and row[0] else alias
+
+
+def index_name(index=None):
+    """index as given, else the live index behind the default alias."""
+    return index or live_index(os.getenv('CLOUDFLARE_VECTORIZE_INDEX_ID', DEFAULT_INDEX))
+
+
+def _session():
+    session = getattr(_local, 'session', None)
+    if session is None:
+        account_id = os.getenv('CLOUDFLARE_ACCOUNT_ID')
+        api_token = os.getenv('CLOUDFLARE_API_TOKEN')
+        if not account_id or not api_token:
+            raise VectorizeError("CLOUDFLARE_ACCOUNT_ID and CLOUDFLARE_API_TOKEN must be set")
+        session = _local.session = requests.Session()
+        session.headers['Authorization'] = f"Bearer {api_token}"
+        session.base_url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/vectorize/v2/indexes"
+    return session
+
+
+def _call(method, url, **kwargs):
+    """HTTP call with 429/5xx retries; returns the envelope's 'result'."""
+    session = _session()
+    for attempt in range(1, MAX_RETRIES + 1):
+        response = session.request(method, url, timeout=TIMEOUT, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == MAX_RETRIES:
+                break
+            time.sleep(float(response.headers.get('retry-after') or BACKOFF_BASE ** attempt))
+            continue
+        try:
+            body = response.json()
+        except ValueError:
+            raise VectorizeError(f"{method} {url}: HTTP {response.status_code}: {response.text[:200]}")
+        if not response.ok or not body.get('success', False):
+            raise VectorizeError(f"{method} {url}: HTTP {response.status_code}: {body.get('errors')}")
+        return body.get('result')
+    raise VectorizeError(f"{method} {url}: HTTP {response.status_code} after {MAX_RETRIES} attempts")
+
+
+def request(method, path, index=None, **kwargs):
+    """Call path on an index; returns the envelope's 'result'."""
+    url = f"{_session().base_url}/{index_name(index)}{'/' + path if path else ''}"
+    return _call(method, url, **kwargs)
+
+
+def get_by_ids(ids, index=None):
+    """Vectors {id, values, metadata} for ids (missing ids are left out)."""
+    ids = [str(vector_id) for vector_id in ids]
+    records = []
+    for start in range(0, len(ids), GET_BATCH):
+        records.extend(request('POST', 'get_by_ids', index, json={'ids': ids[start:start + GET_BATCH]}) or [])
+    return records
+
+
+def upsert(records, index=None):
+    """Upsert {id, values, metadata} records as NDJSON; returns the mutation id."""
+    body = ''.join(json.dumps({'id': str(record['id']),
+                               'values': [float(v) for v in record['values']],
+                               'metadata': record.get('metadata') or {}}, ensure_ascii=False) + '\n'
+                   for record in records)
+    result = request('POST', 'upsert', index, data=body.encode('utf-8'),
+                     headers={'Content-Type': 'application/x-ndjson'})
+    return (result or {}).get('mutationId')
+
+
+def index_info(index=None):
+    """{'vectorCount', 'dimensions', ...} of an index."""
+    return request('GET', 'info', index) or {}
+
+
+def create_index(name, dimensions, metric='cosine', description=''):
+    return _call('POST', _session().base_url, json={
+        'name': name,
+        'description': description,
+        'config': {'dimensions': dimensions, 'metric': metric},
+    })
+
+
+def delete_index(name):
+    return request('DELETE', '', name)
+
+
+def metadata_indexes(index=None):
+    """[{'propertyName', 'indexType'}] of an index."""
+    return (request('GET', 'metadata_index/list', index) or {}).get('metadataIndexes', [])
+
+
+def create_metadata_index(property_name, index_type, index=None):
+    return request('POST', 'metadata_index/create', index,
+                   json={'propertyName': property_name, 'indexType': index_type})
+
+
+def delete_by_ids(ids, index=None):
+    """Delete up to DELETE_BATCH ids; returns the mutation id."""
+    result = request('POST', 'delete_by_ids', index, json={'ids': [str(vector_id) for vector_id in ids]})
+    return (result or {}).get('mutationId')
+
+
+def query(vector, top_k=10, filter=None, index=None):
+    """Nearest neighbours of vector: [{'id', 'score', 'metadata'}]."""
+    body = {'vector': [float(v) for v in vector], 'topK': top_k, 'returnMetadata': 'all'}
+    if filter:
+        body['filter'] = filter
+    return (request('POST', 'query', index, json=body) or {}).get('matches', [])
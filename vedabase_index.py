@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Local two-level (verse -> chunk) vector index over the Vedabase artifacts.
+
+Every purport paragraph, lecture segment and letter chunk used to be
+scored as one flat set. Here the chunk vectors of the embedding
+artifacts are grouped by verse_id (a verse, a lecture, a letter), and
+each group gets a centroid: the normalised mean of its chunks.
+
+    coarse  score every centroid, keep the top fan_out verses
+    fine    score only the chunks of those verses, return top_k
+
+If the coarse stage does not separate its winners (the best centroid is
+less than min_margin above the first verse left out), the query falls
+back to an exact scan of every chunk. Results carry their verse_id, so
+they group naturally by verse for display.
+
+Metadata filters run before scoring. The index carries columns aligned
+with its rows (book, chunk_type, recipient, canto, chapter, year; see
+metadata_columns.py), and a where= expression becomes one boolean mask.
+Verses without an allowed chunk drop out of the coarse stage. A
+selective mask gathers only the allowed rows, so a filtered query
+scores fewer vectors than an unfiltered one:
+
+    index.search(vector, where="book == 'letters' and 1968 <= year <= 1970")
+
+The index is built in memory from the artifacts (about a second for the
+~27k-chunk corpus); shared() keeps one per process.
+
+Usage:
+    python3 vedabase_index.py info
+    python3 vedabase_index.py bench [--queries 100] [--fan-out 64] [--where EXPR]
+"""
+
+import argparse
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import delete_vectors
+import embedding_store
+import metadata_columns
+import storage
+import verse_refs
+
+# Artifacts holding Vedabase chunk vectors (metadata has chunk_id and verse_id)
+STORES = [
+    'sb_cantos_1_3_embeddings', 'sb_cantos_4_10_embeddings', 'cc_embeddings', 'kb_embeddings',
+    'other_individual_embeddings', 'rechunked_embeddings', 'lec1c_embeddings',
+    'lecture_segments_embeddings', 'letter_embeddings', 'conversation_embeddings',
+    'lecture_embeddings', 'vedabase_embeddings',
+]
+FAN_OUT = 64            # verses kept by the coarse stage
+MIN_MARGIN = 0.02       # below this the coarse ranking is not trusted: exact scan
+GATHER_FRACTION = 0.3   # masks selecting more than this are applied to a full scoring pass
+
+YEAR_RE = re.compile(r'\b(19[4-9]\d)\b')
+
+_shared = None
+
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class VedabaseIndex:
+    """Chunk vectors sorted by verse, with one centroid per verse."""
+
+    def __init__(self, stores=STORES, source_db=None):
+        deleted = delete_vectors.tombstoned_chunks()
+        d1 = d1_chunks(source_db)
+        blocks, chunk_ids, verse_ids, seen, metadatas = [], [], [], set(), []
+        self.stores = []
+        self.skipped = {'no_verse': 0, 'duplicate': 0, 'deleted': 0}
+        for name in stores:
+            if not embedding_store.exists(name):
+                continue
+            with embedding_store.EmbeddingStore(name) as store:
+                rows = []
+                for row, (_, _, metadata) in enumerate(store.records()):
+                    chunk_id, verse_id = metadata.get('chunk_id'), metadata.get('verse_id')
+                    if verse_id is None and chunk_id in d1:
+                        # Older artifacts (e.g. rechunked_embeddings) carry no verse_id
+                        verse_id = d1[chunk_id][0]
+                    if chunk_id is None or verse_id is None:
+                        self.skipped['no_verse'] += 1
+                        continue
+                    if chunk_id in seen or chunk_id in deleted:
+                        self.skipped['duplicate' if chunk_id in seen else 'deleted'] += 1
+                        continue
+                    seen.add(chunk_id)
+                    rows.append(row)
+                    chunk_ids.append(chunk_id)
+                    verse_ids.append(verse_id)
+                    metadatas.append(metadata)
+                if rows:
+                    blocks.append(np.asarray(store.vectors[rows], dtype=np.float32))
+                    self.stores.append(name)
+
+        if self.skipped['no_verse']:
+            print(f"⚠️  {self.skipped['no_verse']:,} chunks skipped: no verse_id in the artifact or the D1 mirror")
+        if not blocks:
+            raise FileNotFoundError(f"No embedding artifacts found (looked for {', '.join(stores)})")
+        vectors = normalize(np.concatenate(blocks))
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        verse_ids = np.asarray(verse_ids, dtype=np.int64)
+
+        order = np.lexsort((chunk_ids, verse_ids))
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.chunk_ids = chunk_ids[order]
+        self.verse_ids = verse_ids[order]
+        self.groups, self.starts = np.unique(self.verse_ids, return_index=True)
+        self.ends = np.append(self.starts[1:], len(self.verse_ids))
+        self.centroids = normalize(np.add.reduceat(self.vectors, self.starts, axis=0))
+        self.columns = load_columns(chunk_ids, metadatas, d1).take(order)
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    def _top(self, scores, k):
+        """Indexes of the k best scores, best first."""
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind='stable')]
+
+    def _hits(self, rows, scores):
+        return [{'chunk_id': int(self.chunk_ids[row]), 'verse_id': int(self.verse_ids[row]), 'score': float(score)}
+                for row, score in zip(rows, scores)]
+
+    def _scores(self, rows, query, mask):
+        """(rows, scores) for the allowed rows: a gathered subset when the
+        mask is selective, otherwise a full pass with the rest masked out."""
+        if mask is None:
+            return rows, (self.vectors @ query if rows is None else self.vectors[rows] @ query)
+        if rows is None:
+            if mask.sum() > len(mask) * GATHER_FRACTION:
+                scores = self.vectors @ query
+                scores[~mask] = -np.inf
+                return np.arange(len(mask)), scores
+            rows = np.flatnonzero(mask)
+        else:
+            rows = rows[mask[rows]]
+        return rows, self.vectors[rows] @ query
+
+    def search_exact(self, query, top_k, mask=None):
+        """Flat scan of every (allowed) chunk."""
+        rows, scores = self._scores(None, query, mask)
+        top = self._top(scores, top_k)
+        top = top[np.isfinite(scores[top])]
+        rows = top if rows is None else rows[top]
+        return self._hits(rows, scores[top]), {'mode': 'exact', 'scanned': len(scores)}
+
+    def search(self, query, top_k=10, fan_out=FAN_OUT, min_margin=MIN_MARGIN, exact=False, where=None):
+        """([{'chunk_id', 'verse_id', 'score'}], stats) for a query vector.
+
+        where is a metadata_columns filter expression, applied as a mask
+        before anything is scored.
+        """
+        query = normalize(np.asarray(query, dtype=np.float32))
+        mask = self.columns.mask(where) if where else None
+        verses_allowed = np.logical_or.reduceat(mask, self.starts) if mask is not None else None
+        candidates = len(self.groups) if mask is None else int(verses_allowed.sum())
+        # A mask leaving few chunks (gathering costs ~3x a contiguous pass) is cheaper to scan exactly
+        if exact or fan_out >= candidates or (mask is not None and mask.sum() * 3 <= len(self.groups)):
+            return self.search_exact(query, top_k, mask)
+
+        coarse = self.centroids @ query
+        if verses_allowed is not None:
+            coarse[~verses_allowed] = -np.inf
+        top_verses = self._top(coarse, fan_out + 1)
+        margin = float(coarse[top_verses[0]] - coarse[top_verses[-1]])
+        if margin < min_margin:
+            hits, stats = self.search_exact(query, top_k, mask)
+            stats.update(margin=margin, fallback=True)
+            return hits, stats
+
+        rows = np.concatenate([np.arange(self.starts[v], self.ends[v]) for v in top_verses[:-1]])
+        rows, scores = self._scores(rows, query, mask)
+        top = self._top(scores, top_k)
+        if len(top) < top_k:
+            return self.search_exact(query, top_k, mask)
+        return self._hits(rows[top], scores[top]), {
+            'mode': 'coarse', 'scanned': len(self.groups) + len(rows), 'margin': margin}
+
+
+def d1_chunks(source_db=None):
+    """chunk_id -> (verse_id, chunk_type, book code, chapter, synonyms) from
+    the D1 mirror ({} when there is no mirror)."""
+    d1 = {}
+    try:
+        conn = storage.read_connection(source_db or storage.LOCAL_DB)
+        for row in conn.execute("""
+            SELECT c.id, c.verse_id, c.chunk_type, b.code, v.chapter, v.synonyms
+            FROM vedabase_chunks c
+            JOIN vedabase_verses v ON c.verse_id = v.id
+            JOIN vedabase_books b ON v.book_id = b.id
+        """):
+            d1[row[0]] = row[1:]
+    except sqlite3.Error:
+        pass
+    return d1
+
+
+def load_columns(chunk_ids, metadatas, d1):
+    """Filter columns for the chunks, from the D1 mirror (d1_chunks()) where
+    it has them (artifact metadata otherwise)."""
+    books, chunk_types, cantos, chapters, years, recipients = [], [], [], [], [], []
+    for chunk_id, metadata in zip(chunk_ids, metadatas):
+        row = d1.get(int(chunk_id))
+        chunk_type, book, chapter, synonyms = row[1:] if row else (
+            metadata.get('chunk_type'), metadata.get('book_code'), metadata.get('chapter'), None)
+        book = (book or '').lower()
+        chapter = str(chapter) if chapter is not None else ''
+        year = YEAR_RE.search(chapter)
+        books.append(book)
+        chunk_types.append(chunk_type)
+        cantos.append(int(book[2:]) if book.startswith('sb') and book[2:].isdigit() else None)
+        chapters.append(verse_refs.chapter_number(chapter) if not year else None)
+        years.append(int(year.group(1)) if year else None)
+        recipients.append(synonyms if book == 'letters' else '')
+
+    columns = metadata_columns.MetadataColumns(len(chunk_ids))
+    columns.add_text('book', books)
+    columns.add_text('chunk_type', chunk_types)
+    columns.add_text('recipient', recipients)
+    columns.add_number('canto', cantos)
+    columns.add_number('chapter', chapters)
+    columns.add_number('year', years)
+    return columns
+
+
+def shared(stores=STORES):
+    """One index per process, built on first use."""
+    global _shared
+    if _shared is None:
+        _shared = VedabaseIndex(stores)
+    return _shared
+
+
+def group_by_verse(hits):
+    """OrderedDict verse_id -> hits, verses in order of their best hit."""
+    groups = OrderedDict()
+    for hit in hits:
+        groups.setdefault(hit['verse_id'], []).append(hit)
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local verse -> chunk vector index')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('info')
+    p = sub.add_parser('bench', help='coarse vs exact on random corpus vectors as queries')
+    p.add_argument('--queries', type=int, default=100)
+    p.add_argument('--top-k', type=int, default=10)
+    p.add_argument('--fan-out', type=int, default=FAN_OUT)
+    p.add_argument('--where', help='filter expression applied to both searches')
+    args = parser.parse_args()
+
+    started = time.time()
+    index = VedabaseIndex()
+    print(f"📚 {len(index):,} chunks in {len(index.groups):,} verses from {len(index.stores)} artifacts "
+          f"({time.time() - started:.1f}s to build)")
+    if args.command == 'info':
+        sizes = index.ends - index.starts
+        print(f"   chunks per verse: mean {sizes.mean():.1f}, max {sizes.max()}")
+        for name in sorted(index.columns.vocab):
+            print(f"   {name}: {len(index.columns.vocab[name]):,} distinct values")
+        print(f"   numeric: {', '.join(sorted(index.columns.numbers))}")
+        print(f"   skipped: {index.skipped['no_verse']:,} without a verse_id, "
+              f"{index.skipped['duplicate']:,} duplicates, {index.skipped['deleted']:,} tombstoned")
+        return
+
+    rng = np.random.default_rng(0)
+    queries = index.vectors[rng.choice(len(index), args.queries, replace=False)]
+    queries = normalize(queries + rng.normal(0, 0.02, queries.shape).astype(np.float32))
+    timings = {'coarse': 0.0, 'exact': 0.0}
+    recall, scanned, fallbacks = 0.0, 0, 0
+    for query in queries:
+        started = time.perf_counter()
+        hits, stats = index.search(query, args.top_k, args.fan_out, where=args.where)
+        timings['coarse'] += time.perf_counter() - started
+        started = time.perf_counter()
+        exact, _ = index.search(query, args.top_k, exact=True, where=args.where)
+        timings['exact'] += time.perf_counter() - started
+        recall += len({h['chunk_id'] for h in hits} & {h['chunk_id'] for h in exact}) / max(len(exact), 1)
+        scanned += stats['scanned']
+        fallbacks += stats.get('fallback', False)
+    n = len(queries)
+    print(f"⏱️  two-level {timings['coarse'] / n * 1000:.2f} ms, exact {timings['exact'] / n * 1000:.2f} ms per query")
+    print(f"   recall@{args.top_k} {recall / n:.3f}, {scanned / n:,.0f} vectors scored vs {len(index):,} "
+          f"({fallbacks} exact fallbacks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Vedabase retrieval from Python.
+
+search() answers verse citations ("BG 2.13", "SB 1.2.6", "CC Madhya
+20.108") straight from the verse_refs index with no API call. Any other
+query is embedded and sent to Vectorize, and the matching chunks are
+read from the D1 mirror; with local=True (--local) the embedding is
+searched in the in-process two-level verse -> chunk index instead
+(vedabase_index.py). When a question cites a verse and also asks
+something ("what does BG 2.13 say about the soul?"), the cited verse
+comes first and the semantic hits follow.
+
+Ingest embeds one chunk per near-duplicate cluster (near_dup.py), so a
+semantic hit lists the verses of its unembedded copies in 'duplicates',
+and with --book (on Vectorize) a copy in that book stands in for a
+representative from another book.
+
+Usage:
+    python3 vedabase_search.py "BG 2.13"
+    python3 vedabase_search.py "What is the nature of the soul?" [--top-k 8] [--book bg]
+    python3 vedabase_search.py "What is the nature of the soul?" --local [--fan-out 64]
+    python3 vedabase_search.py "preaching in the West" --local --where "book == 'letters' and 1968 <= year <= 1970"
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import context_window
+import near_dup
+import rate_limit
+import storage
+import vectorize_api
+import vedabase_index
+import verse_refs
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_TOP_K = 8
+CANDIDATE_FACTOR = 2      # Vectorize candidates per requested hit (book filter, duplicates)
+CONTEXT_WINDOW = 1        # neighbouring paragraphs of the same verse added around each hit
+
+_openai_client = None
+
+
+def openai_client():
+    """OpenAI client, created on first semantic query (exact lookups never need it)."""
+    global _openai_client
+    if _openai_client is None:
+        from dotenv import load_dotenv
+        from openai import OpenAI
+        load_dotenv()
+        _openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    return _openai_client
+
+
+def exact_hits(query, source_db=None):
+    """Chunks of every verse cited in query, in citation order."""
+    hits = []
+    for ref, verses in verse_refs.lookup(query, source_db):
+        for verse in verses:
+            for chunk in verse['chunks']:
+                hits.append({
+                    'chunk_id': chunk['chunk_id'], 'verse_id': verse['verse_id'],
+                    'book_code': verse['book_code'], 'book_name': verse['book_name'],
+                    'chapter': verse['chapter'], 'verse_number': verse['verse_number'],
+                    'chunk_type': chunk['chunk_type'], 'chunk_index': chunk['chunk_index'],
+                    'content': chunk['content'], 'score': 1.0, 'match': verse_refs.format_ref(ref),
+                })
+    return hits
+
+
+def fetch_chunks(chunk_ids, source_db=None):
+    """{chunk_id: chunk row with its verse and book} from the D1 mirror."""
+    if not chunk_ids:
+        return {}
+    placeholders = ', '.join('?' * len(chunk_ids))
+    rows = storage.read_connection(source_db or storage.LOCAL_DB).execute(f"""
+        SELECT c.id, c.verse_id, b.code, b.name, v.chapter, v.verse_number,
+               c.chunk_type, c.chunk_index, c.content
+        FROM vedabase_chunks c
+        JOIN vedabase_verses v ON c.verse_id = v.id
+        JOIN vedabase_books b ON v.book_id = b.id
+        WHERE c.id IN ({placeholders})
+    """, list(chunk_ids))
+    return {row[0]: {
+        'chunk_id': row[0], 'verse_id': row[1], 'book_code': row[2], 'book_name': row[3],
+        'chapter': row[4], 'verse_number': row[5], 'chunk_type': row[6], 'chunk_index': row[7],
+        'content': row[8],
+    } for row in rows}
+
+
+def with_duplicates(hits, source_db=None):
+    """Attach hit['duplicates']: the near-duplicate chunks (with their verses)
+    that were not embedded because hit's chunk represents them."""
+    if not hits or not Path(near_dup.DEDUP_DB).exists():
+        return hits
+    conn = near_dup.connect()
+    try:
+        near_dup.expand(conn, near_dup.corpus_key('vedabase_chunks', source_db), hits, key='chunk_id')
+    finally:
+        conn.close()
+    copies = fetch_chunks(sorted({chunk_id for hit in hits for chunk_id in hit['duplicates']}), source_db)
+    for hit in hits:
+        hit['duplicates'] = [copies[chunk_id] for chunk_id in hit['duplicates'] if chunk_id in copies]
+    return hits
+
+
+def in_book(hit, book):
+    """hit if it is in book, else its first duplicate that is (None if neither)."""
+    if hit['book_code'].lower() == book.lower():
+        return hit
+    for copy in hit.get('duplicates', []):
+        if copy['book_code'].lower() == book.lower():
+            original = {key: value for key, value in hit.items() if key not in ('score', 'duplicates')}
+            rest = [other for other in hit['duplicates'] if other is not copy]
+            return dict(copy, score=hit['score'], duplicates=[original] + rest)
+    return None
+
+
+def semantic_hits(query, top_k=DEFAULT_TOP_K, book=None, source_db=None, local=False, fan_out=None, where=None):
+    """Embed query and return the top_k matches (Vectorize, or the local index) with their text.
+
+    Locally, book and where are pushed down into the index as one mask, so
+    there only embedded chunks of the book match (not their copies).
+    """
+    response = rate_limit.embed(openai_client(), model=EMBEDDING_MODEL, input=query)
+    vector = response.data[0].embedding
+    scores = {}
+    if local:
+        conditions = [f"({where})"] if where else []
+        if book:
+            conditions.append(f"book == {book.lower()!r}")
+        matches, _ = vedabase_index.shared().search(vector, top_k, fan_out or vedabase_index.FAN_OUT,
+                                                    where=' and '.join(conditions) or None)
+        for match in matches:
+            scores[match['chunk_id']] = match['score']
+    else:
+        for match in vectorize_api.query(vector, top_k * CANDIDATE_FACTOR, filter={'source': 'vedabase'}):
+            metadata = match.get('metadata') or {}
+            chunk_id = metadata.get('chunk_id')
+            if chunk_id is not None and chunk_id not in scores:
+                scores[chunk_id] = match['score']
+
+    chunks = fetch_chunks(list(scores), source_db)
+    hits = with_duplicates([dict(chunks[chunk_id], score=score) for chunk_id, score in scores.items()
+                            if chunk_id in chunks], source_db)
+    if book:
+        hits = [hit for hit in (in_book(hit, book) for hit in hits) if hit]
+    return hits[:top_k]
+
+
+def search(query, top_k=DEFAULT_TOP_K, book=None, source_db=None,
+           window=CONTEXT_WINDOW, token_budget=context_window.TOKEN_BUDGET, local=False, fan_out=None,
+           where=None):
+    """Exact verse lookup when query cites verses, semantic search otherwise (or as well).
+
+    Semantic hits are widened to window neighbouring paragraphs of their
+    verse (context_window.expand); exact hits already hold the whole verse.
+    """
+    refs = verse_refs.parse(query)
+    exact = exact_hits(query, source_db) if refs else []
+    if exact and verse_refs.is_pure_reference(query, refs):
+        return exact
+
+    seen = {hit['chunk_id'] for hit in exact}
+    semantic = [hit for hit in semantic_hits(query, top_k, book, source_db, local, fan_out, where)
+                if hit['chunk_id'] not in seen]
+    semantic = semantic[:top_k]
+    if window > 0:
+        semantic = context_window.expand(storage.read_connection(source_db or storage.LOCAL_DB), semantic,
+                                         'vedabase_chunks', window, token_budget)
+    return exact + semantic
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search the Vedabase corpus')
+    parser.add_argument('query', nargs='+')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+    parser.add_argument('--book', help='only this book code (semantic search)')
+    parser.add_argument('--window', type=int, default=CONTEXT_WINDOW,
+                        help='neighbouring paragraphs added around each semantic hit (0 disables)')
+    parser.add_argument('--local', action='store_true', help='search the local verse -> chunk index, not Vectorize')
+    parser.add_argument('--fan-out', type=int, default=vedabase_index.FAN_OUT,
+                        help='verses kept by the coarse stage of the local index')
+    parser.add_argument('--where', help="local metadata filter, e.g. \"chunk_type == 'purport_paragraph' and canto >= 4\"")
+    args = parser.parse_args()
+    query = ' '.join(args.query)
+
+    if args.where and not args.local:
+        parser.error('--where filters the local index: add --local')
+    started = time.perf_counter()
+    hits = search(query, args.top_k, args.book, window=args.window, local=args.local, fan_out=args.fan_out,
+                  where=args.where)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    for i, (verse_id, verse_hits) in enumerate(vedabase_index.group_by_verse(hits).items(), 1):
+        first = verse_hits[0]
+        label = f"exact {first['match']}" if 'match' in first else f"{first['score']:.3f}"
+        print(f"\n[{i}] {first['book_code']} {first['chapter'] or ''} {first['verse_number']} ({label})")
+        for hit in verse_hits:
+            print(f"    · {hit['chunk_type']} #{hit['chunk_index']}: {hit['content'][:300]}")
+            if hit.get('duplicates'):
+                print("      ≈ also in " + ', '.join(f"{copy['book_code']} {copy['chapter'] or ''} {copy['verse_number']}"
+                                              for copy in hit['duplicates']))
+    print(f"\n⏱️  {len(hits)} results in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
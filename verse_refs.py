@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Exact verse references: parser and B-tree index over vedabase_verses.
+
+Queries such as "BG 2.13", "SB 1.2.6", "CC Madhya 20.108" or
+"Bhagavad-gita 1.16-18" name a verse outright; embedding them only finds
+neighbours. parse() recognises the citation, and lookup() resolves it
+through the verse_refs table (a WITHOUT ROWID B-tree keyed by
+book_code, chapter, verse) to the verse and its chunks from the D1
+mirror. No API call, well under 5 ms.
+
+The stored numbering is inconsistent across imports ('2.13', 'TEXT 1',
+'TEXTS 16-18'; chapters 'Chapter 2', 'CHAPTER TWO: ...', 'Part 1 -
+Chapter 3'), so build() normalises every verse into one row per verse
+number it covers. The index is rebuilt automatically when the verse
+count of the mirror changes.
+
+Usage:
+    python3 verse_refs.py build
+    python3 verse_refs.py lookup "SB 1.2.6"
+"""
+
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import storage
+
+REFS_DB = "verse_refs.db"
+MAX_CHAPTER_VERSES = 100     # chapter-only references ("BG 2") are capped
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+    'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14,
+    'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19,
+    'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50, 'sixty': 60, 'seventy': 70,
+    'eighty': 80, 'ninety': 90,
+}
+LILAS = {'adi': 1, 'ādi': 1, 'madhya': 2, 'antya': 3}
+LILA_NAMES = {1: 'Adi', 2: 'Madhya', 3: 'Antya'}
+
+CHAPTER_RE = re.compile(r'chapter\s+(\d+|[a-z]+(?:[\s-][a-z]+)?)', re.I)
+DIGITS_RE = re.compile(r'\d+')
+VERSE_RE = re.compile(r'(\d+(?:\.\d+)*)(?:\s*[-–]\s*(\d+))?')
+
+REFERENCE_RE = re.compile(r"""
+    (?<![\w.])
+    (?P<book>
+        b\.?\s?g\.? | bhagavad[\s-]*g[iī]t[aā] | g[iī]t[aā]
+      | s\.?\s?b\.? | (?:[sś]r[iī]mad[\s-]*)?bh[aā]gavat(?:am)?
+      | c\.?\s?c\.? | (?:[sś]r[iī]\s+)?c(?:h)?aitanya[\s-]*carit[aā]m[rṛ]i?t[aā]
+      | k\.?\s?b\.? | kr[sṣ][nṇ]a\s+book | krishna\s+book
+    )
+    (?:\s*(?P<lila>[aā]di|madhya|antya)(?:[\s-]*l[iī]l[aā])?)?
+    \s*(?P<nums>\d+(?:\s*[.:]\s*\d+){0,2})
+    (?:\s*[-–]\s*(?P<end>\d+))?
+    (?![\w.]*\d)
+""", re.I | re.X)
+
+
+def words_to_int(text):
+    """'twenty-one' -> 21; None if it is not a number."""
+    total = 0
+    for word in re.split(r'[\s-]+', text.lower()):
+        if word not in NUMBER_WORDS:
+            return None
+        total += NUMBER_WORDS[word]
+    return total or None
+
+
+def chapter_number(chapter):
+    """Chapter number from 'Chapter 2', 'CHAPTER TWO: ...', 'Part 1 - Chapter 3', '5 / Title'."""
+    if not chapter:
+        return None
+    match = CHAPTER_RE.search(chapter)
+    if match:
+        value = match.group(1)
+        return int(value) if value.isdigit() else words_to_int(value)
+    match = DIGITS_RE.search(chapter)
+    return int(match.group()) if match else None
+
+
+def verse_numbers(verse_number):
+    """(chapter or None, first, last) from '2.13', '1.2.6', 'TEXT 1', 'TEXTS 16-18'."""
+    match = VERSE_RE.search(verse_number or '')
+    if not match:
+        return None
+    parts = [int(p) for p in match.group(1).split('.')]
+    first = parts[-1]
+    last = int(match.group(2)) if match.group(2) else first
+    return (parts[-2] if len(parts) > 1 else None), first, max(first, last)
+
+
+def book_of(name, lila, numbers):
+    """(book_code, chapter, verse or None) for a parsed citation, or None."""
+    name = re.sub(r'[\s.-]', '', name.lower())
+    if name == 'bg' or 'gita' in name or 'gītā' in name:
+        book, rest = 'bg', numbers
+    elif name == 'sb' or 'bhagavat' in name or 'bhāgavat' in name:
+        if len(numbers) < 2:
+            return None
+        book, rest = f"sb{numbers[0]}", numbers[1:]
+    elif name == 'cc' or 'carit' in name:
+        if lila:
+            book, rest = f"cc{LILAS[lila.lower()]}", numbers
+        elif len(numbers) >= 2 and numbers[0] in LILA_NAMES:
+            book, rest = f"cc{numbers[0]}", numbers[1:]
+        else:
+            return None
+    else:
+        book, rest = 'kb', numbers
+    if not rest or len(rest) > 2:
+        return None
+    return book, rest[0], (rest[1] if len(rest) > 1 else None)
+
+
+def parse(query):
+    """Verse citations in query: [{'book_code', 'chapter', 'verse', 'end', 'span'}]."""
+    refs = []
+    for match in REFERENCE_RE.finditer(query):
+        numbers = [int(n) for n in re.split(r'\s*[.:]\s*', match.group('nums'))]
+        resolved = book_of(match.group('book'), match.group('lila'), numbers)
+        if not resolved:
+            continue
+        book, chapter, verse = resolved
+        end = int(match.group('end')) if match.group('end') and verse is not None else verse
+        refs.append({'book_code': book, 'chapter': chapter, 'verse': verse,
+                     'end': max(verse, end) if verse is not None else None, 'span': match.span()})
+    return refs
+
+
+def is_pure_reference(query, refs=None):
+    """True when query is nothing but citations (and punctuation)."""
+    refs = parse(query) if refs is None else refs
+    if not refs:
+        return False
+    rest = query
+    for ref in reversed(refs):
+        rest = rest[:ref['span'][0]] + rest[ref['span'][1]:]
+    return not re.sub(r'[\W_]|\band\b', '', rest, flags=re.I)
+
+
+def format_ref(ref):
+    """'SB 1.2.6', 'CC Madhya 20.108', 'BG 1.16-18', 'BG 2'."""
+    book = ref['book_code']
+    if book.startswith('sb'):
+        prefix = f"SB {book[2:]}."
+    elif book.startswith('cc'):
+        prefix = f"CC {LILA_NAMES[int(book[2:])]} "
+    else:
+        prefix = f"{book.upper()} "
+    if ref['verse'] is None:
+        return f"{prefix}{ref['chapter']}"
+    verses = f"{ref['verse']}-{ref['end']}" if ref['end'] != ref['verse'] else f"{ref['verse']}"
+    return f"{prefix}{ref['chapter']}.{verses}"
+
+
+# --- index --------------------------------------------------------------
+
+def connect(db_path=REFS_DB):
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS verse_refs (
+        book_code TEXT NOT NULL,
+        chapter INTEGER NOT NULL,
+        verse INTEGER NOT NULL,
+        verse_id INTEGER NOT NULL,
+        PRIMARY KEY (book_code, chapter, verse, verse_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+
+def source_signature(source_db=None):
+    """Changes whenever verses are added to or removed from the mirror."""
+    count, max_id = storage.read_connection(source_db or storage.LOCAL_DB).execute(
+        "SELECT COUNT(*), MAX(id) FROM vedabase_verses").fetchone()
+    return f"{count}:{max_id}"
+
+
+def build(source_db=None, db_path=REFS_DB):
+    """(Re)build the reference index from the D1 mirror; returns (verses, rows)."""
+    source = storage.read_connection(source_db or storage.LOCAL_DB)
+    rows, verses = [], 0
+    for verse_id, code, chapter, verse_number in source.execute("""
+        SELECT v.id, b.code, v.chapter, v.verse_number
+        FROM vedabase_verses v JOIN vedabase_books b ON v.book_id = b.id
+    """):
+        verses += 1
+        numbers = verse_numbers(verse_number)
+        if not numbers:
+            continue
+        embedded_chapter, first, last = numbers
+        number = embedded_chapter or chapter_number(chapter)
+        if number is None:
+            continue
+        rows.extend((code.lower(), number, verse, verse_id) for verse in range(first, last + 1))
+
+    conn = connect(db_path)
+    with conn:
+        conn.execute("DELETE FROM verse_refs")
+        storage.executemany_chunked(conn, "INSERT OR IGNORE INTO verse_refs VALUES (?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (source_signature(source_db),))
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('built_at', ?)", (str(time.time()),))
+    conn.close()
+    return verses, len(rows)
+
+
+_checked = set()
+
+
+def ensure_index(source_db=None, db_path=REFS_DB):
+    """Build the index if missing or stale (checked once per process)."""
+    key = (source_db, db_path)
+    if key in _checked:
+        return
+    current = None
+    if Path(db_path).exists():
+        conn = connect(db_path)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        conn.close()
+        current = row[0] if row else None
+    if current != source_signature(source_db):
+        build(source_db, db_path)
+    _checked.add(key)
+
+
+def resolve(ref, db_path=REFS_DB):
+    """Verse ids cited by ref, in order."""
+    refs = storage.read_connection(db_path)
+    if ref['verse'] is None:
+        rows = refs.execute("""
+            SELECT verse_id FROM verse_refs WHERE book_code = ? AND chapter = ? ORDER BY verse LIMIT ?
+        """, (ref['book_code'], ref['chapter'], MAX_CHAPTER_VERSES))
+    else:
+        rows = refs.execute("""
+            SELECT verse_id FROM verse_refs
+            WHERE book_code = ? AND chapter = ? AND verse BETWEEN ? AND ? ORDER BY verse
+        """, (ref['book_code'], ref['chapter'], ref['verse'], ref['end']))
+    return list(dict.fromkeys(row[0] for row in rows))
+
+
+def fetch_verses(verse_ids, source_db=None):
+    """Verse rows with their chunks: [{'verse_id', ..., 'chunks': [...]}] in verse_ids order."""
+    if not verse_ids:
+        return []
+    conn = storage.read_connection(source_db or storage.LOCAL_DB)
+    placeholders = ', '.join('?' * len(verse_ids))
+    verses = {row[0]: {
+        'verse_id': row[0], 'book_code': row[1], 'book_name': row[2], 'chapter': row[3],
+        'verse_number': row[4], 'sanskrit': row[5], 'synonyms': row[6], 'translation': row[7], 'chunks': [],
+    } for row in conn.execute(f"""
+        SELECT v.id, b.code, b.name, v.chapter, v.verse_number, v.sanskrit, v.synonyms, v.translation
+        FROM vedabase_verses v JOIN vedabase_books b ON v.book_id = b.id
+        WHERE v.id IN ({placeholders})
+    """, verse_ids)}
+    for chunk_id, verse_id, chunk_type, chunk_index, content in conn.execute(f"""
+        SELECT id, verse_id, chunk_type, chunk_index, content FROM vedabase_chunks
+        WHERE verse_id IN ({placeholders}) ORDER BY verse_id, chunk_index, id
+    """, verse_ids):
+        verses[verse_id]['chunks'].append({'chunk_id': chunk_id, 'chunk_type': chunk_type,
+                                           'chunk_index': chunk_index, 'content': content})
+    return [verses[verse_id] for verse_id in verse_ids if verse_id in verses]
+
+
+def lookup(query, source_db=None, db_path=REFS_DB):
+    """[(ref, [verse, ...])] for every citation in query (no API calls)."""
+    refs = parse(query)
+    if not refs:
+        return []
+    ensure_index(source_db, db_path)
+    return [(ref, fetch_verses(resolve(ref, db_path), source_db)) for ref in refs]
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'lookup'):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == 'build':
+        started = time.time()
+        verses, rows = build()
+        print(f"✅ Indexed {verses:,} verses as {rows:,} references in {time.time() - started:.2f}s")
+        return
+
+    query = ' '.join(sys.argv[2:])
+    ensure_index()
+    started = time.perf_counter()
+    results = lookup(query)
+    elapsed = (time.perf_counter() - started) * 1000
+    if not results:
+        print(f"No verse reference recognised in: {query}")
+        sys.exit(1)
+    for ref, verses in results:
+        print(f"📖 {format_ref(ref)}: {len(verses)} verse(s)")
+        for verse in verses:
+            print(f"   [{verse['book_code']}] {verse['chapter']} {verse['verse_number']}")
+            print(f"   {(verse['translation'] or '')[:200]}")
+            print(f"   {len(verse['chunks'])} chunks")
+    print(f"⏱️  {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()